@@ -0,0 +1,304 @@
+# autosave.py
+import fcntl
+import hashlib
+import itertools
+import json
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple
+
+from ratelimit import LRUCache
+
+# --------------------------------
+# АВТОСОХРАНЕНИЕ ОТВЕТОВ КАНДИДАТА
+# --------------------------------
+#
+# Фронт присылает не полные тексты, а дельты по каждой задаче:
+#   {"kind": "coding" | "theory", "level": "easy", "start": 10, "end": 12, "text": "ab"}
+# что означает: new = old[:start] + text + old[end:].
+# start/end — в кодовых точках Unicode (как индексы str в Python); фронт
+# считает их по Array.from(text), а не по UTF-16 единицам строки JS.
+#
+# Каждый принятый пакет дельт — это новая версия. Пакеты пишутся в
+# append-only лог на токен (одна запись = 4 байта длины + zlib(json)),
+# а последний снимок держим в памяти, чтобы не переигрывать лог на каждый запрос.
+# Снимки в памяти — LRU с бюджетом по объёму: вытесненный снимок
+# при следующем обращении собирается из лога заново.
+#
+# API может работать в несколько процессов: тогда снимок в памяти помнит,
+# до какого байта лога он дочитан, и перед каждой операцией дочитывает
+# чужие записи. Операции над токеном сериализует только flock его лога —
+# кандидаты с разными токенами друг друга не ждут.
+#
+# Лог, переросший AUTOSAVE_COMPACT_BYTES, переписывается одной записью-снимком
+# ({"version": ..., "snapshot": {"coding": ..., "theory": ...}}) в новый файл,
+# который атомарно подменяет старый (os.replace). Снимок в памяти помнит inode
+# и mtime лога: если файл подменили, он перечитывается с начала.
+
+AUTOSAVE_DIR = Path(__file__).with_name("autosaves")
+
+KINDS = ("coding", "theory")
+
+_HEADER = struct.Struct(">I")
+
+# бюджет памяти на снимки процесса (примерно, по объёму текстов ответов)
+AUTOSAVE_MEMORY_BUDGET = int(os.environ.get("AUTOSAVE_MEMORY_BUDGET_MB", "64")) * 1024 * 1024
+AUTOSAVE_MAX_SNAPSHOTS = 10_000
+
+# порог размера лога, после которого он сжимается в один снимок
+AUTOSAVE_COMPACT_BYTES = int(os.environ.get("AUTOSAVE_COMPACT_KB", "256")) * 1024
+
+
+def _snapshot_size(snapshot: Dict[str, Any]) -> int:
+    texts = [*snapshot["coding"].values(), *snapshot["theory"].values()]
+    # utf-8 длина — нижняя оценка для str; плюс накладные расходы словарей
+    return 512 + sum(len(t.encode("utf-8")) + 64 for t in texts)
+
+
+# token -> {"version": int, "inode": int, "mtime": int, "offset": int,
+#           "coding": {level: text}, "theory": {level: text}}
+_snapshots = LRUCache(
+    max_entries=AUTOSAVE_MAX_SNAPSHOTS, max_bytes=AUTOSAVE_MEMORY_BUDGET, sizeof=_snapshot_size
+)
+
+
+class AutosaveConflict(Exception):
+    """Клиент прислал дельты от устаревшей версии."""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Текущая версия автосохранения: {current_version}")
+        self.current_version = current_version
+
+
+def _log_path(token: str) -> Path:
+    # токен приходит из URL — в имени файла его хеш: замена «опасных» символов
+    # склеивала бы разные токены (a-b и a_b) в один лог
+    digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    path = AUTOSAVE_DIR / f"{digest}.log"
+    if not path.exists():
+        # лог, заведённый до перехода на хеши, подхватываем под новым именем
+        safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in token)
+        try:
+            os.replace(AUTOSAVE_DIR / f"{safe}.log", path)
+        except FileNotFoundError:
+            pass
+    return path
+
+
+def _empty_snapshot(inode: int = 0) -> Dict[str, Any]:
+    return {"version": 0, "inode": inode, "mtime": 0, "offset": 0, "coding": {}, "theory": {}}
+
+
+@contextmanager
+def _locked_log(token: str) -> Iterator[BinaryIO]:
+    """Лог токена, открытый на дозапись под эксклюзивным flock."""
+    AUTOSAVE_DIR.mkdir(exist_ok=True)
+    path = _log_path(token)
+    while True:
+        with open(path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # пока ждали блокировку, лог могли сжать и подменить —
+                # тогда мы держим flock на старом файле и открываем заново
+                try:
+                    current = os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+                except FileNotFoundError:
+                    current = False
+                if current:
+                    yield f
+                    return
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _apply_deltas(snapshot: Dict[str, Any], deltas: List[Dict[str, Any]]) -> None:
+    """
+    Применяем дельты к снимку на месте.
+    Некорректная дельта (не тот kind, выход за границы) -> ValueError.
+    """
+    for d in deltas:
+        kind = d["kind"]
+        if kind not in KINDS:
+            raise ValueError(f"Неизвестный тип ответа: {kind!r}")
+
+        answers = snapshot[kind]
+        old = answers.get(d["level"], "")
+        start, end = d["start"], d["end"]
+        if not (0 <= start <= end <= len(old)):
+            raise ValueError(
+                f"Дельта [{start}:{end}] выходит за границы ответа длины {len(old)}"
+            )
+
+        answers[d["level"]] = old[:start] + d["text"] + old[end:]
+
+
+def _read_records(token: str, offset: int) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """Записи лога начиная с offset: (запись, смещение сразу после неё)."""
+    with open(_log_path(token), "rb") as f:
+        f.seek(offset)
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            (size,) = _HEADER.unpack(header)
+            payload = f.read(size)
+            if len(payload) < size:
+                # недописанная запись (упали посреди write) — дальше не читаем
+                return
+            yield json.loads(zlib.decompress(payload)), f.tell()
+
+
+def _continues(snapshot: Dict[str, Any], first: Tuple[Dict[str, Any], int] | None) -> bool:
+    # inode удалённого при сжатии лога может достаться новому файлу, поэтому
+    # совпадения inode мало: первая запись после offset должна продолжать версию снимка
+    return (
+        first is not None
+        and isinstance(first[0], dict)
+        and "deltas" in first[0]
+        and first[0].get("version") == snapshot["version"] + 1
+    )
+
+
+def _catch_up(token: str, snapshot: Dict[str, Any], log: BinaryIO) -> None:
+    """
+    Дочитываем в снимок записи лога после snapshot["offset"] (их мог дописать
+    другой процесс). log — открытый под flock лог токена.
+    """
+    stat = os.fstat(log.fileno())
+    if stat.st_ino != snapshot["inode"]:
+        # лог сжали (или снимка ещё не было) — читаем новый файл с начала
+        snapshot.update(_empty_snapshot(stat.st_ino))
+    elif (stat.st_size, stat.st_mtime_ns) == (snapshot["offset"], snapshot["mtime"]):
+        # с прошлого раза в лог никто не писал
+        return
+
+    records = _read_records(token, snapshot["offset"])
+    if snapshot["offset"]:
+        try:
+            first = next(records, None)
+        except (ValueError, zlib.error):
+            first = None
+        if _continues(snapshot, first):
+            records = itertools.chain([first], records)
+        else:
+            snapshot.update(_empty_snapshot(stat.st_ino))
+            records = _read_records(token, 0)
+
+    for record, offset in records:
+        if "snapshot" in record:
+            snapshot["coding"] = dict(record["snapshot"]["coding"])
+            snapshot["theory"] = dict(record["snapshot"]["theory"])
+        else:
+            _apply_deltas(snapshot, record["deltas"])
+        snapshot["version"] = record["version"]
+        snapshot["offset"] = offset
+    snapshot["mtime"] = stat.st_mtime_ns
+
+
+def _get_snapshot(token: str, log: BinaryIO) -> Dict[str, Any]:
+    snapshot = _snapshots.get(token)
+    if snapshot is None:
+        snapshot = _empty_snapshot()
+    _catch_up(token, snapshot, log)
+    _snapshots.put(token, snapshot)
+    return snapshot
+
+
+def _encode_record(record: Dict[str, Any]) -> bytes:
+    payload = zlib.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+    return _HEADER.pack(len(payload)) + payload
+
+
+def _compact(token: str, snapshot: Dict[str, Any]) -> None:
+    """
+    Переписываем лог одной записью-снимком. Вызывается под flock текущего лога:
+    новый файл подменяет его атомарно, ждущие блокировку заметят смену inode.
+    """
+    path = _log_path(token)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    record = {
+        "version": snapshot["version"],
+        "snapshot": {"coding": snapshot["coding"], "theory": snapshot["theory"]},
+    }
+    with open(tmp, "wb") as f:
+        f.write(_encode_record(record))
+        f.flush()
+        os.fsync(f.fileno())
+        stat = os.fstat(f.fileno())
+    os.replace(tmp, path)
+    snapshot["inode"] = stat.st_ino
+    snapshot["mtime"] = stat.st_mtime_ns
+    snapshot["offset"] = stat.st_size
+
+
+def append_deltas(token: str, base_version: int, deltas: List[Dict[str, Any]]) -> int:
+    """
+    Применяем пакет дельт поверх версии base_version и дописываем его в лог.
+    Возвращаем новую версию.
+    """
+    # flock лога делает проверку версии и дозапись атомарными
+    # и между потоками, и между процессами
+    with _locked_log(token) as f:
+        snapshot = _get_snapshot(token, f)
+        if base_version != snapshot["version"]:
+            raise AutosaveConflict(snapshot["version"])
+
+        if not deltas:
+            return snapshot["version"]
+
+        # применяем к копии, чтобы битая дельта не испортила снимок
+        updated = {
+            **snapshot,
+            "version": snapshot["version"] + 1,
+            "coding": dict(snapshot["coding"]),
+            "theory": dict(snapshot["theory"]),
+        }
+        _apply_deltas(updated, deltas)
+
+        f.write(_encode_record({"version": updated["version"], "deltas": deltas}))
+        f.flush()
+        updated["offset"] = f.tell()
+        updated["mtime"] = os.fstat(f.fileno()).st_mtime_ns
+
+        if updated["offset"] > AUTOSAVE_COMPACT_BYTES:
+            _compact(token, updated)
+
+        _snapshots.put(token, updated)
+        return updated["version"]
+
+
+def load_snapshot(token: str) -> Dict[str, Any]:
+    """
+    Последний сохранённый снимок ответов:
+    {"version": int, "coding_solutions": {...}, "theory_solutions": {...}}
+    """
+    if not _log_path(token).exists():
+        # лога нет — ничего не сохраняли (или уже выбросили); файл не заводим
+        _snapshots.pop(token)
+        snapshot = _empty_snapshot()
+    else:
+        with _locked_log(token) as f:
+            snapshot = _get_snapshot(token, f)
+    return {
+        "version": snapshot["version"],
+        "coding_solutions": dict(snapshot["coding"]),
+        "theory_solutions": dict(snapshot["theory"]),
+    }
+
+
+def discard(token: str) -> None:
+    """Интервью ушло в архив (ответы сохранены там) — лог и снимок больше не нужны."""
+    _snapshots.pop(token)
+    _log_path(token).unlink(missing_ok=True)
+
+
+def memory_stats() -> Dict[str, int]:
+    return {
+        "snapshots": len(_snapshots),
+        "bytes": _snapshots.nbytes,
+        "budget_bytes": AUTOSAVE_MEMORY_BUDGET,
+        "evictions": _snapshots.evictions,
+    }
@@ -1,25 +1,72 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr, ValidationInfo, constr, field_validator
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, EmailStr, Field, ValidationInfo, constr, field_validator
 from contextlib import asynccontextmanager
+import anyio.to_thread
 import hashlib
+import os
 import secrets
 import sqlite3
+import threading
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Literal
 import json
-import subprocess
-import sys
-import tempfile
+import time
+
+import autosave
+import cheat_log
+import drafts
+import http_cache
+import interview_lifecycle
+import jobs
+from http_cache import prerender
+from interview_pipeline import candidate_view, check_interview, create_interview, store_interview
+from interview_lifecycle import INTERVIEW_ARCHIVE, check_live, known_live, mark_in_progress
+from interview_store import INTERVIEWS
+from jobs import USE_JOB_QUEUE
+from llm_budget import LLM_BUDGETS, UNASSIGNED, BudgetExceeded, company_key
+from model_router import ROUTING_STATS
+from profiler import PROFILER, ProfilerBusy, thread_dump
+from plagiarism import PLAGIARISM_INDEX
+from ratelimit import LRUCache, TokenBucketLimiter
+from sandbox import run_code_on_samples
+from sandbox_pool import RUNNER_POOL
+from scheduler import (
+    BULK,
+    INTERACTIVE,
+    LLM_GATE,
+    PRIORITY,
+    SANDBOX_GATE,
+    current_workload,
+    workload,
+)
+from tracing import current_traceparent, span
 
-from generation import generate_interview_tasks
-from domain_tasks_generator import generate_domain_tasks, grade_candidate_answer
+# В режиме очереди эндпоинт ждёт воркера столько, потом отвечает 202 с job_id,
+# и фронт опрашивает /api/jobs/{job_id} — поток пула не держим минутами
+JOB_REPLY_WAIT_SECONDS = 15
+# сколько ждать генерацию по черновику, которая уже идёт
+GENERATE_WAIT_SECONDS = 900
 
+DB_PATH = Path(__file__).with_name("hr_users.db")
 
-# Простое in-memory хранилище интервью
-INTERVIEWS: Dict[str, Dict[str, Any]] = {}
+# сессия HR после входа: Authorization: Bearer <session_token>
+HR_SESSION_TTL_SECONDS = float(os.environ.get("HR_SESSION_TTL_DAYS", "7")) * 24 * 3600
 
-DB_PATH = Path(__file__).with_name("hr_users.db")
+# доступ к /api/admin/*: заголовок X-Admin-Token; без ADMIN_TOKEN — только с localhost
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# "Запустить" для одной задачи: кэш результатов по хэшу кода и лимит на токен
+RUN_CACHE = LRUCache(max_entries=2048)
+RUN_LIMITER = TokenBucketLimiter(rate=0.5, burst=5)  # ~30 запусков в минуту
+
+# античит-события: ~20 в секунду на интервью с запасом на всплески
+CHEAT_LIMITER = TokenBucketLimiter(rate=20, burst=500)
+CHEAT_MAX_BATCH = 500
+# email HR -> компания, с бюджета LLM которой идёт генерация
+HR_COMPANIES = LRUCache(max_entries=10_000)
 
 
 def init_db() -> None:
@@ -37,6 +84,15 @@ def init_db() -> None:
             )
             """
         )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS hr_sessions (
+                token TEXT PRIMARY KEY,
+                email TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
     conn.close()
 
 
@@ -46,6 +102,67 @@ def get_db_connection() -> sqlite3.Connection:
     return conn
 
 
+def company_for(email: str | None) -> str | None:
+    """Компания HR по email; неизвестный HR или без компании — None (общее ведро бюджета)."""
+    if not email:
+        return None
+    cached = HR_COMPANIES.get(email)
+    if cached is not None:
+        return cached or None
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT company FROM hr_users WHERE email = ?", (email,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    HR_COMPANIES.put(email, row["company"] or "")
+    return row["company"]
+
+
+def create_hr_session(email: str) -> str:
+    token = secrets.token_urlsafe(32)
+    now = time.time()
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute("DELETE FROM hr_sessions WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT INTO hr_sessions (token, email, expires_at) VALUES (?, ?, ?)",
+                (token, email, now + HR_SESSION_TTL_SECONDS),
+            )
+    finally:
+        conn.close()
+    return token
+
+
+def hr_email_for(request: Request) -> str | None:
+    """Email HR по заголовку Authorization: Bearer <session_token>; нет сессии — None."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            "SELECT email FROM hr_sessions WHERE token = ? AND expires_at >= ?",
+            (token.strip(), time.time()),
+        ).fetchone()
+    finally:
+        conn.close()
+    return row["email"] if row else None
+
+
+def require_hr(request: Request) -> str:
+    email = hr_email_for(request)
+    if email is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Нужно войти как HR",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return email
+
+
 def hash_password(password: str) -> str:
     salt = secrets.token_bytes(16)
     hashed = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, 100_000)
@@ -63,73 +180,76 @@ def verify_password(password: str, stored_hash: str) -> bool:
     return secrets.compare_digest(candidate, expected)
 
 
-def _parse_int_output(s: str) -> int:
-    s = s.strip()
-    return int(s)
-
-
-def run_one_code_on_tests(code: str, tests: List[Dict[str, str]]) -> Dict[str, Any]:
+def _run_job(kind: str, payload: Dict[str, Any], owner: str):
     """
-    Гоняем один питон-код по тестам.
-    tests: [{"input": "...", "output": "..."}]
+    Отдаём тяжёлую работу процессам worker.py и недолго ждём результат.
+    Приоритет в очереди — по классу нагрузки текущего запроса.
+    Не дождались — 202 и job_id, дальше фронт опрашивает /api/jobs/{job_id}
+    (с сессией HR или токеном интервью — см. owner в jobs.py).
     """
-    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False, encoding="utf-8") as f:
-        f.write(code)
-        tmp_path = f.name
-
-    total = len(tests)
-    passed = 0
-    failed_test: int | None = None
-
-    for i, t in enumerate(tests, start=1):
-        test_input = t["input"]
-        expected_raw = t["output"]
-
-        try:
-            proc = subprocess.run(
-                [sys.executable, tmp_path],
-                input=test_input.encode("utf-8"),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=3,
-            )
-        except subprocess.TimeoutExpired:
-            failed_test = i
-            break
-
-        stdout = proc.stdout.decode("utf-8", errors="ignore")
-
-        try:
-            exp = _parse_int_output(expected_raw)
-            got = _parse_int_output(stdout)
-            ok = (exp == got)
-        except Exception:
-            ok = False
-
-        if ok:
-            passed += 1
-        else:
-            failed_test = i
-            break
+    job_id = jobs.enqueue(
+        kind,
+        payload,
+        priority=PRIORITY[current_workload()],
+        traceparent=current_traceparent(),
+        owner=owner,
+    )
+    job = jobs.wait_for(job_id, timeout=JOB_REPLY_WAIT_SECONDS)
+
+    if job["status"] == jobs.STATUS_DONE:
+        return job["result"]
+    if job["status"] == jobs.STATUS_FAILED:
+        status_code = (job["result"] or {}).get("status_code", 500)
+        raise HTTPException(status_code=status_code, detail=job["error"])
+    return JSONResponse(
+        status_code=202, content={"job_id": job["public_id"], "status": job["status"]}
+    )
 
-    solved = (failed_test is None) and (passed == total)
 
-    return {
-        "solved": solved,
-        "failed_test": failed_test,
-        "passed_count": passed,
-        "total_count": total,
-    }
+async def require_admin(request: Request) -> None:
+    # async: sync-зависимость FastAPI выполнил бы в пуле потоков, а его мы и диагностируем
+    if ADMIN_TOKEN:
+        if not secrets.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+            raise HTTPException(status_code=403, detail="Нужен токен администратора")
+    elif request.client is None or request.client.host not in ("127.0.0.1", "::1"):
+        raise HTTPException(status_code=403, detail="Админка доступна только с localhost")
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     init_db()
+    jobs.init_queue()
+    drafts.init_drafts()
+    interview_lifecycle.start_compactor()
+    if not USE_JOB_QUEUE:
+        # без worker.py черновики разбирает фоновый поток API; в режиме очереди — воркеры
+        import worker
+
+        threading.Thread(
+            target=worker.worker_loop,
+            args=("api-drafts",),
+            kwargs={"kinds": (drafts.DRAFT_JOB_KIND,)},
+            daemon=True,
+        ).start()
     yield
+    cheat_log.flush()
+    LLM_BUDGETS.flush()
 
 
 app = FastAPI(lifespan=lifespan)
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    # корневой спан запроса; спаны эндпоинта (LLM, песочница) станут его детьми
+    with span("http.request", method=request.method, path=request.url.path) as s:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            s.set("route", route.path)
+        s.set("status_code", response.status_code)
+        return response
+
+
 # --- CORS ---
 app.add_middleware(
     CORSMiddleware,
@@ -148,6 +268,23 @@ class VacancyRequest(BaseModel):
     token: str | None = None
     position: str | None = None
     complexity: str | None = None
+    # гонять решения на растущих входах и оценивать асимптотику для отчёта HR
+    probe_complexity: bool = False
+    # стратегия проверки теоретических вопросов (см. domain_tasks_generator.VALIDATORS)
+    theory_validator: Literal["roleplay", "self_consistency", "local_rubric"] = "roleplay"
+    # id черновика формы HR: если он совпал с вакансией, задачи уже генерируются
+    draft_id: str | None = None
+
+
+class DraftRequest(BaseModel):
+    draft_id: constr(min_length=8, max_length=64)
+    vacancy: str
+    theory_validator: Literal["roleplay", "self_consistency", "local_rubric"] = "roleplay"
+
+
+class BudgetLimitsRequest(BaseModel):
+    tokens_per_hour: int = Field(ge=0)  # 0 — без лимита
+    requests_per_minute: int = Field(ge=0)
 
 
 class HRRegistrationRequest(BaseModel):
@@ -177,110 +314,260 @@ class CheckAllRequest(BaseModel):
     theory_solutions: Dict[str, str]   # {"easy": "ответ", "hard": "ответ"}
 
 class SubmitInterviewRequest(BaseModel):
-    coding_solutions: Dict[str, str]   # {"easy": "код", "medium": "код", "hard": "код"}
-    theory_solutions: Dict[str, str]   # {"easy": "ответ", "hard": "ответ"}
+    # уровни, которых нет в запросе, берём из последнего автосохранения
+    coding_solutions: Dict[str, str] = Field(default_factory=dict)
+    theory_solutions: Dict[str, str] = Field(default_factory=dict)
+
+
+class RunTaskRequest(BaseModel):
+    level: str
+    code: str
+    # номера примеров (с 0), которые надо прогнать; None — все примеры
+    sample_indices: List[int] | None = None
+
+
+class AnswerDelta(BaseModel):
+    kind: Literal["coding", "theory"]
+    level: str
+    start: int = Field(ge=0)
+    end: int = Field(ge=0)
+    text: str = ""
+
+
+class AutosaveRequest(BaseModel):
+    base_version: int = Field(ge=0)
+    deltas: List[AnswerDelta]
+
+
+class CheatEvent(BaseModel):
+    type: constr(min_length=1, max_length=cheat_log.MAX_TYPE_LENGTH)
+    time: str | None = None  # время на клиенте, ISO
 
 
 # --- Эндпоинты ---
 
 
+def _generation_params(req: VacancyRequest | DraftRequest, hr_email: str) -> Dict[str, Any]:
+    # компанию (и её бюджет LLM, см. llm_budget.py) берём из сессии HR, а не из тела
+    # запроса: иначе генерацию можно было бы списать на чужую компанию
+    return {**req.model_dump(), "company": company_for(hr_email), "hr_email": hr_email}
+
+
 @app.post("/api/generate-tasks")
-def generate_tasks(req: VacancyRequest):
+@workload(BULK)
+def generate_tasks(req: VacancyRequest, hr_email: str = Depends(require_hr)):
+    params = _generation_params(req, hr_email)
+    if req.draft_id:
+        interview = _interview_from_draft(req, params, hr_email)
+        if interview is not None:
+            return interview
+
+    if USE_JOB_QUEUE:
+        return _run_job("generate_interview", params, owner=f"hr:{hr_email}")
+
     try:
-        # 1) Генерация алгоритмических задач
-        raw_coding = generate_interview_tasks(req.vacancy)
-
-        if isinstance(raw_coding, dict):
-            coding_tasks = raw_coding.get("tasks", [])
-        else:
-            coding_tasks = raw_coding  # считаем, что это уже список задач
-
-        # 2) Пытаемся сгенерировать 2 теоретические задачи: easy + hard
-        theory_tasks: List[Dict[str, Any]] = []
-
-        # easy
-        try:
-            raw_theory_easy = generate_domain_tasks(
-                vacancy=req.vacancy,
-                level="easy",
-                target_count=1,
-                min_score=65,
-                max_attempts=50,
-            )
-        except Exception as e:
-            print(
-                "Ошибка генерации теоретической задачи уровня easy:",
-                repr(e),
-            )
-            raw_theory_easy = []
-
-        # hard
-        try:
-            raw_theory_hard = generate_domain_tasks(
-                vacancy=req.vacancy,
-                level="hard",
-                target_count=1,
-                min_score=65,
-                max_attempts=50,
-            )
-        except Exception as e:
-            print(
-                "Ошибка генерации теоретической задачи уровня hard:",
-                repr(e),
-            )
-            raw_theory_hard = []
-
-        raw_theory_all = (raw_theory_easy or []) + (raw_theory_hard or [])
-
-        theory_tasks = [
-            {
-                "vacancy": t.get("vacancy"),
-                "level": t.get("level"),
-                "question": t["question"],
-                "reference_answer": t["reference_answer"],
-            }
-            for t in raw_theory_all
-            if "question" in t and "reference_answer" in t
-        ]
-
-        # 3) Токен интервью
-        token = req.token or "int_" + str(len(INTERVIEWS) + 1)
-
-        # 4) Сохраняем интервью в памяти
-        INTERVIEWS[token] = {
-            "token": token,
-            "vacancy": req.vacancy,
-            "position": req.position,
-            "complexity": req.complexity,
-            "coding_tasks": coding_tasks,
-            "theory_tasks": theory_tasks,  # может быть [] — это ОК
-        }
-
-        return INTERVIEWS[token]
+        return create_interview(params)
+    except BudgetExceeded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(int(e.retry_after) + 1)},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _interview_from_draft(req: VacancyRequest, params: Dict[str, Any],
+                          hr_email: str) -> Dict[str, Any] | None:
+    """
+    Черновик совпал с вакансией — дожидаемся его генерации (она уже идёт или готова)
+    и сохраняем интервью из её задач. Не совпал или упал — None, генерируем как обычно.
+    """
+    job_id = drafts.take_draft(req.draft_id, params, owner=f"hr:{hr_email}")
+    if job_id is None:
+        return None
+    with span("draft.handoff", draft_id=req.draft_id, job_id=job_id) as s:
+        job = jobs.wait_for(job_id, timeout=GENERATE_WAIT_SECONDS)
+        s.set("status", job["status"] if job else None)
+        if job is None or job["status"] != jobs.STATUS_DONE:
+            jobs.cancel(job_id)
+            return None
+        return store_interview(params, job["result"])
+
+
+@app.post("/api/generate-tasks/draft", status_code=202)
+def post_generate_draft(req: DraftRequest, hr_email: str = Depends(require_hr)):
+    """
+    Черновик вакансии из формы HR (фронт шлёт с debounce, пока HR печатает).
+    Генерация начинается заранее, с самым низким приоритетом.
+    """
+    if len(req.vacancy.strip()) < drafts.DRAFT_MIN_CHARS:
+        return {"draft_id": req.draft_id, "job_id": None, "status": "skipped"}
+    return drafts.submit_draft(req.draft_id, _generation_params(req, hr_email),
+                               owner=f"hr:{hr_email}")
+
+
+@app.delete("/api/generate-tasks/draft/{draft_id}", status_code=204)
+def delete_generate_draft(draft_id: str, hr_email: str = Depends(require_hr)):
+    # отменить можно только свой черновик; чужой — молча 204, как и несуществующий
+    drafts.cancel_draft(draft_id, owner=f"hr:{hr_email}")
+
+
 @app.get("/api/interview/{token}")
-def get_interview(token: str):
-    interview = INTERVIEWS.get(token)
-    if not interview:
-        raise HTTPException(status_code=404, detail="Interview not found")
-    return interview
+def get_interview(token: str, request: Request):
+    snapshot = INTERVIEWS.get_snapshot(token)
+    if snapshot is None:
+        # интервью, созданные до появления снимков, рендерим при первом чтении
+        interview = INTERVIEWS.get(token)
+        if not interview:
+            raise HTTPException(status_code=404, detail="Interview not found")
+        snapshot = prerender(candidate_view(interview))
+        snapshot["version"] = INTERVIEWS.put_snapshot(token, snapshot)
+
+    return http_cache.snapshot_response(
+        request, snapshot, {"X-Snapshot-Version": str(snapshot["version"])}
+    )
 
 @app.post("/api/interview/{token}/submit")
 def submit_interview(token: str, req: SubmitInterviewRequest):
     """
     Обёртка над /api/check-all, чтобы не трогать фронт.
     Фронт шлёт сюда ответы, мы внутри переиспользуем check_all().
+    Уровни, которые фронт не прислал, добираем из автосохранения.
     """
+    if token not in INTERVIEWS:
+        raise HTTPException(status_code=404, detail="Interview not found")
+
+    saved = autosave.load_snapshot(token)
     check_req = CheckAllRequest(
         token=token,
-        coding_solutions=req.coding_solutions,
-        theory_solutions=req.theory_solutions,
+        coding_solutions={**saved["coding_solutions"], **req.coding_solutions},
+        theory_solutions={**saved["theory_solutions"], **req.theory_solutions},
     )
     return check_all(check_req)
 
 
+@app.post("/api/interview/{token}/run")
+@workload(INTERACTIVE)
+def run_task(token: str, req: RunTaskRequest):
+    """
+    Быстрый прогон одной задачи на видимых примерах (samples).
+    Скрытые тесты и LLM-оценка здесь не участвуют.
+    """
+    interview = INTERVIEWS.get(token)
+    if not interview:
+        raise HTTPException(status_code=404, detail="Interview not found")
+
+    coding_tasks = interview.get("coding_tasks") or interview.get("tasks") or []
+    task = next((t for t in coding_tasks if t.get("level") == req.level), None)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    samples = task.get("samples") or []
+    indices = req.sample_indices
+    if indices is None:
+        indices = list(range(len(samples)))
+    if any(i < 0 or i >= len(samples) for i in indices):
+        raise HTTPException(status_code=400, detail="Нет примера с таким номером")
+
+    code = req.code.strip()
+    if not code:
+        raise HTTPException(status_code=400, detail="Пустое решение")
+
+    code_hash = hashlib.sha256(code.encode("utf-8")).hexdigest()
+    cache_key = (token, req.level, tuple(indices), code_hash)
+    cached = RUN_CACHE.get(cache_key)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    # лимитируем только реальные запуски — повтор того же кода бесплатный
+    retry_after = RUN_LIMITER.try_acquire(token)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Слишком много запусков, попробуйте чуть позже",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+    mark_in_progress(token)
+
+    started = time.perf_counter()
+    results = run_code_on_samples(
+        code, [samples[i] for i in indices], timeout=task.get("time_limit", 3.0)
+    )
+
+    response = {
+        "level": req.level,
+        "samples": [{"index": i, **r} for i, r in zip(indices, results)],
+        "passed_count": sum(1 for r in results if r["passed"]),
+        "total_count": len(results),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000),
+    }
+    RUN_CACHE.put(cache_key, response)
+    return {**response, "cached": False}
+
+
+@app.get("/api/interview/{token}/autosave")
+def get_autosave(token: str):
+    if token not in INTERVIEWS:
+        raise HTTPException(status_code=404, detail="Interview not found")
+    return autosave.load_snapshot(token)
+
+
+@app.post("/api/interview/{token}/autosave")
+def post_autosave(token: str, req: AutosaveRequest):
+    """
+    Инкрементальное автосохранение: фронт шлёт дельты относительно base_version.
+    Если версия устарела — 409, фронт перечитывает снимок через GET и шлёт заново.
+    """
+    if token not in INTERVIEWS:
+        raise HTTPException(status_code=404, detail="Interview not found")
+
+    try:
+        version = autosave.append_deltas(
+            token,
+            req.base_version,
+            [d.model_dump() for d in req.deltas],
+        )
+    except autosave.AutosaveConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": str(e), "version": e.current_version},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    mark_in_progress(token)
+
+    return {"version": version}
+
+
+@app.post("/api/interview/{token}/cheat-event", status_code=202)
+async def post_cheat_events(token: str, events: CheatEvent | List[CheatEvent]):
+    """
+    Античит-события: одно или пачка. Только кладём в буфер (cheat_log) и отвечаем —
+    эндпоинт async и не занимает потоки, в которых идёт проверка решений.
+    """
+    if isinstance(events, CheatEvent):
+        events = [events]
+    if len(events) > CHEAT_MAX_BATCH:
+        raise HTTPException(
+            status_code=413, detail=f"Не больше {CHEAT_MAX_BATCH} событий за запрос"
+        )
+
+    # архивированное интервью событий не принимает: его лог уже удалён (cheat_log.discard)
+    if not known_live(token) and not await run_in_threadpool(check_live, token):
+        raise HTTPException(status_code=404, detail="Interview not found")
+
+    retry_after = CHEAT_LIMITER.try_acquire(token, cost=len(events))
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Слишком много событий",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+
+    accepted = cheat_log.record(token, [e.model_dump() for e in events])
+    return {"accepted": accepted}
+
+
 @app.post("/api/hr/register")
 def register_hr_user(payload: HRRegistrationRequest):
     conn = get_db_connection()
@@ -310,6 +597,7 @@ def register_hr_user(payload: HRRegistrationRequest):
         "email": payload.email,
         "name": payload.name,
         "company": payload.company,
+        "session_token": create_hr_session(payload.email),
         "message": "Регистрация прошла успешно",
     }
 
@@ -332,118 +620,178 @@ def login_hr_user(payload: HRLoginRequest):
         "email": user["email"],
         "name": user["name"],
         "company": user["company"],
+        "session_token": create_hr_session(user["email"]),
         "message": "Вход выполнен успешно",
     }
 
 
-@app.post("/api/check-all")
-def check_all(req: CheckAllRequest):
-    interview = INTERVIEWS.get(req.token)
+def _owns_interview(hr_email: str, interview: Dict[str, Any]) -> bool:
+    """Интервью видят HR той же компании; у HR без компании общее ведро, поэтому — только автор."""
+    company = company_key(company_for(hr_email))
+    if company != UNASSIGNED:
+        return interview.get("company") == company
+    return interview.get("hr_email") == hr_email
+
+
+@app.get("/api/hr/interviews/{token}/report")
+def get_interview_report(token: str, hr_email: str = Depends(require_hr)):
+    """
+    Подробный отчёт для HR по последней проверке: вердикты по каждому тесту,
+    время, память и (если включено) оценка асимптотики.
+    Чужое интервью — 404, как и несуществующее.
+    """
+    interview = INTERVIEWS.get(token)
+    archived = None
     if not interview:
+        # отслужившие интервью компактор переносит в архив (см. interview_lifecycle.py)
+        archived = INTERVIEW_ARCHIVE.get(token)
+        if archived is None:
+            raise HTTPException(status_code=404, detail="Interview not found")
+        interview = archived["interview"]
+    if not _owns_interview(hr_email, interview):
         raise HTTPException(status_code=404, detail="Interview not found")
 
-    coding_tasks = interview.get("coding_tasks") or interview.get("tasks") or []
-    theory_tasks = interview.get("theory_tasks") or []
-    vacancy_text = interview.get("vacancy", "")
-
-    # --- проверяем 3 кодинговые задачи ---
-    coding_results: list[Dict[str, Any]] = []
-    total_tests = 0
-    total_passed = 0
-
-    for task in coding_tasks:
-        level = task.get("level")
-        tests = task.get("tests") or []
-        total_tests += len(tests)
-
-        code = (req.coding_solutions.get(level) or "").strip()
-
-        if not code or not tests:
-            failed_test = 1 if tests else None
-            coding_results.append(
-                {
-                    "level": level,
-                    "solved": False,
-                    "failed_test": failed_test,
-                }
-            )
-            continue
+    report = interview.get("report")
+    if report is None:
+        raise HTTPException(status_code=404, detail="Интервью ещё не проверялось")
+    return {
+        "token": token,
+        **report,
+        "archived": archived is not None,
+        "cheat_events": archived["cheat_events"] if archived else cheat_log.summary(token),
+        # совпадения с решениями других кандидатов (см. plagiarism.py)
+        "plagiarism": PLAGIARISM_INDEX.matches_for(token),
+    }
 
-        check = run_one_code_on_tests(code, tests)
-        total_passed += check["passed_count"]
 
-        if check["solved"]:
-            coding_results.append(
-                {
-                    "level": level,
-                    "solved": True,
-                }
-            )
-        else:
-            coding_results.append(
-                {
-                    "level": level,
-                    "solved": False,
-                    "failed_test": check["failed_test"],
-                }
-            )
+@app.get("/api/jobs/{job_id}")
+def get_job_status(job_id: str, request: Request):
+    """
+    Статус фоновой задачи — если эндпоинт не дождался её и вернул 202.
+    Генерацию видит только HR, который её запустил (сессия в Authorization),
+    проверку — только тот, у кого токен этого интервью (X-Interview-Token).
+    """
+    job = jobs.get_job_by_public_id(job_id)
+    callers = []
+    hr_email = hr_email_for(request)
+    if hr_email:
+        callers.append(f"hr:{hr_email}")
+    interview_token = request.headers.get("X-Interview-Token")
+    if interview_token:
+        callers.append(f"interview:{interview_token}")
+    # чужая задача неотличима от несуществующей
+    if job is None or not job["owner"] or not any(
+        secrets.compare_digest(job["owner"].encode(), caller.encode()) for caller in callers
+    ):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job["public_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "result": job["result"] if job["status"] == jobs.STATUS_DONE else None,
+        "error": job["error"],
+    }
 
-    coding_percent = round(total_passed * 100 / total_tests) if total_tests else 0
-
-    # --- проверяем 2 теоретические задачи нейросетью ---
-    theory_results: list[Dict[str, Any]] = []
-    passed_count = 0
-    total_theory = len(theory_tasks)
-
-    for t in theory_tasks:
-        level = t.get("level")
-        question = t["question"]
-        ref_answer = t["reference_answer"]
-        cand_answer = (req.theory_solutions.get(level) or "").strip()
-
-        if not cand_answer:
-            theory_results.append(
-                {
-                    "level": level,
-                    "answered": False,
-                    "passed": False,
-                }
-            )
-            continue
-
-        grade = grade_candidate_answer(
-            vacancy_text,
-            level,
-            question,
-            ref_answer,
-            cand_answer,
-        )
 
-        # решаем, считать ответ "зачётным" или нет — но числа наружу не отдаём
-        passed = grade["final_score"] >= 65
-        if passed:
-            passed_count += 1
-
-        theory_results.append(
-            {
-                "level": level,
-                "answered": True,
-                "passed": passed,
-            }
-        )
+@app.get("/api/admin/model-routing", dependencies=[Depends(require_admin)])
+def get_model_routing():
+    """Каскад моделей: маршруты по этапам, доля эскалаций и сэкономленное время."""
+    return ROUTING_STATS.summary()
 
-    theory_percent = (
-        round(passed_count * 100 / total_theory) if total_theory else 0
-    )
 
+@app.get("/api/admin/sandbox", dependencies=[Depends(require_admin)])
+def get_sandbox_status():
+    """Локальный шлюз песочницы и выделенные раннеры (если настроены SANDBOX_RUNNERS)."""
     return {
-        "token": req.token,
-        "coding": {
-            "tasks": coding_results,
-            "passed_percent": coding_percent,
-        },
-        "theory": {
-            "tasks": theory_results,
-            "passed_percent": theory_percent,
+        "local_gate": SANDBOX_GATE.stats(),
+        "runners": RUNNER_POOL.stats() if RUNNER_POOL is not None else [],
+    }
+
+
+@app.get("/api/admin/llm-budgets", dependencies=[Depends(require_admin)])
+def get_llm_budgets(days: int = 30):
+    """Бюджеты LLM по компаниям: лимиты, остаток и расход по дням."""
+    return {"companies": LLM_BUDGETS.report(max(1, min(days, 366)))}
+
+
+@app.put("/api/admin/llm-budgets/{company}", dependencies=[Depends(require_admin)])
+def put_llm_budget(company: str, req: BudgetLimitsRequest):
+    LLM_BUDGETS.set_limits(company, req.tokens_per_hour, req.requests_per_minute)
+    return {"company": company, **req.model_dump()}
+
+
+@app.get("/api/admin/interviews", dependencies=[Depends(require_admin)])
+def get_interview_lifecycle():
+    """Интервью по статусам, TTL и память под автосохранения в этом процессе."""
+    return interview_lifecycle.lifecycle_stats()
+
+
+# --- Диагностика на лету (см. profiler.py); всё — про текущий процесс ---
+# Эндпоинты async: они должны отвечать, даже когда пул потоков sync-эндпоинтов забит.
+
+
+@app.post("/api/admin/profile/start", dependencies=[Depends(require_admin)])
+async def start_profile(seconds: float = 30.0, interval_ms: float = 10.0):
+    """Запускаем сэмплирующий профайлер на seconds секунд (не больше 300)."""
+    try:
+        return PROFILER.start(seconds, interval_ms)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.post("/api/admin/profile/stop", dependencies=[Depends(require_admin)])
+async def stop_profile():
+    return PROFILER.stop()
+
+
+@app.get("/api/admin/profile", dependencies=[Depends(require_admin)])
+async def get_profile(format: Literal["json", "collapsed"] = "json", top: int = 30):
+    """
+    Результат текущего или последнего окна. format=collapsed — текст для
+    flamegraph.pl / speedscope: "<поток>;<файл:функция>;... <сэмплы>".
+    """
+    if format == "collapsed":
+        return PlainTextResponse(PROFILER.collapsed())
+    return PROFILER.result(top)
+
+
+@app.get("/api/admin/threads", dependencies=[Depends(require_admin)])
+async def get_threads():
+    """Стеки всех потоков процесса прямо сейчас."""
+    return {"pid": os.getpid(), "threads": thread_dump()}
+
+
+@app.get("/api/admin/queues", dependencies=[Depends(require_admin)])
+async def get_queues():
+    """
+    Очереди процесса: пул потоков sync-эндпоинтов, шлюзы LLM и песочницы, раннеры
+    и очередь задач.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    pool = limiter.statistics()
+    return {
+        "pid": os.getpid(),
+        "threadpool": {
+            "capacity": limiter.total_tokens,
+            "busy": pool.borrowed_tokens,
+            "waiting": pool.tasks_waiting,
         },
+        "threads": threading.active_count(),
+        "llm_gate": LLM_GATE.stats(),
+        "sandbox_gate": SANDBOX_GATE.stats(),
+        "sandbox_runners": RUNNER_POOL.stats() if RUNNER_POOL is not None else [],
+        # один короткий запрос к SQLite — прямо в event loop, не через забитый пул
+        "jobs": jobs.queue_depth(),
     }
+
+
+@app.post("/api/check-all")
+@workload(INTERACTIVE)
+def check_all(req: CheckAllRequest):
+    if req.token not in INTERVIEWS:
+        raise HTTPException(status_code=404, detail="Interview not found")
+
+    if USE_JOB_QUEUE:
+        return _run_job("check_interview", req.model_dump(), owner=f"interview:{req.token}")
+
+    return check_interview(req.token, req.coding_solutions, req.theory_solutions)
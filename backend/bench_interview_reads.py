@@ -0,0 +1,128 @@
+# bench_interview_reads.py
+"""
+Микробенчмарк GET /api/interview/{token}: запросов в секунду до и после
+готовых снимков.
+
+  before — как раньше: читаем и разбираем интервью целиком (со скрытыми
+           и стресс-тестами), проецируем и отдаём dict на сериализацию FastAPI;
+  after  — текущий эндпоинт: готовые байты из interview_snapshots.
+
+Работает на временной базе, LLM не нужен:
+    python bench_interview_reads.py --requests 2000
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import backend
+import http_cache
+from interview_pipeline import candidate_view
+from interview_store import InterviewStore
+
+
+def _fake_interview(token: str, stress_size: int) -> Dict[str, Any]:
+    rnd = random.Random(0)
+
+    def array_input(n: int) -> str:
+        return f"{n}\n" + " ".join(str(rnd.randint(-10**9, 10**9)) for _ in range(n)) + "\n"
+
+    coding_tasks = []
+    for level in ("easy", "medium", "hard"):
+        tests = [{"input": array_input(rnd.randint(1, 50)), "output": "0"} for _ in range(20)]
+        tests += [
+            {"input": array_input(stress_size), "output": "0", "stress": True}
+            for _ in range(3)
+        ]
+        coding_tasks.append(
+            {
+                "level": level,
+                "title": f"Задача {level}",
+                "statement": "Дан массив из n целых чисел. " * 40,
+                "samples": tests[:2],
+                "tests": tests,
+                "reference_solution": "def solve():\n    pass\n" * 20,
+                "time_limit": 2.0,
+            }
+        )
+    theory_tasks = [
+        {
+            "vacancy": "Python-разработчик",
+            "level": level,
+            "question": "Чем отличается процесс от потока? " * 5,
+            "reference_answer": "Процесс — это ... " * 100,
+        }
+        for level in ("easy", "hard")
+    ]
+    return {
+        "token": token,
+        "vacancy": "Python-разработчик",
+        "coding_tasks": coding_tasks,
+        "theory_tasks": theory_tasks,
+    }
+
+
+def _legacy_app(store: InterviewStore) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/interview/{token}")
+    def get_interview(token: str):
+        interview = store.get(token)
+        if not interview:
+            raise HTTPException(status_code=404, detail="Interview not found")
+        return candidate_view(interview)
+
+    return app
+
+
+def _measure(client: TestClient, url: str, requests: int, headers: Dict[str, str]) -> Dict:
+    client.get(url, headers=headers)  # прогрев
+    started = time.perf_counter()
+    size = 0
+    for _ in range(requests):
+        r = client.get(url, headers=headers)
+        size = int(r.headers["content-length"])  # на проводе, до распаковки
+    elapsed = time.perf_counter() - started
+    return {
+        "rps": round(requests / elapsed),
+        "ms_per_request": round(elapsed * 1000 / requests, 3),
+        "bytes": size,
+    }
+
+
+def run_benchmark(requests: int, stress_size: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        store = InterviewStore(Path(tmp) / "bench.db")
+        token = "bench"
+        interview = _fake_interview(token, stress_size)
+        store[token] = interview
+        store.put_snapshot(token, http_cache.prerender(candidate_view(interview)))
+
+        original_store = backend.INTERVIEWS
+        backend.INTERVIEWS = store
+        try:
+            url = f"/api/interview/{token}"
+            cases = [
+                ("before", TestClient(_legacy_app(store)), {"Accept-Encoding": "identity"}),
+                ("after", TestClient(backend.app), {"Accept-Encoding": "identity"}),
+                ("after+gzip", TestClient(backend.app), {"Accept-Encoding": "gzip"}),
+            ]
+            print(f"{'case':12} {'rps':>8} {'ms/req':>8} {'bytes':>9}")
+            for name, client, headers in cases:
+                m = _measure(client, url, requests, headers)
+                print(f"{name:12} {m['rps']:>8} {m['ms_per_request']:>8} {m['bytes']:>9}")
+        finally:
+            backend.INTERVIEWS = original_store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--stress-size", type=int, default=100_000)
+    args = parser.parse_args()
+    run_benchmark(args.requests, args.stress_size)
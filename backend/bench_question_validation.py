@@ -0,0 +1,108 @@
+# bench_question_validation.py
+"""
+Сравнение стратегий проверки теоретических вопросов: сколько LLM-запросов
+тратится на один принятый вопрос и насколько принятые вопросы хороши.
+
+Качество принятых вопросов меряет общий "судья" — исходная схема roleplay
+(ответ кандидата + оценка). Запросы судьи в расход стратегии не входят.
+
+Запуск (нужен доступ к LLM):
+    python bench_question_validation.py --target 3 --levels easy hard
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import domain_tasks_generator as dtg
+import llm
+
+
+class _CallCounter:
+    """Подменяет client.chat.completions.create и считает вызовы."""
+
+    def __init__(self):
+        self.calls = 0
+        self._original = llm.client.chat.completions.create
+
+    def __enter__(self):
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return self._original(*args, **kwargs)
+
+        llm.client.chat.completions.create = counted
+        return self
+
+    def __exit__(self, *exc):
+        llm.client.chat.completions.create = self._original
+
+
+def _judge(vacancy: str, level: str, tasks: List[Dict]) -> List[int]:
+    qas = [{"question": t["question"], "reference_answer": t["reference_answer"]} for t in tasks]
+    if not qas:
+        return []
+    return [r["final_score"] for r in dtg.RoleplayValidator().validate(vacancy, level, qas)]
+
+
+def run_benchmark(vacancy: str, levels: List[str], target: int, min_score: int,
+                  max_attempts: int) -> List[Dict]:
+    rows = []
+    for name in dtg.VALIDATORS:
+        accepted: List[Dict] = []
+        judge_scores: List[int] = []
+        started = time.perf_counter()
+
+        with _CallCounter() as counter:
+            for level in levels:
+                accepted.extend(
+                    dtg.generate_domain_tasks(
+                        vacancy=vacancy,
+                        level=level,
+                        target_count=target,
+                        min_score=min_score,
+                        max_attempts=max_attempts,
+                        validator=name,
+                    )
+                )
+        elapsed = time.perf_counter() - started
+
+        for level in levels:
+            judge_scores.extend(_judge(vacancy, level, [t for t in accepted if t["level"] == level]))
+
+        judged_ok = sum(1 for x in judge_scores if x >= min_score)
+        rows.append(
+            {
+                "strategy": name,
+                "accepted": len(accepted),
+                "llm_calls": counter.calls,
+                "calls_per_accepted": round(counter.calls / len(accepted), 2) if accepted else None,
+                "judge_mean": round(sum(judge_scores) / len(judge_scores), 1) if judge_scores else None,
+                "judge_pass_rate": round(judged_ok / len(judge_scores), 2) if judge_scores else None,
+                "seconds": round(elapsed, 1),
+            }
+        )
+    return rows
+
+
+def _print_table(rows: List[Dict]) -> None:
+    columns = list(rows[0].keys())
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for r in rows:
+        print("  ".join(str(r[c]).ljust(widths[c]) for c in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--vacancy",
+        default="Python-разработчик в команде аналитики заказов (e-commerce, FastAPI, Postgres, очереди).",
+    )
+    parser.add_argument("--levels", nargs="+", default=["easy", "hard"])
+    parser.add_argument("--target", type=int, default=3)
+    parser.add_argument("--min-score", type=int, default=65)
+    parser.add_argument("--max-attempts", type=int, default=15)
+    args = parser.parse_args()
+
+    _print_table(
+        run_benchmark(args.vacancy, args.levels, args.target, args.min_score, args.max_attempts)
+    )
@@ -0,0 +1,184 @@
+# cheat_log.py
+import fcntl
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from ratelimit import LRUCache
+from tracing import get_logger
+
+log = get_logger("cheat_log")
+
+# --------------------------------
+# ЖУРНАЛ АНТИЧИТ-СОБЫТИЙ
+# --------------------------------
+#
+# Фронт присылает события пачками: [{"type": "window_blur", "time": "..."}, ...].
+# Эндпоинт только кладёт их в буфер процесса (record) и сразу отвечает —
+# на диск буфер сбрасывает фоновый поток раз в FLUSH_INTERVAL секунд:
+# одна дозапись на токен за весь интервал (group commit), а не write на событие.
+#
+# Лог — append-only текстовый файл на токен, одна строка на событие:
+#   <серверное время, мс>\t<время клиента>\t<тип>
+#
+# Счётчики для отчёта HR считаются инкрементально, как снимки в autosave.py:
+# в памяти помним, до какого байта лог дочитан, и дочитываем только новое.
+
+CHEAT_LOG_DIR = Path(__file__).with_name("cheat_events")
+
+FLUSH_INTERVAL = 0.5
+# больше этого в буфере не держим: если диск не успевает, лишнее отбрасываем
+MAX_BUFFERED_EVENTS = 100_000
+MAX_TYPE_LENGTH = 64
+MAX_CLIENT_TIME_LENGTH = 40
+
+_buffer_lock = threading.Lock()
+_pending: Dict[str, List[str]] = {}
+_pending_count = 0
+_dropped = 0
+_flusher_pid: int | None = None
+
+_counters_lock = threading.Lock()
+# token -> {"offset": int, "total": int, "by_type": {type: n}, "first_at": ms, "last_at": ms}
+# вытесненные счётчики пересчитываются из лога при следующем отчёте
+_counters = LRUCache(max_entries=10_000)
+
+
+def _log_path(token: str) -> Path:
+    safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in token)
+    return CHEAT_LOG_DIR / f"{safe}.log"
+
+
+def _clean(value: str, limit: int) -> str:
+    # табы и переводы строк — разделители формата, в значения их не пускаем
+    return " ".join(str(value).split())[:limit]
+
+
+def _ensure_flusher() -> None:
+    global _flusher_pid
+    if _flusher_pid != os.getpid():
+        # после fork поток-сбрасыватель надо запускать заново
+        _flusher_pid = os.getpid()
+        threading.Thread(target=_flush_loop, daemon=True).start()
+
+
+def record(token: str, events: List[Dict[str, Any]]) -> int:
+    """
+    Кладём события в буфер и возвращаем, сколько принято.
+    Диска и блокировок здесь нет — вызывать можно прямо из event loop.
+    """
+    global _pending_count, _dropped
+    now_ms = time.time_ns() // 1_000_000
+    lines = [
+        f"{now_ms}\t{_clean(e.get('time') or '', MAX_CLIENT_TIME_LENGTH)}"
+        f"\t{_clean(e['type'], MAX_TYPE_LENGTH)}\n"
+        for e in events
+    ]
+
+    with _buffer_lock:
+        _ensure_flusher()
+        room = MAX_BUFFERED_EVENTS - _pending_count
+        if room < len(lines):
+            _dropped += len(lines) - max(room, 0)
+            lines = lines[: max(room, 0)]
+        if lines:
+            _pending.setdefault(token, []).extend(lines)
+            _pending_count += len(lines)
+    return len(lines)
+
+
+def _take_pending(token: str | None = None) -> Dict[str, List[str]]:
+    global _pending, _pending_count
+    with _buffer_lock:
+        if token is None:
+            batch, _pending, _pending_count = _pending, {}, 0
+            return batch
+        lines = _pending.pop(token, None)
+        if not lines:
+            return {}
+        _pending_count -= len(lines)
+        return {token: lines}
+
+
+def _write(batch: Dict[str, List[str]]) -> None:
+    if not batch:
+        return
+    CHEAT_LOG_DIR.mkdir(exist_ok=True)
+    for token, lines in batch.items():
+        with open(_log_path(token), "a", encoding="utf-8") as f:
+            # в файл пишут и другие процессы API — дозапись целиком под flock
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write("".join(lines))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def flush(token: str | None = None) -> None:
+    """Сбрасываем буфер на диск сейчас: весь или только по одному токену."""
+    _write(_take_pending(token))
+
+
+def _flush_loop() -> None:
+    global _dropped
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception:
+            log.exception("Не удалось сбросить античит-события на диск")
+        if _dropped:
+            with _buffer_lock:
+                dropped, _dropped = _dropped, 0
+            log.warning("Буфер античит-событий переполнен, часть отброшена", dropped=dropped)
+
+
+def _catch_up(token: str, counters: Dict[str, Any]) -> None:
+    path = _log_path(token)
+    if not path.exists() or path.stat().st_size <= counters["offset"]:
+        return
+
+    with open(path, "rb") as f:
+        f.seek(counters["offset"])
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break  # строку ещё дописывают — дочитаем в следующий раз
+            counters["offset"] += len(raw)
+            server_ms, _, event_type = raw.decode("utf-8").rstrip("\n").split("\t", 2)
+            server_ms = int(server_ms)
+            counters["total"] += 1
+            counters["by_type"][event_type] = counters["by_type"].get(event_type, 0) + 1
+            if counters["first_at"] is None:
+                counters["first_at"] = server_ms
+            counters["last_at"] = server_ms
+
+
+def summary(token: str) -> Dict[str, Any]:
+    """
+    Счётчики для отчёта HR:
+    {"total": int, "by_type": {type: n}, "first_at": ms | None, "last_at": ms | None}
+    """
+    flush(token)  # свои несброшенные события тоже должны попасть в отчёт
+    with _counters_lock:
+        counters = _counters.get(token)
+        if counters is None:
+            counters = {"offset": 0, "total": 0, "by_type": {}, "first_at": None, "last_at": None}
+            _counters.put(token, counters)
+        _catch_up(token, counters)
+        return {
+            "total": counters["total"],
+            "by_type": dict(counters["by_type"]),
+            "first_at": counters["first_at"],
+            "last_at": counters["last_at"],
+        }
+
+
+def discard(token: str) -> None:
+    """Интервью ушло в архив вместе со сводкой summary() — лог и счётчики больше не нужны."""
+    _take_pending(token)
+    with _counters_lock:
+        _counters.pop(token)
+        _log_path(token).unlink(missing_ok=True)
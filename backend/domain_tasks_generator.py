@@ -1,86 +1,108 @@
 # domain_tasks_generator.py
 import json
-import textwrap
-from typing import Dict, List
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
 
-from openai import OpenAI
+from llm import JsonObjectValidator, complete
+from model_router import OUTCOME_ACCEPTED, OUTCOME_ESCALATED, cascade, models_for, record
+from prompts import PromptTemplate
+from theory_prescore import tokenize
+from tracing import get_logger, span
+
+log = get_logger("domain_tasks")
 
 # -------------------------------
 # НАСТРОЙКИ LLM
 # -------------------------------
 
-from tokenn import API_KEY
-BASE_URL = "https://llm.t1v.scibox.tech/v1"
-
 TEXT_MODEL = "qwen3-32b-awq"
 
-client = OpenAI(
-    base_url=BASE_URL,
-    api_key=API_KEY,
-)
+# ответ засчитан, если final_score >= GRADE_PASS_SCORE; оценку быстрой модели
+# ближе GRADE_UNCERTAINTY к порогу перепроверяем окончательной (см. model_router)
+GRADE_PASS_SCORE = 65
+GRADE_UNCERTAINTY = 10
+
+
+def _parse_json_object(content: str, what: str) -> Dict:
+    """JSON из ответа модели; если вокруг есть мусор — вырезаем от первой { до последней }."""
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        start = content.find("{")
+        end = content.rfind("}")
+        if start == -1 or end == -1 or end <= start:
+            raise ValueError(f"Не удалось распарсить JSON {what}: {content!r}")
+        return json.loads(content[start : end + 1])
+
+
+def _parse_json_list(content: str, key: str, what: str) -> List[Any]:
+    """Список data[key] из JSON-объекта ответа модели; другая форма ответа — ValueError."""
+    data = _parse_json_object(content, what)
+    items = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        raise ValueError(f"В JSON {what} нет списка {key!r}: {content!r}")
+    return items
 
 # -------------------------------
 # 1. ГЕНЕРАЦИЯ ВОПРОСА + ЭТАЛОНА
 # -------------------------------
 
-def generate_domain_question(vacancy: str, level: str) -> Dict:
-    """
-    Генерируем один вопрос по заданной вакансии и уровню сложности.
-    Возвращаем dict: {question, reference_answer}.
-    """
-    prompt = f"""
-Ты — опытный специалист и интервьюер для вакансии:
+DOMAIN_QUESTION_PROMPT = PromptTemplate(
+    name="domain_question",
+    version=2,
+    system="/no_think Ты генерируешь сильные собеседовательные вопросы по вакансии.",
+    instructions="""
+        Ты — опытный специалист и интервьюер. Вакансия и уровень указаны в конце сообщения.
 
-"{vacancy}"
+        Твоя задача — придумать ОДИН содержательный теоретический вопрос этого уровня
+        для собеседования.
 
-Твоя задача — придумать ОДИН содержательный теоретический вопрос уровня {level}
-для собеседования.
+        Требования:
 
-Требования:
+        1. Вопрос должен быть:
+           - практический, связанный с реальной работой по этой вакансии;
+           - не тривиальный (не "что такое переменная");
+           - формулировка — чёткая и однозначная.
 
-1. Вопрос должен быть:
-   - практический, связанный с реальной работой по этой вакансии;
-   - не тривиальный (не "что такое переменная");
-   - формулировка — чёткая и однозначная.
+        2. Под вопрос сразу дай развернутый правильный ответ:
+           - можно 1–3 абзаца;
+           - не эссе на полстраницы, но и не одно предложение.
 
-2. Под вопрос сразу дай развернутый правильный ответ:
-   - можно 1–3 абзаца;
-   - не эссе на полстраницы, но и не одно предложение.
+        3. Вопрос должен быть формата "объясни", "сравни", "обоснуй", "как бы ты сделал...":
+           — чтобы было, что оценивать по качеству ответа.
 
-3. Вопрос должен быть формата "объясни", "сравни", "обоснуй", "как бы ты сделал...":
-   — чтобы было, что оценивать по качеству ответа.
+        Формат ответа СТРОГО в JSON, без текста вокруг:
 
-Формат ответа СТРОГО в JSON, без текста вокруг:
+        {
+          "question": "<формулировка вопроса>",
+          "reference_answer": "<развернутый правильный ответ>"
+        }
+    """,
+    data="""
+        Вакансия: "{vacancy}"
 
-{{
-  "question": "<формулировка вопроса>",
-  "reference_answer": "<развернутый правильный ответ>"
-}}
-"""
+        Уровень вопроса: {level}
+    """,
+)
 
-    resp = client.chat.completions.create(
-        model=TEXT_MODEL,
-        messages=[
-            {
-                "role": "system",
-                "content": "/no_think Ты генерируешь сильные собеседовательные вопросы по вакансии.",
-            },
-            {"role": "user", "content": textwrap.dedent(prompt).strip()},
-        ],
+
+def generate_domain_question(vacancy: str, level: str, model: str = TEXT_MODEL) -> Dict:
+    """
+    Генерируем один вопрос по заданной вакансии и уровню сложности.
+    Возвращаем dict: {question, reference_answer}.
+    """
+    content = complete(
+        DOMAIN_QUESTION_PROMPT,
+        model=model,
         temperature=0.7,
+        validator=JsonObjectValidator(required_keys=("question", "reference_answer")),
+        vacancy=vacancy,
+        level=level,
     )
 
-    content = resp.choices[0].message.content.strip()
-
-    # Парсим JSON
-    try:
-        data = json.loads(content)
-    except json.JSONDecodeError:
-        start = content.find("{")
-        end = content.rfind("}")
-        if start == -1 or end == -1 or end <= start:
-            raise ValueError(f"Не удалось распарсить JSON вопроса: {content!r}")
-        data = json.loads(content[start : end + 1])
+    data = _parse_json_object(content, "вопроса")
 
     question = data["question"].strip()
     ref_answer = data["reference_answer"].strip()
@@ -95,47 +117,48 @@ def generate_domain_question(vacancy: str, level: str) -> Dict:
 # 2. МОДЕЛЬ КАК КАНДИДАТ
 # -------------------------------
 
+CANDIDATE_ANSWER_PROMPT = PromptTemplate(
+    name="candidate_answer",
+    version=2,
+    system="/no_think Ты выступаешь как кандидат и даёшь честный, но аккуратный ответ.",
+    instructions="""
+        Ты — кандидат на вакансию. Вакансия, твой уровень и вопрос с собеседования
+        приведены в конце сообщения.
+
+        Ответь так, как бы ты ответил на реальном собеседовании:
+        - структурированно,
+        - по делу,
+        - без лишней "воды".
+
+        Не комментируй уровень вопроса и сам процесс собеседования.
+
+        Верни ТОЛЬКО ответ кандидата, без пояснений и префиксов.
+    """,
+    data="""
+        Вакансия: "{vacancy}"
+
+        Уровень кандидата: {level}.
+
+        Вопрос:
+        ---
+        {question}
+        ---
+    """,
+)
+
+
 def generate_candidate_answer(vacancy: str, question: str, level: str) -> str:
     """
     Вторая роль: модель отвечает на вопрос как кандидат.
     """
-    prompt = f"""
-Ты — кандидат на вакансию:
-
-"{vacancy}"
-
-Уровень кандидата: {level}.
-
-Тебе задают вопрос на собеседовании:
-
-Вопрос:
----
-{question}
----
-
-Ответь так, как бы ты ответил на реальном собеседовании:
-- структурированно,
-- по делу,
-- без лишней "воды".
-
-Не комментируй уровень вопроса и сам процесс собеседования.
-
-Верни ТОЛЬКО ответ кандидата, без пояснений и префиксов.
-"""
-
-    resp = client.chat.completions.create(
+    answer = complete(
+        CANDIDATE_ANSWER_PROMPT,
         model=TEXT_MODEL,
-        messages=[
-            {
-                "role": "system",
-                "content": "/no_think Ты выступаешь как кандидат и даёшь честный, но аккуратный ответ.",
-            },
-            {"role": "user", "content": textwrap.dedent(prompt).strip()},
-        ],
         temperature=0.8,
+        vacancy=vacancy,
+        level=level,
+        question=question,
     )
-
-    answer = resp.choices[0].message.content.strip()
     return answer
 
 
@@ -143,8 +166,66 @@ def generate_candidate_answer(vacancy: str, question: str, level: str) -> str:
 # 3. ОЦЕНКА: 1–100, ДВЕ МЕТРИКИ
 # -------------------------------
 
+GRADE_ANSWER_PROMPT = PromptTemplate(
+    name="grade_answer",
+    version=2,
+    system="/no_think Ты строго, но объективно оцениваешь ответы кандидатов.",
+    instructions="""
+        Ты — строгий интервьюер. В конце сообщения даны вакансия, уровень позиции,
+        собеседовательный вопрос, правильный развернутый ответ и ответ кандидата.
+        Нужно оценить КАЧЕСТВО ответа кандидата по двум осям.
+
+        Оцени по двум шкалам от 1 до 100:
+
+        1) correctness (правильность):
+           - 1–20   — почти всё неправильно;
+           - 21–40  — много ошибок, частичное понимание;
+           - 41–60  — базовое понимание, но заметные пробелы;
+           - 61–80  — в целом правильно, есть недочёты;
+           - 81–100 — очень корректно, близко к эталону.
+
+        2) optimality (оптимальность / полнота / структура):
+           - оцени, насколько ответ полный, хорошо структурирован,
+             покрывает важные аспекты, без лишней воды.
+
+        Финальный балл final_score = среднее арифметическое correctness и optimality.
+
+        Формат ответа СТРОГО в JSON, без текста вокруг, вида:
+
+        {
+          "correctness": <целое число 1..100>,
+          "optimality": <целое число 1..100>,
+          "comment": "<краткий комментарий, почему такие оценки>"
+        }
+
+        НЕ добавляй никаких других полей.
+    """,
+    data="""
+        Вакансия: "{vacancy}"
+
+        Уровень позиции: {level}.
+
+        Вопрос:
+        ---
+        {question}
+        ---
+
+        Правильный ответ (эталон):
+        ---
+        {reference_answer}
+        ---
+
+        Ответ кандидата:
+        ---
+        {candidate_answer}
+        ---
+    """,
+)
+
+
 def grade_candidate_answer(vacancy: str, level: str, question: str,
-                           reference_answer: str, candidate_answer: str) -> Dict:
+                           reference_answer: str, candidate_answer: str,
+                           model: str = TEXT_MODEL) -> Dict:
     """
     Третья роль: строгий ревьюер.
     Оценивает по двум метрикам 1–100:
@@ -152,177 +233,655 @@ def grade_candidate_answer(vacancy: str, level: str, question: str,
       - optimality   (оптимальность/глубина/структура)
     Возвращаем dict: {correctness, optimality, final_score, comment}.
     """
-    prompt = f"""
-Ты — строгий интервьюер для вакансии:
+    content = complete(
+        GRADE_ANSWER_PROMPT,
+        model=model,
+        temperature=0.3,
+        validator=JsonObjectValidator(
+            required_keys=("correctness", "optimality"),
+            int_keys=("correctness", "optimality"),
+        ),
+        vacancy=vacancy,
+        level=level,
+        question=question,
+        reference_answer=reference_answer,
+        candidate_answer=candidate_answer,
+    )
+
+    data = _parse_json_object(content, "оценки")
+    return _normalize_grade(data)
 
-"{vacancy}"
 
-Уровень позиции: {level}.
+def is_confident_grade(grade: Dict) -> bool:
+    return abs(grade["final_score"] - GRADE_PASS_SCORE) >= GRADE_UNCERTAINTY
 
-Тебе дан собеседовательный вопрос, правильный развернутый ответ
-и ответ кандидата. Нужно оценить КАЧЕСТВО ответа кандидата по двум осям.
+
+def grade_candidate_answer_routed(vacancy: str, item: Dict) -> Dict:
+    """grade_candidate_answer по каскаду: неуверенную оценку быстрой модели перепроверяем."""
+    return cascade(
+        "theory_grade",
+        TEXT_MODEL,
+        lambda model: grade_candidate_answer(
+            vacancy, item["level"], item["question"],
+            item["reference_answer"], item["candidate_answer"], model=model,
+        ),
+        accept=is_confident_grade,
+    )
+
+
+def _normalize_grade(data: Dict) -> Dict:
+    correctness = int(data["correctness"])
+    optimality = int(data["optimality"])
+    comment = str(data.get("comment", "")).strip()
+
+    # подстрахуемся по диапазону
+    correctness = max(1, min(100, correctness))
+    optimality = max(1, min(100, optimality))
+
+    final_score = int(round((correctness + optimality) / 2))
+
+    return {
+        "correctness": correctness,
+        "optimality": optimality,
+        "final_score": final_score,
+        "comment": comment,
+    }
+
+
+# -------------------------------
+# 3b. ПАКЕТНАЯ ОЦЕНКА И ПАКЕТНАЯ ГЕНЕРАЦИЯ
+# -------------------------------
+
+GRADE_ANSWERS_BATCH_PROMPT = PromptTemplate(
+    name="grade_answers_batch",
+    version=1,
+    system="/no_think Ты строго, но объективно оцениваешь ответы кандидатов.",
+    instructions="""
+        Ты — строгий интервьюер. В конце сообщения даны вакансия и несколько пунктов:
+        в каждом собеседовательный вопрос, правильный развернутый ответ и ответ кандидата.
+        Оцени КАЖДЫЙ пункт независимо от остальных.
+
+        Для каждого пункта оцени по двум шкалам от 1 до 100:
+
+        1) correctness (правильность):
+           - 1–20   — почти всё неправильно;
+           - 21–40  — много ошибок, частичное понимание;
+           - 41–60  — базовое понимание, но заметные пробелы;
+           - 61–80  — в целом правильно, есть недочёты;
+           - 81–100 — очень корректно, близко к эталону.
+
+        2) optimality (оптимальность / полнота / структура):
+           - оцени, насколько ответ полный, хорошо структурирован,
+             покрывает важные аспекты, без лишней воды.
+
+        Формат ответа СТРОГО в JSON, без текста вокруг, вида:
+
+        {
+          "grades": [
+            {"id": <номер пункта>, "correctness": <целое 1..100>, "optimality": <целое 1..100>, "comment": "<кратко>"}
+          ]
+        }
+
+        В "grades" должно быть ровно по одному элементу на каждый пункт.
+    """,
+    data="""
+        Вакансия: "{vacancy}"
+
+        Пунктов: {count}.
+
+        {items_text}
+    """,
+)
+
+
+def grade_candidate_answers_batch(vacancy: str, items: List[Dict]) -> List[Dict]:
+    """
+    Оцениваем сразу несколько ответов одним запросом.
+    items: [{level, question, reference_answer, candidate_answer}]
+    Возвращаем оценки в том же порядке и том же формате, что grade_candidate_answer.
+    Пункты, которые модель потеряла или испортила, доразбираем поштучно.
+    """
+    if not items:
+        return []
+    if len(items) == 1:
+        return [grade_candidate_answer_routed(vacancy, items[0])]
+
+    # пачку оценивает первая модель каскада, неуверенные пункты — окончательная поштучно
+    models = models_for("theory_grade", TEXT_MODEL)
+
+    blocks = "\n".join(
+        f"""
+### Пункт {i}
+Уровень позиции: {it["level"]}.
 
 Вопрос:
 ---
-{question}
+{it["question"]}
 ---
 
 Правильный ответ (эталон):
 ---
-{reference_answer}
+{it["reference_answer"]}
 ---
 
 Ответ кандидата:
 ---
-{candidate_answer}
+{it["candidate_answer"]}
 ---
+"""
+        for i, it in enumerate(items, start=1)
+    )
+
+    by_id: Dict[int, Dict] = {}
+    started = time.perf_counter()
+    try:
+        content = complete(
+            GRADE_ANSWERS_BATCH_PROMPT,
+            model=models[0],
+            temperature=0.3,
+            validator=JsonObjectValidator(required_keys=("grades",)),
+            retries=0,  # при сбое всё равно есть поштучный запасной путь
+            vacancy=vacancy,
+            count=len(items),
+            items_text=blocks,
+        )
+        for g in _parse_json_list(content, "grades", "пакетной оценки"):
+            try:
+                by_id[int(g["id"])] = _normalize_grade(g)
+            except (KeyError, TypeError, ValueError):
+                continue
+    except (ValueError, AttributeError, KeyError, TypeError) as e:
+        log.warning("Пакетная оценка не разобралась, оцениваем поштучно", error=str(e))
+
+    # время пачки делим поровну между пунктами — для метрик каскада
+    per_item_ms = (time.perf_counter() - started) * 1000 / len(items)
+
+    grades: List[Dict] = []
+    for i, it in enumerate(items, start=1):
+        grade = by_id.get(i)
+        if grade is None:
+            grade = grade_candidate_answer_routed(vacancy, it)
+        elif len(models) > 1 and not is_confident_grade(grade):
+            record("theory_grade", 0, models[0], per_item_ms, OUTCOME_ESCALATED)
+            started = time.perf_counter()
+            grade = grade_candidate_answer(
+                vacancy, it["level"], it["question"],
+                it["reference_answer"], it["candidate_answer"], model=models[-1],
+            )
+            record("theory_grade", len(models) - 1, models[-1],
+                   (time.perf_counter() - started) * 1000, OUTCOME_ACCEPTED)
+        else:
+            record("theory_grade", 0, models[0], per_item_ms, OUTCOME_ACCEPTED)
+        grades.append(grade)
+    return grades
+
+
+DOMAIN_QUESTIONS_BATCH_PROMPT = PromptTemplate(
+    name="domain_questions_batch",
+    version=1,
+    system="/no_think Ты генерируешь сильные собеседовательные вопросы по вакансии.",
+    instructions="""
+        Ты — опытный специалист и интервьюер. Вакансия, уровень и нужное число
+        вопросов указаны в конце сообщения.
+
+        Твоя задача — придумать столько РАЗНЫХ содержательных теоретических вопросов
+        этого уровня для собеседования. Вопросы не должны повторять друг друга по теме.
+
+        Требования к каждому вопросу:
+
+        1. Вопрос должен быть:
+           - практический, связанный с реальной работой по этой вакансии;
+           - не тривиальный (не "что такое переменная");
+           - формулировка — чёткая и однозначная.
+
+        2. Под вопрос сразу дай развернутый правильный ответ:
+           - можно 1–3 абзаца;
+           - не эссе на полстраницы, но и не одно предложение.
+
+        3. Вопрос должен быть формата "объясни", "сравни", "обоснуй", "как бы ты сделал...":
+           — чтобы было, что оценивать по качеству ответа.
+
+        Формат ответа СТРОГО в JSON, без текста вокруг:
+
+        {
+          "questions": [
+            {"question": "<формулировка вопроса>", "reference_answer": "<развернутый правильный ответ>"}
+          ]
+        }
+    """,
+    data="""
+        Вакансия: "{vacancy}"
+
+        Уровень вопросов: {level}
+
+        Сколько вопросов нужно: {count}
+    """,
+)
+
+
+CANDIDATE_ANSWERS_BATCH_PROMPT = PromptTemplate(
+    name="candidate_answers_batch",
+    version=1,
+    system="/no_think Ты выступаешь как кандидат и даёшь честные, но аккуратные ответы.",
+    instructions="""
+        Ты — кандидат на вакансию. Вакансия, твой уровень и несколько вопросов
+        с собеседования приведены в конце сообщения.
 
-Оцени по двум шкалам от 1 до 100:
+        Ответь на КАЖДЫЙ вопрос так, как бы ты ответил на реальном собеседовании:
+        - структурированно,
+        - по делу,
+        - без лишней "воды".
 
-1) correctness (правильность):
-   - 1–20   — почти всё неправильно;
-   - 21–40  — много ошибок, частичное понимание;
-   - 41–60  — базовое понимание, но заметные пробелы;
-   - 61–80  — в целом правильно, есть недочёты;
-   - 81–100 — очень корректно, близко к эталону.
+        Отвечай на вопросы независимо друг от друга, не ссылайся на другие ответы.
+        Не комментируй уровень вопросов и сам процесс собеседования.
 
-2) optimality (оптимальность / полнота / структура):
-   - оцени, насколько ответ полный, хорошо структурирован,
-     покрывает важные аспекты, без лишней воды.
+        Формат ответа СТРОГО в JSON, без текста вокруг:
 
-Финальный балл final_score = среднее арифметическое correctness и optimality.
+        {
+          "answers": [
+            {"id": <номер вопроса>, "answer": "<ответ кандидата>"}
+          ]
+        }
+    """,
+    data="""
+        Вакансия: "{vacancy}"
 
-Формат ответа СТРОГО в JSON, без текста вокруг, вида:
+        Уровень кандидата: {level}.
 
-{{
-  "correctness": <целое число 1..100>,
-  "optimality": <целое число 1..100>,
-  "comment": "<краткий комментарий, почему такие оценки>"
-}}
+        Вопросов: {count}.
 
-НЕ добавляй никаких других полей.
+        {questions_text}
+    """,
+)
+
+
+def generate_candidate_answers_batch(vacancy: str, level: str, questions: List[str]) -> List[str]:
+    """
+    Ответы кандидата сразу на несколько вопросов одним запросом — в том же порядке.
+    Вопросы, на которые модель не ответила, доспрашиваем поштучно;
+    если и так не вышло — пустая строка.
+    """
+    if not questions:
+        return []
+
+    by_id: Dict[int, str] = {}
+    if len(questions) > 1:
+        blocks = "\n".join(
+            f"""
+### Вопрос {i}
+---
+{question}
+---
 """
+            for i, question in enumerate(questions, start=1)
+        )
+        try:
+            content = complete(
+                CANDIDATE_ANSWERS_BATCH_PROMPT,
+                model=TEXT_MODEL,
+                temperature=0.8,
+                validator=JsonObjectValidator(required_keys=("answers",)),
+                retries=0,  # при сбое всё равно есть поштучный запасной путь
+                vacancy=vacancy,
+                level=level,
+                count=len(questions),
+                questions_text=blocks,
+            )
+            for a in _parse_json_list(content, "answers", "ответов кандидата"):
+                try:
+                    answer = str(a["answer"]).strip()
+                    if answer:
+                        by_id[int(a["id"])] = answer
+                except (KeyError, TypeError, ValueError):
+                    continue
+        except (ValueError, AttributeError, KeyError, TypeError) as e:
+            log.warning("Пакетные ответы кандидата не разобрались, спрашиваем поштучно",
+                        level=level, error=str(e))
+
+    answers: List[str] = []
+    for i, question in enumerate(questions, start=1):
+        answer = by_id.get(i)
+        if answer is None:
+            try:
+                answer = generate_candidate_answer(vacancy, question, level)
+            except Exception as e:
+                log.warning("Ошибка при генерации ответа кандидата", level=level, error=str(e))
+                answer = ""
+        answers.append(answer)
+    return answers
+
+
+def generate_domain_questions_batch(vacancy: str, level: str, count: int,
+                                    model: str = TEXT_MODEL) -> List[Dict]:
+    """
+    Генерируем сразу count разных вопросов с эталонами одним запросом.
+    Возвращаем [{question, reference_answer}] — может быть меньше count,
+    если модель вернула битые элементы.
+    """
+    if count == 1:
+        return [generate_domain_question(vacancy, level, model=model)]
 
-    resp = client.chat.completions.create(
-        model=TEXT_MODEL,
-        messages=[
+    content = complete(
+        DOMAIN_QUESTIONS_BATCH_PROMPT,
+        model=model,
+        temperature=0.7,
+        validator=JsonObjectValidator(required_keys=("questions",)),
+        vacancy=vacancy,
+        level=level,
+        count=count,
+    )
+    data = _parse_json_object(content, "вопросов")
+
+    result: List[Dict] = []
+    for q in data.get("questions") or []:
+        question = str(q.get("question", "")).strip() if isinstance(q, dict) else ""
+        ref_answer = str(q.get("reference_answer", "")).strip() if isinstance(q, dict) else ""
+        if question and ref_answer:
+            result.append({"question": question, "reference_answer": ref_answer})
+    return result[:count]
+
+
+# -------------------------------
+# 4. СТРАТЕГИИ ПРОВЕРКИ ВОПРОСА
+# -------------------------------
+#
+# Вопрос с эталоном считается годным, если стратегия поставила ему
+# final_score >= min_score. Стратегии отличаются ценой в LLM-запросах:
+#   roleplay         — модель отвечает как кандидат, ответы оцениваются (2/пачку);
+#   self_consistency — модель одним запросом рецензирует пачку вопросов с эталонами (1/пачку);
+#   local_rubric     — локальные эвристики по тексту, без LLM (0).
+
+QUESTION_REVIEW_PROMPT = PromptTemplate(
+    name="question_review",
+    version=1,
+    system="/no_think Ты придирчиво рецензируешь вопросы для собеседований.",
+    instructions="""
+        Ты — ревьюер банка вопросов для собеседований. В конце сообщения даны вакансия,
+        уровень и несколько пунктов: вопрос и эталонный ответ. Для КАЖДОГО пункта проверь:
+        - вопрос чёткий, однозначный, практический и соответствует уровню;
+        - эталонный ответ фактически верен и действительно отвечает на вопрос;
+        - по эталону можно объективно оценить ответ кандидата.
+
+        Поставь каждому пункту оценку quality от 1 до 100
+        (1–40 — брак, 41–64 — есть серьёзные проблемы, 65–100 — можно использовать).
+
+        Формат ответа СТРОГО в JSON, без текста вокруг:
+
+        {
+          "reviews": [
+            {"id": <номер пункта>, "quality": <целое 1..100>, "comment": "<кратко>"}
+          ]
+        }
+    """,
+    data="""
+        Вакансия: "{vacancy}"
+
+        Уровень вопросов: {level}.
+
+        Пунктов: {count}.
+
+        {items_text}
+    """,
+)
+
+
+class QuestionValidator(ABC):
+    """Проверка пачки [{question, reference_answer}] -> [{final_score, comment, ...}]."""
+
+    name = "base"
+
+    @abstractmethod
+    def validate(self, vacancy: str, level: str, qas: List[Dict]) -> List[Dict]:
+        """Оценки в порядке qas, по одной на каждый вопрос."""
+
+
+class RoleplayValidator(QuestionValidator):
+    """Исходная схема: синтетический ответ кандидата + оценка его по эталону."""
+
+    name = "roleplay"
+
+    def validate(self, vacancy: str, level: str, qas: List[Dict]) -> List[Dict]:
+        log.info("Генерируем ответы кандидата", level=level, count=len(qas))
+        # ответы на всю пачку — одним запросом: раунд стоит 3 запроса
+        # (вопросы, ответы, оценка) независимо от размера пачки
+        answers = generate_candidate_answers_batch(vacancy, level, [qa["question"] for qa in qas])
+        items = [
             {
-                "role": "system",
-                "content": "/no_think Ты строго, но объективно оцениваешь ответы кандидатов.",
-            },
-            {"role": "user", "content": textwrap.dedent(prompt).strip()},
-        ],
-        temperature=0.3,
+                "level": level,
+                "question": qa["question"],
+                "reference_answer": qa["reference_answer"],
+                "candidate_answer": cand_answer,
+            }
+            for qa, cand_answer in zip(qas, answers)
+        ]
+
+        log.info("Оцениваем ответы", level=level)
+        graded = [it for it in items if it["candidate_answer"]]
+        grades = iter(grade_candidate_answers_batch(vacancy, graded))
+
+        results: List[Dict] = []
+        for it in items:
+            if not it["candidate_answer"]:
+                results.append({"final_score": 0, "comment": "нет ответа кандидата"})
+                continue
+            grade = next(grades)
+            results.append({**grade, "candidate_answer": it["candidate_answer"]})
+        return results
+
+
+class SelfConsistencyValidator(QuestionValidator):
+    """Один запрос на пачку: модель сама рецензирует вопрос и эталон."""
+
+    name = "self_consistency"
+
+    def validate(self, vacancy: str, level: str, qas: List[Dict]) -> List[Dict]:
+        blocks = "\n".join(
+            f"""
+### Пункт {i}
+Вопрос:
+---
+{qa["question"]}
+---
+
+Эталонный ответ:
+---
+{qa["reference_answer"]}
+---
+"""
+            for i, qa in enumerate(qas, start=1)
+        )
+
+        content = complete(
+            QUESTION_REVIEW_PROMPT,
+            model=TEXT_MODEL,
+            temperature=0.2,
+            validator=JsonObjectValidator(required_keys=("reviews",)),
+            vacancy=vacancy,
+            level=level,
+            count=len(qas),
+            items_text=blocks,
+        )
+        by_id: Dict[int, Dict] = {}
+        for r in _parse_json_list(content, "reviews", "рецензии"):
+            try:
+                quality = max(1, min(100, int(r["quality"])))
+                by_id[int(r["id"])] = {
+                    "final_score": quality,
+                    "comment": str(r.get("comment", "")).strip(),
+                }
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        # пункт без рецензии считаем непроверенным
+        return [
+            by_id.get(i, {"final_score": 0, "comment": "нет рецензии"})
+            for i in range(1, len(qas) + 1)
+        ]
+
+
+class LocalRubricValidator(QuestionValidator):
+    """Без LLM: форма вопроса, объём и связность эталона с вопросом."""
+
+    name = "local_rubric"
+
+    _OPEN_FORMS = re.compile(
+        r"\b(объясн|сравн|обоснуй|почему|как бы|как вы|каким образом|чем отлича|"
+        r"в каких случаях|какие плюсы|опиши|explain|compare|why|how would)",
+        re.IGNORECASE,
     )
+    _TRIVIAL = re.compile(r"^\s*(что такое|what is)\b", re.IGNORECASE)
 
-    content = resp.choices[0].message.content.strip()
+    def validate(self, vacancy: str, level: str, qas: List[Dict]) -> List[Dict]:
+        return [self._score(qa["question"], qa["reference_answer"]) for qa in qas]
 
-    try:
-        data = json.loads(content)
-    except json.JSONDecodeError:
-        start = content.find("{")
-        end = content.rfind("}")
-        if start == -1 or end == -1 or end <= start:
-            raise ValueError(f"Не удалось распарсить JSON оценки: {content!r}")
-        data = json.loads(content[start : end + 1])
+    def _score(self, question: str, reference: str) -> Dict:
+        q_tokens = tokenize(question)
+        r_tokens = tokenize(reference)
+        sentences = [x for x in re.split(r"(?<=[.!?])\s+", reference.strip()) if x]
 
-    correctness = int(data["correctness"])
-    optimality = int(data["optimality"])
-    comment = str(data.get("comment", "")).strip()
+        notes: List[str] = []
+        score = 0
 
-    # подстрахуемся по диапазону
-    correctness = max(1, min(100, correctness))
-    optimality = max(1, min(100, optimality))
+        # 25: вопрос открытого типа
+        if self._OPEN_FORMS.search(question):
+            score += 25
+        else:
+            notes.append("закрытый вопрос")
+        # 10: не тривиальное "что такое X"
+        if not self._TRIVIAL.search(question):
+            score += 10
+        else:
+            notes.append("тривиальная формулировка")
+        # 15: вопрос разумной длины
+        if 6 <= len(q_tokens) <= 60:
+            score += 15
+        else:
+            notes.append("длина вопроса")
+        # 20: эталон 1–3 абзаца, а не фраза и не эссе
+        if 30 <= len(r_tokens) <= 350:
+            score += 20
+        else:
+            notes.append("объём эталона")
+        # 10: в эталоне несколько мыслей
+        if len(sentences) >= 3:
+            score += 10
+        else:
+            notes.append("мало предложений в эталоне")
+        # 20: эталон отвечает именно на этот вопрос
+        overlap = len(set(q_tokens) & set(r_tokens)) / len(set(q_tokens)) if q_tokens else 0.0
+        score += round(20 * min(1.0, overlap / 0.5))
+        if overlap < 0.25:
+            notes.append("эталон слабо связан с вопросом")
 
-    final_score = int(round((correctness + optimality) / 2))
+        return {"final_score": score, "comment": ", ".join(notes) or "ок"}
 
-    return {
-        "correctness": correctness,
-        "optimality": optimality,
-        "final_score": final_score,
-        "comment": comment,
-    }
+
+VALIDATORS: Dict[str, QuestionValidator] = {
+    v.name: v for v in (RoleplayValidator(), SelfConsistencyValidator(), LocalRubricValidator())
+}
 
 
 # -------------------------------
-# 4. ЦИКЛ: СБОР ХОРОШИХ ВОПРОСОВ
+# 4b. ЦИКЛ: СБОР ХОРОШИХ ВОПРОСОВ
 # -------------------------------
 
+def _question_round(vacancy: str, level: str, round_size: int, validator: QuestionValidator,
+                    min_score: int, need: int) -> List[Dict]:
+    """
+    Один раунд: пачка вопросов -> проверка -> лучшие из прошедших порог (не больше need).
+    Пачка может быть больше need: лишние вопросы почти ничего не стоят в том же
+    запросе, а шанс закрыть уровень за один раунд растёт.
+    """
+    def generate(model: str) -> List[Dict]:
+        qas = generate_domain_questions_batch(vacancy, level, round_size, model=model)
+        if not qas:
+            raise ValueError("Модель не вернула ни одного годного вопроса")
+        return qas
+
+    log.info("Генерируем вопросы", level=level, count=round_size)
+    try:
+        with span("question.generate", level=level, count=round_size) as s:
+            qas = cascade("theory_question", TEXT_MODEL, generate)
+            s.set("generated", len(qas))
+    except Exception as e:
+        log.warning("Ошибка при генерации вопросов", level=level, error=str(e))
+        return []
+
+    log.info("Проверяем вопросы", level=level, validator=validator.name)
+    try:
+        with span("question.validate", level=level, validator=validator.name, count=len(qas)):
+            results = validator.validate(vacancy, level, qas)
+    except Exception as e:
+        log.warning("Ошибка при проверке вопросов", level=level, error=str(e))
+        return []
+
+    accepted: List[Dict] = []
+    for qa, res in zip(qas, results):
+        final_score = res["final_score"]
+        comment = res["comment"]
+
+        if final_score >= min_score:
+            log.info("Вопрос прошёл порог", level=level, final_score=final_score,
+                     min_score=min_score, comment=comment)
+            accepted.append(
+                {
+                    "vacancy": vacancy,
+                    "level": level,
+                    "question": qa["question"],
+                    "reference_answer": qa["reference_answer"],
+                    "candidate_answer": res.get("candidate_answer"),
+                    "correctness": res.get("correctness"),
+                    "optimality": res.get("optimality"),
+                    "final_score": final_score,
+                    "review_comment": comment,
+                    "validator": validator.name,
+                }
+            )
+        else:
+            log.info("Вопрос не прошёл порог, выкидываем", level=level, final_score=final_score,
+                     min_score=min_score, comment=comment)
+
+    # прошло больше, чем нужно, — берём лучших (sorted устойчив: при равенстве — по порядку)
+    return sorted(accepted, key=lambda t: t["final_score"], reverse=True)[:need]
+
+
 def generate_domain_tasks(
     vacancy: str,
     level: str,
     target_count: int = 2,
     min_score: int = 65,
     max_attempts: int = 50,
+    batch_size: int = 3,
+    validator: QuestionValidator | str = "roleplay",
 ) -> List[Dict]:
     """
     Генерируем список задач по вакансии:
     - vacancy: строка с описанием вакансии;
     - level: "easy" / "medium" / "hard";
     - target_count: сколько задач хотим собрать для этого уровня;
-    - min_score: порог по final_score (среднее correctness и optimality);
-    - max_attempts: максимум общих попыток.
+    - min_score: порог по final_score;
+    - max_attempts: максимум вопросов, которые пробуем;
+    - batch_size: сколько вопросов за раунд генерируем и проверяем пачкой —
+      даже если нужен один: из пачки берём лучшие прошедшие порог;
+    - validator: стратегия проверки (объект или имя из VALIDATORS).
 
     Возвращаем список диктов, каждый из которых уже прошёл порог.
     """
+    if isinstance(validator, str):
+        validator = VALIDATORS[validator]
+
     tasks: List[Dict] = []
     attempt = 0
 
     while len(tasks) < target_count and attempt < max_attempts:
-        attempt += 1
-        print(f"[{level}] Попытка генерации вопроса #{attempt}...")
-
-        try:
-            qa = generate_domain_question(vacancy, level)
-        except Exception as e:
-            print(f"[{level}] Ошибка при генерации вопроса: {e}")
-            continue
-
-        question = qa["question"]
-        ref_answer = qa["reference_answer"]
-
-        print(f"[{level}] Генерируем ответ кандидата...")
-        try:
-            cand_answer = generate_candidate_answer(vacancy, question, level)
-        except Exception as e:
-            print(f"[{level}] Ошибка при генерации ответа кандидата: {e}")
-            continue
-
-        print(f"[{level}] Оцениваем ответ...")
-        try:
-            grade = grade_candidate_answer(vacancy, level, question, ref_answer, cand_answer)
-        except Exception as e:
-            print(f"[{level}] Ошибка при оценке ответа: {e}")
-            continue
-
-        correctness = grade["correctness"]
-        optimality = grade["optimality"]
-        final_score = grade["final_score"]
-        comment = grade["comment"]
-
-        print(
-            f"[{level}] Оценка: correctness={correctness}, "
-            f"optimality={optimality}, final={final_score}"
-        )
-        print(f"[{level}] Комментарий: {comment}")
-
-        if final_score >= min_score:
-            print(f"[{level}] Вопрос прошёл порог ({final_score} ≥ {min_score}), добавляем.\n")
-            tasks.append(
-                {
-                    "vacancy": vacancy,
-                    "level": level,
-                    "question": question,
-                    "reference_answer": ref_answer,
-                    "candidate_answer": cand_answer,
-                    "correctness": correctness,
-                    "optimality": optimality,
-                    "final_score": final_score,
-                    "review_comment": comment,
-                }
-            )
-        else:
-            print(f"[{level}] Вопрос не прошёл порог (final_score < {min_score}), выкидываем.\n")
+        round_size = min(batch_size, max_attempts - attempt)
+        attempt += round_size
+        with span("question.round", level=level, validator=validator.name,
+                  first_attempt=attempt - round_size + 1, size=round_size) as s:
+            accepted = _question_round(vacancy, level, round_size, validator, min_score,
+                                       target_count - len(tasks))
+            s.set("accepted", len(accepted))
+        tasks.extend(accepted)
 
     return tasks
 
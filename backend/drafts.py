@@ -0,0 +1,170 @@
+# drafts.py
+import secrets
+import time
+from typing import Any, Dict
+
+import jobs
+from scheduler import BULK, PRIORITY, SPECULATIVE
+from task_templates import vacancy_fingerprint
+from tracing import current_traceparent, get_logger
+
+log = get_logger("drafts")
+
+# --------------------------------
+# СПЕКУЛЯТИВНАЯ ГЕНЕРАЦИЯ ПО ЧЕРНОВИКУ
+# --------------------------------
+#
+# Пока HR заполняет форму, фронт (с debounce) присылает черновик вакансии.
+# По нему сразу ставим генерацию в очередь с самым низким приоритетом
+# (класс speculative). Черновик живёт под draft_id формы:
+#   - текст изменился — старую задачу отменяем, ставим новую;
+#   - HR нажал "Сформировать" с тем же текстом — забираем готовые задачи
+#     (или дожидаемся уже идущей генерации), иначе отменяем и генерируем как обычно.
+#
+# Текст сравниваем по отпечатку (регистр и пробелы не важны) вместе с
+# настройками генерации, которые влияют на результат.
+#
+# Черновик принадлежит HR, который его прислал (owner — как у задач в jobs.py,
+# "hr:<email>"): забрать или отменить чужой черновик по draft_id нельзя.
+
+DRAFT_JOB_KIND = "draft_interview"
+# черновики короче — ещё не вакансия, на них LLM не тратим
+DRAFT_MIN_CHARS = 20
+# черновик без движения дольше этого — брошенная форма
+DRAFT_TTL_SECONDS = 3600
+
+
+def init_drafts() -> None:
+    conn = jobs._connect()
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS drafts (
+                draft_id TEXT PRIMARY KEY,
+                draft_key TEXT NOT NULL,
+                job_id INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                owner TEXT NULL
+            )
+            """
+        )
+        # базы от прошлых версий: черновики без владельца просто истекут по TTL
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(drafts)")}
+        if "owner" not in columns:
+            conn.execute("ALTER TABLE drafts ADD COLUMN owner TEXT NULL")
+    finally:
+        conn.close()
+
+
+def draft_key(params: Dict[str, Any]) -> str:
+    return f"{vacancy_fingerprint(params['vacancy'])}:{params.get('theory_validator', 'roleplay')}"
+
+
+def _get(conn, draft_id: str):
+    return conn.execute("SELECT * FROM drafts WHERE draft_id = ?", (draft_id,)).fetchone()
+
+
+def _owned(row, owner: str) -> bool:
+    return row is not None and row["owner"] is not None and secrets.compare_digest(
+        row["owner"].encode("utf-8"), owner.encode("utf-8")
+    )
+
+
+def submit_draft(draft_id: str, params: Dict[str, Any], owner: str) -> Dict[str, Any]:
+    """Новый или изменившийся черновик: ставим (или оставляем) спекулятивную генерацию."""
+    key = draft_key(params)
+    conn = jobs._connect()
+    try:
+        row = _get(conn, draft_id)
+        if row is not None and not _owned(row, owner):
+            # draft_id занят чужим черновиком — его не трогаем и новый не заводим
+            log.warning("draft_id занят черновиком другого HR", draft_id=draft_id)
+            return {"draft_id": draft_id, "job_id": None, "status": "skipped"}
+        if row is not None and row["draft_key"] == key:
+            status = jobs.get_status(row["job_id"])
+            # None — задача давно завершилась и уже удалена (jobs.purge)
+            if status not in (None, jobs.STATUS_FAILED, jobs.STATUS_CANCELLED):
+                conn.execute(
+                    "UPDATE drafts SET updated_at = ? WHERE draft_id = ?", (time.time(), draft_id)
+                )
+                return {"draft_id": draft_id, "job_id": row["job_id"], "status": status}
+
+        if row is not None and jobs.cancel(row["job_id"]):
+            log.info("Черновик изменился, отменяем генерацию", draft_id=draft_id,
+                     job_id=row["job_id"])
+
+        job_id = jobs.enqueue(
+            DRAFT_JOB_KIND,
+            {k: params[k] for k in ("vacancy", "theory_validator", "company") if k in params},
+            priority=PRIORITY[SPECULATIVE],
+            traceparent=current_traceparent(),
+            owner=owner,
+        )
+        conn.execute(
+            """
+            INSERT INTO drafts (draft_id, draft_key, job_id, updated_at, owner)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(draft_id) DO UPDATE SET draft_key = excluded.draft_key,
+                                                job_id = excluded.job_id,
+                                                updated_at = excluded.updated_at
+            """,
+            (draft_id, key, job_id, time.time(), owner),
+        )
+    finally:
+        conn.close()
+    _expire_stale()
+    return {"draft_id": draft_id, "job_id": job_id, "status": jobs.STATUS_QUEUED}
+
+
+def take_draft(draft_id: str, params: Dict[str, Any], owner: str) -> int | None:
+    """
+    HR отправил форму. Черновик с тем же текстом — возвращаем job_id его генерации
+    (и поднимаем ей приоритет до bulk, если её ещё не взяли). Иначе — отменяем, None.
+    Черновик при этом расходуется. Чужой черновик — как будто его нет.
+    """
+    conn = jobs._connect()
+    try:
+        row = _get(conn, draft_id)
+        if not _owned(row, owner):
+            return None
+        conn.execute("DELETE FROM drafts WHERE draft_id = ?", (draft_id,))
+    finally:
+        conn.close()
+
+    if row["draft_key"] != draft_key(params):
+        jobs.cancel(row["job_id"])
+        log.info("Черновик не совпал с итоговой вакансией", draft_id=draft_id)
+        return None
+
+    if jobs.get_status(row["job_id"]) in (None, jobs.STATUS_FAILED, jobs.STATUS_CANCELLED):
+        return None
+    jobs.set_priority(row["job_id"], PRIORITY[BULK])
+    return row["job_id"]
+
+
+def cancel_draft(draft_id: str, owner: str) -> bool:
+    """HR ушёл с формы — генерация больше не нужна. Чужой черновик не трогаем."""
+    conn = jobs._connect()
+    try:
+        row = _get(conn, draft_id)
+        if not _owned(row, owner):
+            return False
+        conn.execute("DELETE FROM drafts WHERE draft_id = ?", (draft_id,))
+    finally:
+        conn.close()
+    return jobs.cancel(row["job_id"])
+
+
+def _expire_stale() -> None:
+    conn = jobs._connect()
+    try:
+        stale = conn.execute(
+            "SELECT draft_id, job_id FROM drafts WHERE updated_at < ?",
+            (time.time() - DRAFT_TTL_SECONDS,),
+        ).fetchall()
+        for row in stale:
+            jobs.cancel(row["job_id"])
+            conn.execute("DELETE FROM drafts WHERE draft_id = ?", (row["draft_id"],))
+    finally:
+        conn.close()
+
@@ -1,35 +1,109 @@
 # generator.py
 import json
-import subprocess
-import tempfile
-import textwrap
+import os
+import random
+import time
 import re
 from typing import List, Dict
 
-from openai import OpenAI
+from llm import JsonObjectValidator, PythonCodeValidator, complete
+from model_router import (
+    OUTCOME_ACCEPTED,
+    OUTCOME_ESCALATED,
+    OUTCOME_FAILED,
+    cascade,
+    model_for_attempt,
+    models_for,
+    record,
+)
+from prompts import PromptTemplate
+from sandbox import execute_batch
+from stress_inputs import STRESS_INPUTS
+from tracing import get_logger, set_attribute, span
+
+log = get_logger("generation")
 
 # --------------------------------
 # НАСТРОЙКИ LLM
 # --------------------------------
 
-from tokenn import API_KEY
-
-BASE_URL = "https://llm.t1v.scibox.tech/v1"
-
 CHAT_MODEL = "qwen3-32b-awq"
 CODE_MODEL = "qwen3-coder-30b-a3b-instruct-fp8"
 
-client = OpenAI(
-    base_url=BASE_URL,
-    api_key=API_KEY,
-)
-
 
 # --------------------------------
 # ГЕНЕРАЦИЯ ЗАДАЧИ ИЗ ВАКАНСИИ
 # --------------------------------
 
-def generate_task_from_vacancy(vacancy_text: str, level_for_prompt: str) -> Dict:
+TASK_FROM_VACANCY_PROMPT = PromptTemplate(
+    name="task_from_vacancy",
+    version=2,
+    system="/no_think Ты генерируешь чёткие и проверяемые задачи для собеседований.",
+    instructions="""
+        Ты выступаешь как инженер по найму разработчиков.
+
+        В конце сообщения даны текст вакансии и уровень сложности.
+        Сгенерируй одну ЗАВЕРШЁННУЮ техническую задачу на Python этого уровня для собеседования.
+
+        Свяжи задачу по смыслу с вакансией (домен, данные, бизнес-контекст), но по сути это
+        чистая алгоритмическая мини-задача.
+
+        ФОРМАТ ДАННЫХ (СОБЛЮДАЙ ЖЁСТКО):
+
+        Входные данные:
+        - в первой строке задано целое число n (1 ≤ n ≤ разумная константа, например 10^5);
+        - во второй строке заданы n целых чисел a_1, a_2, ..., a_n, разделённых пробелами.
+
+        Если по смыслу задачи тебе достаточно одного числа, просто используй n = 1 и одно число во второй строке.
+
+        Выходные данные:
+        - выведи ОДНО целое число в отдельной строке.
+        - НИКАКОГО дополнительного текста ("Ответ:", комментариев и т.п.) — только число.
+
+        ОФОРМЛЕНИЕ УСЛОВИЯ:
+
+        - Нормальное олимпиадное условие на русском с разделами:
+          "Описание задачи", "Формат ввода", "Формат вывода", "Ограничения", "Пример".
+        - В разделе "Формат ввода" НЕДВУСМЫСЛЕННО напиши именно этот формат (n и n чисел).
+        - В разделе "Формат вывода" напиши, что нужно вывести одно целое число.
+
+        ФОРМАТ ОТВЕТА:
+
+        Верни строго JSON БЕЗ пояснений вокруг:
+
+        {
+          "statement": "<полный текст условия задачи со всеми разделами>",
+          "samples": [
+            {"input": "<пример ввода: две строки (n и n чисел)>", "output": "<пример вывода: одно число и перевод строки>"}
+          ],
+          "tests": [
+            {"input": "<ввод для теста: две строки (n и n чисел)>", "output": "<ожидаемый вывод: одно число и перевод строки>"}
+          ]
+        }
+
+        Требования к samples и tests:
+        - во всех input:
+          * первая строка — одно целое число n,
+          * вторая строка — n целых чисел, разделённых пробелами,
+          * в конце входа должен быть перевод строки;
+        - во всех output:
+          * одно целое число (целочисленный ответ),
+          * никаких вещественных чисел.
+    """,
+    data="""
+        Уровень задачи: {level}
+
+        Текст вакансии:
+
+        ---
+        {vacancy_text}
+        ---
+    """,
+)
+
+
+def generate_task_from_vacancy(vacancy_text: str, level_for_prompt: str,
+                               model: str = CHAT_MODEL) -> Dict:
     """
     Генерируем задачу под вакансию.
 
@@ -43,77 +117,15 @@ def generate_task_from_vacancy(vacancy_text: str, level_for_prompt: str) -> Dict
       Выход:
         - одно целое число в отдельной строке.
     """
-    prompt = f"""
-Ты выступаешь как инженер по найму разработчиков.
-
-Тебе даётся текст вакансии:
-
----
-{vacancy_text}
----
-
-Сгенерируй одну ЗАВЕРШЁННУЮ техническую задачу на Python уровня {level_for_prompt} для собеседования.
-
-Свяжи задачу по смыслу с вакансией (домен, данные, бизнес-контекст), но по сути это
-чистая алгоритмическая мини-задача.
-
-ФОРМАТ ДАННЫХ (СОБЛЮДАЙ ЖЁСТКО):
-
-Входные данные:
-- в первой строке задано целое число n (1 ≤ n ≤ разумная константа, например 10^5);
-- во второй строке заданы n целых чисел a_1, a_2, ..., a_n, разделённых пробелами.
-
-Если по смыслу задачи тебе достаточно одного числа, просто используй n = 1 и одно число во второй строке.
-
-Выходные данные:
-- выведи ОДНО целое число в отдельной строке.
-- НИКАКОГО дополнительного текста ("Ответ:", комментариев и т.п.) — только число.
-
-ОФОРМЛЕНИЕ УСЛОВИЯ:
-
-- Нормальное олимпиадное условие на русском с разделами:
-  "Описание задачи", "Формат ввода", "Формат вывода", "Ограничения", "Пример".
-- В разделе "Формат ввода" НЕДВУСМЫСЛЕННО напиши именно этот формат (n и n чисел).
-- В разделе "Формат вывода" напиши, что нужно вывести одно целое число.
-
-ФОРМАТ ОТВЕТА:
-
-Верни строго JSON БЕЗ пояснений вокруг:
-
-{{
-  "statement": "<полный текст условия задачи со всеми разделами>",
-  "samples": [
-    {{"input": "<пример ввода: две строки (n и n чисел)>", "output": "<пример вывода: одно число и перевод строки>"}}
-  ],
-  "tests": [
-    {{"input": "<ввод для теста: две строки (n и n чисел)>", "output": "<ожидаемый вывод: одно число и перевод строки>"}}
-  ]
-}}
-
-Требования к samples и tests:
-- во всех input:
-  * первая строка — одно целое число n,
-  * вторая строка — n целых чисел, разделённых пробелами,
-  * в конце входа должен быть перевод строки;
-- во всех output:
-  * одно целое число (целочисленный ответ),
-  * никаких вещественных чисел.
-"""
-
-    resp = client.chat.completions.create(
-        model=CHAT_MODEL,
-        messages=[
-            {
-                "role": "system",
-                "content": "/no_think Ты генерируешь чёткие и проверяемые задачи для собеседований.",
-            },
-            {"role": "user", "content": textwrap.dedent(prompt).strip()},
-        ],
+    content = complete(
+        TASK_FROM_VACANCY_PROMPT,
+        model=model,
         temperature=0.5,
+        validator=JsonObjectValidator(required_keys=("statement", "tests")),
+        vacancy_text=vacancy_text,
+        level=level_for_prompt,
     )
 
-    content = resp.choices[0].message.content.strip()
-
     # Парсим JSON из ответа
     try:
         data = json.loads(content)
@@ -183,10 +195,68 @@ def generate_task_from_vacancy(vacancy_text: str, level_for_prompt: str) -> Dict
 # РЕШЕНИЕ ЗАДАЧИ ЧЕРЕЗ CODE-МОДЕЛЬ
 # --------------------------------
 
-def solve_task_with_llm(task: Dict, attempt: int = 1) -> str:
+SOLVE_TASK_PROMPT = PromptTemplate(
+    name="solve_task",
+    version=2,
+    system="/no_think Ты опытный Python-разработчик и пишешь корректные решения под строгие автотесты.",
+    instructions="""
+        Тебе дана задача на собеседовании по программированию на Python.
+        Условие задачи и примеры приведены в конце сообщения.
+
+        Формат данных (важно для реализации):
+
+        - На первой строке входа подаётся целое число n — количество элементов.
+        - На второй строке подаётся n целых чисел, разделённых пробелами.
+        - Если в конкретных тестах n = 1, то во второй строке просто одно число.
+        - В выход нужно напечатать ОДНО целое число в отдельной строке.
+
+        Напиши корректное, рабочее решение на Python.
+
+        ОЧЕНЬ ВАЖНО:
+
+        1. Строго соблюдай формат ввода и вывода:
+           - читай n и массив именно так:
+               n = int(input().strip())
+               arr = list(map(int, input().split()))
+           - напечатай только одно число: print(answer)
+           Любое отклонение по формату считается неверным решением.
+
+        2. Используй примеры (samples) для самопроверки:
+           - мысленно подставь примеры во вход;
+           - убедись, что твой код даёт точно такой же вывод, как в примерах.
+
+        Требования к коду:
+
+        - Оформи решение как функцию solve().
+        - Функция solve() должна читать данные из stdin и печатать результат в stdout через print().
+        - Не печатай ничего лишнего (никаких "Введите n:", "Ответ:" и т.п.).
+        - Не возвращай значение из solve(), просто печатай результат.
+        - Не включай примеры ввода/вывода в код.
+        - Код должен быть самодостаточным: достаточно запустить файл, чтобы он прочитал stdin и напечатал ответ.
+
+        Верни ТОЛЬКО код, без пояснений, без ``` и без лишнего текста вокруг.
+    """,
+    data="""
+        Условие задачи:
+
+        ---
+        {statement}
+        ---
+
+        {samples_text}
+
+        Это попытка написать решение номер {attempt}.
+        Если предыдущий подход мог быть неправильным, попробуй сейчас другой способ,
+        но обязательно соблюдай формат ввода/вывода.
+    """,
+)
+
+
+def solve_task_with_llm(task: Dict, attempt: int = 1, model: str = CODE_MODEL) -> str:
     """
     Просим qwen-coder написать решение на Python.
-    attempt — номер попытки (1, 2, 3...), чтобы немного менять промпт и ломать кэш.
+    attempt — номер попытки (1, 2, 3...), чтобы немного менять промпт.
+    Номер стоит в хвосте промпта и не ломает общий закэшированный префикс.
     """
     statement = task["statement"]
     samples = task["samples"]
@@ -197,69 +267,130 @@ def solve_task_with_llm(task: Dict, attempt: int = 1) -> str:
             f"Ввод:\n{ s['input'] }\nВывод:\n{ s['output'] }\n" for s in samples
         )
 
-    prompt = f"""
-Тебе дана задача на собеседовании по программированию на Python.
+    code = complete(
+        SOLVE_TASK_PROMPT,
+        model=model,
+        temperature=0.35,  # можно чуть выше, чтобы код различался
+        validator=PythonCodeValidator(),
+        statement=statement,
+        samples_text=samples_text,
+        attempt=attempt,
+    )
 
-Условие задачи:
+    if code.startswith("```"):
+        code = code.strip("`")
+        if code.lower().startswith("python"):
+            code = code[len("python") :].lstrip()
 
----
-{statement}
----
+    return code
 
-{samples_text}
 
-Формат данных (важно для реализации):
 
-- На первой строке входа подаётся целое число n — количество элементов.
-- На второй строке подаётся n целых чисел, разделённых пробелами.
-- Если в конкретных тестах n = 1, то во второй строке просто одно число.
-- В выход нужно напечатать ОДНО целое число в отдельной строке.
 
-Это попытка написать решение номер {attempt}.
-Если предыдущий подход мог быть неправильным, попробуй сейчас другой способ,
-но обязательно соблюдай формат ввода/вывода.
+# --------------------------------
+# ЛОКАЛЬНАЯ ПРОВЕРКА РЕШЕНИЯ (ТОЛЬКО ЦЕЛЫЕ)
+# --------------------------------
 
-Напиши корректное, рабочее решение на Python.
+def _parse_int(s: str):
+    m = re.search(r"-?\d+", s)
+    if not m:
+        return None
+    return int(m.group(0))
+
+def with_solve_harness(code: str) -> str:
+    # Обёртка: если solve() что-то возвращает, напечатаем это
+    return code + """
+if __name__ == "__main__":
+    _res = solve()
+    if _res is not None:
+        print(_res)
+"""
 
-ОЧЕНЬ ВАЖНО:
 
-1. Строго соблюдай формат ввода и вывода:
-   - читай n и массив именно так:
-       n = int(input().strip())
-       arr = list(map(int, input().split()))
-   - напечатай только одно число: print(answer)
-   Любое отклонение по формату считается неверным решением.
+def outputs_match_tests(tests: List[Dict], outputs: List) -> bool:
+    """
+    Сверяем ответы решения (целые из run_reference, None — упало, зависло
+    или вывело не число) с ожидаемыми выводами тестов.
+    Считаем, что формат: одно целое число -> одно целое число.
+    """
+    for i, (test, got) in enumerate(zip(tests, outputs), start=1):
+        expected_num = _parse_int(test["output"])
 
-2. Используй примеры (samples) для самопроверки:
-   - мысленно подставь примеры во вход;
-   - убедись, что твой код даёт точно такой же вывод, как в примерах.
+        if got is None or expected_num is None:
+            log.info(
+                "Тест: решение упало, превысило время или вывод не разобрать",
+                test=i, input=test["input"][:200], expected=test["output"],
+            )
+            return False
 
-Требования к коду:
+        if expected_num != got:
+            log.info(
+                "Тест: неверный ответ",
+                test=i, input=test["input"][:200], expected=expected_num, got=got,
+            )
+            return False
 
-- Оформи решение как функцию solve().
-- Функция solve() должна читать данные из stdin и печатать результат в stdout через print().
-- Не печатай ничего лишнего (никаких "Введите n:", "Ответ:" и т.п.).
-- Не возвращай значение из solve(), просто печатай результат.
-- Не включай примеры ввода/вывода в код.
-- Код должен быть самодостаточным: достаточно запустить файл, чтобы он прочитал stdin и напечатал ответ.
+    return len(outputs) == len(tests)
 
-Верни ТОЛЬКО код, без пояснений, без ``` и без лишнего текста вокруг.
-"""
 
-    resp = client.chat.completions.create(
+# --------------------------------
+# СТРЕСС-ТЕСТЫ НА ГРАНИЦАХ ОГРАНИЧЕНИЙ
+# --------------------------------
+
+# какие n просим у генератора: генератор сам урезает их до ограничений из условия
+STRESS_SIZES = [10**5, 10**5, 10**5]
+# TL = множитель * худшее время эталона на тестах задачи, в пределах [MIN, MAX]
+TIME_LIMIT_FACTOR = 5.0
+MIN_TIME_LIMIT = 1.0
+MAX_TIME_LIMIT = 10.0
+
+
+INPUT_GENERATOR_PROMPT = PromptTemplate(
+    name="input_generator",
+    version=1,
+    system="/no_think Ты пишешь генераторы тестов для олимпиадных задач.",
+    instructions="""
+        Тебе дана задача с собеседования по программированию (условие — в конце сообщения).
+
+        Напиши на Python ГЕНЕРАТОР случайных входных данных для этой задачи.
+
+        Требования к генератору:
+
+        - Читает из stdin одну строку: два целых числа n и seed через пробел.
+        - Инициализирует random.seed(seed).
+        - Если n больше максимально допустимого по разделу "Ограничения", используй максимально допустимое n.
+        - Значения элементов выбирай случайно, но СТРОГО в пределах ограничений из условия,
+          стараясь покрыть крайние случаи (большие значения, повторы, худший случай для наивного решения).
+        - Печатает вход ровно в формате задачи:
+            первая строка — целое число n,
+            вторая строка — n целых чисел через пробел.
+        - Ничего, кроме входных данных, не печатает.
+
+        Верни ТОЛЬКО код, без пояснений, без ``` и без лишнего текста вокруг.
+    """,
+    data="""
+        Условие задачи:
+
+        ---
+        {statement}
+        ---
+    """,
+)
+
+
+def generate_input_generator(task: Dict) -> str:
+    """
+    Просим code-модель написать генератор случайного входа для задачи.
+    Генератор читает из stdin строку "n seed" и печатает вход в формате задачи.
+    """
+    code = complete(
+        INPUT_GENERATOR_PROMPT,
         model=CODE_MODEL,
-        messages=[
-            {
-                "role": "system",
-                "content": "/no_think Ты опытный Python-разработчик и пишешь корректные решения под строгие автотесты.",
-            },
-            {"role": "user", "content": textwrap.dedent(prompt).strip()},
-        ],
-        temperature=0.35,  # можно чуть выше, чтобы код различался
+        temperature=0.2,
+        validator=PythonCodeValidator(),
+        statement=task["statement"],
     )
 
-    code = resp.choices[0].message.content.strip()
-
     if code.startswith("```"):
         code = code.strip("`")
         if code.lower().startswith("python"):
@@ -268,85 +399,295 @@ def solve_task_with_llm(task: Dict, attempt: int = 1) -> str:
     return code
 
 
+def _is_valid_array_input(text: str) -> bool:
+    """Проверяем, что вход в фиксированном формате: n и n целых чисел."""
+    lines = text.strip().split("\n")
+    if len(lines) != 2:
+        return False
+    try:
+        n = int(lines[0])
+        values = [int(x) for x in lines[1].split()]
+    except ValueError:
+        return False
+    return n >= 1 and len(values) == n
+
+
+def add_stress_tests(task: Dict) -> Dict:
+    """
+    Добавляем к задаче тесты максимального размера.
+
+    Входы пишет генератор от code-модели, выходы считает эталонное решение
+    task["reference_solution"]. Если генератор не получился — оставляем задачу
+    как есть: проверенная задача ценнее стресс-тестов.
+    """
+    level = task["level"]
+
+    try:
+        gen_code = generate_input_generator(task)
+    except Exception as e:
+        log.warning("Ошибка при генерации генератора тестов", level=level, error=str(e))
+        return task
+
+    inputs = []
+    gen_runs = execute_batch(
+        gen_code, [f"{n} {seed}\n" for seed, n in enumerate(STRESS_SIZES, start=1)], timeout=10.0
+    )
+    for seed, gen in enumerate(gen_runs, start=1):
+        if gen["returncode"] != 0 or not _is_valid_array_input(gen["stdout"]):
+            log.info("Генератор выдал некорректный вход, пропускаем", level=level, seed=seed)
+            continue
+        inputs.append(gen["stdout"].strip() + "\n")
+
+    stress_tests = [
+        {"input": inp, "output": f"{got}\n", "stress": True}
+        for inp, (got, _) in zip(inputs, run_reference(task["reference_solution"], inputs))
+        if got is not None
+    ]
+
+    if not stress_tests:
+        log.warning("Стресс-тесты не получились", level=level)
+        return task
+
+    task["tests"] = task["tests"] + stress_tests
+    log.info("Добавлены стресс-тесты", level=level, count=len(stress_tests))
+    return task
 
 
 # --------------------------------
-# ЛОКАЛЬНАЯ ПРОВЕРКА РЕШЕНИЯ (ТОЛЬКО ЦЕЛЫЕ)
+# ЭТАЛОННОЕ РЕШЕНИЕ КАК ОРАКУЛ
 # --------------------------------
 
-def _parse_int(s: str):
-    m = re.search(r"-?\d+", s)
-    if not m:
+# сколько дешёвых тестов досинтезировать локально, без LLM
+SYNTHETIC_TESTS = 10
+
+
+def run_reference(code: str, inputs: List[str],
+                  timeout: float = MAX_TIME_LIMIT) -> List[tuple]:
+    """
+    Прогоняем решение (с обёрткой solve()) по входам.
+    Возвращаем [(ответ или None, wall_ms)] — None, если упало, зависло или вывело не число.
+    """
+    results = []
+    with span("sandbox.run_reference", inputs=len(inputs)) as s:
+        for run in execute_batch(with_solve_harness(code), inputs, timeout=timeout):
+            got = None
+            if not run["timed_out"] and run["returncode"] == 0:
+                got = _parse_int(run["stdout"])
+            results.append((got, run["wall_ms"]))
+        s.set("failed", sum(1 for got, _ in results if got is None))
+
+    return results
+
+
+def samples_match_reference(task: Dict) -> bool:
+    """Примеры из условия видит кандидат — эталон обязан выдавать на них ровно то же."""
+    samples = [s for s in task.get("samples") or [] if s.get("input")]
+    outputs = run_reference(task["reference_solution"], [s["input"] for s in samples])
+    for s, (got, _) in zip(samples, outputs):
+        expected = _parse_int(str(s.get("output", "")))
+        if expected is not None and got != expected:
+            log.info(
+                "Пример из условия расходится с эталоном",
+                level=task["level"], expected=expected, got=got,
+            )
+            return False
+    return True
+
+
+def reconcile_with_agreement(tests: List[Dict], outputs_a: List, outputs_b: List):
+    """
+    Дифференциальная проверка ожидаемых ответов от LLM.
+
+    Если два независимых решения выдали одинаковые ответы на всех тестах,
+    а с LLM расходятся лишь на меньшей части, то скорее ошибся автор тестов.
+    Возвращаем тесты без спорных, либо None, если согласия нет.
+    """
+    if outputs_a != outputs_b or any(got is None for got in outputs_a):
         return None
-    return int(m.group(0))
 
-def run_code_on_tests(code: str, tests: List[Dict], timeout: float = 3.0) -> bool:
+    kept = [t for t, got in zip(tests, outputs_a) if _parse_int(t["output"]) == got]
+    disputed = len(tests) - len(kept)
+    if not kept or disputed > len(tests) // 3:
+        return None
+    return kept
+
+
+def _value_range(tests: List[Dict]) -> tuple | None:
+    """Диапазон n и значений по тестам от LLM — в нём синтезированные тесты не нарушат ограничений."""
+    ns, values = [], []
+    for t in tests:
+        # стресс-тесты максимального размера в диапазон не берём: синтезированные
+        # тесты должны остаться маленькими (они хранятся прямо в задаче)
+        if t.get("stress") or "input" not in t or not _is_valid_array_input(t["input"]):
+            continue
+        first, second = t["input"].strip().split("\n")
+        ns.append(int(first))
+        values.extend(int(x) for x in second.split())
+    if not ns:
+        return None
+    return max(ns), min(values), max(values)
+
+
+def add_synthetic_tests(task: Dict, count: int = SYNTHETIC_TESTS, seed: int = 0) -> Dict:
     """
-    Запускаем данный код на всех тестах.
-    Ожидаем, что в коде есть функция solve(), которая читает stdin и пишет в stdout.
-    Считаем, что формат: одно целое число -> одно целое число.
+    Досинтезируем небольшие тесты локально: случайные массивы в пределах,
+    уже встречавшихся в тестах, плюс крайние случаи. Ответы считает эталон.
     """
-    # Обёртка: если solve() что-то возвращает, напечатаем это
-    full_code = code + """
-if __name__ == "__main__":
-    _res = solve()
-    if _res is not None:
-        print(_res)
-"""
+    bounds = _value_range(task["tests"])
+    if bounds is None:
+        return task
+    max_n, lo, hi = bounds
+
+    rnd = random.Random(seed)
+    arrays = [
+        [lo],
+        [hi],
+        [hi] * max_n,
+        sorted(rnd.randint(lo, hi) for _ in range(max_n)),
+        sorted((rnd.randint(lo, hi) for _ in range(max_n)), reverse=True),
+    ]
+    while len(arrays) < count:
+        arrays.append([rnd.randint(lo, hi) for _ in range(rnd.randint(1, max_n))])
+
+    inputs = [f"{len(a)}\n{' '.join(map(str, a))}\n" for a in arrays[:count]]
+    existing = {t["input"] for t in task["tests"]}
+    synthetic = [
+        {"input": inp, "output": f"{got}\n", "synthetic": True}
+        for inp, (got, _) in zip(inputs, run_reference(task["reference_solution"], inputs))
+        if got is not None and inp not in existing
+    ]
+
+    task["tests"] = task["tests"] + synthetic
+    return task
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        path = tempfile.NamedTemporaryFile(dir=tmpdir, suffix=".py", delete=False).name
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(full_code)
 
-        for i, test in enumerate(tests, start=1):
-            inp = test["input"]
-            expected = test["output"]
+def calibrate_time_limit(task: Dict) -> Dict:
+    """TL задачи = множитель * худшее время эталона на всех её тестах."""
+    outputs = run_reference(task["reference_solution"], [t["input"] for t in task["tests"]])
+    worst_ms = max((ms for _, ms in outputs), default=0.0)
+    time_limit = TIME_LIMIT_FACTOR * worst_ms / 1000
+    task["time_limit"] = round(min(MAX_TIME_LIMIT, max(MIN_TIME_LIMIT, time_limit)), 1)
+    log.info(
+        "Откалиброван TL", level=task["level"], time_limit=task["time_limit"],
+        reference_worst_ms=round(worst_ms),
+    )
+    return task
 
-            try:
-                proc = subprocess.run(
-                    ["python", path],
-                    input=inp.encode("utf-8"),
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    timeout=timeout,
-                )
-            except subprocess.TimeoutExpired:
-                print(f"Тест {i}: превышено время выполнения")
-                return False
-
-            out = proc.stdout.decode("utf-8")
-            err = proc.stderr.decode("utf-8")
-
-            expected_num = _parse_int(expected)
-            got_num = _parse_int(out)
-
-            if expected_num is None or got_num is None:
-                print(f"Тест {i}: не удалось разобрать целое число")
-                print("  Ввод:      ", repr(inp))
-                print("  Ожидали:   ", repr(expected))
-                print("  Получили:  ", repr(out))
-                if err:
-                    print("  stderr:", err)
-                return False
-
-            if expected_num != got_num:
-                print(f"Тест {i}: ОШИБКА")
-                print("  Ввод:        ", repr(inp))
-                print("  Ожидали (int)", expected_num)
-                print("  Получили (int)", got_num)
-                print("  Сырой вывод: ", repr(out))
-                if err:
-                    print("  stderr:", err)
-                return False
-
-        return True
+
+def finalize_verified_task(task: Dict, reference_code: str) -> Dict | None:
+    """
+    Задачу решило эталонное решение: сохраняем его рядом с задачей,
+    сверяем с ним примеры, досыпаем тесты и калибруем TL.
+    None — если примеры из условия противоречат эталону.
+    """
+    task["reference_solution"] = reference_code
+    with span("task.finalize", level=task["level"]) as s:
+        if not samples_match_reference(task):
+            s.set("outcome", "samples_mismatch")
+            return None
+
+        add_synthetic_tests(task)
+        add_stress_tests(task)
+        calibrate_time_limit(task)
+        # большие входы — в отдельное хранилище, в задаче только ссылки
+        task["tests"] = STRESS_INPUTS.externalize(task["tests"])
+        s.set("outcome", "ok")
+        s.set("tests", len(task["tests"]))
+        s.set("time_limit", task["time_limit"])
+        return task
 
 
 # --------------------------------
 # ГЕНЕРАЦИЯ ПРОВЕРЕННОЙ ЗАДАЧИ
 # --------------------------------
 
+def _try_verify_task(vacancy_text: str, level_for_prompt: str, task_attempt: int,
+                     max_code_attempts: int) -> Dict | None:
+    """Одна задача от LLM и до max_code_attempts решений к ней. None — задача не подтвердилась."""
+    log.info("Попытка генерации задачи", level=level_for_prompt, attempt=task_attempt)
+    try:
+        task = cascade(
+            "task_statement",
+            CHAT_MODEL,
+            lambda model: generate_task_from_vacancy(vacancy_text, level_for_prompt, model=model),
+        )
+    except Exception as e:
+        log.warning("Ошибка при генерации задачи", level=level_for_prompt, error=str(e))
+        return None
+
+    # ответы каждого не прошедшего решения — для дифференциальной сверки
+    attempt_outputs: List[List] = []
+
+    # первая попытка — быстрая модель, следующие — старше (см. model_router)
+    solve_models = models_for("task_solve", CODE_MODEL)
+
+    def record_solve(model: str, started: float, solved: bool) -> None:
+        tier = solve_models.index(model)
+        if solved:
+            outcome = OUTCOME_ACCEPTED
+        else:
+            outcome = OUTCOME_ESCALATED if tier < len(solve_models) - 1 else OUTCOME_FAILED
+        record("task_solve", tier, model, (time.perf_counter() - started) * 1000, outcome)
+
+    # Несколько попыток написать решение для ОДНОЙ задачи
+    for code_attempt in range(1, max_code_attempts + 1):
+        model = model_for_attempt("task_solve", CODE_MODEL, code_attempt)
+        with span("task.solve_attempt", level=level_for_prompt, attempt=code_attempt,
+                  model=model) as s:
+            log.info(
+                "Пытаемся решить с помощью code-модели",
+                level=level_for_prompt, attempt=code_attempt, model=model,
+            )
+            started = time.perf_counter()
+            try:
+                code = solve_task_with_llm(task, attempt=code_attempt, model=model)
+            except Exception as e:
+                log.warning("Ошибка при генерации кода", level=level_for_prompt, error=str(e))
+                record_solve(model, started, solved=False)
+                s.set("outcome", "llm_error")
+                continue
+
+            # один прогон: по его ответам и проверяем тесты, и сверяем решения между собой
+            with span("sandbox.run_tests", tests=len(task["tests"])) as run_span:
+                outputs = [
+                    got
+                    for got, _ in run_reference(code, [t["input"] for t in task["tests"]], timeout=3.0)
+                ]
+                ok = outputs_match_tests(task["tests"], outputs)
+                run_span.set("passed", ok)
+            if ok:
+                log.info("Успешно: задача прошла все тесты", level=level_for_prompt)
+                record_solve(model, started, solved=True)
+                s.set("outcome", "passed")
+                return finalize_verified_task(task, code)
+
+            kept = None
+            for prev in attempt_outputs:
+                kept = reconcile_with_agreement(task["tests"], prev, outputs)
+                if kept is not None:
+                    break
+
+            if kept is not None:
+                log.info(
+                    "Два независимых решения согласны между собой, выкидываем спорные тесты",
+                    level=level_for_prompt, disputed=len(task["tests"]) - len(kept),
+                )
+                record_solve(model, started, solved=True)
+                s.set("outcome", "reconciled")
+                task["tests"] = kept
+                return finalize_verified_task(task, code)
+
+            attempt_outputs.append(outputs)
+            record_solve(model, started, solved=False)
+            s.set("outcome", "failed_tests")
+            log.info(
+                "Этот вариант решения не прошёл тесты, пробуем другой код для той же задачи",
+                level=level_for_prompt, attempt=code_attempt,
+            )
+
+    return None
+
+
 def generate_verified_task(
     vacancy_text: str,
     level_for_prompt: str,
@@ -360,46 +701,27 @@ def generate_verified_task(
     max_task_attempts  – сколько разных задач пробуем сгенерировать.
     max_code_attempts  – сколько раз даём code-модели шанс решить одну и ту же задачу.
     """
-    for task_attempt in range(1, max_task_attempts + 1):
-        print(f"[{level_for_prompt}] Попытка генерации задачи #{task_attempt}...")
-        try:
-            task = generate_task_from_vacancy(vacancy_text, level_for_prompt)
-        except Exception as e:
-            print(f"[{level_for_prompt}] Ошибка при генерации задачи: {e}")
-            continue
+    with span("task.generate", level=level_for_prompt) as gen_span:
+        for task_attempt in range(1, max_task_attempts + 1):
+            gen_span.set("task_attempts", task_attempt)
+            with span("task.attempt", level=level_for_prompt, attempt=task_attempt) as attempt_span:
+                verified = _try_verify_task(
+                    vacancy_text, level_for_prompt, task_attempt, max_code_attempts
+                )
+                attempt_span.set("outcome", "verified" if verified is not None else "rejected")
+            if verified is not None:
+                return verified
 
-        # Несколько попыток написать решение для ОДНОЙ задачи
-        for code_attempt in range(1, max_code_attempts + 1):
-            print(
-                f"[{level_for_prompt}] Пытаемся решить с помощью code-модели "
-                f"(попытка кода #{code_attempt})..."
+            log.info(
+                "Ни одно из решений не прошло тесты, генерируем новую задачу",
+                level=level_for_prompt, attempt=task_attempt,
             )
-            try:
-                code = solve_task_with_llm(task, attempt=code_attempt)
-            except Exception as e:
-                print(f"[{level_for_prompt}] Ошибка при генерации кода: {e}")
-                continue
 
-            ok = run_code_on_tests(code, task["tests"])
-            if ok:
-                print(f"[{level_for_prompt}] Успешно: задача прошла все тесты.")
-                return task
-            else:
-                print(
-                    f"[{level_for_prompt}] Этот вариант решения не прошёл тесты, "
-                    f"пробуем другой код для той же задачи..."
-                )
-
-        print(
-            f"[{level_for_prompt}] Ни одно из решений не прошло тесты, "
-            f"генерируем новую задачу..."
+        raise RuntimeError(
+            f"Не удалось получить рабочую задачу уровня {level_for_prompt} "
+            f"за {max_task_attempts} попыток"
         )
 
-    raise RuntimeError(
-        f"Не удалось получить рабочую задачу уровня {level_for_prompt} "
-        f"за {max_task_attempts} попыток"
-    )
-
 
 
 # --------------------------------
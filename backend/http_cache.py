@@ -0,0 +1,117 @@
+# http_cache.py
+import gzip
+import hashlib
+import json
+from typing import Any, Dict
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен — без него отдаём gzip
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # без orjson рендерим стандартным json, просто медленнее
+    orjson = None
+
+# --------------------------------
+# СЖАТИЕ И ETAG ДЛЯ НЕИЗМЕНЯЕМЫХ JSON-ОТВЕТОВ
+# --------------------------------
+#
+# Неизменяемые ответы (страница интервью для кандидата) рендерим в байты
+# один раз — сразу во всех кодировках — и дальше отдаём как есть.
+# ETag — хэш содержимого: поменялось содержимое — поменялся и ETag.
+
+MIN_COMPRESS_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def render_json(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def content_etag(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def prerender(payload: Any) -> Dict[str, Any]:
+    """
+    Готовый к отдаче снимок: {"etag", "identity", "gzip", "br"} (br — None без brotli).
+    Маленькие тела не сжимаем — там заголовки дороже выигрыша.
+    """
+    body = render_json(payload)
+    small = len(body) < MIN_COMPRESS_BYTES
+    return {
+        "etag": content_etag(body),
+        "identity": body,
+        "gzip": None if small else _compress(body, "gzip"),
+        "br": None if small or brotli is None else _compress(body, "br"),
+    }
+
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """br, если клиент и сервер умеют; иначе gzip; иначе identity."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def _etag_matches(if_none_match: str | None, tag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(t.strip() == tag for t in if_none_match.split(","))
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+def _conditional_headers(request: Request, etag: str, encoding: str):
+    # у разных кодировок разные байты — значит и сильный ETag должен отличаться
+    tag = f'"{etag}"' if encoding == "identity" else f'"{etag}-{encoding}"'
+    headers = {
+        "ETag": tag,
+        "Vary": "Accept-Encoding",
+        # кэшировать можно, но каждый раз сверяться с сервером
+        "Cache-Control": "no-cache",
+    }
+    return headers, _etag_matches(request.headers.get("if-none-match"), tag)
+
+
+def snapshot_response(request: Request, snapshot: Dict[str, Any],
+                      extra_headers: Dict[str, str] | None = None) -> Response:
+    """
+    Отдаём снимок из prerender() без сериализации и сжатия на запрос.
+    If-None-Match совпал — 304 без тела.
+    """
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if snapshot.get(encoding) is None:
+        encoding = "gzip" if encoding == "br" and snapshot.get("gzip") is not None else "identity"
+
+    headers, not_modified = _conditional_headers(request, snapshot["etag"], encoding)
+    headers.update(extra_headers or {})
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=snapshot[encoding], media_type="application/json", headers=headers)
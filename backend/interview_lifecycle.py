@@ -0,0 +1,266 @@
+# interview_lifecycle.py
+import json
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict
+
+import autosave
+import cheat_log
+import jobs
+from interview_store import (
+    INTERVIEWS,
+    STATUS_ARCHIVED,
+    STATUS_CREATED,
+    STATUS_IN_PROGRESS,
+    STATUS_SUBMITTED,
+    connect,
+)
+from jobs import JOB_RESULT_TTL_SECONDS
+from ratelimit import LRUCache
+from stress_inputs import STRESS_INPUT_TTL_SECONDS, STRESS_INPUTS
+from tracing import get_logger, span
+
+log = get_logger("interview_lifecycle")
+
+# --------------------------------
+# ЖИЗНЕННЫЙ ЦИКЛ ИНТЕРВЬЮ
+# --------------------------------
+#
+#   created      — HR сгенерировал интервью, кандидат ещё не начинал;
+#   in_progress  — кандидат начал (автосохранение или "Запустить");
+#   submitted    — ответы проверены, есть отчёт;
+#   archived     — интервью отслужило и лежит в холодном архиве.
+#
+# Сколько интервью может пробыть в каждом статусе — TTL ниже. Фоновый
+# компактор раз в COMPACT_INTERVAL_SECONDS переносит просроченные интервью
+# в архив: условия, скрытые тесты, отчёт, финальные ответы из автосохранения
+# и сводку античита — одной сжатой записью. Из горячей базы, автосохранений
+# и журнала античита они удаляются, поэтому рабочий набор не растёт со временем.
+#
+# Отчёт HR по архивному интервью по-прежнему доступен (из архива),
+# а кандидатская ссылка такого интервью отвечает 404.
+
+# архив можно вынести на отдельный (медленный и дешёвый) диск
+ARCHIVE_DB_PATH = Path(
+    os.environ.get("INTERVIEW_ARCHIVE_PATH")
+    or Path(__file__).with_name("interviews_archive.db")
+)
+
+DAY = 24 * 3600
+# сколько интервью живёт в статусе, сутки; 0 — не архивировать
+TTL_SECONDS = {
+    STATUS_CREATED: float(os.environ.get("INTERVIEW_TTL_CREATED_DAYS", "14")) * DAY,
+    STATUS_IN_PROGRESS: float(os.environ.get("INTERVIEW_TTL_IN_PROGRESS_DAYS", "3")) * DAY,
+    STATUS_SUBMITTED: float(os.environ.get("INTERVIEW_TTL_SUBMITTED_DAYS", "30")) * DAY,
+}
+# сколько хранится архив; 0 — бессрочно
+ARCHIVE_TTL_SECONDS = float(os.environ.get("INTERVIEW_ARCHIVE_TTL_DAYS", "365")) * DAY
+
+COMPACT_INTERVAL_SECONDS = 600
+COMPACT_BATCH = 200
+
+
+# --------------------------------
+# ХОЛОДНЫЙ АРХИВ
+# --------------------------------
+
+class InterviewArchive:
+    def __init__(self, path: Path = ARCHIVE_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS archived_interviews (
+                token TEXT PRIMARY KEY,
+                final_status TEXT NOT NULL,
+                data BLOB NOT NULL,
+                archived_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn().execute(
+            "CREATE INDEX IF NOT EXISTS archived_at ON archived_interviews (archived_at)"
+        )
+
+    def _conn(self):
+        cached = getattr(self._local, "conn", None)
+        if cached is not None and cached[0] == os.getpid():
+            return cached[1]
+        conn = connect(self.path)
+        self._local.conn = (os.getpid(), conn)
+        return conn
+
+    def put(self, token: str, final_status: str, record: Dict[str, Any]) -> None:
+        data = zlib.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"), 6)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO archived_interviews VALUES (?, ?, ?, ?)",
+            (token, final_status, data, time.time()),
+        )
+
+    def get(self, token: str) -> Dict[str, Any] | None:
+        """{"interview", "answers", "cheat_events", "final_status", "archived_at"} или None."""
+        row = self._conn().execute(
+            "SELECT * FROM archived_interviews WHERE token = ?", (token,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = json.loads(zlib.decompress(row["data"]))
+        record["final_status"] = row["final_status"]
+        record["archived_at"] = row["archived_at"]
+        return record
+
+    def purge(self, before: float) -> int:
+        return self._conn().execute(
+            "DELETE FROM archived_interviews WHERE archived_at < ?", (before,)
+        ).rowcount
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM archived_interviews").fetchone()[0]
+
+
+INTERVIEW_ARCHIVE = InterviewArchive()
+
+
+# --------------------------------
+# ПЕРЕХОДЫ
+# --------------------------------
+
+# токены, которые этот процесс уже перевёл в in_progress, — чтобы не писать в базу
+# на каждое автосохранение
+_STARTED = LRUCache(max_entries=10_000)
+
+
+def mark_in_progress(token: str) -> None:
+    """Кандидат начал работу (автосохранение, "Запустить")."""
+    if _STARTED.get(token):
+        return
+    INTERVIEWS.set_status(token, STATUS_IN_PROGRESS, from_statuses=(STATUS_CREATED,))
+    _STARTED.put(token, True)
+
+
+def mark_submitted(token: str) -> None:
+    INTERVIEWS.set_status(token, STATUS_SUBMITTED)
+
+
+# живые интервью для античит-событий: token -> до какого момента (monotonic)
+# верим, что интервью не архивировано, — чтобы не ходить в базу на каждую пачку
+_LIVE = LRUCache(max_entries=10_000)
+# архивацию в другом процессе API этот процесс заметит не позже чем через столько
+LIVE_CHECK_SECONDS = 30.0
+LIVE_STATUSES = (STATUS_CREATED, STATUS_IN_PROGRESS, STATUS_SUBMITTED)
+
+
+def known_live(token: str) -> bool:
+    """Без похода в базу: интервью недавно было живым. False — надо проверить (check_live)."""
+    until = _LIVE.get(token)
+    return until is not None and until > time.monotonic()
+
+
+def check_live(token: str) -> bool:
+    """Интервью есть в горячей базе и ещё не архивировано."""
+    if INTERVIEWS.status(token) in LIVE_STATUSES:
+        _LIVE.put(token, time.monotonic() + LIVE_CHECK_SECONDS)
+        return True
+    _LIVE.pop(token)
+    return False
+
+
+# --------------------------------
+# КОМПАКТОР
+# --------------------------------
+
+def _archive(token: str, status: str, status_at: float) -> bool:
+    interview = INTERVIEWS.get(token)
+    if interview is None:
+        return False
+    answers = autosave.load_snapshot(token)
+    INTERVIEW_ARCHIVE.put(
+        token,
+        status,
+        {
+            "interview": interview,
+            "answers": {
+                "coding_solutions": answers["coding_solutions"],
+                "theory_solutions": answers["theory_solutions"],
+            },
+            "cheat_events": cheat_log.summary(token),
+        },
+    )
+    if not INTERVIEWS.remove(token, status, status_at):
+        # пока архивировали, интервью ожило — оставляем в горячей базе,
+        # архивная копия перезапишется, когда оно снова просрочится
+        return False
+    autosave.discard(token)
+    cheat_log.discard(token)
+    _STARTED.pop(token)
+    _LIVE.pop(token)
+    return True
+
+
+def compact_once(now: float | None = None) -> Dict[str, int]:
+    """Один проход: просроченные интервью — в архив, просроченный архив и старые задачи — удалить."""
+    now = now or time.time()
+    archived: Dict[str, int] = {}
+    with span("interview.compact") as s:
+        for status, ttl in TTL_SECONDS.items():
+            if ttl <= 0:
+                continue
+            n = 0
+            while True:
+                batch = INTERVIEWS.expired(status, now - ttl, COMPACT_BATCH)
+                moved = 0
+                for row in batch:
+                    try:
+                        moved += _archive(row["token"], status, row["status_at"])
+                    except Exception:
+                        log.exception("Не удалось заархивировать интервью", token=row["token"])
+                n += moved
+                if len(batch) < COMPACT_BATCH or not moved:
+                    break
+            if n:
+                archived[status] = n
+        purged = INTERVIEW_ARCHIVE.purge(now - ARCHIVE_TTL_SECONDS) if ARCHIVE_TTL_SECONDS > 0 else 0
+        # входы стресс-тестов, которые давно никто не прогонял (см. stress_inputs.py)
+        stress_purged = (
+            STRESS_INPUTS.purge(now - STRESS_INPUT_TTL_SECONDS) if STRESS_INPUT_TTL_SECONDS > 0 else 0
+        )
+        # завершённые фоновые задачи с их результатами (см. jobs.py)
+        jobs_purged = jobs.purge(now - JOB_RESULT_TTL_SECONDS) if JOB_RESULT_TTL_SECONDS > 0 else 0
+        s.set("archived", sum(archived.values()))
+        s.set("purged", purged)
+        s.set("stress_inputs_purged", stress_purged)
+        s.set("jobs_purged", jobs_purged)
+
+    if archived or purged or stress_purged or jobs_purged:
+        log.info("Компактор интервью", archived=archived, purged=purged,
+                 stress_inputs_purged=stress_purged, jobs_purged=jobs_purged)
+    return {"archived": sum(archived.values()), "purged": purged,
+            "stress_inputs_purged": stress_purged, "jobs_purged": jobs_purged}
+
+
+def _compact_loop() -> None:
+    while True:
+        try:
+            compact_once()
+        except Exception:
+            log.exception("Компактор интервью упал, попробуем в следующий раз")
+        time.sleep(COMPACT_INTERVAL_SECONDS)
+
+
+def start_compactor() -> None:
+    # процессов API может быть несколько — проход идемпотентный, удаление условное
+    threading.Thread(target=_compact_loop, daemon=True).start()
+
+
+def lifecycle_stats() -> Dict[str, Any]:
+    counts = INTERVIEWS.status_counts()
+    counts[STATUS_ARCHIVED] = INTERVIEW_ARCHIVE.count()
+    return {
+        "interviews": counts,
+        "ttl_days": {status: ttl / DAY for status, ttl in TTL_SECONDS.items()},
+        "archive_ttl_days": ARCHIVE_TTL_SECONDS / DAY,
+        "autosave_memory": autosave.memory_stats(),
+    }
@@ -0,0 +1,366 @@
+# interview_pipeline.py
+import secrets
+from typing import Any, Dict, List
+
+from domain_tasks_generator import (
+    GRADE_PASS_SCORE,
+    generate_domain_tasks,
+    grade_candidate_answers_batch,
+)
+from http_cache import prerender
+from interview_lifecycle import mark_submitted
+from llm_budget import LLM_BUDGETS, charged_to, company_key
+from interview_store import INTERVIEWS
+from plagiarism import PLAGIARISM_INDEX, task_key
+from stress_inputs import STRESS_INPUTS
+from sandbox import estimate_complexity, run_code_report
+from task_templates import generate_interview_tasks
+from theory_prescore import DECISION_FAIL, prescore_answer
+from tracing import get_logger, span
+
+log = get_logger("pipeline")
+
+# --------------------------------
+# ТЯЖЁЛЫЕ ОПЕРАЦИИ НАД ИНТЕРВЬЮ
+# --------------------------------
+#
+# Генерация интервью и проверка ответов. Вызываются либо прямо из эндпоинтов,
+# либо в процессах worker.py через очередь задач (jobs.py) — поэтому здесь
+# нет ничего от FastAPI, только dict на входе и на выходе.
+
+
+# что из задач можно показывать кандидату — белый список, чтобы новое
+# служебное поле задачи (тесты, эталоны) не утекло само собой
+CANDIDATE_CODING_FIELDS = ("level", "title", "statement", "samples", "time_limit")
+CANDIDATE_THEORY_FIELDS = ("level", "vacancy", "question")
+
+
+def candidate_view(interview: Dict[str, Any]) -> Dict[str, Any]:
+    """Интервью глазами кандидата: без скрытых тестов, эталонных ответов и решений."""
+    return {
+        "token": interview["token"],
+        "vacancy": interview.get("vacancy"),
+        "position": interview.get("position"),
+        "complexity": interview.get("complexity"),
+        "coding_tasks": [
+            {k: t[k] for k in CANDIDATE_CODING_FIELDS if k in t}
+            for t in interview.get("coding_tasks") or interview.get("tasks") or []
+        ],
+        "theory_tasks": [
+            {k: t[k] for k in CANDIDATE_THEORY_FIELDS if k in t}
+            for t in interview.get("theory_tasks") or []
+        ],
+    }
+
+
+def create_interview(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Генерируем задачи по вакансии и сохраняем интервью.
+    params — поля VacancyRequest.
+    """
+    return store_interview(params, generate_interview_content(params))
+
+
+def generate_interview_content(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Только генерация: {"coding_tasks", "theory_tasks"} без токена и без записи в хранилище.
+    Так же работает и черновик (drafts.py) — его результат потом отдаётся store_interview.
+    """
+    company = company_key(params.get("company"))
+    with span("interview.generate", validator=params.get("theory_validator", "roleplay"),
+              vacancy_chars=len(params["vacancy"]), company=company) as s, charged_to(company):
+        content = _degraded_content(params, company)
+        s.set("degraded", content is not None)
+        if content is None:
+            LLM_BUDGETS.wait_for_tokens(company)
+            content = _generate_interview_content(params)
+        s.set("coding_tasks", len(content["coding_tasks"]))
+        s.set("theory_tasks", len(content["theory_tasks"]))
+        return content
+
+
+def _degraded_content(params: Dict[str, Any], company: str) -> Dict[str, Any] | None:
+    """
+    Бюджет LLM компании исчерпан — собираем интервью без LLM: задачи из банка
+    шаблонов этой вакансии, без теоретических вопросов. None — бюджет есть
+    или банк вакансию не покрывает.
+    """
+    if LLM_BUDGETS.tokens_wait(company) <= 0:
+        return None
+    raw_coding = generate_interview_tasks(params["vacancy"], bank_only=True)
+    if raw_coding is None:
+        return None
+    LLM_BUDGETS.note_degraded(company)
+    log.info("Бюджет LLM исчерпан, интервью из банка шаблонов", company=company)
+    return {"coding_tasks": raw_coding["tasks"], "theory_tasks": [], "degraded": True}
+
+
+def _generate_interview_content(params: Dict[str, Any]) -> Dict[str, Any]:
+    # 1) Генерация алгоритмических задач
+    raw_coding = generate_interview_tasks(params["vacancy"])
+
+    if isinstance(raw_coding, dict):
+        coding_tasks = raw_coding.get("tasks", [])
+    else:
+        coding_tasks = raw_coding  # считаем, что это уже список задач
+
+    # 2) Пытаемся сгенерировать 2 теоретические задачи: easy + hard
+    theory_tasks: List[Dict[str, Any]] = []
+
+    # easy
+    try:
+        raw_theory_easy = generate_domain_tasks(
+            vacancy=params["vacancy"],
+            level="easy",
+            target_count=1,
+            min_score=65,
+            max_attempts=50,
+            validator=params.get("theory_validator", "roleplay"),
+        )
+    except Exception as e:
+        log.exception("Ошибка генерации теоретической задачи", level="easy", error=repr(e))
+        raw_theory_easy = []
+
+    # hard
+    try:
+        raw_theory_hard = generate_domain_tasks(
+            vacancy=params["vacancy"],
+            level="hard",
+            target_count=1,
+            min_score=65,
+            max_attempts=50,
+            validator=params.get("theory_validator", "roleplay"),
+        )
+    except Exception as e:
+        log.exception("Ошибка генерации теоретической задачи", level="hard", error=repr(e))
+        raw_theory_hard = []
+
+    raw_theory_all = (raw_theory_easy or []) + (raw_theory_hard or [])
+
+    theory_tasks = [
+        {
+            "vacancy": t.get("vacancy"),
+            "level": t.get("level"),
+            "question": t["question"],
+            "reference_answer": t["reference_answer"],
+        }
+        for t in raw_theory_all
+        if "question" in t and "reference_answer" in t
+    ]
+
+    return {
+        "coding_tasks": coding_tasks,
+        "theory_tasks": theory_tasks,  # может быть [] — это ОК
+    }
+
+
+def store_interview(params: Dict[str, Any], content: Dict[str, Any]) -> Dict[str, Any]:
+    """Интервью из готовых задач: токен, запись в общее хранилище и снимок для кандидата."""
+    # не по счётчику: интервью уходят в архив, и len(INTERVIEWS) повторялся бы
+    token = params.get("token") or "int_" + secrets.token_hex(8)
+
+    interview = {
+        "token": token,
+        "vacancy": params["vacancy"],
+        "position": params.get("position"),
+        "complexity": params.get("complexity"),
+        "coding_tasks": content["coding_tasks"],
+        "theory_tasks": content["theory_tasks"],
+        "probe_complexity": params.get("probe_complexity", False),
+        # с чьего бюджета LLM идёт и проверка ответов
+        "company": company_key(params.get("company")),
+        # кто создал: отчёт видят HR этой компании (или сам автор, если компании нет)
+        "hr_email": params.get("hr_email"),
+        "degraded": content.get("degraded", False),
+    }
+    INTERVIEWS[token] = interview
+    # страницу для кандидата рендерим один раз: задачи после создания не меняются
+    INTERVIEWS.put_snapshot(token, prerender(candidate_view(interview)))
+
+    return interview
+
+
+def check_interview(token: str, coding_solutions: Dict[str, str],
+                    theory_solutions: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Проверяем ответы кандидата, сохраняем подробный отчёт для HR
+    и возвращаем то, что можно показать кандидату.
+    Нет такого интервью -> KeyError.
+    """
+    interview = INTERVIEWS[token]
+    with span("interview.check", token=token) as s, charged_to(interview.get("company")):
+        result = _check_interview(interview, coding_solutions, theory_solutions)
+        s.set("coding_passed_percent", result["coding"]["passed_percent"])
+        s.set("theory_passed_percent", result["theory"]["passed_percent"])
+        return result
+
+
+def _index_submission(token: str, task: Dict[str, Any], code: str) -> None:
+    """Кладём решение в индекс плагиата; его сбой не должен мешать проверке."""
+    level = task.get("level")
+    try:
+        with span("plagiarism.index", level=level) as s:
+            s.set("matches", len(PLAGIARISM_INDEX.add(token, level, task_key(task), code)))
+    except Exception:
+        log.exception("Не удалось проиндексировать решение", token=token, level=level)
+
+
+def _check_interview(interview: Dict[str, Any], coding_solutions: Dict[str, str],
+                     theory_solutions: Dict[str, str]) -> Dict[str, Any]:
+    token = interview["token"]
+
+    coding_tasks = interview.get("coding_tasks") or interview.get("tasks") or []
+    theory_tasks = interview.get("theory_tasks") or []
+    vacancy_text = interview.get("vacancy", "")
+
+    # --- проверяем 3 кодинговые задачи ---
+    coding_results: list[Dict[str, Any]] = []
+    # подробности (вердикты, время, память) — только для HR, кандидату не отдаём
+    coding_report: list[Dict[str, Any]] = []
+    total_tests = 0
+    total_passed = 0
+
+    for task in coding_tasks:
+        level = task.get("level")
+        # входы стресс-тестов лежат отдельно — грузим их только под прогон
+        tests = STRESS_INPUTS.resolve(task.get("tests") or [])
+        total_tests += len(tests)
+
+        code = (coding_solutions.get(level) or "").strip()
+        if code:
+            _index_submission(token, task, code)
+
+        if not code or not tests:
+            failed_test = 1 if tests else None
+            coding_results.append(
+                {
+                    "level": level,
+                    "solved": False,
+                    "failed_test": failed_test,
+                }
+            )
+            continue
+
+        time_limit = task.get("time_limit", 3.0)
+        # один прогон на задачу: подробный отчёт для HR с вердиктами и по тестам
+        # после первой ошибки; после первого TLE не гоняем — каждый следующий
+        # съел бы ещё целый TL
+        execution = run_code_report(code, tests, timeout=time_limit, stop_on_timeout=True)
+        solved = execution["solved"]
+        failed_test = execution["failed_test"]
+        # балл кандидата — как и раньше, до первого непройденного теста
+        total_passed += failed_test - 1 if failed_test else execution["passed_count"]
+
+        # производительность: отдельно смотрим на стресс-тесты максимального размера
+        stress = [r for t, r in zip(tests, execution["tests"]) if t.get("stress")]
+        task_report: Dict[str, Any] = {
+            "level": level,
+            "execution": execution,
+            "performance": {
+                "time_limit": time_limit,
+                "stress_passed": sum(1 for r in stress if r["verdict"] == "OK"),
+                "stress_total": sum(1 for t in tests if t.get("stress")),
+                "stress_max_wall_ms": max((r["wall_ms"] for r in stress), default=None),
+            },
+        }
+        if solved and interview.get("probe_complexity"):
+            task_report["complexity"] = estimate_complexity(code)
+        coding_report.append(task_report)
+
+        if solved:
+            coding_results.append(
+                {
+                    "level": level,
+                    "solved": True,
+                }
+            )
+        else:
+            coding_results.append(
+                {
+                    "level": level,
+                    "solved": False,
+                    "failed_test": failed_test,
+                }
+            )
+
+    coding_percent = round(total_passed * 100 / total_tests) if total_tests else 0
+
+    # --- проверяем 2 теоретические задачи: явный провал — локально, остальное — нейросетью ---
+    theory_results: list[Dict[str, Any]] = []
+    theory_report: list[Dict[str, Any]] = []
+    passed_count = 0
+    total_theory = len(theory_tasks)
+
+    to_grade: list[Dict[str, Any]] = []
+    for t in theory_tasks:
+        level = t.get("level")
+        cand_answer = (theory_solutions.get(level) or "").strip()
+
+        if not cand_answer:
+            theory_results.append(
+                {
+                    "level": level,
+                    "answered": False,
+                    "passed": False,
+                }
+            )
+            continue
+
+        result = {"level": level, "answered": True, "passed": False}
+        theory_results.append(result)
+
+        prescore = prescore_answer(t["question"], t["reference_answer"], cand_answer)
+        task_report = {"level": level, "prescore": prescore, "decided_by": "local"}
+        theory_report.append(task_report)
+
+        if prescore["decision"] == DECISION_FAIL:
+            # явный провал (пусто, не текст, переписан вопрос) — без LLM; зачёт ставит только LLM
+            continue
+
+        task_report["decided_by"] = "llm"
+        to_grade.append(
+            {
+                "result": result,
+                "report": task_report,
+                "level": level,
+                "question": t["question"],
+                "reference_answer": t["reference_answer"],
+                "candidate_answer": cand_answer,
+            }
+        )
+
+    with span("theory.grade", answered=len(theory_report), escalated=len(to_grade)):
+        grades = grade_candidate_answers_batch(vacancy_text, to_grade)
+
+    for item, grade in zip(to_grade, grades):
+        # решаем, считать ответ "зачётным" или нет — но числа наружу не отдаём
+        item["result"]["passed"] = grade["final_score"] >= GRADE_PASS_SCORE
+        item["report"]["grade"] = grade
+
+    passed_count = sum(1 for r in theory_results if r["passed"])
+
+    theory_percent = (
+        round(passed_count * 100 / total_theory) if total_theory else 0
+    )
+
+    interview["report"] = {
+        "coding": coding_report,
+        "coding_passed_percent": coding_percent,
+        "theory": theory_report,
+        "theory_passed_percent": theory_percent,
+    }
+
+    INTERVIEWS[token] = interview
+    mark_submitted(token)
+
+    return {
+        "token": token,
+        "coding": {
+            "tasks": coding_results,
+            "passed_percent": coding_percent,
+        },
+        "theory": {
+            "tasks": theory_results,
+            "passed_percent": theory_percent,
+        },
+    }
@@ -0,0 +1,247 @@
+# interview_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+# --------------------------------
+# ОБЩЕЕ ХРАНИЛИЩЕ ИНТЕРВЬЮ
+# --------------------------------
+#
+# Интервью лежат в SQLite, а не в памяти процесса: так их видят все
+# API-воркеры (uvicorn --workers N) и процессы worker.py.
+# Снаружи это похоже на dict: INTERVIEWS[token], INTERVIEWS.get(token), token in INTERVIEWS.
+# Важно: get() отдаёт копию — после изменения её надо записать обратно через INTERVIEWS[token] = ...
+#
+# Рядом лежат снимки для кандидата — готовые байты ответа (см. http_cache.prerender)
+# с номером версии. Их отдают как есть, не разбирая интервью целиком.
+#
+# У интервью есть статус: created -> in_progress -> submitted. Здесь лежат только
+# живые интервью; отслужившие (см. TTL в interview_lifecycle.py) переезжают в архив
+# и из этой базы удаляются.
+
+INTERVIEWS_DB_PATH = Path(__file__).with_name("interviews.db")
+
+STATUS_CREATED = "created"
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_SUBMITTED = "submitted"
+STATUS_ARCHIVED = "archived"
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """
+    Соединение для общих SQLite-баз (интервью, очередь задач).
+    WAL — читатели не ждут писателя; busy_timeout — писатели из разных
+    процессов ждут друг друга, а не падают с "database is locked".
+    """
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class InterviewStore:
+    def __init__(self, path: Path = INTERVIEWS_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS interviews (
+                token TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                status TEXT NOT NULL DEFAULT 'created',
+                status_at REAL NULL
+            )
+            """
+        )
+        # базы от прошлых версий: статус выводим из наличия отчёта,
+        # время статуса — из последнего изменения
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(interviews)")}
+        if "status" not in columns:
+            conn.execute("ALTER TABLE interviews ADD COLUMN status TEXT NOT NULL DEFAULT 'created'")
+            conn.execute("ALTER TABLE interviews ADD COLUMN status_at REAL NULL")
+            conn.execute(
+                """
+                UPDATE interviews SET
+                    status = CASE WHEN json_extract(data, '$.report') IS NOT NULL
+                                  THEN ? ELSE ? END,
+                    status_at = CAST(strftime('%s', updated_at) AS REAL)
+                """,
+                (STATUS_SUBMITTED, STATUS_CREATED),
+            )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS interviews_status ON interviews (status, status_at)"
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS interview_snapshots (
+                token TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                etag TEXT NOT NULL,
+                body BLOB NOT NULL,
+                body_gzip BLOB NULL,
+                body_br BLOB NULL
+            )
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        """
+        Одно соединение на поток: открывать SQLite на каждое чтение заметно дороже
+        самого чтения. pid проверяем, чтобы не унаследовать соединение через fork.
+        """
+        cached = getattr(self._local, "conn", None)
+        if cached is not None and cached[0] == os.getpid():
+            return cached[1]
+        conn = connect(self.path)
+        self._local.conn = (os.getpid(), conn)
+        return conn
+
+    def put_snapshot(self, token: str, snapshot: Dict[str, Any]) -> int:
+        """Сохраняем новый снимок (результат prerender) и возвращаем его версию."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT version FROM interview_snapshots WHERE token = ?", (token,)
+            ).fetchone()
+            version = (row["version"] if row else 0) + 1
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO interview_snapshots
+                    (token, version, etag, body, body_gzip, body_br)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    token,
+                    version,
+                    snapshot["etag"],
+                    snapshot["identity"],
+                    snapshot["gzip"],
+                    snapshot["br"],
+                ),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+
+    def get_snapshot(self, token: str) -> Dict[str, Any] | None:
+        """{"version", "etag", "identity", "gzip", "br"} или None."""
+        row = self._conn().execute(
+            """
+            SELECT version, etag, body, body_gzip, body_br
+            FROM interview_snapshots WHERE token = ?
+            """,
+            (token,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "version": row["version"],
+            "etag": row["etag"],
+            "identity": row["body"],
+            "gzip": row["body_gzip"],
+            "br": row["body_br"],
+        }
+
+    def get(self, token: str, default: Any = None) -> Dict[str, Any] | None:
+        row = self._conn().execute(
+            "SELECT data FROM interviews WHERE token = ?", (token,)
+        ).fetchone()
+        return json.loads(row["data"]) if row else default
+
+    def __getitem__(self, token: str) -> Dict[str, Any]:
+        interview = self.get(token)
+        if interview is None:
+            raise KeyError(token)
+        return interview
+
+    def __setitem__(self, token: str, interview: Dict[str, Any]) -> None:
+        self._conn().execute(
+            """
+            INSERT INTO interviews (token, data, status, status_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(token) DO UPDATE SET data = excluded.data,
+                                             updated_at = CURRENT_TIMESTAMP
+            """,
+            (token, json.dumps(interview, ensure_ascii=False), STATUS_CREATED, time.time()),
+        )
+
+    def __contains__(self, token: object) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM interviews WHERE token = ?", (token,)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM interviews").fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        rows = self._conn().execute("SELECT token FROM interviews").fetchall()
+        return iter([r["token"] for r in rows])
+
+
+    # --- жизненный цикл ---
+
+    def set_status(self, token: str, status: str, from_statuses: tuple[str, ...] | None = None) -> bool:
+        """Меняем статус (только из from_statuses, если заданы). True — поменяли."""
+        query = "UPDATE interviews SET status = ?, status_at = ? WHERE token = ?"
+        args: tuple = (status, time.time(), token)
+        if from_statuses:
+            query += f" AND status IN ({','.join('?' * len(from_statuses))})"
+            args += from_statuses
+        return self._conn().execute(query, args).rowcount > 0
+
+    def status(self, token: str) -> str | None:
+        row = self._conn().execute(
+            "SELECT status FROM interviews WHERE token = ?", (token,)
+        ).fetchone()
+        return row["status"] if row else None
+
+    def expired(self, status: str, before: float, limit: int) -> List[Dict[str, Any]]:
+        """Интервью в статусе status, которые в нём с момента раньше before."""
+        rows = self._conn().execute(
+            """
+            SELECT token, status_at FROM interviews
+            WHERE status = ? AND status_at < ?
+            ORDER BY status_at LIMIT ?
+            """,
+            (status, before, limit),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def remove(self, token: str, status: str, status_at: float) -> bool:
+        """
+        Удаляем интервью и его снимок — если оно всё ещё в том же статусе с тем же временем
+        (пока его архивировали, кандидат мог успеть что-то сделать).
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                "DELETE FROM interviews WHERE token = ? AND status = ? AND status_at = ?",
+                (token, status, status_at),
+            )
+            if cur.rowcount:
+                conn.execute("DELETE FROM interview_snapshots WHERE token = ?", (token,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount > 0
+
+    def status_counts(self) -> Dict[str, int]:
+        rows = self._conn().execute(
+            "SELECT status, COUNT(*) AS n FROM interviews GROUP BY status"
+        ).fetchall()
+        return {r["status"]: r["n"] for r in rows}
+
+
+INTERVIEWS = InterviewStore()
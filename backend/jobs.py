@@ -0,0 +1,330 @@
+# jobs.py
+import json
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from interview_store import connect
+
+# --------------------------------
+# ДОЛГОВЕЧНАЯ ОЧЕРЕДЬ ЗАДАЧ (SQLite)
+# --------------------------------
+#
+# API-воркеры кладут сюда тяжёлую работу (генерация интервью, проверка ответов),
+# процессы worker.py её разбирают. Брокер не нужен: очередь — таблица в SQLite,
+# задачи переживают рестарт любого процесса.
+#
+# Жизненный цикл: queued -> running -> done | failed.
+# Задачу можно отменить (cancelled) — воркер заметит это по heartbeat и бросит работу.
+# Взятая задача "арендована" воркером до lease_until; воркер продлевает аренду,
+# пока работает. Если воркер умер, аренда истекает и задачу берёт другой.
+#
+# Наружу (202 и /api/jobs/{job_id}) отдаём не id, а случайный public_id:
+# перебором id чужую задачу не найти. owner — кто может читать результат:
+# "hr:<email>" для генерации, "interview:<token>" для проверки ответов.
+# Завершённые задачи через JOB_RESULT_TTL_SECONDS удаляет компактор
+# (interview_lifecycle.py) — результаты в них крупные.
+
+JOBS_DB_PATH = Path(__file__).with_name("jobs.db")
+
+# включает режим с отдельными процессами worker.py (см. README)
+USE_JOB_QUEUE = os.environ.get("SAFE_INTERVIEW_QUEUE") == "1"
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+FINAL_STATUSES = (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED)
+
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+# сколько часов хранить завершённую задачу; 0 — бессрочно
+JOB_RESULT_TTL_SECONDS = float(os.environ.get("JOB_RESULT_TTL_HOURS", "24")) * 3600
+
+
+def _connect():
+    return connect(JOBS_DB_PATH)
+
+
+def init_queue() -> None:
+    conn = _connect()
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                public_id TEXT NULL,
+                owner TEXT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 1,
+                traceparent TEXT NULL,
+                status TEXT NOT NULL,
+                result TEXT NULL,
+                error TEXT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT NULL,
+                lease_until REAL NULL,
+                created_at REAL NOT NULL,
+                started_at REAL NULL,
+                finished_at REAL NULL
+            )
+            """
+        )
+        # базы от прошлых версий: добавляем недостающие колонки
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)")}
+        for name, ddl in (
+            ("priority", "INTEGER NOT NULL DEFAULT 1"),
+            ("traceparent", "TEXT NULL"),
+            ("public_id", "TEXT NULL"),
+            ("owner", "TEXT NULL"),
+        ):
+            if name not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {ddl}")
+        conn.execute("DROP INDEX IF EXISTS jobs_status")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority, id)")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS jobs_public_id ON jobs (public_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)")
+    finally:
+        conn.close()
+
+
+def _row_to_job(row) -> Dict[str, Any]:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    return job
+
+
+def enqueue(kind: str, payload: Dict[str, Any], priority: int = 1,
+            traceparent: str | None = None, owner: str | None = None) -> int:
+    """
+    priority: меньше — раньше (см. scheduler.PRIORITY).
+    traceparent: спан API-запроса — воркер продолжит ту же трассу.
+    owner: кому можно читать задачу через API; None — только внутренняя.
+    """
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            """
+            INSERT INTO jobs (public_id, owner, kind, payload, priority, traceparent, status,
+                              created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                secrets.token_urlsafe(16),
+                owner,
+                kind,
+                json.dumps(payload, ensure_ascii=False),
+                priority,
+                traceparent,
+                STATUS_QUEUED,
+                time.time(),
+            ),
+        )
+        return cur.lastrowid
+    finally:
+        conn.close()
+
+
+def claim(worker: str, max_priority: int | None = None,
+          kinds: Tuple[str, ...] | None = None) -> Dict[str, Any] | None:
+    """
+    Берём самую важную и старую свободную задачу: новую или с протухшей арендой.
+    max_priority — брать только задачи не ниже этого приоритета
+    (резервные воркеры под кандидатские задачи).
+    kinds — брать только задачи этих типов.
+    BEGIN IMMEDIATE сразу берёт блокировку на запись — два воркера
+    не смогут забрать одну и ту же задачу.
+    """
+    if max_priority is None:
+        max_priority = 1 << 30
+    kinds_clause = f"AND kind IN ({','.join('?' * len(kinds))})" if kinds else ""
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            f"""
+            SELECT * FROM jobs
+            WHERE (status = ? OR (status = ? AND lease_until < ?)) AND priority <= ?
+                {kinds_clause}
+            ORDER BY priority, id
+            LIMIT 1
+            """,
+            (STATUS_QUEUED, STATUS_RUNNING, now, max_priority, *(kinds or ())),
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+
+        if row["attempts"] >= MAX_ATTEMPTS:
+            # воркеры уже несколько раз умирали на этой задаче — больше не пробуем
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (STATUS_FAILED, "Превышено число попыток", now, row["id"]),
+            )
+            conn.execute("COMMIT")
+            return claim(worker, max_priority, kinds)
+
+        conn.execute(
+            """
+            UPDATE jobs
+            SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1,
+                started_at = ?
+            WHERE id = ?
+            """,
+            (STATUS_RUNNING, worker, now + LEASE_SECONDS, now, row["id"]),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    return get_job(row["id"])
+
+
+def extend_lease(job_id: int, worker: str) -> None:
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = ?",
+            (time.time() + LEASE_SECONDS, job_id, worker, STATUS_RUNNING),
+        )
+    finally:
+        conn.close()
+
+
+def finish(job_id: int, result: Any) -> None:
+    conn = _connect()
+    try:
+        # отменённая задача так и остаётся отменённой, даже если успела доработать
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ? AND status != ?",
+            (
+                STATUS_DONE,
+                json.dumps(result, ensure_ascii=False),
+                time.time(),
+                job_id,
+                STATUS_CANCELLED,
+            ),
+        )
+    finally:
+        conn.close()
+
+
+def fail(job_id: int, error: str, status_code: int = 500) -> None:
+    """status_code кладём в result — API-воркер вернёт клиенту именно его."""
+    conn = _connect()
+    try:
+        conn.execute(
+            """
+            UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?
+            WHERE id = ? AND status != ?
+            """,
+            (
+                STATUS_FAILED,
+                json.dumps({"status_code": status_code}),
+                error,
+                time.time(),
+                job_id,
+                STATUS_CANCELLED,
+            ),
+        )
+    finally:
+        conn.close()
+
+
+def cancel(job_id: int) -> bool:
+    """Отменяем задачу, если она ещё не завершилась. True — отменили."""
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)",
+            (STATUS_CANCELLED, time.time(), job_id, STATUS_QUEUED, STATUS_RUNNING),
+        )
+        return cur.rowcount > 0
+    finally:
+        conn.close()
+
+
+def set_priority(job_id: int, priority: int) -> None:
+    """Поднять (или опустить) приоритет задачи, пока её не взяли."""
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE jobs SET priority = ? WHERE id = ? AND status = ?",
+            (priority, job_id, STATUS_QUEUED),
+        )
+    finally:
+        conn.close()
+
+
+def get_status(job_id: int) -> str | None:
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return row["status"] if row else None
+
+
+def get_job(job_id: int) -> Dict[str, Any] | None:
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row) if row else None
+
+
+def get_job_by_public_id(public_id: str) -> Dict[str, Any] | None:
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE public_id = ?", (public_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row) if row else None
+
+
+def wait_for(job_id: int, timeout: float, poll_interval: float = 0.5) -> Dict[str, Any] | None:
+    """
+    Ждём, пока задача завершится (done/failed/cancelled) или выйдет timeout; возвращаем её.
+    None — задачи уже нет (удалена после JOB_RESULT_TTL_SECONDS).
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        job = get_job(job_id)
+        if job is None or job["status"] in FINAL_STATUSES or time.monotonic() >= deadline:
+            return job
+        time.sleep(poll_interval)
+
+
+def purge(before: float) -> int:
+    """Удаляем завершённые задачи, закончившиеся раньше before."""
+    conn = _connect()
+    try:
+        return conn.execute(
+            f"""
+            DELETE FROM jobs
+            WHERE status IN ({','.join('?' * len(FINAL_STATUSES))}) AND finished_at < ?
+            """,
+            (*FINAL_STATUSES, before),
+        ).rowcount
+    finally:
+        conn.close()
+
+
+def queue_depth() -> Dict[str, int]:
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+    finally:
+        conn.close()
+    return {r["status"]: r["n"] for r in rows}
@@ -0,0 +1,343 @@
+# llm.py
+import json
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Iterable
+
+from openai import OpenAI
+
+from llm_budget import LLM_BUDGETS, estimate_tokens
+from prompts import PromptTemplate
+from scheduler import LLM_GATE, current_workload
+from tracing import get_logger, set_attribute, span
+
+log = get_logger("llm")
+
+# --------------------------------
+# НАСТРОЙКИ LLM
+# --------------------------------
+
+from tokenn import API_KEY
+
+# для нагрузочных тестов — локальный mock_llm.py: LLM_BASE_URL=http://127.0.0.1:9200/v1
+BASE_URL = os.environ.get("LLM_BASE_URL", "https://llm.t1v.scibox.tech/v1")
+
+client = OpenAI(
+    base_url=BASE_URL,
+    api_key=API_KEY,
+)
+
+
+# --------------------------------
+# ИНКРЕМЕНТАЛЬНЫЕ ВАЛИДАТОРЫ ПОТОКА
+# --------------------------------
+
+class InvalidOutput(ValueError):
+    """Ответ модели заведомо не подходит под ожидаемый формат — генерацию обрываем."""
+
+
+# пустой блок размышлений, который qwen3 иногда отдаёт даже с /no_think
+_THINK_OPEN = "<think>"
+_THINK_CLOSE = "</think>"
+
+
+class StreamValidator(ABC):
+    """
+    feed() получает весь накопленный текст после каждого куска потока.
+    Бросает InvalidOutput, как только ответ точно не сможет пройти проверку.
+    done — ответ уже полный, дальше поток можно не читать.
+
+    Ответ растёт на куски по несколько символов, поэтому между вызовами
+    валидатор помнит, докуда уже дочитал, и смотрит только новый хвост:
+    перечитывать весь текст на каждом куске — квадрат от длины ответа.
+    """
+
+    done = False
+    _think_scan = 0
+
+    def reset(self) -> None:
+        """Сбросить состояние перед новой попыткой."""
+        self.done = False
+        # докуда уже искали закрывающий </think>
+        self._think_scan = 0
+
+    @abstractmethod
+    def feed(self, text: str) -> None:
+        """Проверить text (весь ответ на сейчас); явный брак — InvalidOutput."""
+
+    def result(self, text: str) -> str:
+        """Итоговый текст ответа (можно обрезать хвост после полезной части)."""
+        return text.strip()
+
+    def _content_start(self, text: str) -> int | None:
+        """
+        Позиция первого значимого символа после <think>...</think>
+        или None, если начало ответа ещё не пришло.
+        """
+        head = _skip_spaces(text, 0)
+        if text.startswith(_THINK_OPEN, head):
+            scan_from = max(self._think_scan, head + len(_THINK_OPEN))
+            close = text.find(_THINK_CLOSE, scan_from)
+            if close == -1:
+                # закрывающий тег может прийти разрезанным — хвост перечитаем
+                self._think_scan = max(scan_from, len(text) - len(_THINK_CLOSE) + 1)
+                return None
+            head = _skip_spaces(text, close + len(_THINK_CLOSE))
+        elif _THINK_OPEN.startswith(text[head:]):
+            return None  # "<thi" — тег ещё не пришёл целиком
+        return head if head < len(text) else None
+
+
+def _skip_spaces(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos].isspace():
+        pos += 1
+    return pos
+
+
+class JsonObjectValidator(StreamValidator):
+    """
+    Ждём один JSON-объект. Обрываем, если:
+      - первый значимый символ не "{" (допускаем <think></think> и ```json в начале);
+      - объект закрылся, но в нём нет обязательных ключей или int-ключ не целое число.
+    """
+
+    def __init__(self, required_keys: Iterable[str] = (), int_keys: Iterable[str] = ()):
+        self.required_keys = tuple(required_keys)
+        self.int_keys = tuple(int_keys)
+        self.reset()
+
+    def reset(self) -> None:
+        super().reset()
+        self._end = None
+        # состояние сканера объекта: где "{", докуда дочитали, глубина, строка
+        self._start = None
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def _body_start(self, text: str) -> int | None:
+        """Позиция "{" или None, если начало ещё не пришло целиком."""
+        offset = self._content_start(text)
+        if offset is None:
+            return None
+
+        if text.startswith("```", offset):
+            newline = text.find("\n", offset)
+            if newline == -1:
+                return None
+            offset = _skip_spaces(text, newline + 1)
+            if offset == len(text):
+                return None
+        elif "```".startswith(text[offset:]):
+            return None  # "``" — ограждение ещё не пришло целиком
+
+        if text[offset] != "{":
+            raise InvalidOutput(
+                f"Ожидали JSON-объект, а модель начала с {text[offset : offset + 40]!r}"
+            )
+        return offset
+
+    def feed(self, text: str) -> None:
+        if self.done:
+            return
+        if self._start is None:
+            self._start = self._body_start(text)
+            if self._start is None:
+                return
+            self._pos = self._start
+
+        depth, in_string, escaped = self._depth, self._in_string, self._escaped
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    self._check(text[self._start : i + 1])
+                    self._end = (self._start, i + 1)
+                    self.done = True
+                    return
+        self._pos = len(text)
+        self._depth, self._in_string, self._escaped = depth, in_string, escaped
+
+    def _check(self, obj_text: str) -> None:
+        try:
+            data = json.loads(obj_text)
+        except json.JSONDecodeError as e:
+            raise InvalidOutput(f"Битый JSON: {e}")
+        missing = [k for k in self.required_keys if k not in data]
+        if missing:
+            raise InvalidOutput(f"В JSON нет обязательных ключей: {missing}")
+        for k in self.int_keys:
+            try:
+                int(data[k])
+            except (KeyError, TypeError, ValueError):
+                raise InvalidOutput(f"Поле {k!r} не целое число: {data.get(k)!r}")
+
+    def result(self, text: str) -> str:
+        if self._end is None:
+            return text.strip()
+        start, end = self._end
+        return text[start:end]
+
+
+class PythonCodeValidator(StreamValidator):
+    """
+    Ждём голый Python-код. Обрываем, если первая значимая строка — прозой
+    ("Вот решение:", "Конечно! ..."): кириллица вне комментария и строки.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        super().reset()
+        # первая строка уже проверена — дальше поток не смотрим
+        self._checked = False
+
+    def feed(self, text: str) -> None:
+        if self._checked:
+            return
+        start = self._content_start(text)
+        if start is None:
+            return
+        # первая строка нужна целиком; ```python пропускаем
+        if text.startswith("```", start):
+            newline = text.find("\n", start)
+            if newline == -1:
+                return
+            start = newline + 1
+        end = text.find("\n", start)
+        if end == -1:
+            return
+
+        self._checked = True
+        first = text[start:end].strip()
+        if not first or first.startswith("#") or first[0] in "\"'":
+            return
+        if re.search(r"[а-яё]", first, re.IGNORECASE):
+            raise InvalidOutput(f"Вместо кода модель пишет текст: {first[:60]!r}")
+
+
+# --------------------------------
+# ЗАПРОСЫ
+# --------------------------------
+
+def _prompt_tokens(messages: list) -> int:
+    return estimate_tokens("".join(m["content"] for m in messages))
+
+
+def _stream_with_validator(template: PromptTemplate, model: str, temperature: float,
+                           validator: StreamValidator, values: dict) -> str:
+    messages = template.messages(**values)
+    LLM_BUDGETS.before_call()
+    waited = time.perf_counter()
+    with LLM_GATE.slot():
+        set_attribute("gate_wait_ms", round((time.perf_counter() - waited) * 1000, 1))
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            prompt_cache_key=template.cache_key,
+            stream=True,
+        )
+
+        text = ""
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                text += delta
+                validator.feed(text)
+                if validator.done:
+                    break
+        finally:
+            # и при ошибке, и при досрочном выходе рвём соединение — сервер
+            # перестаёт генерировать ненужные токены
+            stream.close()
+            set_attribute("response_chars", len(text))
+            # в потоке нет usage — оценка по символам, оборванный ответ тоже в счёт
+            LLM_BUDGETS.charge(_prompt_tokens(messages), estimate_tokens(text))
+
+    return validator.result(text)
+
+
+def complete(template: PromptTemplate, model: str, temperature: float,
+             validator: StreamValidator | None = None, retries: int = 2, **values) -> str:
+    """
+    Один chat-запрос по шаблону. Возвращаем текст ответа без пробелов по краям.
+    prompt_cache_key помогает серверу маршрутизировать запросы с общим префиксом
+    на один и тот же кэш.
+
+    С validator ответ читаем потоком и обрываем, как только он заведомо
+    не подходит; тогда сразу делаем новую попытку (до retries раз),
+    а после последней пробрасываем InvalidOutput.
+
+    Одновременных запросов не больше, чем слотов LLM_GATE; кандидатские
+    (interactive) запросы получают слот раньше генерации для HR.
+    Расход списывается с бюджета компании (см. llm_budget.charged_to).
+    """
+    attributes = {
+        "template": template.name,
+        "template_version": template.version,
+        "model": model,
+        "temperature": temperature,
+        "workload": current_workload(),
+        "streamed": validator is not None,
+    }
+
+    if validator is None:
+        with span("llm.call", attempt=1, **attributes) as s:
+            messages = template.messages(**values)
+            LLM_BUDGETS.before_call()
+            waited = time.perf_counter()
+            with LLM_GATE.slot():
+                s.set("gate_wait_ms", round((time.perf_counter() - waited) * 1000, 1))
+                resp = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    prompt_cache_key=template.cache_key,
+                )
+            content = resp.choices[0].message.content.strip()
+            if resp.usage is not None:
+                LLM_BUDGETS.charge(resp.usage.prompt_tokens, resp.usage.completion_tokens)
+            else:
+                LLM_BUDGETS.charge(_prompt_tokens(messages), estimate_tokens(content))
+            s.set("response_chars", len(content))
+            s.set("outcome", "ok")
+        return content
+
+    for attempt in range(retries + 1):
+        validator.reset()
+        with span("llm.call", attempt=attempt + 1, **attributes) as s:
+            try:
+                content = _stream_with_validator(template, model, temperature, validator, values)
+            except InvalidOutput as e:
+                s.set("outcome", "invalid_output")
+                s.set("abort_reason", str(e))
+                log.warning(
+                    "Ответ модели отброшен на лету",
+                    template=template.name, attempt=attempt + 1, reason=str(e),
+                )
+                if attempt == retries:
+                    raise
+                continue
+            s.set("outcome", "ok")
+        return content
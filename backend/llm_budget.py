@@ -0,0 +1,412 @@
+# llm_budget.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from interview_store import connect
+from scheduler import INTERACTIVE, SPECULATIVE, check_cancelled, current_workload
+from tracing import get_logger, set_attribute
+
+log = get_logger("llm_budget")
+
+# --------------------------------
+# БЮДЖЕТ LLM ПО КОМПАНИЯМ
+# --------------------------------
+#
+# Ключ LLM у всех HR один, и кампания одной компании может выбрать всю
+# пропускную способность модели. Поэтому у каждой компании (hr_users.company)
+# два ведра: токены в час и запросы в минуту. Ведро в памяти процесса,
+# раз в FLUSH_SECONDS расход сводится в SQLite — так процессы API и worker.py
+# видят общий остаток (с точностью до интервала сброса).
+#
+# Что делаем, когда бюджет кончился:
+#   - новая генерация интервью: собираем задачи из банка шаблонов без LLM
+#     (см. interview_pipeline), а если банк вакансию не покрывает — ждём
+#     пополнения до MAX_WAIT_SECONDS, дальше 429;
+#   - уже идущая генерация доделывается в долг, но не глубже OVERDRAFT_SHARE
+#     ёмкости — бесконечные повторы генерации на этом обрываются;
+#   - черновики (speculative) не ждут: без бюджета они не нужны;
+#   - проверка ответов кандидата (interactive) не ограничивается никогда,
+#     но тоже списывается с компании.
+
+BUDGET_DB_PATH = Path(os.environ.get("LLM_BUDGET_PATH") or Path(__file__).with_name("llm_budget.db"))
+
+USE_LLM_BUDGETS = os.environ.get("LLM_BUDGETS", "1") != "0"
+# лимиты по умолчанию; свои для компании — PUT /api/admin/llm-budgets/{company}; 0 — без лимита
+DEFAULT_TOKENS_PER_HOUR = int(os.environ.get("LLM_COMPANY_TOKENS_PER_HOUR", "1000000"))
+DEFAULT_REQUESTS_PER_MINUTE = int(os.environ.get("LLM_COMPANY_REQUESTS_PER_MINUTE", "120"))
+MAX_WAIT_SECONDS = float(os.environ.get("LLM_BUDGET_MAX_WAIT_SECONDS", "60"))
+# ёмкость ведра токенов — часовой лимит; в долг — не больше этой доли ёмкости
+OVERDRAFT_SHARE = 0.5
+
+FLUSH_SECONDS = 5
+# потоковые ответы приходят без usage — считаем токены по символам (кириллица ~3 символа)
+CHARS_PER_TOKEN = 3
+# запросы без компании (HR не указал, старый фронт) — общее ведро
+UNASSIGNED = "unassigned"
+
+_company: ContextVar[str | None] = ContextVar("llm_company", default=None)
+
+
+class BudgetExceeded(BaseException):
+    """
+    Бюджет компании кончился, а ждать дольше нельзя.
+    BaseException, как scheduler.Cancelled: генерация ловит Exception и пробует
+    заново — а повтор здесь означал бы ещё запросы к LLM сверх бюджета.
+    """
+
+    def __init__(self, company: str, retry_after: float):
+        super().__init__(f"Исчерпан бюджет LLM компании {company!r}")
+        self.company = company
+        self.retry_after = retry_after
+
+
+def company_key(company: str | None) -> str:
+    company = (company or "").strip().casefold()
+    return company or UNASSIGNED
+
+
+@contextmanager
+def charged_to(company: str | None) -> Iterator[None]:
+    """Все запросы к LLM внутри блока списываются с company."""
+    token = _company.set(company_key(company))
+    try:
+        yield
+    finally:
+        _company.reset(token)
+
+
+def current_company() -> str:
+    return _company.get() or UNASSIGNED
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class _Bucket:
+    __slots__ = ("tokens", "requests", "updated_at")
+
+    def __init__(self, tokens: float, requests: float, updated_at: float):
+        self.tokens = tokens
+        self.requests = requests
+        self.updated_at = updated_at
+
+
+def _usage_counter() -> Dict[str, int]:
+    return {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "degraded": 0, "rejected": 0}
+
+
+class CompanyBudgets:
+    def __init__(self, path: Path = BUDGET_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, _Bucket] = {}
+        self._limits: Dict[str, tuple[int, int]] = {}
+        # расход с прошлого сброса: company -> счётчики
+        self._pending: Dict[str, Dict[str, int]] = {}
+        self._flusher_pid: int | None = None
+
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS company_limits (
+                company TEXT PRIMARY KEY,
+                tokens_per_hour INTEGER NOT NULL,
+                requests_per_minute INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS company_buckets (
+                company TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                requests REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS company_usage (
+                company TEXT NOT NULL,
+                day TEXT NOT NULL,
+                requests INTEGER NOT NULL DEFAULT 0,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                degraded INTEGER NOT NULL DEFAULT 0,
+                rejected INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (company, day)
+            )
+            """
+        )
+        self._load_limits()
+
+    def _conn(self):
+        cached = getattr(self._local, "conn", None)
+        if cached is not None and cached[0] == os.getpid():
+            return cached[1]
+        conn = connect(self.path)
+        self._local.conn = (os.getpid(), conn)
+        return conn
+
+    # --- лимиты ---
+
+    def _load_limits(self) -> None:
+        rows = self._conn().execute("SELECT * FROM company_limits").fetchall()
+        with self._lock:
+            self._limits = {
+                r["company"]: (r["tokens_per_hour"], r["requests_per_minute"]) for r in rows
+            }
+
+    def limits(self, company: str) -> tuple[int, int]:
+        """(токенов в час, запросов в минуту) компании; 0 — без лимита."""
+        return self._limits.get(company, (DEFAULT_TOKENS_PER_HOUR, DEFAULT_REQUESTS_PER_MINUTE))
+
+    def set_limits(self, company: str, tokens_per_hour: int, requests_per_minute: int) -> None:
+        company = company_key(company)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO company_limits VALUES (?, ?, ?)",
+            (company, tokens_per_hour, requests_per_minute),
+        )
+        with self._lock:
+            self._limits[company] = (tokens_per_hour, requests_per_minute)
+
+    # --- вёдра ---
+
+    def _refill(self, company: str, bucket: _Bucket, now: float) -> None:
+        tokens_per_hour, requests_per_minute = self.limits(company)
+        elapsed = max(0.0, now - bucket.updated_at)
+        if tokens_per_hour:
+            bucket.tokens = min(float(tokens_per_hour), bucket.tokens + elapsed * tokens_per_hour / 3600)
+        if requests_per_minute:
+            bucket.requests = min(
+                float(requests_per_minute), bucket.requests + elapsed * requests_per_minute / 60
+            )
+        bucket.updated_at = now
+
+    def _bucket(self, company: str, now: float) -> _Bucket:
+        """Вызывать под self._lock."""
+        bucket = self._buckets.get(company)
+        if bucket is None:
+            row = self._conn().execute(
+                "SELECT * FROM company_buckets WHERE company = ?", (company,)
+            ).fetchone()
+            if row is not None:
+                bucket = _Bucket(row["tokens"], row["requests"], row["updated_at"])
+            else:
+                tokens_per_hour, requests_per_minute = self.limits(company)
+                bucket = _Bucket(float(tokens_per_hour), float(requests_per_minute), now)
+            self._buckets[company] = bucket
+        self._refill(company, bucket, now)
+        return bucket
+
+    def _count(self, company: str, **deltas: int) -> None:
+        """Вызывать под self._lock."""
+        self._ensure_flusher()
+        pending = self._pending.setdefault(company, _usage_counter())
+        for key, value in deltas.items():
+            pending[key] += value
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher_pid != os.getpid():
+            # после fork поток сброса надо запускать заново
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def tokens_wait(self, company: str) -> float:
+        """Сколько секунд до того, как у компании снова появятся токены; 0 — есть уже сейчас."""
+        tokens_per_hour, _ = self.limits(company)
+        if not USE_LLM_BUDGETS or not tokens_per_hour:
+            return 0.0
+        with self._lock:
+            bucket = self._bucket(company, time.time())
+            if bucket.tokens > 0:
+                return 0.0
+            return (1 - bucket.tokens) * 3600 / tokens_per_hour
+
+    def wait_for_tokens(self, company: str) -> None:
+        """Новая генерация: ждём пополнения (не дольше MAX_WAIT_SECONDS), иначе BudgetExceeded."""
+        wait = self.tokens_wait(company)
+        if wait <= 0:
+            return
+        if wait > MAX_WAIT_SECONDS or current_workload() == SPECULATIVE:
+            self.reject(company, wait)
+        log.info("Бюджет LLM исчерпан, ждём пополнения", company=company, seconds=round(wait, 1))
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            check_cancelled()
+            time.sleep(min(1.0, deadline - time.monotonic()))
+
+    def before_call(self) -> None:
+        """
+        Перед каждым запросом к LLM: лимит запросов в минуту (ждём) и долг по
+        токенам (обрываем). Кандидатские запросы не ограничиваем.
+        """
+        if not USE_LLM_BUDGETS:
+            return
+        company = current_company()
+        tokens_per_hour, requests_per_minute = self.limits(company)
+        interactive = current_workload() == INTERACTIVE
+        while True:
+            with self._lock:
+                bucket = self._bucket(company, time.time())
+                overdraft = -OVERDRAFT_SHARE * tokens_per_hour
+                if tokens_per_hour and bucket.tokens < overdraft and not interactive:
+                    wait = (overdraft - bucket.tokens) * 3600 / tokens_per_hour
+                elif requests_per_minute and bucket.requests < 1 and not interactive:
+                    wait = (1 - bucket.requests) * 60 / requests_per_minute
+                else:
+                    bucket.requests -= 1
+                    self._count(company, requests=1)
+                    return
+            if wait > MAX_WAIT_SECONDS or current_workload() == SPECULATIVE:
+                self.reject(company, wait)
+            set_attribute("budget_wait_ms", round(wait * 1000))
+            check_cancelled()
+            time.sleep(min(1.0, wait))
+
+    def charge(self, prompt_tokens: int, completion_tokens: int) -> None:
+        if not USE_LLM_BUDGETS:
+            return
+        company = current_company()
+        with self._lock:
+            bucket = self._bucket(company, time.time())
+            bucket.tokens -= prompt_tokens + completion_tokens
+            self._count(company, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def note_degraded(self, company: str) -> None:
+        with self._lock:
+            self._count(company, degraded=1)
+
+    def reject(self, company: str, retry_after: float) -> None:
+        with self._lock:
+            self._count(company, rejected=1)
+        log.warning("Бюджет LLM исчерпан", company=company, retry_after=round(retry_after))
+        raise BudgetExceeded(company, retry_after)
+
+    # --- сброс в SQLite ---
+
+    def flush(self) -> None:
+        """
+        Расход процесса — в общую базу; остатки вёдер — из неё обратно.
+        Пополнение считаем по времени из базы, расход вычитаем — итог не зависит
+        от того, сколько процессов и как часто сбрасывают.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            companies = set(self._buckets) | set(pending)
+
+        now = time.time()
+        day = time.strftime("%Y-%m-%d", time.gmtime(now))
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for company in companies:
+                used = pending.get(company, _usage_counter())
+                row = conn.execute(
+                    "SELECT * FROM company_buckets WHERE company = ?", (company,)
+                ).fetchone()
+                tokens_per_hour, requests_per_minute = self.limits(company)
+                bucket = (
+                    _Bucket(row["tokens"], row["requests"], row["updated_at"])
+                    if row is not None
+                    else _Bucket(float(tokens_per_hour), float(requests_per_minute), now)
+                )
+                self._refill(company, bucket, now)
+                bucket.tokens -= used["prompt_tokens"] + used["completion_tokens"]
+                bucket.requests -= used["requests"]
+                conn.execute(
+                    "INSERT OR REPLACE INTO company_buckets VALUES (?, ?, ?, ?)",
+                    (company, bucket.tokens, bucket.requests, now),
+                )
+                if any(used.values()):
+                    conn.execute(
+                        """
+                        INSERT INTO company_usage VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(company, day) DO UPDATE SET
+                            requests = requests + excluded.requests,
+                            prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                            completion_tokens = completion_tokens + excluded.completion_tokens,
+                            degraded = degraded + excluded.degraded,
+                            rejected = rejected + excluded.rejected
+                        """,
+                        (company, day, used["requests"], used["prompt_tokens"],
+                         used["completion_tokens"], used["degraded"], used["rejected"]),
+                    )
+                with self._lock:
+                    # пока сбрасывали, процесс мог потратить ещё — это уже в новом _pending
+                    fresh = self._pending.get(company, _usage_counter())
+                    self._buckets[company] = _Bucket(
+                        bucket.tokens - fresh["prompt_tokens"] - fresh["completion_tokens"],
+                        bucket.requests - fresh["requests"],
+                        now,
+                    )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            with self._lock:
+                for company, used in pending.items():
+                    self._count(company, **used)
+            raise
+        self._load_limits()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(FLUSH_SECONDS)
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Не удалось сохранить расход LLM, попробуем в следующий раз")
+
+    # --- отчёт ---
+
+    def report(self, days: int = 30) -> List[Dict[str, Any]]:
+        self.flush()
+        since = time.strftime("%Y-%m-%d", time.gmtime(time.time() - (days - 1) * 86400))
+        conn = self._conn()
+        usage = conn.execute(
+            "SELECT * FROM company_usage WHERE day >= ? ORDER BY company, day", (since,)
+        ).fetchall()
+        companies = {r["company"] for r in usage} | set(self._limits)
+        companies |= {r["company"] for r in conn.execute("SELECT company FROM company_buckets")}
+
+        report = []
+        now = time.time()
+        for company in sorted(companies):
+            tokens_per_hour, requests_per_minute = self.limits(company)
+            with self._lock:
+                bucket = self._bucket(company, now)
+                tokens, requests = bucket.tokens, bucket.requests
+            daily = [
+                {k: r[k] for k in ("day", "requests", "prompt_tokens", "completion_tokens",
+                                   "degraded", "rejected")}
+                for r in usage
+                if r["company"] == company
+            ]
+            totals = {
+                k: sum(d[k] for d in daily)
+                for k in ("requests", "prompt_tokens", "completion_tokens", "degraded", "rejected")
+            }
+            report.append(
+                {
+                    "company": company,
+                    "limits": {
+                        "tokens_per_hour": tokens_per_hour,
+                        "requests_per_minute": requests_per_minute,
+                    },
+                    "available": {"tokens": round(tokens), "requests": round(requests, 1)},
+                    "totals": {**totals, "tokens": totals["prompt_tokens"] + totals["completion_tokens"]},
+                    "daily": daily,
+                }
+            )
+        return report
+
+
+LLM_BUDGETS = CompanyBudgets()
@@ -0,0 +1,543 @@
+# loadtest.py
+"""
+Нагрузочный тест: сценарии HR и кандидатов, как их проигрывает фронт.
+
+HR (hrAuthApi.js, HrWorkshopPage.jsx):
+    регистрация -> вход -> черновик вакансии -> "Сформировать" (generate-tasks);
+кандидат (interviewApi.js, useAntiCheat.js):
+    интервью -> автосохранение -> печатает ответы (дельты автосохранения),
+    пачки античит-событий, "Запустить" на примерах -> отправка -> отчёт HR.
+
+API поднимаем с локальным LLM (mock_llm.py) и настоящей песочницей:
+    python mock_llm.py --port 9200
+    LLM_BASE_URL=http://127.0.0.1:9200/v1 uvicorn backend:app --port 8000
+    python loadtest.py --api http://127.0.0.1:8000 --interviews 20 --profile ramp
+
+Сначала HR генерируют пул интервью (--interviews), затем по ступеням профиля
+работают виртуальные кандидаты: "60:10,60:20" — 60 с по 10 кандидатов, потом 60 с по 20.
+На каждой ступени — пропускная способность, p50/p95/p99 по эндпоинтам и очереди
+процесса API (/api/admin/queues). Точка насыщения — ступень, где рост нагрузки
+перестал давать рост пропускной способности, выросли ошибки или задержка.
+"""
+import argparse
+import json
+import math
+import queue
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+# готовые профили; можно передать и свой: "30:5,60:20,60:50"
+PROFILES = {
+    "smoke": "20:2",
+    "ramp": "60:5,60:10,60:20,60:40,60:80",
+    "peak": "30:5,120:60,60:5",
+    "soak": "1800:20",
+}
+
+# ступень насыщена, если пропускная способность выросла меньше чем на эту долю
+# от роста числа кандидатов
+SATURATION_GAIN = 0.5
+# ...или ошибок больше этой доли
+SATURATION_ERROR_RATE = 0.01
+# колено задержки эндпоинта: p95 вырос во столько раз от первой ступени
+LATENCY_KNEE_FACTOR = 2.0
+# меньше запросов на ступени — перцентили эндпоинта не считаем показательными
+MIN_SAMPLES = 5
+
+JOB_POLL_SECONDS = 1.0
+QUEUE_SAMPLE_SECONDS = 2.0
+
+VACANCIES = [
+    "Python-разработчик в команду аналитики заказов: FastAPI, Postgres, очереди задач.",
+    "Backend-разработчик платёжного сервиса: Python, Kafka, высокая нагрузка.",
+    "Инженер данных в логистику: Python, Airflow, ClickHouse, расчёт маршрутов посылок.",
+    "Python-разработчик сервиса бронирований: asyncio, Redis, интеграции с партнёрами.",
+]
+WRONG_SOLUTION = "def solve():\n    n = int(input().strip())\n    print(0)\n"
+THEORY_ANSWER = (
+    "Сначала измерил бы, где узкое место, затем выбрал бы решение с учётом "
+    "согласованности данных и стоимости поддержки, и добавил бы метрики."
+)
+CHEAT_EVENTS = ["window_blur", "tab_hidden_or_minimized", "copy_attempt", "paste_attempt"]
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank: наименьшее значение, не меньше которого p% выборки
+    k = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+
+# --------------------------------
+# МЕТРИКИ
+# --------------------------------
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage = "setup"
+        # (ступень, эндпоинт) -> [мс], {статус: сколько}
+        self._latencies: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+        self._statuses: Dict[Tuple[str, str], Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        # ступень -> максимум по очередям процесса API
+        self._queues: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, stage: str, endpoint: str, status: int, elapsed_ms: float) -> None:
+        with self._lock:
+            self._latencies[(stage, endpoint)].append(elapsed_ms)
+            self._statuses[(stage, endpoint)][status] += 1
+
+    def record_queues(self, stage: str, sample: Dict[str, int]) -> None:
+        with self._lock:
+            for name, value in sample.items():
+                self._queues[stage][name] = max(self._queues[stage][name], value)
+
+    def endpoint_stats(self, stage: str, seconds: float) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            keys = [k for k in self._latencies if k[0] == stage]
+            stats = {}
+            for key in sorted(keys, key=lambda k: k[1]):
+                values = sorted(self._latencies[key])
+                statuses = dict(self._statuses[key])
+                # 409 автосохранения и 429 лимитов — штатные ответы, не сбои
+                errors = sum(n for code, n in statuses.items() if code == 0 or code >= 500)
+                stats[key[1]] = {
+                    "count": len(values),
+                    "rps": round(len(values) / seconds, 2) if seconds else 0.0,
+                    "p50_ms": round(percentile(values, 50), 1),
+                    "p95_ms": round(percentile(values, 95), 1),
+                    "p99_ms": round(percentile(values, 99), 1),
+                    "errors": errors,
+                    "statuses": {str(code): n for code, n in sorted(statuses.items())},
+                }
+            return stats
+
+    def queue_stats(self, stage: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._queues.get(stage, {}))
+
+
+# --------------------------------
+# HTTP-КЛИЕНТ
+# --------------------------------
+
+class Api:
+    def __init__(self, base_url: str, metrics: Metrics, timeout: float, admin_token: str = ""):
+        self.base_url = base_url.rstrip("/")
+        self.metrics = metrics
+        self.timeout = timeout
+        self.admin_token = admin_token
+
+    def call(self, method: str, path: str, endpoint: str, body: Any = None,
+             headers: Dict[str, str] | None = None, record: bool = True) -> Tuple[int, Any]:
+        """(HTTP-статус или 0 при сетевой ошибке, разобранный JSON или None)."""
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(body).encode("utf-8") if body is not None else None,
+            headers={"Content-Type": "application/json", **(headers or {})},
+            method=method,
+        )
+        stage = self.metrics.stage
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status, raw = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        except (urllib.error.URLError, OSError):
+            status, raw = 0, b""
+        if record:
+            self.metrics.record(stage, endpoint, status, (time.perf_counter() - started) * 1000)
+        try:
+            return status, json.loads(raw) if raw else None
+        except ValueError:
+            return status, None
+
+    def wait_job(self, status: int, data: Any, headers: Dict[str, str]) -> Tuple[int, Any]:
+        """
+        202 с job_id (режим очереди) — опрашиваем /api/jobs, как фронт (api/jobsApi.js).
+        headers — сессия HR или X-Interview-Token: чужие задачи API не отдаёт.
+        """
+        while status == 202 and isinstance(data, dict) and data.get("job_id"):
+            time.sleep(JOB_POLL_SECONDS)
+            job_status, job = self.call("GET", f"/api/jobs/{data['job_id']}", "GET /api/jobs/{id}",
+                                        headers=headers)
+            if job_status != 200:
+                return job_status, job
+            if job["status"] == "done":
+                return 200, job["result"]
+            if job["status"] in ("failed", "cancelled"):
+                return 500, job
+        return status, data
+
+
+# --------------------------------
+# СЦЕНАРИИ
+# --------------------------------
+
+def _pause(think_ms: float) -> None:
+    if think_ms > 0:
+        time.sleep(random.expovariate(1000 / think_ms))
+
+
+def hr_session(api: Api, vacancy: str, use_draft: bool, think_ms: float) -> Dict[str, Any] | None:
+    """Регистрация, вход и генерация интервью. Возвращаем интервью (как его видит HR) или None."""
+    email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+    password = "loadtest-password"
+    api.call("POST", "/api/hr/register", "POST /api/hr/register", {
+        "email": email, "password": password, "confirm_password": password,
+        "name": "Нагрузочный тест", "company": "loadtest",
+    })
+    status, login = api.call("POST", "/api/hr/login", "POST /api/hr/login",
+                             {"email": email, "password": password})
+    if status != 200 or not isinstance(login, dict):
+        return None
+    auth = {"Authorization": f"Bearer {login['session_token']}"}
+
+    # компанию бэк берёт из сессии HR
+    request: Dict[str, Any] = {"vacancy": vacancy}
+    if use_draft:
+        # фронт шлёт черновик с debounce, пока HR допечатывает форму
+        request["draft_id"] = uuid.uuid4().hex
+        api.call("POST", "/api/generate-tasks/draft", "POST /api/generate-tasks/draft",
+                 {"draft_id": request["draft_id"], "vacancy": vacancy},
+                 headers=auth)
+        _pause(think_ms)
+
+    status, interview = api.call("POST", "/api/generate-tasks", "POST /api/generate-tasks", request,
+                                 headers=auth)
+    status, interview = api.wait_job(status, interview, auth)
+    if status != 200 or not isinstance(interview, dict) or "token" not in interview:
+        return None
+    # отчёт по интервью потом читаем от имени того же HR
+    interview["hr_headers"] = auth
+    return interview
+
+
+class CandidateSession:
+    def __init__(self, api: Api, interview: Dict[str, Any], args: argparse.Namespace):
+        self.api = api
+        self.interview = interview
+        self.token = interview["token"]
+        self.args = args
+        self.version = 0
+        self.coding: Dict[str, str] = {}
+        self.theory: Dict[str, str] = {}
+
+    def _path(self, suffix: str = "") -> str:
+        return f"/api/interview/{self.token}{suffix}"
+
+    def _load_autosave(self) -> None:
+        status, saved = self.api.call("GET", self._path("/autosave"), "GET /api/interview/{token}/autosave")
+        if status == 200:
+            self.version = saved["version"]
+            self.coding = dict(saved["coding_solutions"])
+            self.theory = dict(saved["theory_solutions"])
+
+    def _type(self, kind: str, level: str, piece: str) -> None:
+        answers = self.coding if kind == "coding" else self.theory
+        current = answers.get(level, "")
+        delta = {"kind": kind, "level": level, "start": len(current), "end": len(current), "text": piece}
+        status, data = self.api.call(
+            "POST", self._path("/autosave"), "POST /api/interview/{token}/autosave",
+            {"base_version": self.version, "deltas": [delta]},
+        )
+        if status == 200:
+            self.version = data["version"]
+            answers[level] = current + piece
+        elif status == 409:
+            # как фронт: перечитываем снимок, дельту шлём заново
+            self._load_autosave()
+
+    def _cheat_batch(self) -> None:
+        events = [
+            {"type": random.choice(CHEAT_EVENTS), "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            for _ in range(random.randint(1, self.args.cheat_batch))
+        ]
+        self.api.call("POST", self._path("/cheat-event"), "POST /api/interview/{token}/cheat-event", events)
+
+    def run(self) -> None:
+        args = self.args
+        status, view = self.api.call("GET", self._path(), "GET /api/interview/{token}")
+        if status != 200:
+            return
+        self._load_autosave()
+
+        coding_tasks = self.interview.get("coding_tasks") or []
+        # что кандидат в итоге напишет: эталон (верно) или заглушку
+        plan = {
+            t["level"]: t.get("reference_solution") if random.random() < args.correct_rate else WRONG_SOLUTION
+            for t in coding_tasks
+        }
+        plan = {level: code or WRONG_SOLUTION for level, code in plan.items()}
+        theory_levels = [t["level"] for t in view.get("theory_tasks") or []]
+
+        for step in range(args.autosaves):
+            _pause(args.think_ms)
+            for level, code in plan.items():
+                size = -(-len(code) // args.autosaves)
+                self._type("coding", level, code[step * size : (step + 1) * size])
+            for level in theory_levels:
+                size = -(-len(THEORY_ANSWER) // args.autosaves)
+                self._type("theory", level, THEORY_ANSWER[step * size : (step + 1) * size])
+            if args.cheat_batch and random.random() < 0.5:
+                self._cheat_batch()
+            if plan and step % max(1, args.autosaves // max(1, args.runs)) == 0:
+                level = random.choice(list(plan))
+                self.api.call("POST", self._path("/run"), "POST /api/interview/{token}/run",
+                              {"level": level, "code": self.coding.get(level) or plan[level]})
+
+        _pause(args.think_ms)
+        status, report = self.api.call(
+            "POST", self._path("/submit"), "POST /api/interview/{token}/submit",
+            {"coding_solutions": plan, "theory_solutions": {lvl: THEORY_ANSWER for lvl in theory_levels}},
+        )
+        self.api.wait_job(status, report, {"X-Interview-Token": self.token})
+        self.api.call("GET", f"/api/hr/interviews/{self.token}/report", "GET /api/hr/interviews/{token}/report",
+                      headers=self.interview.get("hr_headers"))
+
+
+# --------------------------------
+# ПРОГОН
+# --------------------------------
+
+def parse_profile(spec: str) -> List[Tuple[float, int]]:
+    spec = PROFILES.get(spec, spec)
+    stages = []
+    for part in spec.split(","):
+        seconds, users = part.strip().split(":")
+        stages.append((float(seconds), int(users)))
+    return stages
+
+
+def generate_pool(api: Api, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    vacancies = VACANCIES[: max(1, args.vacancies)]
+    pool: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    todo = queue.Queue()
+    for i in range(args.interviews):
+        todo.put(vacancies[i % len(vacancies)])
+
+    def hr_worker():
+        while True:
+            try:
+                vacancy = todo.get_nowait()
+            except queue.Empty:
+                return
+            interview = hr_session(api, vacancy, args.drafts, args.think_ms)
+            if interview is not None:
+                with lock:
+                    pool.append(interview)
+
+    threads = [threading.Thread(target=hr_worker, daemon=True) for _ in range(args.hr_concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return pool
+
+
+def _sample_queues(api: Api, metrics: Metrics, stop: threading.Event) -> None:
+    headers = {"X-Admin-Token": api.admin_token} if api.admin_token else {}
+    while not stop.wait(QUEUE_SAMPLE_SECONDS):
+        status, q = api.call("GET", "/api/admin/queues", "", headers=headers, record=False)
+        if status != 200:
+            # админка закрыта — работаем без очередей
+            return
+        metrics.record_queues(metrics.stage, {
+            "threadpool_waiting": q["threadpool"]["waiting"],
+            "llm_waiting": sum(c["waiting"] for c in q["llm_gate"]["classes"].values()),
+            "sandbox_waiting": sum(c["waiting"] for c in q["sandbox_gate"]["classes"].values()),
+            "jobs_queued": q["jobs"].get("queued", 0),
+        })
+
+
+def run_stages(api: Api, metrics: Metrics, pool: List[Dict[str, Any]],
+               args: argparse.Namespace) -> List[Dict[str, Any]]:
+    # одно интервью — один кандидат за раз: иначе автосохранения конфликтуют,
+    # а лимиты "Запустить" общие на токен
+    free = queue.Queue()
+    for interview in pool:
+        free.put(interview)
+    peak = max(users for _, users in parse_profile(args.profile))
+    if peak > len(pool):
+        print(f"Внимание: интервью {len(pool)}, а кандидатов до {peak} — лишние будут ждать "
+              "свободное интервью, насыщение окажется заниженным", flush=True)
+
+    def candidate(stop: threading.Event):
+        while not stop.is_set():
+            try:
+                interview = free.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                CandidateSession(api, interview, args).run()
+            finally:
+                free.put(interview)
+
+    def hr_background(stop: threading.Event):
+        while not stop.is_set():
+            hr_session(api, random.choice(VACANCIES[: max(1, args.vacancies)]), args.drafts, args.think_ms)
+
+    users: List[threading.Event] = []
+    hr_users: List[threading.Event] = []
+    stages = []
+    for index, (seconds, target) in enumerate(parse_profile(args.profile), start=1):
+        name = f"stage{index}"
+        metrics.stage = name
+        while len(users) < target:
+            stop = threading.Event()
+            threading.Thread(target=candidate, args=(stop,), daemon=True).start()
+            users.append(stop)
+        while len(users) > target:
+            # лишние кандидаты доигрывают текущую сессию и уходят
+            users.pop().set()
+        while len(hr_users) < args.hr_users:
+            stop = threading.Event()
+            threading.Thread(target=hr_background, args=(stop,), daemon=True).start()
+            hr_users.append(stop)
+
+        print(f"[{name}] {seconds:.0f} с, кандидатов: {target}", flush=True)
+        started = time.perf_counter()
+        time.sleep(seconds)
+        stages.append({"stage": name, "users": target, "seconds": time.perf_counter() - started})
+
+    for stop in users + hr_users:
+        stop.set()
+    metrics.stage = "drain"
+    return stages
+
+
+def analyze(metrics: Metrics, stages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    report = []
+    for stage in stages:
+        endpoints = metrics.endpoint_stats(stage["stage"], stage["seconds"])
+        total = sum(e["count"] for e in endpoints.values())
+        errors = sum(e["errors"] for e in endpoints.values())
+        report.append({
+            **stage,
+            "seconds": round(stage["seconds"], 1),
+            "rps": round(total / stage["seconds"], 2) if stage["seconds"] else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "endpoints": endpoints,
+            "queues": metrics.queue_stats(stage["stage"]),
+        })
+
+    # общая точка насыщения
+    saturation = None
+    for prev, cur in zip(report, report[1:]):
+        if cur["error_rate"] > SATURATION_ERROR_RATE:
+            saturation = {"stage": cur["stage"], "users": cur["users"],
+                          "reason": f"ошибок {cur['error_rate']:.1%}"}
+            break
+        if cur["users"] > prev["users"] and prev["rps"] > 0:
+            users_growth = cur["users"] / prev["users"] - 1
+            rps_growth = cur["rps"] / prev["rps"] - 1
+            if rps_growth < SATURATION_GAIN * users_growth:
+                saturation = {
+                    "stage": cur["stage"], "users": cur["users"],
+                    "reason": f"кандидатов +{users_growth:.0%}, пропускная способность {rps_growth:+.0%}",
+                }
+                break
+
+    # колено задержки по каждому эндпоинту
+    knees = {}
+    if report:
+        for endpoint, first in report[0]["endpoints"].items():
+            if first["count"] < MIN_SAMPLES or not first["p95_ms"]:
+                continue
+            for stage in report[1:]:
+                cur = stage["endpoints"].get(endpoint)
+                if cur and cur["count"] >= MIN_SAMPLES and cur["p95_ms"] >= LATENCY_KNEE_FACTOR * first["p95_ms"]:
+                    knees[endpoint] = {"stage": stage["stage"], "users": stage["users"],
+                                       "p95_ms": cur["p95_ms"], "baseline_p95_ms": first["p95_ms"]}
+                    break
+
+    return {"stages": report, "saturation": saturation, "latency_knees": knees}
+
+
+def _print_table(rows: List[Dict[str, Any]], columns: List[str]) -> None:
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for r in rows:
+        print("  ".join(str(r.get(c, "")).ljust(widths[c]) for c in columns))
+
+
+def print_report(setup: Dict[str, Dict[str, Any]], result: Dict[str, Any]) -> None:
+    print("\n== Генерация пула интервью (HR) ==")
+    _print_table([{"endpoint": e, **s} for e, s in setup.items()],
+                 ["endpoint", "count", "p50_ms", "p95_ms", "p99_ms", "errors", "statuses"])
+
+    print("\n== Ступени ==")
+    _print_table(
+        [{**{k: s[k] for k in ("stage", "users", "seconds", "rps", "error_rate")}, **s["queues"]}
+         for s in result["stages"]],
+        ["stage", "users", "seconds", "rps", "error_rate",
+         "threadpool_waiting", "llm_waiting", "sandbox_waiting", "jobs_queued"],
+    )
+    for stage in result["stages"]:
+        print(f"\n-- {stage['stage']} ({stage['users']} кандидатов) --")
+        _print_table([{"endpoint": e, **s} for e, s in stage["endpoints"].items()],
+                     ["endpoint", "count", "rps", "p50_ms", "p95_ms", "p99_ms", "errors", "statuses"])
+
+    print("\n== Насыщение ==")
+    saturation = result["saturation"]
+    if saturation:
+        print(f"{saturation['stage']} ({saturation['users']} кандидатов): {saturation['reason']}")
+    else:
+        print("в пределах профиля не достигнуто")
+    for endpoint, knee in result["latency_knees"].items():
+        print(f"{endpoint}: p95 {knee['baseline_p95_ms']} -> {knee['p95_ms']} мс "
+              f"на {knee['stage']} ({knee['users']} кандидатов)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--api", default="http://127.0.0.1:8000")
+    parser.add_argument("--profile", default="ramp",
+                        help=f"{', '.join(PROFILES)} или свой: 'секунд:кандидатов,...'")
+    parser.add_argument("--interviews", type=int, default=20, help="сколько интервью сгенерировать")
+    parser.add_argument("--vacancies", type=int, default=2,
+                        help="разных вакансий (повторы идут из банка шаблонов)")
+    parser.add_argument("--hr-concurrency", type=int, default=4)
+    parser.add_argument("--hr-users", type=int, default=0,
+                        help="HR, генерирующих интервью параллельно с кандидатами")
+    parser.add_argument("--drafts", action="store_true", help="слать черновик перед генерацией")
+    parser.add_argument("--think-ms", type=float, default=1000.0, help="средняя пауза между действиями")
+    parser.add_argument("--autosaves", type=int, default=6, help="автосохранений за сессию")
+    parser.add_argument("--runs", type=int, default=2, help="'Запустить' за сессию")
+    parser.add_argument("--cheat-batch", type=int, default=5, help="до стольких событий в пачке")
+    parser.add_argument("--correct-rate", type=float, default=0.7, help="доля верных решений")
+    parser.add_argument("--timeout", type=float, default=900.0)
+    parser.add_argument("--admin-token", default="")
+    parser.add_argument("--json", help="сохранить отчёт в файл")
+    args = parser.parse_args()
+
+    metrics = Metrics()
+    api = Api(args.api, metrics, args.timeout, args.admin_token)
+
+    started = time.perf_counter()
+    pool = generate_pool(api, args)
+    setup_seconds = time.perf_counter() - started
+    print(f"Сгенерировано интервью: {len(pool)} из {args.interviews} за {setup_seconds:.0f} с", flush=True)
+    if not pool:
+        raise SystemExit("Ни одного интервью — кандидатам нечего проходить")
+
+    stop_sampler = threading.Event()
+    threading.Thread(target=_sample_queues, args=(api, metrics, stop_sampler), daemon=True).start()
+    stages = run_stages(api, metrics, pool, args)
+    stop_sampler.set()
+
+    setup = metrics.endpoint_stats("setup", setup_seconds)
+    result = analyze(metrics, stages)
+    print_report(setup, result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"setup": setup, **result}, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,432 @@
+# mock_llm.py
+"""
+Локальный OpenAI-совместимый LLM для нагрузочных тестов (loadtest.py).
+
+Отвечает на POST /v1/chat/completions (обычный ответ и поток) по имени шаблона
+из prompt_cache_key: задачи с правильными тестами и решениями, генераторы
+входов, вопросы, оценки — так, что генерация интервью и проверка проходят
+целиком, с настоящей песочницей. Задержку задаём как у живого сервера:
+время до первого токена, токенов в секунду, число одновременных генераций.
+
+Запуск:
+    python mock_llm.py --port 9200 --ttft-ms 300 --tokens-per-second 150
+API и worker.py: LLM_BASE_URL=http://127.0.0.1:9200/v1
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List
+
+from tracing import get_logger
+
+log = get_logger("mock_llm")
+
+# "токен" ответа — столько символов; для задержек и usage этого достаточно
+CHARS_PER_TOKEN = 4
+# столько токенов в одном куске потока
+TOKENS_PER_CHUNK = 4
+
+# ответ прозой вместо JSON/кода — так валидаторы llm.py обрывают поток
+BAD_OUTPUT = "Конечно! Вот что получилось:\nк сожалению, без кода и без JSON.\n"
+
+
+# --------------------------------
+# ЗАДАЧИ
+# --------------------------------
+#
+# Каждое семейство — условие, эталонное решение и функция ответа.
+# По названию семейства в условии solve_task понимает, какое решение вернуть.
+
+class Family:
+    def __init__(self, title: str, story: str, code: str, answer: Callable[[List[int]], int]):
+        self.title = title
+        self.story = story
+        self.code = code
+        self.answer = answer
+
+
+def _kadane(a: List[int]) -> int:
+    best = cur = a[0]
+    for x in a[1:]:
+        cur = max(x, cur + x)
+        best = max(best, cur)
+    return best
+
+
+FAMILIES = [
+    Family(
+        "Суммарная выручка",
+        "Дана выручка по n заказов за день. Найдите суммарную выручку.",
+        "def solve():\n"
+        "    n = int(input().strip())\n"
+        "    arr = list(map(int, input().split()))\n"
+        "    print(sum(arr))\n",
+        sum,
+    ),
+    Family(
+        "Самый крупный заказ",
+        "Даны суммы n заказов. Найдите самую большую сумму среди заказов.",
+        "def solve():\n"
+        "    n = int(input().strip())\n"
+        "    arr = list(map(int, input().split()))\n"
+        "    print(max(arr))\n",
+        max,
+    ),
+    Family(
+        "Прибыльные заказы",
+        "Дана прибыль по n заказов. Сколько заказов принесли положительную прибыль?",
+        "def solve():\n"
+        "    n = int(input().strip())\n"
+        "    arr = list(map(int, input().split()))\n"
+        "    print(sum(1 for x in arr if x > 0))\n",
+        lambda a: sum(1 for x in a if x > 0),
+    ),
+    Family(
+        "Лучший период",
+        "Дана прибыль по n заказов подряд. Найдите максимальную сумму подряд идущих заказов.",
+        "def solve():\n"
+        "    n = int(input().strip())\n"
+        "    arr = list(map(int, input().split()))\n"
+        "    best = cur = arr[0]\n"
+        "    for x in arr[1:]:\n"
+        "        cur = max(x, cur + x)\n"
+        "        best = max(best, cur)\n"
+        "    print(best)\n",
+        _kadane,
+    ),
+    Family(
+        "Разные клиенты",
+        "Даны идентификаторы клиентов n заказов. Сколько среди заказов разных клиентов?",
+        "def solve():\n"
+        "    n = int(input().strip())\n"
+        "    arr = list(map(int, input().split()))\n"
+        "    print(len(set(arr)))\n",
+        lambda a: len(set(a)),
+    ),
+]
+
+INPUT_GENERATOR_CODE = (
+    "import random\n"
+    "\n"
+    "def main():\n"
+    "    n, seed = map(int, input().split())\n"
+    "    random.seed(seed)\n"
+    "    n = min(n, 100000)\n"
+    "    print(n)\n"
+    "    print(' '.join(str(random.randint(-10**9, 10**9)) for _ in range(n)))\n"
+    "\n"
+    "main()\n"
+)
+
+
+def _array_input(a: List[int]) -> str:
+    return f"{len(a)}\n{' '.join(map(str, a))}\n"
+
+
+def _task(rnd: random.Random, level: str) -> Dict[str, Any]:
+    family = rnd.choice(FAMILIES)
+    arrays = [[rnd.randint(-100, 100) for _ in range(rnd.randint(1, 12))] for _ in range(10)]
+    samples = [{"input": _array_input(a), "output": f"{family.answer(a)}\n"} for a in arrays[:2]]
+    example = "\n".join(f"Ввод:\n{s['input']}Вывод:\n{s['output']}" for s in samples)
+    statement = (
+        f"{family.title} (уровень {level})\n\n"
+        f"Описание задачи\n{family.story}\n\n"
+        "Формат ввода\nВ первой строке — целое число n, во второй — n целых чисел через пробел.\n\n"
+        "Формат вывода\nВыведите одно целое число.\n\n"
+        "Ограничения\n1 ≤ n ≤ 10^5, |a_i| ≤ 10^9.\n\n"
+        f"Пример\n{example}"
+    )
+    return {
+        "statement": statement,
+        "samples": samples,
+        "tests": [{"input": _array_input(a), "output": f"{family.answer(a)}\n"} for a in arrays],
+    }
+
+
+def _family_of(text: str) -> Family:
+    for family in FAMILIES:
+        if family.title in text:
+            return family
+    return FAMILIES[0]
+
+
+def _between_dashes(text: str) -> str:
+    """Первый блок между строками '---' из data шаблона (условие, вопрос)."""
+    parts = text.split("\n---\n")
+    return parts[1] if len(parts) > 2 else ""
+
+
+def _count(text: str, label: str, default: int = 1) -> int:
+    m = re.search(label + r":\s*(\d+)", text)
+    return int(m.group(1)) if m else default
+
+
+# --------------------------------
+# ОТВЕТЫ ПО ШАБЛОНАМ
+# --------------------------------
+
+def _qa(rnd: random.Random, level: str) -> Dict[str, str]:
+    topic = rnd.choice(["кэширование", "индексы в базе", "очереди задач", "транзакции", "логирование"])
+    return {
+        "question": f"Объясните, как бы вы использовали {topic} в сервисе этой вакансии "
+                    f"(уровень {level}, вариант {rnd.randint(1, 10**6)}).",
+        "reference_answer": f"{topic.capitalize()} нужно применять там, где это снижает "
+                            "задержку и нагрузку; важно учитывать согласованность, "
+                            "инвалидацию и наблюдаемость. " * 3,
+    }
+
+
+CANDIDATE_ANSWER = (
+    "Я бы начал с измерений, затем выбрал решение с учётом согласованности "
+    "и инвалидации, и добавил бы метрики, чтобы видеть эффект."
+)
+
+
+def _grade(rnd: random.Random) -> Dict[str, Any]:
+    return {
+        "correctness": rnd.randint(70, 95),
+        "optimality": rnd.randint(70, 95),
+        "comment": "Ответ по существу, есть небольшие пробелы.",
+    }
+
+
+def respond(template: str, prompt: str, rnd: random.Random, wrong_solution_rate: float) -> str:
+    level_match = re.search(r"Уровень[^:]*:\s*(\w+)", prompt)
+    level = level_match.group(1) if level_match else "easy"
+
+    if template == "task_from_vacancy":
+        return json.dumps(_task(rnd, level), ensure_ascii=False)
+    if template == "solve_task":
+        code = _family_of(prompt).code
+        if rnd.random() < wrong_solution_rate:
+            code = code.replace("print(", "print(1 + ", 1)
+        return code
+    if template == "input_generator":
+        return INPUT_GENERATOR_CODE
+    if template == "task_template":
+        statement = _between_dashes(prompt)
+        answers = iter(range(1, 100))
+        statement = re.sub(r"(Вывод:\n)-?\d+", lambda m: f"{m.group(1)}[[answer_{next(answers)}]]",
+                           statement)
+        statement = statement.replace("заказов", "[[items]]", 1)
+        slots = [{"name": "items", "kind": "word", "group": "items",
+                  "values": ["заказов", "платежей", "посылок", "бронирований"]}]
+        return json.dumps({"statement": statement, "slots": slots}, ensure_ascii=False)
+    if template == "domain_question":
+        return json.dumps(_qa(rnd, level), ensure_ascii=False)
+    if template == "domain_questions_batch":
+        count = _count(prompt, "Сколько вопросов нужно")
+        return json.dumps({"questions": [_qa(rnd, level) for _ in range(count)]}, ensure_ascii=False)
+    if template == "candidate_answer":
+        return CANDIDATE_ANSWER
+    if template == "candidate_answers_batch":
+        count = _count(prompt, "Вопросов")
+        answers = [{"id": i, "answer": CANDIDATE_ANSWER} for i in range(1, count + 1)]
+        return json.dumps({"answers": answers}, ensure_ascii=False)
+    if template == "grade_answer":
+        return json.dumps(_grade(rnd), ensure_ascii=False)
+    if template == "grade_answers_batch":
+        count = _count(prompt, "Пунктов")
+        grades = [{"id": i, **_grade(rnd)} for i in range(1, count + 1)]
+        return json.dumps({"grades": grades}, ensure_ascii=False)
+    if template == "question_review":
+        count = _count(prompt, "Пунктов")
+        reviews = [{"id": i, "quality": rnd.randint(70, 95), "comment": "ок"}
+                   for i in range(1, count + 1)]
+        return json.dumps({"reviews": reviews}, ensure_ascii=False)
+    return "ok"
+
+
+# --------------------------------
+# СЕРВЕР
+# --------------------------------
+
+class MockSettings:
+    def __init__(self, ttft_ms: float, tokens_per_second: float, max_concurrency: int,
+                 bad_output_rate: float, wrong_solution_rate: float, seed: int | None):
+        self.ttft = ttft_ms / 1000
+        self.tokens_per_second = tokens_per_second
+        # одновременных генераций не больше — остальные ждут, как в очереди vLLM
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.bad_output_rate = bad_output_rate
+        self.wrong_solution_rate = wrong_solution_rate
+        self.rnd = random.Random(seed)
+        self.rnd_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.active = 0
+        self.completion_tokens = 0
+
+    def child_rnd(self) -> random.Random:
+        with self.rnd_lock:
+            return random.Random(self.rnd.random())
+
+
+SETTINGS: MockSettings | None = None
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _chunks(text: str) -> Iterator[str]:
+    step = CHARS_PER_TOKEN * TOKENS_PER_CHUNK
+    for i in range(0, len(text), step):
+        yield text[i : i + step]
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            with SETTINGS.stats_lock:
+                self._reply(200, {
+                    "status": "ok",
+                    "active": SETTINGS.active,
+                    "max_concurrency": SETTINGS.max_concurrency,
+                    "requests": dict(SETTINGS.requests),
+                    "completion_tokens": SETTINGS.completion_tokens,
+                })
+            return
+        self._reply(404, {"detail": "Not found"})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._reply(404, {"detail": "Not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            req = json.loads(self.rfile.read(length))
+            prompt = req["messages"][-1]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            self._reply(400, {"error": {"message": f"Bad request: {e}"}})
+            return
+
+        template = str(req.get("prompt_cache_key") or "").split(":")[0]
+        rnd = SETTINGS.child_rnd()
+        if rnd.random() < SETTINGS.bad_output_rate:
+            text = BAD_OUTPUT
+        else:
+            text = respond(template, prompt, rnd, SETTINGS.wrong_solution_rate)
+
+        with SETTINGS.stats_lock:
+            SETTINGS.requests[template or "unknown"] = SETTINGS.requests.get(template or "unknown", 0) + 1
+
+        with SETTINGS.slots:
+            with SETTINGS.stats_lock:
+                SETTINGS.active += 1
+            try:
+                time.sleep(SETTINGS.ttft)
+                if req.get("stream"):
+                    self._stream(req, text)
+                else:
+                    time.sleep(_tokens(text) / SETTINGS.tokens_per_second)
+                    self._reply(200, self._completion(req, text, prompt))
+            finally:
+                with SETTINGS.stats_lock:
+                    SETTINGS.active -= 1
+
+    def _completion(self, req: dict, text: str, prompt: str) -> Dict[str, Any]:
+        with SETTINGS.stats_lock:
+            SETTINGS.completion_tokens += _tokens(text)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": req.get("model", "mock"),
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": text},
+                 "finish_reason": "stop"}
+            ],
+            "usage": {
+                "prompt_tokens": _tokens(prompt),
+                "completion_tokens": _tokens(text),
+                "total_tokens": _tokens(prompt) + _tokens(text),
+            },
+        }
+
+    def _stream(self, req: dict, text: str) -> None:
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        def event(delta: Dict[str, Any], finish_reason: str | None = None) -> bytes:
+            payload = {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": req.get("model", "mock"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        # длина потока заранее неизвестна — отдаём до закрытия соединения
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        sent = 0
+        try:
+            self.wfile.write(event({"role": "assistant", "content": ""}))
+            for piece in _chunks(text):
+                time.sleep(TOKENS_PER_CHUNK / SETTINGS.tokens_per_second)
+                self.wfile.write(event({"content": piece}))
+                self.wfile.flush()
+                sent += len(piece)
+            self.wfile.write(event({}, "stop"))
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # клиент оборвал поток (валидатор решил, что хватит) — как vLLM, перестаём генерировать
+            pass
+        finally:
+            with SETTINGS.stats_lock:
+                SETTINGS.completion_tokens += sent // CHARS_PER_TOKEN
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--ttft-ms", type=float, default=300.0, help="время до первого токена")
+    parser.add_argument("--tokens-per-second", type=float, default=150.0,
+                        help="скорость генерации одного ответа")
+    parser.add_argument("--max-concurrency", type=int, default=32,
+                        help="одновременных генераций, остальные ждут")
+    parser.add_argument("--bad-output-rate", type=float, default=0.0,
+                        help="доля ответов прозой вместо JSON/кода")
+    parser.add_argument("--wrong-solution-rate", type=float, default=0.1,
+                        help="доля неверных решений задач (повторы и эскалация каскада)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    SETTINGS = MockSettings(
+        args.ttft_ms, args.tokens_per_second, args.max_concurrency,
+        args.bad_output_rate, args.wrong_solution_rate, args.seed,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), MockLLMHandler)
+    server.daemon_threads = True
+    log.info("Mock LLM запущен", host=args.host, port=args.port,
+             ttft_ms=args.ttft_ms, tokens_per_second=args.tokens_per_second,
+             max_concurrency=args.max_concurrency)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("Останавливаем mock LLM")
@@ -0,0 +1,234 @@
+# model_router.py
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, TypeVar
+
+from interview_store import connect
+from tracing import get_logger, span
+
+log = get_logger("model_router")
+
+T = TypeVar("T")
+
+# --------------------------------
+# КАСКАД МОДЕЛЕЙ ПО ЭТАПАМ
+# --------------------------------
+#
+# Каждый этап (генерация условия, решение, оценка ответа, ...) сначала идёт
+# в быструю модель и поднимается к большой, только если:
+#   - ответ не прошёл проверку (битый JSON, не те поля, InvalidOutput) или
+#   - ответ неуверенный (accept(result) вернул False — например, оценка
+#     теоретического ответа рядом с порогом 65).
+#
+#     grade = cascade("theory_grade", TEXT_MODEL, lambda model: grade(..., model=model),
+#                     accept=lambda g: not near_threshold(g))
+#
+# Маршруты:
+#   LLM_FAST_MODEL=<имя>   — быстрая модель для всех этапов из CASCADE_STAGES;
+#   MODEL_ROUTES='{"theory_grade": ["small", "large"], "task_solve": ["large"]}'
+#                          — явный список моделей по этапам, важнее LLM_FAST_MODEL.
+# Без настроек каждый этап ходит в свою модель по умолчанию, как раньше.
+#
+# Счётчики (вызовы, эскалации, время по моделям) пишем в model_routing.db,
+# чтобы статистика была общей для API и процессов worker.py.
+
+MODEL_ROUTING_DB_PATH = Path(__file__).with_name("model_routing.db")
+
+LLM_FAST_MODEL = os.environ.get("LLM_FAST_MODEL") or None
+# этапы, где ошибку быстрой модели дёшево заметить и исправить
+CASCADE_STAGES = (
+    "task_statement",
+    "task_solve",
+    "task_template",
+    "theory_question",
+    "theory_grade",
+)
+
+OUTCOME_ACCEPTED = "accepted"
+OUTCOME_ESCALATED = "escalated"
+OUTCOME_FAILED = "failed"
+
+
+def _load_routes() -> Dict[str, List[str]]:
+    raw = os.environ.get("MODEL_ROUTES")
+    if not raw:
+        return {}
+    try:
+        routes = json.loads(raw)
+        return {str(k): [str(m) for m in v] for k, v in routes.items() if v}
+    except (ValueError, AttributeError, TypeError) as e:
+        log.error("MODEL_ROUTES не разобрался, каскад отключён", error=str(e))
+        return {}
+
+
+ROUTES = _load_routes()
+
+
+def models_for(stage: str, default: str) -> List[str]:
+    """Модели этапа от быстрой к большой; последняя — окончательная."""
+    if stage in ROUTES:
+        return ROUTES[stage]
+    if LLM_FAST_MODEL and stage in CASCADE_STAGES and LLM_FAST_MODEL != default:
+        return [LLM_FAST_MODEL, default]
+    return [default]
+
+
+def model_for_attempt(stage: str, default: str, attempt: int) -> str:
+    """Для этапов с собственными повторами: первая попытка — быстрая модель, дальше — старше."""
+    models = models_for(stage, default)
+    return models[min(attempt - 1, len(models) - 1)]
+
+
+# --------------------------------
+# МЕТРИКИ
+# --------------------------------
+
+class RoutingStats:
+    def __init__(self, path: Path = MODEL_ROUTING_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS routing_stats (
+                stage TEXT NOT NULL,
+                tier INTEGER NOT NULL,
+                model TEXT NOT NULL,
+                calls INTEGER NOT NULL DEFAULT 0,
+                accepted INTEGER NOT NULL DEFAULT 0,
+                escalated INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                total_ms REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (stage, tier, model)
+            )
+            """
+        )
+
+    def _conn(self):
+        cached = getattr(self._local, "conn", None)
+        if cached is not None and cached[0] == os.getpid():
+            return cached[1]
+        conn = connect(self.path)
+        self._local.conn = (os.getpid(), conn)
+        return conn
+
+    def record(self, stage: str, tier: int, model: str, elapsed_ms: float, outcome: str) -> None:
+        try:
+            self._conn().execute(
+                f"""
+                INSERT INTO routing_stats (stage, tier, model, calls, {outcome}, total_ms)
+                VALUES (?, ?, ?, 1, 1, ?)
+                ON CONFLICT(stage, tier, model) DO UPDATE SET
+                    calls = calls + 1,
+                    {outcome} = {outcome} + 1,
+                    total_ms = total_ms + excluded.total_ms
+                """,
+                (stage, tier, model, elapsed_ms),
+            )
+        except Exception as e:
+            # метрики не должны ронять генерацию
+            log.warning("Не удалось записать метрику маршрутизации", stage=stage, error=str(e))
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        По этапам: вызовы и эскалации по моделям, доля эскалаций и оценка
+        сэкономленного времени против варианта "всегда окончательная модель":
+            saved = принято_быстрой * среднее_время_окончательной - всё_время_быстрой
+        (эскалированные вызовы быстрая модель потратила зря — они в вычитаемом).
+        """
+        rows = self._conn().execute(
+            "SELECT * FROM routing_stats ORDER BY stage, tier"
+        ).fetchall()
+
+        stages: Dict[str, Dict[str, Any]] = {}
+        for r in rows:
+            stage = stages.setdefault(r["stage"], {"tiers": []})
+            stage["tiers"].append(
+                {
+                    "tier": r["tier"],
+                    "model": r["model"],
+                    "calls": r["calls"],
+                    "accepted": r["accepted"],
+                    "escalated": r["escalated"],
+                    "failed": r["failed"],
+                    "avg_ms": round(r["total_ms"] / r["calls"], 1) if r["calls"] else None,
+                    "total_ms": r["total_ms"],
+                }
+            )
+
+        for name, stage in stages.items():
+            tiers = stage["tiers"]
+            first = [t for t in tiers if t["tier"] == 0]
+            last_tier = max(t["tier"] for t in tiers)
+            last = [t for t in tiers if t["tier"] == last_tier]
+            first_calls = sum(t["calls"] for t in first)
+            first_escalated = sum(t["escalated"] for t in first)
+            stage["escalation_rate"] = (
+                round(first_escalated / first_calls, 3) if first_calls and last_tier > 0 else 0.0
+            )
+
+            last_calls = sum(t["calls"] for t in last)
+            saved = None
+            if last_tier > 0 and last_calls:
+                avg_last = sum(t["total_ms"] for t in last) / last_calls
+                saved = (
+                    sum(t["accepted"] for t in first) * avg_last
+                    - sum(t["total_ms"] for t in first)
+                )
+                saved = round(saved / 1000, 1)
+            stage["latency_saved_s"] = saved
+            for t in tiers:
+                t.pop("total_ms")
+
+        return {"routes": {s: models_for(s, "<default>") for s in CASCADE_STAGES}, "stages": stages}
+
+
+ROUTING_STATS = RoutingStats()
+
+
+# --------------------------------
+# КАСКАД
+# --------------------------------
+
+def record(stage: str, tier: int, model: str, elapsed_ms: float, outcome: str) -> None:
+    """Для этапов, которые эскалируют сами (см. model_for_attempt)."""
+    ROUTING_STATS.record(stage, tier, model, elapsed_ms, outcome)
+
+
+def cascade(stage: str, default: str, call: Callable[[str], T],
+            accept: Callable[[T], bool] | None = None) -> T:
+    """
+    call(model) по моделям этапа, пока ответ не пройдёт проверку.
+    ValueError/KeyError/TypeError из call — ответ не прошёл проверку (в том числе
+    InvalidOutput и битый JSON). На последней модели ошибка летит наружу,
+    а неуверенный ответ принимается как есть.
+    """
+    models = models_for(stage, default)
+    for tier, model in enumerate(models):
+        last = tier == len(models) - 1
+        started = time.perf_counter()
+        with span("llm.route", stage=stage, tier=tier, model=model) as s:
+            try:
+                result = call(model)
+            except (ValueError, KeyError, TypeError) as e:
+                elapsed = (time.perf_counter() - started) * 1000
+                record(stage, tier, model, elapsed, OUTCOME_FAILED if last else OUTCOME_ESCALATED)
+                s.set("outcome", "invalid")
+                if last:
+                    raise
+                log.info("Ответ быстрой модели не прошёл проверку, эскалируем",
+                         stage=stage, model=model, error=str(e))
+                continue
+
+            elapsed = (time.perf_counter() - started) * 1000
+            if not last and accept is not None and not accept(result):
+                record(stage, tier, model, elapsed, OUTCOME_ESCALATED)
+                s.set("outcome", "low_confidence")
+                log.info("Неуверенный ответ быстрой модели, эскалируем", stage=stage, model=model)
+                continue
+
+            record(stage, tier, model, elapsed, OUTCOME_ACCEPTED)
+            s.set("outcome", "accepted")
+            return result
@@ -0,0 +1,365 @@
+# plagiarism.py
+import ast
+import builtins
+import hashlib
+import io
+import os
+import threading
+import time
+import tokenize
+from pathlib import Path
+from typing import Any, Dict, List
+
+from interview_store import connect
+from tracing import get_logger
+
+log = get_logger("plagiarism")
+
+# --------------------------------
+# ИНДЕКС ПЛАГИАТА ПО РЕШЕНИЯМ
+# --------------------------------
+#
+# Каждое проверенное решение:
+#   1) разбираем через ast и превращаем в поток токенов, где имена
+#      переменных/функций и литералы заменены на заглушки — переименование
+#      и смена констант не помогают спрятать копию;
+#   2) режем на k-граммы, хэшируем и прореживаем winnowing-ом
+#      (минимум в каждом окне из WINDOW хэшей) — это отпечатки;
+#   3) кладём отпечатки в обратный индекс SQLite: хэш -> решения.
+#
+# Сравниваем только решения одной и той же задачи (task_key): у разных задач
+# бывает общий каркас — чтение ввода, цикл, вывод, — и без этого короткие
+# решения разных задач "совпадали" бы между собой. Варианты одного шаблона
+# (task_templates.py) — одна задача: условия у них разные, алгоритм общий.
+#
+# Поиск похожих идёт только по спискам решений для своих отпечатков,
+# а не по всему корпусу, поэтому он не замедляется линейно с ростом базы.
+# Слишком частые в этой задаче отпечатки (шаблон ввода, "for i in range(n)")
+# пропускаем: они есть почти у всех и ничего не доказывают.
+#
+# Совпадение хранится для обеих сторон и попадает в отчёт HR у обоих кандидатов.
+# Токен другого интервью в отчёт не попадает — по нему можно открыть чужое
+# интервью; вместо него стабильный псевдоним interview_ref().
+
+PLAGIARISM_DB_PATH = Path(__file__).with_name("plagiarism.db")
+
+KGRAM = 10
+WINDOW = 6
+# меньше отпечатков — решение слишком короткое, чтобы о чём-то судить
+MIN_FINGERPRINTS = 5
+# отпечатки, которые встречаются чаще, в поиске не участвуют
+MAX_POSTINGS = 500
+# доля отпечатков меньшего решения, найденная в другом
+MATCH_THRESHOLD = 0.5
+MAX_MATCHES = 5
+
+_BUILTINS = set(dir(builtins))
+
+
+# --------------------------------
+# НОРМАЛИЗАЦИЯ И ОТПЕЧАТКИ
+# --------------------------------
+
+def _ast_tokens(node: ast.AST, out: List[str]) -> None:
+    """Обход в порядке исходника: тип узла + то, что не зависит от имён."""
+    if isinstance(node, ast.expr_context):
+        return
+    kind = type(node).__name__
+    if isinstance(node, ast.Name):
+        # встроенные (input, range, len) оставляем — они часть алгоритма
+        out.append(f"Name:{node.id}" if node.id in _BUILTINS else "Name")
+    elif isinstance(node, ast.Attribute):
+        # методы (append, sort) тоже часть алгоритма
+        out.append(f"Attr:{node.attr}")
+    elif isinstance(node, ast.Constant):
+        out.append(f"Const:{type(node.value).__name__}")
+    else:
+        out.append(kind)
+    for child in ast.iter_child_nodes(node):
+        _ast_tokens(child, out)
+
+
+def _lexical_tokens(code: str) -> List[str]:
+    """Запасной вариант для кода, который не парсится: токены с теми же заглушками."""
+    out: List[str] = []
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type == tokenize.NAME:
+                out.append(tok.string if tok.string in _BUILTINS else "Name")
+            elif tok.type in (tokenize.NUMBER, tokenize.STRING):
+                out.append("Const")
+            elif tok.type == tokenize.OP:
+                out.append(tok.string)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        pass
+    return out
+
+
+def normalize(code: str) -> List[str]:
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return _lexical_tokens(code)
+    out: List[str] = []
+    for stmt in tree.body:
+        _ast_tokens(stmt, out)
+    return out
+
+
+def _hash(gram: List[str]) -> int:
+    digest = hashlib.blake2b("\x1f".join(gram).encode("utf-8"), digest_size=8).digest()
+    # знаковое 64-битное — влезает в INTEGER SQLite
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def task_key(task: Dict[str, Any]) -> str:
+    """Какая это задача: варианты шаблона — по id шаблона, остальные — по хэшу условия."""
+    if task.get("template_id") is not None:
+        return f"template:{task['template_id']}"
+    statement = (task.get("statement") or "").strip()
+    return "statement:" + hashlib.sha256(statement.encode("utf-8")).hexdigest()[:32]
+
+
+def interview_ref(token: str) -> str:
+    """Псевдоним интервью для отчёта: одинаковый у всех совпадений, токен по нему не узнать."""
+    return hashlib.sha256(f"plagiarism:{token}".encode("utf-8")).hexdigest()[:12]
+
+
+def fingerprints(code: str) -> List[int]:
+    """Winnowing: из каждого окна WINDOW хэшей k-грамм берём минимальный (правый при равенстве)."""
+    tokens = normalize(code)
+    hashes = [_hash(tokens[i:i + KGRAM]) for i in range(len(tokens) - KGRAM + 1)]
+    if len(hashes) <= WINDOW:
+        return sorted(set(hashes))
+
+    selected = set()
+    for start in range(len(hashes) - WINDOW + 1):
+        window = hashes[start:start + WINDOW]
+        best = min(range(WINDOW), key=lambda i: (window[i], -i))
+        selected.add(window[best])
+    return sorted(selected)
+
+
+# --------------------------------
+# ОБРАТНЫЙ ИНДЕКС
+# --------------------------------
+
+class PlagiarismIndex:
+    def __init__(self, path: Path = PLAGIARISM_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(submissions)")}
+        if columns and "task_key" not in columns:
+            # индекс прошлой версии сравнивал решения разных задач — и отпечатки,
+            # и найденные по ним совпадения недостоверны; начинаем индекс заново
+            log.warning("Индекс плагиата без привязки к задаче — пересоздаём")
+            conn.executescript(
+                """
+                DROP TABLE IF EXISTS submissions;
+                DROP TABLE IF EXISTS postings;
+                DROP TABLE IF EXISTS hash_counts;
+                DROP TABLE IF EXISTS matches;
+                """
+            )
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS submissions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                token TEXT NOT NULL,
+                level TEXT NOT NULL,
+                task_key TEXT NOT NULL,
+                fingerprint_count INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE (token, level)
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                task_key TEXT NOT NULL,
+                hash INTEGER NOT NULL,
+                submission_id INTEGER NOT NULL,
+                PRIMARY KEY (task_key, hash, submission_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS hash_counts (
+                task_key TEXT NOT NULL,
+                hash INTEGER NOT NULL,
+                n INTEGER NOT NULL,
+                PRIMARY KEY (task_key, hash)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS matches (
+                token TEXT NOT NULL,
+                level TEXT NOT NULL,
+                other_token TEXT NOT NULL,
+                other_level TEXT NOT NULL,
+                similarity REAL NOT NULL,
+                shared INTEGER NOT NULL,
+                found_at REAL NOT NULL,
+                PRIMARY KEY (token, level, other_token, other_level)
+            );
+            """
+        )
+
+    def _conn(self):
+        cached = getattr(self._local, "conn", None)
+        if cached is not None and cached[0] == os.getpid():
+            return cached[1]
+        conn = connect(self.path)
+        self._local.conn = (os.getpid(), conn)
+        return conn
+
+    def _remove(self, conn, token: str, level: str) -> None:
+        """Кандидат пересдал задачу — старое решение и его совпадения убираем."""
+        row = conn.execute(
+            "SELECT id, task_key FROM submissions WHERE token = ? AND level = ?", (token, level)
+        ).fetchone()
+        if row is None:
+            return
+        conn.execute(
+            """
+            UPDATE hash_counts SET n = n - 1
+            WHERE task_key = ? AND hash IN (
+                SELECT hash FROM postings WHERE task_key = ? AND submission_id = ?
+            )
+            """,
+            (row["task_key"], row["task_key"], row["id"]),
+        )
+        conn.execute(
+            "DELETE FROM postings WHERE task_key = ? AND submission_id = ?",
+            (row["task_key"], row["id"]),
+        )
+        conn.execute("DELETE FROM submissions WHERE id = ?", (row["id"],))
+        conn.execute(
+            """
+            DELETE FROM matches
+            WHERE (token = ? AND level = ?) OR (other_token = ? AND other_level = ?)
+            """,
+            (token, level, token, level),
+        )
+
+    def add(self, token: str, level: str, task: str, code: str) -> List[Dict[str, Any]]:
+        """
+        Индексируем решение задачи task (см. task_key) и возвращаем найденные
+        совпадения с решениями той же задачи в других интервью:
+        [{"token", "level", "similarity", "shared"}].
+        """
+        prints = fingerprints(code)
+        if len(prints) < MIN_FINGERPRINTS:
+            return []
+
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._remove(conn, token, level)
+            matches = self._search(conn, token, task, prints)
+
+            now = time.time()
+            cur = conn.execute(
+                """
+                INSERT INTO submissions (token, level, task_key, fingerprint_count, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (token, level, task, len(prints), now),
+            )
+            conn.executemany(
+                "INSERT INTO postings (task_key, hash, submission_id) VALUES (?, ?, ?)",
+                [(task, h, cur.lastrowid) for h in prints],
+            )
+            conn.executemany(
+                """
+                INSERT INTO hash_counts (task_key, hash, n) VALUES (?, ?, 1)
+                ON CONFLICT(task_key, hash) DO UPDATE SET n = n + 1
+                """,
+                [(task, h) for h in prints],
+            )
+            rows = []
+            for m in matches:
+                rows.append((token, level, m["token"], m["level"], m["similarity"], m["shared"], now))
+                rows.append((m["token"], m["level"], token, level, m["similarity"], m["shared"], now))
+            conn.executemany("INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if matches:
+            log.info("Найдены похожие решения", token=token, level=level, matches=len(matches))
+        return matches
+
+    def _search(self, conn, token: str, task: str, prints: List[int]) -> List[Dict[str, Any]]:
+        # частые отпечатки отбрасываем до похода в postings
+        common = set()
+        for i in range(0, len(prints), 500):
+            chunk = prints[i:i + 500]
+            common.update(
+                r["hash"]
+                for r in conn.execute(
+                    "SELECT hash FROM hash_counts WHERE task_key = ? "
+                    f"AND hash IN ({','.join('?' * len(chunk))}) AND n > ?",
+                    (task, *chunk, MAX_POSTINGS),
+                )
+            )
+        query = [h for h in prints if h not in common]
+
+        shared: Dict[int, int] = {}
+        for i in range(0, len(query), 500):
+            chunk = query[i:i + 500]
+            for r in conn.execute(
+                f"""
+                SELECT submission_id, COUNT(*) AS n FROM postings
+                WHERE task_key = ? AND hash IN ({','.join('?' * len(chunk))})
+                GROUP BY submission_id
+                """,
+                (task, *chunk),
+            ):
+                shared[r["submission_id"]] = shared.get(r["submission_id"], 0) + r["n"]
+        if not shared:
+            return []
+
+        candidates = sorted(shared.items(), key=lambda kv: kv[1], reverse=True)[:MAX_MATCHES * 4]
+        rows = conn.execute(
+            f"""
+            SELECT id, token, level, fingerprint_count FROM submissions
+            WHERE id IN ({','.join('?' * len(candidates))}) AND token != ?
+            """,
+            (*[sid for sid, _ in candidates], token),
+        ).fetchall()
+
+        matches = []
+        for r in rows:
+            n = shared[r["id"]]
+            similarity = n / min(len(prints), r["fingerprint_count"])
+            if similarity >= MATCH_THRESHOLD:
+                matches.append(
+                    {
+                        "token": r["token"],
+                        "level": r["level"],
+                        "similarity": round(similarity, 3),
+                        "shared": n,
+                    }
+                )
+        matches.sort(key=lambda m: m["similarity"], reverse=True)
+        return matches[:MAX_MATCHES]
+
+    def matches_for(self, token: str) -> List[Dict[str, Any]]:
+        """
+        Все совпадения решений интервью token — для отчёта HR.
+        Другое интервью — псевдонимом other_interview, не токеном.
+        """
+        rows = self._conn().execute(
+            """
+            SELECT level, other_token, other_level, similarity, shared FROM matches
+            WHERE token = ? ORDER BY level, similarity DESC
+            """,
+            (token,),
+        ).fetchall()
+        return [
+            {
+                "level": r["level"],
+                "other_interview": interview_ref(r["other_token"]),
+                "other_level": r["other_level"],
+                "similarity": r["similarity"],
+                "shared_fingerprints": r["shared"],
+            }
+            for r in rows
+        ]
+
+
+PLAGIARISM_INDEX = PlagiarismIndex()
@@ -0,0 +1,175 @@
+# profiler.py
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Any, Dict, List
+
+from tracing import get_logger
+
+log = get_logger("profiler")
+
+# --------------------------------
+# ПРОФИЛИРОВАНИЕ НА ЛЕТУ
+# --------------------------------
+#
+# Сэмплирующий профайлер без зависимостей: фоновый поток раз в interval
+# снимает стеки всех потоков процесса (sys._current_frames) и считает,
+# сколько раз встретился каждый стек. Код приложения при этом не трогается,
+# накладные расходы — доли процента на 100 Гц.
+#
+# Результат — "collapsed stacks" (формат flamegraph.pl / speedscope):
+#     <поток>;<файл:функция>;<файл:функция> <сколько сэмплов>
+# Потоки, которые ждут (LLM, слот шлюза, песочница), тоже попадают в сэмплы:
+# для медленного эндпоинта важно и где он считает, и где стоит в очереди.
+#
+# Профайлер и дамп потоков — на процесс. При uvicorn --workers N или worker.py
+# каждый процесс профилируется отдельно (в ответе есть pid).
+
+DEFAULT_SECONDS = 30.0
+MAX_SECONDS = 300.0
+DEFAULT_INTERVAL_MS = 10.0
+MIN_INTERVAL_MS = 1.0
+MAX_STACK_DEPTH = 64
+
+
+class ProfilerBusy(Exception):
+    """Профайлер уже запущен — второй сеанс параллельно не нужен."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _collapse(frame) -> List[str]:
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # счётчики читают эндпоинты, пока поток-сэмплер их пополняет
+        self._data_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._counts: Counter = Counter()
+        self._samples = 0
+        self._started_at: float | None = None
+        self._finished_at: float | None = None
+        self._seconds = 0.0
+        self._interval = 0.0
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float = DEFAULT_SECONDS,
+              interval_ms: float = DEFAULT_INTERVAL_MS) -> Dict[str, Any]:
+        with self._lock:
+            if self.running():
+                raise ProfilerBusy("Профайлер уже запущен")
+            self._counts = Counter()
+            self._samples = 0
+            self._seconds = min(max(seconds, 0.1), MAX_SECONDS)
+            self._interval = max(interval_ms, MIN_INTERVAL_MS) / 1000
+            self._started_at = time.time()
+            self._finished_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+        log.info("Профайлер запущен", seconds=self._seconds, interval_ms=self._interval * 1000)
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        """Останавливаем досрочно (или забираем результат уже закончившегося окна)."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        return self.result()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        deadline = time.monotonic() + self._seconds
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = _collapse(frame)
+                stack.insert(0, names.get(ident, f"thread-{ident}"))
+                stacks.append(";".join(stack))
+            with self._data_lock:
+                self._counts.update(stacks)
+                self._samples += 1
+            self._stop.wait(self._interval)
+        self._finished_at = time.time()
+        log.info("Профайлер остановлен", samples=self._samples)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "running": self.running(),
+            "started_at": self._started_at,
+            "finished_at": self._finished_at,
+            "seconds": self._seconds,
+            "interval_ms": self._interval * 1000,
+            "samples": self._samples,
+        }
+
+    def collapsed(self) -> str:
+        """Текст для flamegraph.pl / speedscope."""
+        with self._data_lock:
+            counts = self._counts.most_common()
+        return "".join(f"{stack} {n}\n" for stack, n in counts)
+
+    def result(self, top: int = 30) -> Dict[str, Any]:
+        """
+        status() + самые частые стеки и функции, где стоят сэмплы (self — верх стека,
+        total — функция есть где-то в стеке).
+        """
+        with self._data_lock:
+            counts = Counter(self._counts)
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, n in counts.items():
+            frames = stack.split(";")[1:]
+            if frames:
+                self_counts[frames[-1]] += n
+            for label in set(frames):
+                total_counts[label] += n
+        return {
+            **self.status(),
+            "top_stacks": [{"stack": s, "samples": n} for s, n in counts.most_common(top)],
+            "top_self": [{"frame": f, "samples": n} for f, n in self_counts.most_common(top)],
+            "top_total": [{"frame": f, "samples": n} for f, n in total_counts.most_common(top)],
+        }
+
+
+PROFILER = SamplingProfiler()
+
+
+def thread_dump() -> List[Dict[str, Any]]:
+    """Текущие стеки всех потоков процесса."""
+    threads = {t.ident: t for t in threading.enumerate()}
+    dump = []
+    for ident, frame in sys._current_frames().items():
+        thread = threads.get(ident)
+        dump.append(
+            {
+                "ident": ident,
+                "name": thread.name if thread else f"thread-{ident}",
+                "daemon": thread.daemon if thread else None,
+                "stack": [line.rstrip("\n") for line in traceback.format_stack(frame)],
+            }
+        )
+    dump.sort(key=lambda t: t["name"])
+    return dump
@@ -0,0 +1,51 @@
+# prompts.py
+import hashlib
+import string
+import textwrap
+from typing import Dict, List
+
+# --------------------------------
+# ШАБЛОНЫ ПРОМПТОВ
+# --------------------------------
+#
+# Промпт собирается один раз при импорте модуля, а не на каждой попытке.
+# Статичная часть (system + инструкции) идёт первой и одинакова для всех вызовов
+# шаблона — это общий префикс, который LLM-сервер может держать в prefix/KV-кэше.
+# Всё переменное (вакансия, условие, ответ кандидата) — в конце, в блоке data.
+#
+# Меняешь текст шаблона — поднимай version: от неё зависит cache_key.
+
+TEMPLATES: Dict[str, "PromptTemplate"] = {}
+
+
+class PromptTemplate:
+    def __init__(self, name: str, version: int, system: str, instructions: str, data: str):
+        self.name = name
+        self.version = version
+        self.system = textwrap.dedent(system).strip()
+        # инструкции не форматируются — фигурные скобки в примерах JSON пишем как есть
+        self.instructions = textwrap.dedent(instructions).strip()
+        # data — str.format-шаблон с именованными полями
+        self.data = textwrap.dedent(data).strip()
+        self.fields = {f for _, f, _, _ in string.Formatter().parse(self.data) if f}
+
+        prefix_hash = hashlib.sha256(
+            f"{self.system}\0{self.instructions}".encode("utf-8")
+        ).hexdigest()[:12]
+        # ключ меняется и при смене версии, и если текст поправили, забыв про версию
+        self.cache_key = f"{name}:v{version}:{prefix_hash}"
+
+        TEMPLATES[name] = self
+
+    def messages(self, **values) -> List[Dict[str, str]]:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Шаблону {self.name} не хватает полей: {sorted(missing)}")
+
+        return [
+            {"role": "system", "content": self.system},
+            {
+                "role": "user",
+                "content": self.instructions + "\n\n" + self.data.format(**values),
+            },
+        ]
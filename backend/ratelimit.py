@@ -0,0 +1,100 @@
+# ratelimit.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+# --------------------------------
+# TOKEN BUCKET ПО КЛЮЧУ
+# --------------------------------
+
+class TokenBucketLimiter:
+    """
+    Отдельное ведро на каждый ключ (например, токен интервью).
+    rate — сколько запросов в секунду пополняется, burst — ёмкость ведра.
+
+    Ключей столько, сколько интервью прошло через процесс, поэтому вёдра
+    лежат в LRU на max_keys записей. Вытесненное ведро давно не трогали —
+    обычно оно успело наполниться, так что полное ведро на его месте почти ничего не меняет.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        # key -> (tokens, last_ts)
+        self._buckets = LRUCache(max_entries=max_keys)
+
+    def try_acquire(self, key: Hashable, cost: float = 1.0) -> float:
+        """
+        Пытаемся списать cost из ведра.
+        Возвращаем 0.0, если получилось, иначе сколько секунд подождать.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key) or (float(self.burst), now)
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+
+            if tokens >= cost:
+                self._buckets.put(key, (tokens - cost, now))
+                return 0.0
+
+            self._buckets.put(key, (tokens, now))
+            return (cost - tokens) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# --------------------------------
+# LRU-КЭШ
+# --------------------------------
+
+class LRUCache:
+    """
+    Потокобезопасный LRU на OrderedDict, ограниченный числом записей
+    и (если задан sizeof) примерным объёмом в байтах.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int | None = None,
+                 sizeof: Callable[[Any], int] | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self.nbytes = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Класть заново и после изменения значения на месте — так пересчитывается его размер."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self._sizeof is not None:
+                size = self._sizeof(value)
+                self.nbytes += size - self._sizes.get(key, 0)
+                self._sizes[key] = size
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self.nbytes > self.max_bytes and len(self._data) > 1
+            ):
+                old, _ = self._data.popitem(last=False)
+                self.nbytes -= self._sizes.pop(old, 0)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        with self._lock:
+            self.nbytes -= self._sizes.pop(key, 0)
+            return self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,159 @@
+# runner.py
+"""
+Выделенный раннер песочницы: принимает код кандидата по HTTP и гоняет его на входах.
+
+Запуск (несколько раннеров на одной машине — для проверки балансировки):
+    SANDBOX_CONCURRENCY=4 python runner.py --port 9101
+    SANDBOX_CONCURRENCY=4 python runner.py --port 9102
+API и worker.py: SANDBOX_RUNNERS=http://127.0.0.1:9101,http://127.0.0.1:9102
+
+Протокол:
+    GET  /health -> {"status": "ok", "capacity", "active", "waiting", "runs"}
+    POST /run    {"code", "inputs": [...], "timeout", "memory_limit_mb",
+                  "stop_on_timeout", "expected", "workload",
+                  "max_queue_seconds"} -> {"runs": [...]}
+    expected (необязательно) — ожидаемые ответы: прогон останавливается
+    на первом непройденном тесте, как при подсчёте балла кандидата.
+    max_queue_seconds (необязательно) — сколько прогон может простоять в очереди
+    SANDBOX_GATE сверх лимитов своих тестов. Не уложился — 503, и API повторит
+    прогон на другом раннере, а не будет ждать до своего таймаута.
+"""
+import argparse
+import json
+import os
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sandbox import DEFAULT_MEMORY_LIMIT_MB, execute_batch_local
+from scheduler import BULK, PRIORITY, SANDBOX_GATE, Cancelled, cancellable, workload
+from tracing import get_logger, span
+
+log = get_logger("runner")
+
+SANDBOX_RUNNER_TOKEN = os.environ.get("SANDBOX_RUNNER_TOKEN", "")
+
+# ограничения на запрос: раннер не должен зависнуть на одном прогоне
+MAX_BODY_BYTES = 64 * 1024 * 1024
+MAX_INPUTS = 1000
+MAX_TIMEOUT_SECONDS = 30.0
+MAX_QUEUE_SECONDS = 300.0
+MAX_MEMORY_LIMIT_MB = 1024
+
+_runs_lock = threading.Lock()
+_runs = 0
+
+
+class RunnerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        if not SANDBOX_RUNNER_TOKEN:
+            return True
+        return secrets.compare_digest(self.headers.get("X-Runner-Token", ""), SANDBOX_RUNNER_TOKEN)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._reply(404, {"detail": "Not found"})
+            return
+        classes = SANDBOX_GATE.stats()["classes"].values()
+        self._reply(
+            200,
+            {
+                "status": "ok",
+                "capacity": SANDBOX_GATE.capacity,
+                "active": sum(c["active"] for c in classes),
+                "waiting": sum(c["waiting"] for c in classes),
+                "runs": _runs,
+            },
+        )
+
+    def do_POST(self):
+        global _runs
+        if self.path != "/run":
+            self._reply(404, {"detail": "Not found"})
+            return
+        if not self._authorized():
+            self._reply(401, {"detail": "Bad runner token"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._reply(413, {"detail": "Request too large"})
+            return
+        try:
+            req = json.loads(self.rfile.read(length))
+            code = str(req["code"])
+            inputs = [str(i) for i in req["inputs"]]
+            timeout = min(float(req.get("timeout", 3.0)), MAX_TIMEOUT_SECONDS)
+            memory_limit_mb = min(
+                int(req.get("memory_limit_mb", DEFAULT_MEMORY_LIMIT_MB)), MAX_MEMORY_LIMIT_MB
+            )
+            max_queue = req.get("max_queue_seconds")
+            if max_queue is not None:
+                max_queue = min(max(float(max_queue), 0.0), MAX_QUEUE_SECONDS)
+            expected = req.get("expected")
+            if expected is not None:
+                expected = [str(e) for e in expected]
+                if len(expected) != len(inputs):
+                    raise ValueError("expected and inputs differ in length")
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"detail": f"Bad request: {e}"})
+            return
+        if len(inputs) > MAX_INPUTS:
+            self._reply(413, {"detail": "Too many inputs"})
+            return
+        cls = req.get("workload") if req.get("workload") in PRIORITY else BULK
+
+        # срок на очередь и тесты: по нему шлюз перестаёт ждать слот (Cancelled),
+        # а начатый тест доработает до своего лимита
+        expired = threading.Event()
+        timer = None
+        if max_queue is not None:
+            timer = threading.Timer(len(inputs) * (timeout + 1) + max_queue, expired.set)
+            timer.daemon = True
+            timer.start()
+        try:
+            with span("runner.run", traceparent=self.headers.get("traceparent"),
+                      inputs=len(inputs), workload=cls) as s, workload(cls), cancellable(expired):
+                runs = execute_batch_local(
+                    code, inputs, timeout, memory_limit_mb, bool(req.get("stop_on_timeout")),
+                    expected,
+                )
+                s.set("timed_out", sum(1 for r in runs if r["timed_out"]))
+        except Cancelled:
+            self._reply(503, {"detail": "Runner busy: queue wait exceeded"})
+            return
+        finally:
+            if timer is not None:
+                timer.cancel()
+        with _runs_lock:
+            _runs += 1
+        self._reply(200, {"runs": runs})
+
+    def log_message(self, format, *args):
+        # каждый запрос в лог не пишем — есть спаны
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9101)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), RunnerHandler)
+    server.daemon_threads = True
+    log.info("Раннер запущен", host=args.host, port=args.port, capacity=SANDBOX_GATE.capacity)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("Останавливаем раннер")
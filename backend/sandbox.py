@@ -0,0 +1,430 @@
+# sandbox.py
+import json
+import math
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from sandbox_pool import RUNNER_POOL, SANDBOX_LOCAL_FALLBACK, RunnersUnavailable
+from scheduler import SANDBOX_GATE
+from tracing import get_logger, span
+
+log = get_logger("sandbox")
+
+# --------------------------------
+# ЗАПУСК КОДА КАНДИДАТА НА ТЕСТАХ
+# --------------------------------
+
+# сколько stderr отдаём наружу при прогоне примеров
+STDERR_TAIL_CHARS = 2000
+
+
+def _parse_int_output(s: str) -> int:
+    s = s.strip()
+    return int(s)
+
+
+def run_one_code_on_tests(code: str, tests: List[Dict[str, str]],
+                          timeout: float = 3.0) -> Dict[str, Any]:
+    """
+    Гоняем один питон-код по тестам до первой ошибки — так считается балл кандидата.
+    tests: [{"input": "...", "output": "..."}]
+    """
+    report = run_code_report(code, tests, timeout=timeout, stop_on_failure=True)
+    return {k: report[k] for k in ("solved", "failed_test", "passed_count", "total_count")}
+
+
+def run_code_on_samples(code: str, samples: List[Dict[str, str]],
+                        timeout: float = 3.0) -> List[Dict[str, Any]]:
+    """
+    Прогон кода по видимым примерам для кандидата.
+    В отличие от run_one_code_on_tests не останавливаемся на первой ошибке
+    и отдаём вывод программы, чтобы кандидат видел, что пошло не так.
+    timeout — TL задачи, тот же, что при проверке на скрытых тестах.
+    """
+    with span("sandbox.run_samples", samples=len(samples)) as s:
+        runs = execute_batch(code, [sample["input"] for sample in samples], timeout=timeout)
+        results = [_sample_result(sample, run) for sample, run in zip(samples, runs)]
+        s.set("passed", sum(1 for r in results if r["passed"]))
+
+    return results
+
+
+def _sample_result(sample: Dict[str, str], run: Dict[str, Any]) -> Dict[str, Any]:
+    if run["timed_out"]:
+        return {
+            "input": sample["input"],
+            "expected": sample["output"],
+            "output": "",
+            "error": "Превышено время выполнения",
+            "passed": False,
+        }
+
+    try:
+        ok = _parse_int_output(sample["output"]) == _parse_int_output(run["stdout"])
+    except Exception:
+        ok = False
+
+    return {
+        "input": sample["input"],
+        "expected": sample["output"],
+        "output": run["stdout"],
+        "error": run["stderr"][-STDERR_TAIL_CHARS:],
+        "passed": ok,
+    }
+
+
+# --------------------------------
+# ПОЛНЫЙ ОТЧЁТ: ВЕРДИКТ, ВРЕМЯ И ПАМЯТЬ ПО КАЖДОМУ ТЕСТУ
+# --------------------------------
+
+VERDICT_OK = "OK"
+VERDICT_WA = "WA"    # неверный ответ
+VERDICT_TLE = "TLE"  # превышено время
+VERDICT_RE = "RE"    # упало с ошибкой
+VERDICT_MLE = "MLE"  # превышена память
+
+DEFAULT_MEMORY_LIMIT_MB = 256
+
+
+# Маленький процесс-посредник: форкает решение с лимитами и через отдельный
+# pipe сообщает его rusage. Напрямую из API-процесса мерить нельзя: после fork
+# ru_maxrss ребёнка включает RSS родителя (весь бэкенд), а посредник крошечный.
+_LAUNCHER = r"""
+import json, os, resource, sys
+path, mem, cpu, report_fd = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4])
+pid = os.fork()
+if pid == 0:
+    os.close(report_fd)
+    resource.setrlimit(resource.RLIMIT_AS, (mem, mem))
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+    os.execv(sys.executable, [sys.executable, path])
+_, status, ru = os.wait4(pid, 0)
+os.write(report_fd, json.dumps({
+    "status": status, "utime": ru.ru_utime, "stime": ru.ru_stime, "maxrss": ru.ru_maxrss,
+}).encode())
+"""
+
+
+def execute_with_usage(path: str, test_input: str, timeout: float,
+                       memory_limit_mb: int = DEFAULT_MEMORY_LIMIT_MB) -> Dict[str, Any]:
+    """
+    Один запуск python-файла с замером wall/CPU времени и пиковой памяти.
+    Решение запускается через _LAUNCHER в отдельной сессии, чтобы по таймауту
+    прибить всю группу процессов разом.
+    Запуск ждёт слот SANDBOX_GATE; ожидание в wall_ms не входит.
+    """
+    with span("sandbox.exec", timeout=timeout, input_bytes=len(test_input)) as s:
+        waited = time.perf_counter()
+        with SANDBOX_GATE.slot():
+            s.set("gate_wait_ms", round((time.perf_counter() - waited) * 1000, 1))
+            run = _execute_with_usage(path, test_input, timeout, memory_limit_mb)
+        for key in ("returncode", "timed_out", "wall_ms", "cpu_ms", "peak_memory_kb"):
+            s.set(key, run[key])
+        return run
+
+
+def _execute_with_usage(path: str, test_input: str, timeout: float,
+                        memory_limit_mb: int) -> Dict[str, Any]:
+    report_r, report_w = os.pipe()
+    started = time.perf_counter()
+    try:
+        proc = subprocess.Popen(
+            [
+                sys.executable, "-S", "-c", _LAUNCHER, path,
+                str(memory_limit_mb * 1024 * 1024),
+                str(int(math.ceil(timeout)) + 1),
+                str(report_w),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            pass_fds=(report_w,),
+            start_new_session=True,
+        )
+    finally:
+        os.close(report_w)
+
+    timed_out = False
+    try:
+        stdout, stderr = proc.communicate(test_input.encode("utf-8"), timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        os.killpg(proc.pid, signal.SIGKILL)
+        stdout, stderr = proc.communicate()
+    wall = time.perf_counter() - started
+
+    with os.fdopen(report_r, "rb") as f:
+        raw_report = f.read()
+
+    if raw_report:
+        usage = json.loads(raw_report)
+        returncode = os.waitstatus_to_exitcode(usage["status"])
+        cpu_ms = (usage["utime"] + usage["stime"]) * 1000
+        # на Linux ru_maxrss в килобайтах
+        peak_kb = usage["maxrss"]
+    else:
+        # посредника убили по таймауту — замеров нет
+        returncode = proc.returncode
+        cpu_ms = wall * 1000
+        peak_kb = 0
+
+    return {
+        "stdout": stdout.decode("utf-8", errors="ignore"),
+        "stderr": stderr.decode("utf-8", errors="ignore"),
+        "returncode": returncode,
+        "timed_out": timed_out,
+        "wall_ms": round(wall * 1000, 1),
+        "cpu_ms": round(cpu_ms, 1),
+        "peak_memory_kb": peak_kb,
+    }
+
+
+def execute_batch(code: str, inputs: List[str], timeout: float,
+                  memory_limit_mb: int = DEFAULT_MEMORY_LIMIT_MB,
+                  stop_on_timeout: bool = False,
+                  expected: List[str] | None = None) -> List[Dict[str, Any]]:
+    """
+    Один код на нескольких входах: [результат как у execute_with_usage] по порядку входов.
+    stop_on_timeout — после первого таймаута дальше не запускаем (список выйдет короче).
+    expected — ожидаемые ответы по входам: останавливаемся на первом тесте,
+    который не прошёл (вердикт не OK).
+    С SANDBOX_RUNNERS прогон целиком уходит на выделенный раннер (см. sandbox_pool.py).
+    """
+    if RUNNER_POOL is not None:
+        try:
+            return RUNNER_POOL.run_batch(
+                code, inputs, timeout, memory_limit_mb, stop_on_timeout, expected
+            )
+        except RunnersUnavailable as e:
+            if not SANDBOX_LOCAL_FALLBACK:
+                raise
+            log.warning("Раннеры недоступны, гоняем код локально", error=str(e))
+    return execute_batch_local(code, inputs, timeout, memory_limit_mb, stop_on_timeout, expected)
+
+
+def execute_batch_local(code: str, inputs: List[str], timeout: float,
+                        memory_limit_mb: int = DEFAULT_MEMORY_LIMIT_MB,
+                        stop_on_timeout: bool = False,
+                        expected: List[str] | None = None) -> List[Dict[str, Any]]:
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False, encoding="utf-8") as f:
+        f.write(code)
+        tmp_path = f.name
+
+    runs: List[Dict[str, Any]] = []
+    try:
+        for i, test_input in enumerate(inputs):
+            run = execute_with_usage(tmp_path, test_input, timeout, memory_limit_mb)
+            runs.append(run)
+            if stop_on_timeout and run["timed_out"]:
+                break
+            if expected is not None and _verdict(run, expected[i], memory_limit_mb) != VERDICT_OK:
+                break
+    finally:
+        os.remove(tmp_path)
+    return runs
+
+
+def _verdict(run: Dict[str, Any], expected_raw: str, memory_limit_mb: int) -> str:
+    if run["timed_out"]:
+        return VERDICT_TLE
+    if "MemoryError" in run["stderr"] or run["peak_memory_kb"] >= memory_limit_mb * 1024:
+        return VERDICT_MLE
+    if run["returncode"] != 0:
+        # RLIMIT_CPU прибивает процесс сигналом SIGXCPU
+        if run["returncode"] == -signal.SIGXCPU:
+            return VERDICT_TLE
+        return VERDICT_RE
+
+    try:
+        ok = _parse_int_output(expected_raw) == _parse_int_output(run["stdout"])
+    except Exception:
+        ok = False
+    return VERDICT_OK if ok else VERDICT_WA
+
+
+def run_code_report(code: str, tests: List[Dict[str, str]], timeout: float = 3.0,
+                    memory_limit_mb: int = DEFAULT_MEMORY_LIMIT_MB,
+                    stop_on_timeout: bool = False,
+                    stop_on_failure: bool = False) -> Dict[str, Any]:
+    """
+    Прогон по тестам с вердиктом OK/WA/TLE/RE/MLE, wall и CPU временем и пиковой
+    памятью по каждому запущенному тесту.
+    По умолчанию — все тесты без остановки на первой ошибке (подробный отчёт для HR);
+    stop_on_timeout — не гоняем остальные тесты после первого TLE;
+    stop_on_failure — до первого непройденного теста, как считается балл кандидата.
+    Сверху — те же поля, что у run_one_code_on_tests.
+    """
+    with span("sandbox.run_tests", tests=len(tests), timeout=timeout,
+              stop_on_failure=stop_on_failure) as s:
+        report = _run_code_report(
+            code, tests, timeout, memory_limit_mb, stop_on_timeout, stop_on_failure
+        )
+        s.set("passed", report["passed_count"])
+        s.set("verdicts", report["verdict_counts"])
+        s.set("max_wall_ms", report["max_wall_ms"])
+        return report
+
+
+def _run_code_report(code: str, tests: List[Dict[str, str]], timeout: float,
+                     memory_limit_mb: int, stop_on_timeout: bool,
+                     stop_on_failure: bool) -> Dict[str, Any]:
+    runs = execute_batch(
+        code,
+        [t["input"] for t in tests],
+        timeout,
+        memory_limit_mb,
+        stop_on_timeout=stop_on_timeout,
+        expected=[t["output"] for t in tests] if stop_on_failure else None,
+    )
+    per_test: List[Dict[str, Any]] = [
+        {
+            "test": i,
+            "verdict": _verdict(run, t["output"], memory_limit_mb),
+            "wall_ms": run["wall_ms"],
+            "cpu_ms": run["cpu_ms"],
+            "peak_memory_kb": run["peak_memory_kb"],
+        }
+        for i, (t, run) in enumerate(zip(tests, runs), start=1)
+    ]
+
+    passed = sum(1 for r in per_test if r["verdict"] == VERDICT_OK)
+    failed_test = next((r["test"] for r in per_test if r["verdict"] != VERDICT_OK), None)
+
+    verdict_counts: Dict[str, int] = {}
+    for r in per_test:
+        verdict_counts[r["verdict"]] = verdict_counts.get(r["verdict"], 0) + 1
+
+    if failed_test is None and len(per_test) < len(tests):
+        # раннер вернул не все прогоны — незапущенный тест не пройден
+        failed_test = len(per_test) + 1
+
+    return {
+        "solved": failed_test is None and passed == len(tests),
+        "failed_test": failed_test,
+        "passed_count": passed,
+        "total_count": len(tests),
+        # не запускались: остановились на первой ошибке или первом TLE
+        "skipped_count": len(tests) - len(per_test),
+        "verdict_counts": verdict_counts,
+        "max_wall_ms": max((r["wall_ms"] for r in per_test), default=0.0),
+        "max_cpu_ms": max((r["cpu_ms"] for r in per_test), default=0.0),
+        "max_peak_memory_kb": max((r["peak_memory_kb"] for r in per_test), default=0),
+        "tests": per_test,
+    }
+
+
+# --------------------------------
+# ЭМПИРИЧЕСКАЯ СЛОЖНОСТЬ
+# --------------------------------
+
+# размеры входа для зондирования (в задачах n ≤ 10^5)
+PROBE_SIZES = (2_000, 8_000, 32_000, 100_000)
+
+# точки, где полезная работа меньше этого, в оценку наклона не берём — там шум
+MIN_PROBE_WORK_MS = 5.0
+
+
+def random_array_input(n: int, seed: int = 0, max_value: int = 10**6) -> str:
+    """Вход в фиксированном формате задач: n, затем n целых чисел."""
+    rnd = random.Random(seed)
+    values = " ".join(str(rnd.randint(1, max_value)) for _ in range(n))
+    return f"{n}\n{values}\n"
+
+
+def _fit_line(xs: List[float], ys: List[float]) -> tuple[float, float]:
+    """МНК для y = a + b * x. Возвращаем (a, b)."""
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    b = 0.0 if var_x == 0 else sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+    return mean_y - b * mean_x, b
+
+
+def _relative_sse(ns: List[int], work: List[float], f) -> float:
+    """Невязка подгонки work = c * f(n) через ноль, в относительных единицах."""
+    fs = [f(n) for n in ns]
+    c = sum(w * x for w, x in zip(work, fs)) / sum(x * x for x in fs)
+    return sum(((c * x - w) / w) ** 2 for w, x in zip(work, fs))
+
+
+def _classify(ns: List[int], work: List[float], slope: float) -> str:
+    if slope < 1.3:
+        # на глаз n и n log n на таком диапазоне почти не различить — сравниваем подгонки
+        lin = _relative_sse(ns, work, float)
+        nlogn = _relative_sse(ns, work, lambda n: n * math.log(n))
+        return "O(n)" if lin <= nlogn else "O(n log n)"
+    if slope < 2.5:
+        return "O(n^2)"
+    return "O(n^3)"
+
+
+def estimate_complexity(code: str, sizes=PROBE_SIZES, make_input=random_array_input,
+                        timeout: float = 5.0, repeats: int = 2,
+                        memory_limit_mb: int = DEFAULT_MEMORY_LIMIT_MB) -> Dict[str, Any]:
+    """
+    Гоняем решение на сгенерированных входах растущего размера и оцениваем
+    асимптотику по CPU-времени.
+
+    Из каждого замера вычитаем базу (запуск интерпретатора на n = 1), по
+    остатку в log-log координатах считаем наклон и по нему выбираем класс.
+    Чтение входа уже линейное, так что быстрее O(n) здесь не бывает.
+    """
+    with span("sandbox.complexity", sizes=list(sizes), repeats=repeats) as s:
+        result = _estimate_complexity(code, sizes, make_input, timeout, repeats, memory_limit_mb)
+        s.set("estimate", result["estimate"])
+        s.set("loglog_slope", result["loglog_slope"])
+        return result
+
+
+def _estimate_complexity(code: str, sizes, make_input, timeout: float, repeats: int,
+                         memory_limit_mb: int) -> Dict[str, Any]:
+    def _best_cpu(inp: str) -> Dict[str, Any]:
+        runs = execute_batch(code, [inp] * repeats, timeout, memory_limit_mb,
+                             stop_on_timeout=True)
+        if runs[0]["timed_out"]:
+            return runs[0]
+        return min((r for r in runs if not r["timed_out"]), key=lambda r: r["cpu_ms"])
+
+    points: List[Dict[str, Any]] = []
+    baseline = _best_cpu(make_input(1))["cpu_ms"]
+    for n in sizes:
+        run = _best_cpu(make_input(n))
+        point = {"n": n, "cpu_ms": run["cpu_ms"], "wall_ms": run["wall_ms"]}
+        if run["timed_out"]:
+            point["verdict"] = VERDICT_TLE
+            points.append(point)
+            # дальше будет только медленнее
+            break
+        point["verdict"] = VERDICT_OK if run["returncode"] == 0 else VERDICT_RE
+        points.append(point)
+
+    result: Dict[str, Any] = {
+        "points": points,
+        "baseline_cpu_ms": baseline,
+        "estimate": None,
+        "loglog_slope": None,
+    }
+
+    good = [
+        p for p in points
+        if p["verdict"] == VERDICT_OK and p["cpu_ms"] - baseline >= MIN_PROBE_WORK_MS
+    ]
+    if len(good) < 2:
+        if points and all(p["verdict"] == VERDICT_OK for p in points):
+            # даже на максимальном n работы почти нет
+            result["estimate"] = "O(n)"
+        return result
+
+    ns = [p["n"] for p in good]
+    work = [p["cpu_ms"] - baseline for p in good]
+    _, slope = _fit_line([math.log(n) for n in ns], [math.log(w) for w in work])
+
+    result["loglog_slope"] = round(slope, 2)
+    result["estimate"] = _classify(ns, work, slope)
+    return result
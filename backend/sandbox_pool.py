@@ -0,0 +1,245 @@
+# sandbox_pool.py
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List
+
+from scheduler import current_workload
+from tracing import current_traceparent, get_logger, span
+
+log = get_logger("sandbox_pool")
+
+# --------------------------------
+# ВЫДЕЛЕННЫЕ РАННЕРЫ ПЕСОЧНИЦЫ
+# --------------------------------
+#
+# Код кандидата можно гонять не на машине API, а на отдельных раннерах
+# (runner.py) — тогда мощность песочницы растёт отдельно от веб-части:
+#
+#     SANDBOX_RUNNERS=http://10.0.0.5:9101,http://10.0.0.6:9101
+#
+# Единица работы — прогон одного кода на списке входов (POST /run), чтобы на
+# задачу с 30 тестами был один сетевой запрос, а не 30.
+#
+# Балансировка — к наименее загруженному раннеру: свои запросы в полёте
+# знаем точно, общую загрузку (active + waiting из GET /health) — по
+# последней проверке здоровья.
+#
+# На раннере прогон стоит в очереди его SANDBOX_GATE, поэтому время ответа —
+# это очередь плюс сами тесты. Очередь ограничиваем: в запросе уходит
+# max_queue_seconds, и раннер, не уложившийся в очередь плюс лимиты тестов,
+# отвечает 503 — прогон повторяем на другом, запуск кода ничего не меняет
+# снаружи. Из ротации до следующей удачной проверки здоровья выводим только
+# раннер, до которого не достучаться (или ответивший 5xx кроме 503):
+#   - 503 — раннер занят, 401/403 — чужой токен: пробуем следующий;
+#   - остальные 4xx — запрос плохой, на другом раннере будет то же самое;
+#   - таймаут чтения — раннер жив и гоняет код; повтор удвоил бы нагрузку.
+# Ни один раннер не справился — RunnersUnavailable. Локальный запуск на машине
+# API вместо раннера — только если явно включён SANDBOX_LOCAL_FALLBACK=1:
+# раннеры выносят как раз затем, чтобы чужой код не шёл рядом с API.
+
+SANDBOX_RUNNERS = [
+    url.strip().rstrip("/")
+    for url in os.environ.get("SANDBOX_RUNNERS", "").split(",")
+    if url.strip()
+]
+# общий секрет API и раннеров: раннер выполняет произвольный код
+SANDBOX_RUNNER_TOKEN = os.environ.get("SANDBOX_RUNNER_TOKEN", "")
+SANDBOX_LOCAL_FALLBACK = os.environ.get("SANDBOX_LOCAL_FALLBACK", "0") == "1"
+# сколько прогон может простоять в очереди раннера сверх лимитов своих тестов
+RUNNER_QUEUE_SECONDS = float(os.environ.get("SANDBOX_RUNNER_QUEUE_SECONDS", "30"))
+
+HEALTH_INTERVAL_SECONDS = 5.0
+HEALTH_TIMEOUT_SECONDS = 2.0
+MAX_ATTEMPTS = 3
+# запас к суммарному лимиту времени тестов: сеть и старт интерпретатора
+REQUEST_SLACK_SECONDS = 10.0
+
+
+class RunnersUnavailable(Exception):
+    """Ни один раннер не смог выполнить прогон."""
+
+
+class RemoteRunner:
+    def __init__(self, url: str):
+        self.url = url
+        self.healthy = True
+        self.capacity = 1
+        # active + waiting по последнему /health — в том числе запросы других процессов API
+        self.reported_load = 0
+        # наши запросы, которые сейчас выполняются на раннере
+        self.inflight = 0
+        self.runs = 0
+        self.failures = 0
+        self.last_error: str | None = None
+        self.checked_at: float | None = None
+
+    def load(self) -> float:
+        return max(self.inflight, self.reported_load) / self.capacity
+
+
+class RunnerPool:
+    def __init__(self, urls: List[str], token: str = ""):
+        self.runners = [RemoteRunner(url) for url in urls]
+        self.token = token
+        self._lock = threading.Lock()
+        self._checker_pid: int | None = None
+
+    def _request(self, runner: RemoteRunner, path: str, timeout: float,
+                 payload: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["X-Runner-Token"] = self.token
+        traceparent = current_traceparent()
+        if traceparent:
+            headers["traceparent"] = traceparent
+        request = urllib.request.Request(
+            runner.url + path,
+            data=json.dumps(payload).encode("utf-8") if payload is not None else None,
+            headers=headers,
+            method="POST" if payload is not None else "GET",
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+
+    # --- здоровье ---
+
+    def _ensure_checker(self) -> None:
+        if self._checker_pid != os.getpid():
+            # после fork поток проверки надо запускать заново
+            self._checker_pid = os.getpid()
+            threading.Thread(target=self._check_loop, daemon=True).start()
+
+    def _check_loop(self) -> None:
+        while True:
+            self.check_health()
+            time.sleep(HEALTH_INTERVAL_SECONDS)
+
+    def check_health(self) -> None:
+        for runner in self.runners:
+            try:
+                health = self._request(runner, "/health", HEALTH_TIMEOUT_SECONDS)
+            except Exception as e:
+                self._mark_down(runner, e)
+                continue
+            with self._lock:
+                if not runner.healthy:
+                    log.info("Раннер снова в ротации", runner=runner.url)
+                runner.healthy = True
+                runner.capacity = max(1, int(health["capacity"]))
+                runner.reported_load = int(health["active"]) + int(health["waiting"])
+                runner.checked_at = time.time()
+
+    def _note_error(self, runner: RemoteRunner, error: Exception) -> None:
+        with self._lock:
+            runner.failures += 1
+            runner.last_error = str(error)
+
+    def _mark_down(self, runner: RemoteRunner, error: Exception) -> None:
+        self._note_error(runner, error)
+        with self._lock:
+            runner.checked_at = time.time()
+            if not runner.healthy:
+                return
+            runner.healthy = False
+        log.warning("Раннер недоступен, выводим из ротации", runner=runner.url, error=str(error))
+
+    # --- прогон ---
+
+    def _pick(self, exclude: set) -> RemoteRunner | None:
+        with self._lock:
+            candidates = [r for r in self.runners if r.healthy and r.url not in exclude]
+            if not candidates:
+                return None
+            best = min(r.load() for r in candidates)
+            runner = random.choice([r for r in candidates if r.load() == best])
+            runner.inflight += 1
+            return runner
+
+    def run_batch(self, code: str, inputs: List[str], timeout: float, memory_limit_mb: int,
+                  stop_on_timeout: bool = False,
+                  expected: List[str] | None = None) -> List[Dict[str, Any]]:
+        """То же, что sandbox.execute_batch, но на раннере. Все раннеры отказали — RunnersUnavailable."""
+        self._ensure_checker()
+        payload = {
+            "code": code,
+            "inputs": inputs,
+            "timeout": timeout,
+            "memory_limit_mb": memory_limit_mb,
+            "stop_on_timeout": stop_on_timeout,
+            "expected": expected,
+            # раннер обслуживает кандидатов раньше генерации, как и локальный шлюз
+            "workload": current_workload(),
+            "max_queue_seconds": RUNNER_QUEUE_SECONDS,
+        }
+        # раннер сам бросит прогон через очередь + лимиты тестов (см. runner.py);
+        # ждём ещё последний начатый тест и запас на сеть
+        request_timeout = (
+            len(inputs) * (timeout + 1) + RUNNER_QUEUE_SECONDS + timeout + REQUEST_SLACK_SECONDS
+        )
+
+        tried: set = set()
+        last_error: Exception | None = None
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            runner = self._pick(tried)
+            if runner is None:
+                break
+            tried.add(runner.url)
+            with span("sandbox.remote", runner=runner.url, attempt=attempt,
+                      inputs=len(inputs)) as s:
+                try:
+                    result = self._request(runner, "/run", request_timeout, payload)
+                except urllib.error.HTTPError as e:
+                    last_error = e
+                    if e.code >= 500 and e.code != 503:
+                        s.set("outcome", "error")
+                        self._mark_down(runner, e)
+                        continue
+                    s.set("outcome", "busy" if e.code == 503 else "rejected")
+                    self._note_error(runner, e)
+                    if e.code in (401, 403, 503):
+                        continue
+                    break
+                except TimeoutError as e:
+                    s.set("outcome", "timeout")
+                    self._note_error(runner, e)
+                    last_error = e
+                    break
+                except Exception as e:
+                    s.set("outcome", "error")
+                    self._mark_down(runner, e)
+                    last_error = e
+                    continue
+                finally:
+                    with self._lock:
+                        runner.inflight -= 1
+                s.set("outcome", "ok")
+                with self._lock:
+                    runner.runs += 1
+                return result["runs"]
+
+        raise RunnersUnavailable(f"Нет доступных раннеров песочницы: {last_error}")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "url": r.url,
+                    "healthy": r.healthy,
+                    "capacity": r.capacity,
+                    "inflight": r.inflight,
+                    "reported_load": r.reported_load,
+                    "runs": r.runs,
+                    "failures": r.failures,
+                    "last_error": r.last_error,
+                    "checked_at": r.checked_at,
+                }
+                for r in self.runners
+            ]
+
+
+RUNNER_POOL = RunnerPool(SANDBOX_RUNNERS, SANDBOX_RUNNER_TOKEN) if SANDBOX_RUNNERS else None
@@ -0,0 +1,177 @@
+# scheduler.py
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator
+
+# --------------------------------
+# ПРИОРИТЕТЫ НАГРУЗКИ
+# --------------------------------
+#
+# Классы работы делят одни и те же LLM и песочницу:
+#   interactive — кандидат ждёт ответа (проверка, "Запустить на примерах");
+#   bulk        — HR генерирует интервью, может и подождать;
+#   speculative — генерация по черновику вакансии, которая может и не понадобиться.
+#
+# Класс задаётся в эндпоинте (with workload(...)) и живёт в contextvar,
+# а llm.complete и песочница берут слот у своего PriorityGate: interactive
+# обслуживается первым, а bulk никогда не занимает все слоты.
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+SPECULATIVE = "speculative"
+
+# меньше — важнее; это же значение идёт в приоритет очереди jobs
+PRIORITY = {INTERACTIVE: 0, BULK: 1, SPECULATIVE: 2}
+
+_workload: ContextVar[str] = ContextVar("workload", default=BULK)
+
+
+class Cancelled(BaseException):
+    """
+    Работу отменили (черновик устарел) — бросается на входе в шлюз.
+    BaseException, как asyncio.CancelledError: генерация местами ловит Exception
+    и пробует заново, а отмену так глотать нельзя.
+    """
+
+
+# событие отмены текущей работы; проверяется перед каждым запросом к LLM и песочнице
+_cancel_event: ContextVar[threading.Event | None] = ContextVar("cancel_event", default=None)
+
+
+@contextmanager
+def workload(cls: str) -> Iterator[None]:
+    """Вся работа внутри блока (LLM, песочница) идёт с классом cls."""
+    token = _workload.set(cls)
+    try:
+        yield
+    finally:
+        _workload.reset(token)
+
+
+def current_workload() -> str:
+    return _workload.get()
+
+
+@contextmanager
+def cancellable(event: threading.Event) -> Iterator[None]:
+    """Внутри блока шлюзы бросают Cancelled, как только event выставлен."""
+    token = _cancel_event.set(event)
+    try:
+        yield
+    finally:
+        _cancel_event.reset(token)
+
+
+def check_cancelled() -> None:
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise Cancelled()
+
+
+class PriorityGate:
+    """
+    Семафор на capacity слотов с очередью по классам.
+    class_limits — сколько слотов максимум может занять один класс.
+    Внутри класса — FIFO; свободный слот достаётся самому важному классу,
+    которому его лимит позволяет стартовать.
+    """
+
+    def __init__(self, name: str, capacity: int, class_limits: Dict[str, int]):
+        self.name = name
+        self.capacity = capacity
+        self.class_limits = class_limits
+        self._cond = threading.Condition()
+        self._active = {cls: 0 for cls in PRIORITY}
+        self._waiting: Dict[str, deque] = {cls: deque() for cls in PRIORITY}
+        # последние времена ожидания слота, мс — для stats()
+        self._waits: Dict[str, deque] = {cls: deque(maxlen=1000) for cls in PRIORITY}
+
+    def _can_start(self, cls: str, ticket: object) -> bool:
+        if sum(self._active.values()) >= self.capacity:
+            return False
+        if self._active[cls] >= self.class_limits[cls]:
+            return False
+        for other, prio in PRIORITY.items():
+            if (
+                prio < PRIORITY[cls]
+                and self._waiting[other]
+                and self._active[other] < self.class_limits[other]
+            ):
+                return False  # слот нужнее более важному классу
+        return self._waiting[cls][0] is ticket
+
+    @contextmanager
+    def slot(self, cls: str | None = None) -> Iterator[None]:
+        cls = cls or current_workload()
+        ticket = object()
+        started = time.perf_counter()
+        check_cancelled()
+
+        with self._cond:
+            self._waiting[cls].append(ticket)
+            try:
+                while not self._can_start(cls, ticket):
+                    # с таймаутом — чтобы отменённая работа не ждала слот до конца
+                    self._cond.wait(timeout=1.0)
+                    check_cancelled()
+            finally:
+                self._waiting[cls].remove(ticket)
+                # сменилась голова очереди — пусть остальные перепроверят
+                self._cond.notify_all()
+            self._active[cls] += 1
+            self._waits[cls].append((time.perf_counter() - started) * 1000)
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active[cls] -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            per_class = {}
+            for cls in PRIORITY:
+                waits = sorted(self._waits[cls])
+                per_class[cls] = {
+                    "active": self._active[cls],
+                    "waiting": len(self._waiting[cls]),
+                    "limit": self.class_limits[cls],
+                    "wait_p50_ms": round(waits[len(waits) // 2], 1) if waits else None,
+                    "wait_p99_ms": round(waits[int(len(waits) * 0.99)], 1) if waits else None,
+                }
+        return {"name": self.name, "capacity": self.capacity, "classes": per_class}
+
+
+# --------------------------------
+# ШЛЮЗЫ ПРОЦЕССА
+# --------------------------------
+# Лимиты — на процесс. В режиме с worker.py у каждого процесса свои шлюзы.
+
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "8"))
+SANDBOX_CONCURRENCY = int(os.environ.get("SANDBOX_CONCURRENCY", str(os.cpu_count() or 2)))
+
+# bulk не получает последние слоты: кандидату всегда есть куда встать;
+# speculative — не больше половины: черновик не должен тормозить настоящие заказы
+LLM_GATE = PriorityGate(
+    "llm",
+    capacity=LLM_CONCURRENCY,
+    class_limits={
+        INTERACTIVE: LLM_CONCURRENCY,
+        BULK: max(1, LLM_CONCURRENCY - 2),
+        SPECULATIVE: max(1, LLM_CONCURRENCY // 2),
+    },
+)
+SANDBOX_GATE = PriorityGate(
+    "sandbox",
+    capacity=SANDBOX_CONCURRENCY,
+    class_limits={
+        INTERACTIVE: SANDBOX_CONCURRENCY,
+        BULK: max(1, SANDBOX_CONCURRENCY - 1),
+        SPECULATIVE: max(1, SANDBOX_CONCURRENCY // 2),
+    },
+)
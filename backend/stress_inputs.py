@@ -0,0 +1,126 @@
+# stress_inputs.py
+import hashlib
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List
+
+from interview_store import connect
+from tracing import get_logger
+
+log = get_logger("stress_inputs")
+
+# --------------------------------
+# ВХОДЫ СТРЕСС-ТЕСТОВ ОТДЕЛЬНО ОТ ЗАДАЧ
+# --------------------------------
+#
+# Стресс-тест максимального размера — это ~10^5 чисел, сотни килобайт текста.
+# Лежи такие входы прямо в задаче, каждое чтение интервью (INTERVIEWS.get на
+# "Запустить" и проверке), каждая запись отчёта, результат задачи в jobs.db
+# и шаблон в банке разбирали бы и переписывали мегабайты JSON.
+#
+# Поэтому в задаче вместо {"input": "..."} у стресс-теста лежит
+# {"input_ref": "<sha256>"}, а сам вход — здесь, сжатым. Ключ — хэш
+# содержимого: варианты одного шаблона и повторная генерация ссылаются
+# на одну запись. Входы загружаются только под прогон (resolve).
+#
+# Запись, к которой давно не обращались, удаляет компактор интервью
+# (interview_lifecycle.py). Тест, чей вход уже удалён, resolve пропускает —
+# как и при генерации, задача без стресс-тестов остаётся рабочей.
+
+STRESS_INPUTS_DB_PATH = Path(
+    os.environ.get("STRESS_INPUTS_PATH") or Path(__file__).with_name("stress_inputs.db")
+)
+# сутки без обращений, после которых вход удаляется; 0 — хранить бессрочно
+STRESS_INPUT_TTL_SECONDS = float(os.environ.get("STRESS_INPUT_TTL_DAYS", "180")) * 24 * 3600
+
+
+def _ref(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class StressInputStore:
+    def __init__(self, path: Path = STRESS_INPUTS_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS stress_inputs (
+                ref TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                used_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn().execute(
+            "CREATE INDEX IF NOT EXISTS stress_inputs_used ON stress_inputs (used_at)"
+        )
+
+    def _conn(self):
+        cached = getattr(self._local, "conn", None)
+        if cached is not None and cached[0] == os.getpid():
+            return cached[1]
+        conn = connect(self.path)
+        self._local.conn = (os.getpid(), conn)
+        return conn
+
+    def put(self, text: str) -> str:
+        ref = _ref(text)
+        self._conn().execute(
+            """
+            INSERT INTO stress_inputs (ref, body, used_at) VALUES (?, ?, ?)
+            ON CONFLICT(ref) DO UPDATE SET used_at = excluded.used_at
+            """,
+            (ref, zlib.compress(text.encode("utf-8")), time.time()),
+        )
+        return ref
+
+    def get_many(self, refs: List[str]) -> Dict[str, str]:
+        """ref -> вход; удалённых входов в ответе нет."""
+        refs = list(dict.fromkeys(refs))
+        if not refs:
+            return {}
+        placeholders = ",".join("?" * len(refs))
+        conn = self._conn()
+        rows = conn.execute(
+            f"SELECT ref, body FROM stress_inputs WHERE ref IN ({placeholders})", refs
+        ).fetchall()
+        conn.execute(
+            f"UPDATE stress_inputs SET used_at = ? WHERE ref IN ({placeholders})",
+            (time.time(), *refs),
+        )
+        return {r["ref"]: zlib.decompress(r["body"]).decode("utf-8") for r in rows}
+
+    def externalize(self, tests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Входы стресс-тестов — в хранилище, в тестах остаются ссылки."""
+        out = []
+        for t in tests:
+            if t.get("stress") and "input" in t:
+                t = dict(t)
+                t["input_ref"] = self.put(t.pop("input"))
+            out.append(t)
+        return out
+
+    def resolve(self, tests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Тесты с загруженными входами; тест, чей вход уже удалён, пропускаем."""
+        inputs = self.get_many([t["input_ref"] for t in tests if "input_ref" in t])
+        out = []
+        for t in tests:
+            if "input_ref" in t:
+                if t["input_ref"] not in inputs:
+                    log.warning("Вход стресс-теста удалён, тест пропускаем", ref=t["input_ref"])
+                    continue
+                t = dict(t)
+                t["input"] = inputs[t.pop("input_ref")]
+            out.append(t)
+        return out
+
+    def purge(self, before: float) -> int:
+        return self._conn().execute(
+            "DELETE FROM stress_inputs WHERE used_at < ?", (before,)
+        ).rowcount
+
+
+STRESS_INPUTS = StressInputStore()
@@ -0,0 +1,483 @@
+# task_templates.py
+import ast
+import difflib
+import hashlib
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from generation import (
+    CHAT_MODEL,
+    add_synthetic_tests,
+    calibrate_time_limit,
+    generate_verified_task,
+    run_reference,
+)
+from interview_store import connect
+from llm import JsonObjectValidator, complete
+from model_router import cascade
+from prompts import PromptTemplate
+from stress_inputs import STRESS_INPUTS
+from tracing import get_logger, span
+
+log = get_logger("task_templates")
+
+# --------------------------------
+# ПАРАМЕТРИЧЕСКИЕ ШАБЛОНЫ ЗАДАЧ
+# --------------------------------
+#
+# Проверенная задача (условие + эталонное решение) стоит десятки вызовов LLM,
+# а используется один раз. Поэтому после проверки превращаем её в шаблон:
+#   - сюжетные сущности условия ("заказы", "склад") становятся словесными слотами;
+#   - константы, которые ровно в одном месте встречаются и в условии, и в эталоне
+#     (K, модуль, порог), становятся числовыми слотами — меняются и там, и там;
+#   - ответы в примерах условия — тоже слоты, их считает эталон.
+# На это уходит ОДИН вызов LLM на задачу. Дальше варианты для следующих
+# кандидатов с той же вакансией собираются локально: подставляем значения,
+# пересчитываем эталоном ответы на все тесты, досинтезируем новые тесты и
+# калибруем TL. Вариант, на котором эталон падает или вырождается, отбрасываем.
+#
+# Шаблоны лежат в task_bank.db и привязаны к отпечатку вакансии.
+
+TASK_BANK_DB_PATH = Path(__file__).with_name("task_bank.db")
+USE_TASK_TEMPLATES = os.environ.get("TASK_TEMPLATES", "1") != "0"
+
+# сколько раз пробуем собрать вариант из шаблона, прежде чем идти в LLM
+VARIANT_ATTEMPTS = 3
+# условие, собранное из шаблона с исходными значениями, должно почти совпасть с исходным
+MIN_STATEMENT_SIMILARITY = 0.9
+
+_SLOT_RE = re.compile(r"\[\[(\w+)\]\]")
+_ANSWER_SLOT_RE = re.compile(r"answer_(\d+)$")
+
+
+TASK_TEMPLATE_PROMPT = PromptTemplate(
+    name="task_template",
+    version=1,
+    system="/no_think Ты превращаешь олимпиадные задачи в шаблоны для генерации вариантов.",
+    instructions="""
+        Тебе даны условие задачи и её эталонное решение (в конце сообщения).
+        Сделай из условия шаблон, по которому можно собирать изоморфные варианты задачи:
+        тот же алгоритм и формат ввода/вывода, но другой сюжет и другие константы.
+
+        Правила:
+
+        1. Сюжетные сущности (что за объекты, кто действующие лица, предметная область)
+           замени на слоты вида [[имя]]. Слот заменяет слово или фразу ровно в той
+           грамматической форме, в которой она стоит в тексте. Если одна сущность
+           встречается в разных формах ("заказ", "заказов"), сделай отдельные слоты
+           с общим полем "group" — значения из одной группы берутся с одним индексом.
+           Для каждого словесного слота дай 4–6 значений, ПЕРВОЕ — исходное.
+
+        2. Числовые константы задачи (K, модуль, порог, штраф), от которых зависит ответ,
+           замени на слоты [[имя]] и укажи исходное значение и допустимый диапазон,
+           при котором задача остаётся осмысленной. Ограничения на n и на значения
+           элементов НЕ трогай.
+
+        3. В разделе "Пример" ответ каждого примера замени на [[answer_1]], [[answer_2]], ...
+           по порядку. Входные данные примеров оставь как есть.
+
+        4. Всё остальное в условии оставь дословно.
+
+        Верни строго JSON без пояснений вокруг:
+
+        {
+          "statement": "<условие со слотами>",
+          "slots": [
+            {"name": "item", "kind": "word", "group": "item", "values": ["заказ", "платёж", "посылка", "билет"]},
+            {"name": "items", "kind": "word", "group": "item", "values": ["заказов", "платежей", "посылок", "билетов"]},
+            {"name": "k", "kind": "int", "value": 3, "min": 2, "max": 9}
+          ]
+        }
+    """,
+    data="""
+        Условие задачи:
+
+        ---
+        {statement}
+        ---
+
+        Эталонное решение:
+
+        ---
+        {reference_solution}
+        ---
+    """,
+)
+
+
+def vacancy_fingerprint(vacancy_text: str) -> str:
+    """Отпечаток вакансии: одинаковый текст с точностью до регистра и пробелов — один отпечаток."""
+    normalized = " ".join(vacancy_text.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+# --------------------------------
+# ШАБЛОН ИЗ ПРОВЕРЕННОЙ ЗАДАЧИ
+# --------------------------------
+
+def _int_constants(code: str) -> Dict[int, List[tuple]]:
+    """Целые литералы эталона: значение -> [(строка, начало, конец)]."""
+    found: Dict[int, List[tuple]] = {}
+    for node in ast.walk(ast.parse(code)):
+        if (
+            isinstance(node, ast.Constant)
+            and type(node.value) is int
+            and node.lineno == node.end_lineno
+        ):
+            found.setdefault(node.value, []).append(
+                (node.lineno, node.col_offset, node.end_col_offset)
+            )
+    return found
+
+
+def _render_code(code: str, code_slots: Dict[str, List[int]], values: Dict[str, Any]) -> str:
+    lines = code.split("\n")
+    # справа налево, чтобы замены в одной строке не сдвигали друг друга
+    for name, (lineno, start, end) in sorted(
+        code_slots.items(), key=lambda kv: (kv[1][0], -kv[1][1])
+    ):
+        line = lines[lineno - 1].encode("utf-8")  # col_offset в ast — в байтах UTF-8
+        line = line[:start] + str(values[name]).encode("utf-8") + line[end:]
+        lines[lineno - 1] = line.decode("utf-8")
+    return "\n".join(lines)
+
+
+def _render_statement(statement: str, values: Dict[str, Any]) -> str:
+    return _SLOT_RE.sub(lambda m: str(values.get(m.group(1), m.group(0))), statement)
+
+
+def _parse_template_answer(content: str) -> Dict[str, Any]:
+    start, end = content.find("{"), content.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError("В ответе нет JSON-объекта")
+    data = json.loads(content[start : end + 1])
+    if not isinstance(data.get("statement"), str) or not isinstance(data.get("slots"), list):
+        raise ValueError("В шаблоне нет statement или slots")
+    return data
+
+
+def build_template(task: Dict[str, Any]) -> Dict[str, Any] | None:
+    """
+    Шаблон из проверенной задачи (с reference_solution) или None,
+    если вариантов из неё не получится.
+    """
+    data = cascade(
+        "task_template",
+        CHAT_MODEL,
+        lambda model: _parse_template_answer(
+            complete(
+                TASK_TEMPLATE_PROMPT,
+                model=model,
+                temperature=0.3,
+                validator=JsonObjectValidator(required_keys=("statement", "slots")),
+                statement=task["statement"],
+                reference_solution=task["reference_solution"],
+            )
+        ),
+    )
+    statement = data["statement"]
+    reference = task["reference_solution"]
+    constants = _int_constants(reference)
+
+    word_slots: Dict[str, Dict[str, Any]] = {}
+    int_slots: Dict[str, Dict[str, Any]] = {}
+    code_slots: Dict[str, List[int]] = {}
+    original: Dict[str, Any] = {}
+
+    for slot in data["slots"]:
+        name = str(slot.get("name", ""))
+        if not re.fullmatch(r"\w+", name) or _ANSWER_SLOT_RE.match(name):
+            continue
+        if slot.get("kind") == "word":
+            values = [str(v) for v in slot.get("values") or [] if str(v).strip()]
+            if not values:
+                continue
+            word_slots[name] = {"group": str(slot.get("group") or name), "values": values}
+            original[name] = values[0]
+        elif slot.get("kind") == "int":
+            try:
+                value, lo, hi = int(slot["value"]), int(slot["min"]), int(slot["max"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            original[name] = value
+            # менять можно только константу, которая в эталоне стоит ровно в одном месте;
+            # иначе не знаем, что именно править в коде, и значение остаётся исходным
+            places = constants.get(value, [])
+            if (
+                lo <= value <= hi
+                and lo < hi
+                and len(places) == 1
+                and list(places[0]) not in code_slots.values()
+            ):
+                int_slots[name] = {"min": lo, "max": hi}
+                code_slots[name] = list(places[0])
+
+    # слот в тексте без описания — не шаблон, а ошибка модели
+    answers = []
+    for name in _SLOT_RE.findall(statement):
+        match = _ANSWER_SLOT_RE.match(name)
+        if match:
+            answers.append(int(match.group(1)))
+        elif name not in original:
+            log.info("В шаблоне слот без описания", slot=name)
+            return None
+
+    samples = [s for s in task.get("samples") or [] if s.get("input")]
+    if sorted(set(answers)) != list(range(1, len(set(answers)) + 1)) or len(set(answers)) > len(samples):
+        log.info("Ответы примеров в шаблоне размечены неверно", answers=answers)
+        return None
+    if int_slots and len(set(answers)) < len(samples):
+        # константа меняет ответы — а старые ответы остались зашиты в текст примеров
+        int_slots, code_slots = {}, {}
+
+    if not int_slots and not any(len(s["values"]) > 1 for s in word_slots.values()):
+        log.info("В шаблоне нечего менять")
+        return None
+
+    # с исходными значениями шаблон должен вернуть исходное условие
+    restored = _render_statement(
+        statement,
+        {**original, **{f"answer_{i}": str(s.get("output", "")).strip() for i, s in enumerate(samples, 1)}},
+    )
+    similarity = difflib.SequenceMatcher(None, restored, task["statement"]).ratio()
+    if similarity < MIN_STATEMENT_SIMILARITY:
+        log.info("Шаблон слишком далёк от исходного условия", similarity=round(similarity, 2))
+        return None
+
+    return {
+        "level": task["level"],
+        "title": task.get("title"),
+        "statement": statement,
+        "word_slots": word_slots,
+        "int_slots": int_slots,
+        "code_slots": code_slots,
+        "original": original,
+        "reference_solution": reference,
+        "sample_inputs": [s["input"] for s in samples],
+        "answer_slots": len(set(answers)),
+        # входы исходных тестов (у стресс-тестов — ссылки, см. stress_inputs.py);
+        # ответы для варианта каждый раз считает эталон
+        "tests": [
+            {
+                **({"input_ref": t["input_ref"]} if "input_ref" in t else {"input": t["input"]}),
+                "stress": bool(t.get("stress")),
+            }
+            for t in task["tests"]
+            if not t.get("synthetic")
+        ],
+    }
+
+
+# --------------------------------
+# ВАРИАНТ ИЗ ШАБЛОНА
+# --------------------------------
+
+def instantiate(template: Dict[str, Any], seed: int) -> Dict[str, Any] | None:
+    """
+    Собираем вариант задачи без LLM. None — если эталон на варианте
+    не отработал на всех тестах или ответы выродились.
+    """
+    rnd = random.Random(seed)
+    values = dict(template["original"])
+
+    group_index: Dict[str, int] = {}
+    for name, slot in template["word_slots"].items():
+        index = group_index.setdefault(slot["group"], rnd.randrange(len(slot["values"])))
+        values[name] = slot["values"][index % len(slot["values"])]
+    for name, slot in template["int_slots"].items():
+        values[name] = rnd.randint(slot["min"], slot["max"])
+
+    reference = _render_code(template["reference_solution"], template["code_slots"], values)
+
+    template_tests = STRESS_INPUTS.resolve(template["tests"])
+    inputs = template["sample_inputs"] + [t["input"] for t in template_tests]
+    outputs = [got for got, _ in run_reference(reference, inputs)]
+    if any(got is None for got in outputs):
+        return None
+    sample_outputs = outputs[: len(template["sample_inputs"])]
+    test_outputs = outputs[len(template["sample_inputs"]) :]
+
+    # константа могла сделать задачу тривиальной: один и тот же ответ на всё
+    if template["int_slots"] and len(test_outputs) > 3 and len(set(test_outputs)) == 1:
+        return None
+
+    for i, got in enumerate(sample_outputs[: template["answer_slots"]], start=1):
+        values[f"answer_{i}"] = got
+
+    task = {
+        "level": template["level"],
+        "statement": _render_statement(template["statement"], values),
+        "samples": [
+            {"input": inp, "output": f"{got}\n"}
+            for inp, got in zip(template["sample_inputs"], sample_outputs)
+        ],
+        "tests": [
+            {"input": t["input"], "output": f"{got}\n", **({"stress": True} if t["stress"] else {})}
+            for t, got in zip(template_tests, test_outputs)
+        ],
+        "reference_solution": reference,
+        "variant": {
+            "seed": seed,
+            "slots": {k: v for k, v in values.items() if not _ANSWER_SLOT_RE.match(k)},
+        },
+    }
+    if template.get("title"):
+        task["title"] = template["title"]
+
+    add_synthetic_tests(task, seed=seed)
+    calibrate_time_limit(task)
+    task["tests"] = STRESS_INPUTS.externalize(task["tests"])
+    return task
+
+
+# --------------------------------
+# БАНК ШАБЛОНОВ
+# --------------------------------
+
+class TaskBank:
+    def __init__(self, path: Path = TASK_BANK_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS templates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                vacancy_fp TEXT NOT NULL,
+                level TEXT NOT NULL,
+                data TEXT NOT NULL,
+                variants INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn().execute(
+            "CREATE INDEX IF NOT EXISTS templates_vacancy ON templates (vacancy_fp, level)"
+        )
+
+    def _conn(self):
+        cached = getattr(self._local, "conn", None)
+        if cached is not None and cached[0] == os.getpid():
+            return cached[1]
+        conn = connect(self.path)
+        self._local.conn = (os.getpid(), conn)
+        return conn
+
+    def add(self, vacancy_fp: str, template: Dict[str, Any]) -> int:
+        cur = self._conn().execute(
+            "INSERT INTO templates (vacancy_fp, level, data, created_at) VALUES (?, ?, ?, ?)",
+            (vacancy_fp, template["level"], json.dumps(template, ensure_ascii=False), time.time()),
+        )
+        return cur.lastrowid
+
+    def templates(self, vacancy_fp: str, level: str) -> List[Dict[str, Any]]:
+        """Шаблоны вакансии: сначала те, из которых собрали меньше вариантов."""
+        rows = self._conn().execute(
+            """
+            SELECT id, data FROM templates WHERE vacancy_fp = ? AND level = ?
+            ORDER BY variants, random()
+            """,
+            (vacancy_fp, level),
+        ).fetchall()
+        return [{"id": r["id"], **json.loads(r["data"])} for r in rows]
+
+    def mark_used(self, template_id: int) -> None:
+        self._conn().execute(
+            "UPDATE templates SET variants = variants + 1 WHERE id = ?", (template_id,)
+        )
+
+    def count(self, vacancy_fp: str) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM templates WHERE vacancy_fp = ?", (vacancy_fp,)
+        ).fetchone()[0]
+
+
+TASK_BANK = TaskBank()
+
+
+# --------------------------------
+# ЗАДАЧИ ДЛЯ ИНТЕРВЬЮ: ШАБЛОНЫ, А ЕСЛИ ИХ НЕТ — LLM
+# --------------------------------
+
+def _variant_from_bank(template: Dict[str, Any]) -> Dict[str, Any] | None:
+    with span("task.variant", template_id=template["id"]) as s:
+        for attempt in range(1, VARIANT_ATTEMPTS + 1):
+            task = instantiate(template, seed=secrets.randbits(32))
+            if task is not None:
+                task["template_id"] = template["id"]
+                TASK_BANK.mark_used(template["id"])
+                s.set("attempts", attempt)
+                s.set("outcome", "ok")
+                return task
+        s.set("outcome", "rejected")
+    log.warning("Из шаблона не собрался вариант", template_id=template["id"])
+    return None
+
+
+def _remember_template(vacancy_fp: str, task: Dict[str, Any]) -> int | None:
+    """Id нового шаблона. Сбой шаблонизации не должен терять уже проверенную задачу."""
+    with span("task.templatize", level=task["level"]) as s:
+        try:
+            template = build_template(task)
+        except Exception as e:
+            log.warning("Не удалось построить шаблон задачи", level=task["level"], error=str(e))
+            s.set("outcome", "error")
+            return None
+        if template is None:
+            s.set("outcome", "rejected")
+            return None
+        template_id = TASK_BANK.add(vacancy_fp, template)
+        s.set("outcome", "ok")
+        s.set("template_id", template_id)
+        log.info("Задача сохранена как шаблон", template_id=template_id, level=task["level"])
+        return template_id
+
+
+def generate_interview_tasks(vacancy_text: str, bank_only: bool = False) -> Dict | None:
+    """
+    Как generation.generate_interview_tasks, но сначала берём варианты
+    шаблонов этой вакансии (разные шаблоны на разные задачи интервью).
+    Недостающие задачи генерирует LLM, и они тут же становятся шаблонами.
+    bank_only — без LLM: если банк не покрывает все задачи, None.
+    """
+    label_levels = ["easy", "easy", "easy"]
+    vacancy_fp = vacancy_fingerprint(vacancy_text)
+    tasks = []
+    used_templates = set()
+
+    for label in label_levels:
+        task = None
+        if USE_TASK_TEMPLATES:
+            for template in TASK_BANK.templates(vacancy_fp, label):
+                if template["id"] in used_templates:
+                    continue
+                used_templates.add(template["id"])
+                task = _variant_from_bank(template)
+                if task is not None:
+                    break
+
+        if task is None and bank_only:
+            return None
+        if task is None:
+            task = generate_verified_task(vacancy_text, level_for_prompt=label, max_task_attempts=20)
+            if USE_TASK_TEMPLATES:
+                template_id = _remember_template(vacancy_fp, task)
+                # в этом же интервью вариант той же задачи не нужен
+                used_templates.add(template_id)
+                if template_id is not None:
+                    # исходная задача и её будущие варианты — одна задача для plagiarism.py
+                    task["template_id"] = template_id
+
+        task["level"] = label
+        tasks.append(task)
+
+    return {
+        "vacancy": vacancy_text,
+        "tasks": tasks,
+    }
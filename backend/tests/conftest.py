@@ -0,0 +1,13 @@
+# conftest.py
+import sys
+from pathlib import Path
+
+# модули бэка импортируют друг друга плоско (from ratelimit import ...),
+# как при запуске из папки backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# llm.py создаёт клиента OpenAI при импорте, а без ключа клиент не создаётся.
+# Тесты в LLM не ходят — без настоящего ключа (tokenn.py) подставляем заглушку
+import tokenn  # noqa: E402
+
+tokenn.API_KEY = tokenn.API_KEY or "test-key"
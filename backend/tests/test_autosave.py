@@ -0,0 +1,142 @@
+# test_autosave.py
+import pytest
+
+import autosave
+from ratelimit import LRUCache
+
+
+def _fresh_cache():
+    return LRUCache(max_entries=100)
+
+
+@pytest.fixture(autouse=True)
+def autosave_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(autosave, "AUTOSAVE_DIR", tmp_path)
+    monkeypatch.setattr(autosave, "_snapshots", _fresh_cache())
+    return tmp_path
+
+
+def _delta(start, end, text, kind="coding", level="easy"):
+    return {"kind": kind, "level": level, "start": start, "end": end, "text": text}
+
+
+def test_apply_deltas_splices_text():
+    snapshot = autosave._empty_snapshot()
+    autosave._apply_deltas(snapshot, [_delta(0, 0, "print(1)")])
+    autosave._apply_deltas(snapshot, [_delta(6, 7, "42")])
+    assert snapshot["coding"]["easy"] == "print(42)"
+
+
+def test_apply_deltas_counts_code_points():
+    # фронт шлёт позиции по Array.from: эмодзи — одна позиция, не две
+    snapshot = autosave._empty_snapshot()
+    snapshot["theory"]["hard"] = "😀ab"
+    autosave._apply_deltas(snapshot, [_delta(1, 2, "x", kind="theory", level="hard")])
+    assert snapshot["theory"]["hard"] == "😀xb"
+
+
+@pytest.mark.parametrize(
+    "delta",
+    [
+        _delta(0, 1, "x"),
+        _delta(2, 1, "x"),
+        _delta(0, 0, "x", kind="essay"),
+    ],
+)
+def test_apply_deltas_rejects_bad_delta(delta):
+    with pytest.raises(ValueError):
+        autosave._apply_deltas(autosave._empty_snapshot(), [delta])
+
+
+def test_append_and_load():
+    assert autosave.append_deltas("tok", 0, [_delta(0, 0, "abc")]) == 1
+    assert autosave.append_deltas("tok", 1, [_delta(0, 0, "d", kind="theory")]) == 2
+
+    saved = autosave.load_snapshot("tok")
+    assert saved == {
+        "version": 2,
+        "coding_solutions": {"easy": "abc"},
+        "theory_solutions": {"easy": "d"},
+    }
+
+
+def test_stale_version_conflicts():
+    autosave.append_deltas("tok", 0, [_delta(0, 0, "abc")])
+    with pytest.raises(autosave.AutosaveConflict) as e:
+        autosave.append_deltas("tok", 0, [_delta(0, 0, "zzz")])
+    assert e.value.current_version == 1
+    assert autosave.load_snapshot("tok")["coding_solutions"]["easy"] == "abc"
+
+
+def test_bad_delta_does_not_bump_version():
+    autosave.append_deltas("tok", 0, [_delta(0, 0, "abc")])
+    with pytest.raises(ValueError):
+        autosave.append_deltas("tok", 1, [_delta(0, 0, "ok"), _delta(10, 11, "x")])
+    assert autosave.load_snapshot("tok")["version"] == 1
+    assert autosave.append_deltas("tok", 1, [_delta(3, 3, "d")]) == 2
+
+
+def test_snapshot_rebuilt_from_log():
+    # другой процесс / вытеснение из LRU: снимок собирается из лога заново
+    autosave.append_deltas("tok", 0, [_delta(0, 0, "abc")])
+    autosave.append_deltas("tok", 1, [_delta(1, 2, "B")])
+    autosave._snapshots = _fresh_cache()
+    assert autosave.load_snapshot("tok")["coding_solutions"] == {"easy": "aBc"}
+
+
+def test_discard_removes_log():
+    autosave.append_deltas("tok", 0, [_delta(0, 0, "abc")])
+    autosave.discard("tok")
+    assert autosave.load_snapshot("tok")["version"] == 0
+
+
+def test_similar_tokens_get_separate_logs():
+    # a-b и a_b раньше санитизировались в одно имя файла
+    autosave.append_deltas("a-b", 0, [_delta(0, 0, "first")])
+    autosave.append_deltas("a_b", 0, [_delta(0, 0, "second")])
+    assert autosave._log_path("a-b") != autosave._log_path("a_b")
+    assert autosave.load_snapshot("a-b")["coding_solutions"] == {"easy": "first"}
+    assert autosave.load_snapshot("a_b")["coding_solutions"] == {"easy": "second"}
+
+
+def test_log_compacted_past_threshold(monkeypatch):
+    monkeypatch.setattr(autosave, "AUTOSAVE_COMPACT_BYTES", 200)
+    text = ""
+    for version in range(20):
+        chunk = f"line {version}\n"
+        autosave.append_deltas("tok", version, [_delta(len(text), len(text), chunk)])
+        text += chunk
+
+    assert autosave._log_path("tok").stat().st_size < 200 + len(text)
+    # снимок, собранный из сжатого лога, совпадает с накопленным
+    autosave._snapshots = _fresh_cache()
+    saved = autosave.load_snapshot("tok")
+    assert saved["version"] == 20
+    assert saved["coding_solutions"] == {"easy": text}
+
+
+def test_stale_snapshot_rereads_compacted_log(monkeypatch):
+    # другой процесс сжал лог: наш снимок с offset от старого файла
+    # должен перечитаться с начала нового
+    autosave.append_deltas("tok", 0, [_delta(0, 0, "abc")])
+    ours = autosave._snapshots
+    autosave._snapshots = _fresh_cache()
+
+    monkeypatch.setattr(autosave, "AUTOSAVE_COMPACT_BYTES", 0)
+    autosave.append_deltas("tok", 1, [_delta(3, 3, "def")])
+    autosave.append_deltas("tok", 2, [_delta(6, 6, "g")])
+
+    autosave._snapshots = ours
+    assert autosave.load_snapshot("tok")["coding_solutions"] == {"easy": "abcdefg"}
+    assert autosave.append_deltas("tok", 3, [_delta(0, 0, ">")]) == 4
+
+
+def test_reused_inode_does_not_trust_stale_offset():
+    # inode совпал (новый файл занял inode удалённого), а содержимое другое
+    autosave.append_deltas("tok", 0, [_delta(0, 0, "abc")])
+    autosave.append_deltas("tok", 1, [_delta(3, 3, "def")])
+    snapshot = autosave._snapshots.get("tok")
+    autosave._compact("tok", dict(snapshot))
+    snapshot["inode"] = autosave._log_path("tok").stat().st_ino
+    snapshot["offset"] = 1
+    assert autosave.load_snapshot("tok")["coding_solutions"] == {"easy": "abcdef"}
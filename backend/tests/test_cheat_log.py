@@ -0,0 +1,119 @@
+# test_cheat_log.py
+import os
+import threading
+
+import pytest
+
+import cheat_log
+from ratelimit import LRUCache
+
+
+@pytest.fixture(autouse=True)
+def log_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cheat_log, "CHEAT_LOG_DIR", tmp_path)
+    monkeypatch.setattr(cheat_log, "_counters", LRUCache(max_entries=100))
+    monkeypatch.setattr(cheat_log, "_pending", {})
+    monkeypatch.setattr(cheat_log, "_pending_count", 0)
+    monkeypatch.setattr(cheat_log, "_dropped", 0)
+    # фоновый сбрасыватель не запускаем, а уже запущенный другими тестами
+    # глушим: сбрасываем только вручную, из потока теста
+    monkeypatch.setattr(cheat_log, "_flusher_pid", os.getpid())
+    test_thread = threading.get_ident()
+    real_flush = cheat_log.flush
+    monkeypatch.setattr(
+        cheat_log, "flush",
+        lambda token=None: real_flush(token) if threading.get_ident() == test_thread else None,
+    )
+    return tmp_path
+
+
+def _events(*types):
+    return [{"type": t, "time": "2026-01-01T10:00:00"} for t in types]
+
+
+def _lines(token):
+    return cheat_log._log_path(token).read_text(encoding="utf-8").splitlines()
+
+
+def test_record_buffers_until_flush():
+    assert cheat_log.record("tok", _events("window_blur", "paste")) == 2
+    assert cheat_log.record("tok", _events("copy")) == 1
+    assert cheat_log.record("other", _events("paste")) == 1
+    assert not cheat_log._log_path("tok").exists()
+    assert cheat_log._pending_count == 4
+
+    cheat_log.flush()
+
+    # все пачки токена — одной дозаписью
+    assert [line.split("\t")[2] for line in _lines("tok")] == ["window_blur", "paste", "copy"]
+    assert len(_lines("other")) == 1
+    assert cheat_log._pending == {} and cheat_log._pending_count == 0
+
+
+def test_flush_of_one_token_keeps_the_rest_buffered():
+    cheat_log.record("tok", _events("paste"))
+    cheat_log.record("other", _events("copy", "copy"))
+
+    cheat_log.flush("tok")
+
+    assert len(_lines("tok")) == 1
+    assert not cheat_log._log_path("other").exists()
+    assert cheat_log._pending_count == 2
+
+
+def test_summary_counts_unflushed_and_new_events():
+    cheat_log.record("tok", _events("paste", "window_blur", "paste"))
+    summary = cheat_log.summary("tok")
+    assert summary["total"] == 3
+    assert summary["by_type"] == {"paste": 2, "window_blur": 1}
+    assert summary["first_at"] <= summary["last_at"]
+
+    # счётчики дочитывают только новый хвост лога
+    offset = cheat_log._counters.get("tok")["offset"]
+    cheat_log.record("tok", _events("copy"))
+    summary = cheat_log.summary("tok")
+    assert summary["total"] == 4
+    assert summary["by_type"]["copy"] == 1
+    assert cheat_log._counters.get("tok")["offset"] > offset
+
+
+def test_summary_skips_line_still_being_written():
+    cheat_log.record("tok", _events("paste"))
+    cheat_log.flush()
+    with open(cheat_log._log_path("tok"), "a", encoding="utf-8") as f:
+        f.write("123\t\tcop")
+
+    assert cheat_log.summary("tok")["total"] == 1
+
+    with open(cheat_log._log_path("tok"), "a", encoding="utf-8") as f:
+        f.write("y\n")
+    assert cheat_log.summary("tok")["by_type"] == {"paste": 1, "copy": 1}
+
+
+def test_separators_are_stripped_from_values():
+    cheat_log.record("tok", [{"type": "pa\tste\nx", "time": "10:00\t\n"}])
+    cheat_log.flush()
+    (line,) = _lines("tok")
+    assert line.split("\t")[1:] == ["10:00", "pa ste x"]
+
+
+def test_full_buffer_drops_extra_events(monkeypatch):
+    monkeypatch.setattr(cheat_log, "MAX_BUFFERED_EVENTS", 3)
+    assert cheat_log.record("tok", _events("a", "b")) == 2
+    assert cheat_log.record("tok", _events("c", "d", "e")) == 1
+    # _dropped не проверяем: его обнуляет (и пишет в лог) фоновый сбрасыватель
+    assert cheat_log._pending_count == 3
+    assert cheat_log.summary("tok")["total"] == 3
+
+
+def test_discard_drops_buffer_counters_and_log():
+    cheat_log.record("tok", _events("paste"))
+    cheat_log.summary("tok")
+    cheat_log.record("tok", _events("copy"))
+
+    cheat_log.discard("tok")
+
+    assert not cheat_log._log_path("tok").exists()
+    assert cheat_log._counters.get("tok") is None
+    assert cheat_log._pending_count == 0
+    assert cheat_log.summary("tok")["total"] == 0
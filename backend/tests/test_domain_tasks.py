@@ -0,0 +1,123 @@
+# test_domain_tasks.py
+import pytest
+
+import domain_tasks_generator as dtg
+
+
+class ScoreByIndex(dtg.QuestionValidator):
+    """Оценки по порядку вопросов в пачке."""
+
+    name = "scores"
+
+    def __init__(self, scores):
+        self.scores = list(scores)
+        self.calls = 0
+
+    def validate(self, vacancy, level, qas):
+        self.calls += 1
+        scores, self.scores = self.scores[: len(qas)], self.scores[len(qas):]
+        return [{"final_score": s, "comment": ""} for s in scores]
+
+
+@pytest.fixture
+def generated(monkeypatch):
+    counts = []
+
+    def fake_batch(vacancy, level, count, model=dtg.TEXT_MODEL):
+        counts.append(count)
+        return [
+            {"question": f"q{len(counts)}.{i}", "reference_answer": "a"} for i in range(count)
+        ]
+
+    monkeypatch.setattr(dtg, "generate_domain_questions_batch", fake_batch)
+    monkeypatch.setattr(dtg, "cascade", lambda stage, model, fn: fn(model))
+    return counts
+
+
+def test_one_question_is_picked_from_a_full_batch(generated):
+    validator = ScoreByIndex([70, 90, 40])
+    tasks = dtg.generate_domain_tasks("vac", "easy", target_count=1, batch_size=3,
+                                      validator=validator)
+
+    assert generated == [3]
+    assert validator.calls == 1
+    assert [t["question"] for t in tasks] == ["q1.1"]
+    assert tasks[0]["final_score"] == 90
+
+
+def test_more_rounds_until_target(generated):
+    validator = ScoreByIndex([10, 20, 30, 80, 10, 75])
+    tasks = dtg.generate_domain_tasks("vac", "hard", target_count=2, batch_size=3,
+                                      validator=validator)
+
+    assert generated == [3, 3]
+    assert [t["final_score"] for t in tasks] == [80, 75]
+
+
+def test_max_attempts_caps_the_last_round(generated):
+    validator = ScoreByIndex([0] * 10)
+    tasks = dtg.generate_domain_tasks("vac", "easy", target_count=1, batch_size=3,
+                                      max_attempts=5, validator=validator)
+
+    assert tasks == []
+    assert generated == [3, 2]
+
+
+def test_roleplay_round_answers_the_whole_batch_in_one_request(monkeypatch):
+    calls = []
+
+    def fake_complete(template, **values):
+        calls.append(template.name)
+        if template.name == "candidate_answers_batch":
+            # на второй вопрос модель не ответила — его доспросим поштучно
+            return '{"answers": [{"id": 1, "answer": "a1"}, {"id": 3, "answer": "a3"}]}'
+        return "a2"
+
+    monkeypatch.setattr(dtg, "complete", fake_complete)
+    graded = []
+    monkeypatch.setattr(
+        dtg, "grade_candidate_answers_batch",
+        lambda vacancy, items: graded.extend(items) or [{"final_score": 70, "comment": ""}] * len(items),
+    )
+
+    qas = [{"question": f"q{i}", "reference_answer": "r"} for i in range(1, 4)]
+    results = dtg.RoleplayValidator().validate("vac", "easy", qas)
+
+    assert calls == ["candidate_answers_batch", "candidate_answer"]
+    assert [it["candidate_answer"] for it in graded] == ["a1", "a2", "a3"]
+    assert [r["candidate_answer"] for r in results] == ["a1", "a2", "a3"]
+
+
+def test_validator_must_implement_validate():
+    class Incomplete(dtg.QuestionValidator):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize(
+    "reply",
+    [
+        '[{"id": 1, "correctness": 80, "optimality": 80}]',
+        '{"grades": {"1": {"correctness": 80, "optimality": 80}}}',
+        '{"grades": "всё хорошо"}',
+        '{"grades": [{"id": 1}, {"id": "x", "correctness": 80, "optimality": 80}, 7]}',
+    ],
+)
+def test_malformed_batch_grades_fall_back_to_single_grading(monkeypatch, reply):
+    monkeypatch.setattr(dtg, "complete", lambda template, **values: reply)
+    single = []
+    monkeypatch.setattr(
+        dtg, "grade_candidate_answer_routed",
+        lambda vacancy, item: single.append(item["question"]) or {"final_score": 50, "comment": ""},
+    )
+
+    items = [
+        {"level": "easy", "question": f"q{i}", "reference_answer": "r", "candidate_answer": "a"}
+        for i in (1, 2)
+    ]
+    grades = dtg.grade_candidate_answers_batch("vac", items)
+
+    assert single == ["q1", "q2"]
+    assert [g["final_score"] for g in grades] == [50, 50]
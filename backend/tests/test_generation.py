@@ -0,0 +1,40 @@
+# test_generation.py
+from generation import reconcile_with_agreement, run_reference, outputs_match_tests
+
+SUM = "def solve():\n    n = int(input())\n    return sum(map(int, input().split()))\n"
+
+
+def _t(inp, out):
+    return {"input": inp, "output": out}
+
+
+def test_single_run_feeds_both_checks():
+    tests = [_t("2\n1 2\n", "3\n"), _t("3\n1 1 1\n", "3\n")]
+    outputs = [got for got, _ in run_reference(SUM, [t["input"] for t in tests])]
+    assert outputs == [3, 3]
+    assert outputs_match_tests(tests, outputs)
+
+
+def test_tests_passed_rejects_mismatch_and_failures():
+    tests = [_t("1\n5\n", "5\n"), _t("1\n6\n", "6\n")]
+    assert not outputs_match_tests(tests, [5, 7])
+    assert not outputs_match_tests(tests, [5, None])
+    assert not outputs_match_tests([_t("1\n5\n", "пять")], [5])
+    # раннер вернул не все ответы
+    assert not outputs_match_tests(tests, [5])
+
+
+def test_reconcile_drops_disputed_tests():
+    tests = [_t(f"1\n{i}\n", f"{i}\n") for i in range(6)]
+    tests[2]["output"] = "100\n"
+    outputs = list(range(6))
+    assert reconcile_with_agreement(tests, outputs, list(outputs)) == tests[:2] + tests[3:]
+
+
+def test_reconcile_needs_agreement():
+    tests = [_t(f"1\n{i}\n", f"{i}\n") for i in range(6)]
+    outputs = list(range(6))
+    assert reconcile_with_agreement(tests, outputs, outputs[:-1] + [9]) is None
+    assert reconcile_with_agreement(tests, [None] * 6, [None] * 6) is None
+    # спорных больше трети — скорее ошиблись решения, а не тесты
+    assert reconcile_with_agreement(tests, [9] * 6, [9] * 6) is None
@@ -0,0 +1,91 @@
+# test_http_cache.py
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import http_cache
+
+PAYLOAD = {"token": "tok", "statement": "Посчитайте сумму чисел. " * 100}
+
+
+class FakeBrotli:
+    """Вместо brotli: метка перед телом, чтобы отличать кодировку в тестах."""
+
+    @staticmethod
+    def compress(body, quality):
+        return b"BR" + body
+
+
+@pytest.fixture
+def client():
+    snapshots = {}
+    app = FastAPI()
+
+    @app.get("/snapshot")
+    def get_snapshot(request: Request):
+        if "snap" not in snapshots:
+            snapshots["snap"] = http_cache.prerender(PAYLOAD)
+        return http_cache.snapshot_response(request, snapshots["snap"])
+
+    return TestClient(app)
+
+
+def _get(client, encoding, **headers):
+    return client.get("/snapshot", headers={"Accept-Encoding": encoding, **headers})
+
+
+def test_not_modified_when_etag_matches(client):
+    first = _get(client, "identity")
+    assert first.status_code == 200
+    assert first.json() == PAYLOAD
+    etag = first.headers["ETag"]
+
+    for if_none_match in (etag, f'"other", {etag}', "*"):
+        again = _get(client, "identity", **{"If-None-Match": if_none_match})
+        assert again.status_code == 304
+        assert again.content == b""
+        assert again.headers["ETag"] == etag
+
+    assert _get(client, "identity", **{"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_each_encoding_has_its_own_etag(client):
+    plain = _get(client, "identity")
+    zipped = _get(client, "gzip")
+
+    assert "Content-Encoding" not in plain.headers
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert zipped.json() == PAYLOAD
+    assert plain.headers["ETag"] != zipped.headers["ETag"]
+    assert plain.headers["Vary"] == zipped.headers["Vary"] == "Accept-Encoding"
+    # сжатые байты с кэша не подходят клиенту без gzip, и наоборот
+    assert _get(client, "identity", **{"If-None-Match": zipped.headers["ETag"]}).status_code == 200
+    assert _get(client, "gzip", **{"If-None-Match": plain.headers["ETag"]}).status_code == 200
+
+
+def test_br_is_refused_without_brotli(client, monkeypatch):
+    monkeypatch.setattr(http_cache, "brotli", None)
+    assert http_cache.prerender(PAYLOAD)["br"] is None
+    assert http_cache.negotiate_encoding("br") == "identity"
+    assert http_cache.negotiate_encoding("br, gzip") == "gzip"
+
+    response = _get(client, "br, gzip")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json() == PAYLOAD
+    assert "Content-Encoding" not in _get(client, "br").headers
+
+
+def test_br_is_served_with_brotli(monkeypatch):
+    monkeypatch.setattr(http_cache, "brotli", FakeBrotli())
+    snapshot = http_cache.prerender(PAYLOAD)
+    assert snapshot["br"] == b"BR" + snapshot["identity"]
+    assert gzip.decompress(snapshot["gzip"]) == snapshot["identity"]
+    assert http_cache.negotiate_encoding("gzip, br") == "br"
+    assert http_cache.negotiate_encoding("br;q=0, gzip") == "gzip"
+
+
+def test_small_bodies_are_not_compressed():
+    snapshot = http_cache.prerender({"ok": True})
+    assert snapshot["gzip"] is None and snapshot["br"] is None
@@ -0,0 +1,81 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import autosave
+import backend
+import cheat_log
+import interview_lifecycle
+from interview_lifecycle import InterviewArchive
+from interview_store import STATUS_CREATED, InterviewStore
+from ratelimit import LRUCache
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    interviews = InterviewStore(tmp_path / "interviews.db")
+    monkeypatch.setattr(interview_lifecycle, "INTERVIEWS", interviews)
+    monkeypatch.setattr(interview_lifecycle, "INTERVIEW_ARCHIVE", InterviewArchive(tmp_path / "archive.db"))
+    monkeypatch.setattr(interview_lifecycle, "_LIVE", LRUCache(max_entries=100))
+    monkeypatch.setattr(autosave, "AUTOSAVE_DIR", tmp_path / "autosaves")
+    monkeypatch.setattr(cheat_log, "CHEAT_LOG_DIR", tmp_path / "cheat_events")
+    (tmp_path / "autosaves").mkdir()
+    (tmp_path / "cheat_events").mkdir()
+    interviews["tok"] = {"token": "tok", "coding_tasks": [], "theory_tasks": []}
+    return interviews
+
+
+def _archive(store, token):
+    (row,) = [r for r in store.expired(STATUS_CREATED, float("inf"), 10) if r["token"] == token]
+    assert interview_lifecycle._archive(token, STATUS_CREATED, row["status_at"])
+
+
+def test_live_check_is_cached_and_dropped_on_archive(store):
+    assert not interview_lifecycle.known_live("tok")
+    assert interview_lifecycle.check_live("tok")
+    assert interview_lifecycle.known_live("tok")
+
+    _archive(store, "tok")
+    assert not interview_lifecycle.known_live("tok")
+    assert not interview_lifecycle.check_live("tok")
+
+
+def test_cheat_events_are_rejected_after_archive(store):
+    client = TestClient(backend.app)
+    event = {"type": "window_blur"}
+    assert client.post("/api/interview/tok/cheat-event", json=event).status_code == 202
+
+    _archive(store, "tok")
+    assert client.post("/api/interview/tok/cheat-event", json=event).status_code == 404
+    assert client.post("/api/interview/missing/cheat-event", json=event).status_code == 404
+
+
+def test_report_is_visible_only_to_the_interview_company(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(backend, "DB_PATH", tmp_path / "hr_users.db")
+    monkeypatch.setattr(backend, "HR_COMPANIES", LRUCache(max_entries=100))
+    monkeypatch.setattr(backend, "INTERVIEWS", store)
+    monkeypatch.setattr(backend, "INTERVIEW_ARCHIVE", interview_lifecycle.INTERVIEW_ARCHIVE)
+    monkeypatch.setattr(backend.PLAGIARISM_INDEX, "matches_for", lambda token: [])
+    backend.init_db()
+    client = TestClient(backend.app)
+
+    sessions = {}
+    for email, company in (("owner@example.com", "Acme"), ("other@example.com", "Rival")):
+        client.post("/api/hr/register", json={
+            "email": email, "password": "password123", "confirm_password": "password123",
+            "company": company,
+        })
+        login = client.post("/api/hr/login", json={"email": email, "password": "password123"})
+        sessions[company] = {"Authorization": f"Bearer {login.json()['session_token']}"}
+
+    store["tok"] = {**store["tok"], "company": "acme", "report": {"coding": []}}
+    path = "/api/hr/interviews/tok/report"
+
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=sessions["Rival"]).status_code == 404
+    response = client.get(path, headers=sessions["Acme"])
+    assert response.status_code == 200
+    assert response.json()["archived"] is False
+
+    _archive(store, "tok")
+    assert client.get(path, headers=sessions["Rival"]).status_code == 404
+    assert client.get(path, headers=sessions["Acme"]).json()["archived"] is True
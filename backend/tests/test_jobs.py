@@ -0,0 +1,180 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend
+import jobs
+
+
+@pytest.fixture(autouse=True)
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_DB_PATH", tmp_path / "jobs.db")
+    jobs.init_queue()
+
+
+def _expire_lease(job_id):
+    conn = jobs._connect()
+    try:
+        conn.execute("UPDATE jobs SET lease_until = ? WHERE id = ?", (time.time() - 1, job_id))
+    finally:
+        conn.close()
+
+
+def test_claim_leases_job_to_one_worker():
+    job_id = jobs.enqueue("check_interview", {"token": "t"})
+    job = jobs.claim("w1")
+    assert job["id"] == job_id
+    assert job["status"] == jobs.STATUS_RUNNING
+    assert job["worker"] == "w1"
+    # аренда ещё действует — второй воркер задачу не получит
+    assert jobs.claim("w2") is None
+
+
+def test_expired_lease_is_reclaimed_by_another_worker():
+    job_id = jobs.enqueue("check_interview", {"token": "t"})
+    jobs.claim("w1")
+    _expire_lease(job_id)
+
+    job = jobs.claim("w2")
+    assert job["id"] == job_id
+    assert job["worker"] == "w2"
+    assert job["attempts"] == 2
+    # продлевать аренду может только текущий воркер
+    jobs.extend_lease(job_id, "w1")
+    assert jobs.get_job(job_id)["lease_until"] == job["lease_until"]
+
+
+def test_job_fails_after_max_attempts():
+    job_id = jobs.enqueue("check_interview", {"token": "t"})
+    for attempt in range(jobs.MAX_ATTEMPTS):
+        assert jobs.claim(f"w{attempt}")["id"] == job_id
+        _expire_lease(job_id)
+
+    assert jobs.claim("last") is None
+    assert jobs.get_status(job_id) == jobs.STATUS_FAILED
+
+
+def test_claim_takes_higher_priority_first():
+    low = jobs.enqueue("generate_interview", {}, priority=2)
+    high = jobs.enqueue("check_interview", {}, priority=0)
+    assert jobs.claim("w")["id"] == high
+    assert jobs.claim("w", max_priority=1) is None
+    assert jobs.claim("w")["id"] == low
+
+
+def test_public_id_is_random_and_resolves_job():
+    first = jobs.get_job(jobs.enqueue("check_interview", {}, owner="interview:a"))
+    second = jobs.get_job(jobs.enqueue("check_interview", {}, owner="interview:b"))
+    assert len(first["public_id"]) >= 20
+    assert first["public_id"] != second["public_id"]
+    assert jobs.get_job_by_public_id(second["public_id"])["owner"] == "interview:b"
+
+
+def test_purge_removes_only_old_finished_jobs():
+    done = jobs.enqueue("check_interview", {})
+    jobs.finish(done, {"ok": True})
+    queued = jobs.enqueue("check_interview", {})
+
+    assert jobs.purge(time.time() - 3600) == 0
+    assert jobs.purge(time.time() + 1) == 1
+    assert jobs.get_job(done) is None
+    assert jobs.get_status(queued) == jobs.STATUS_QUEUED
+    assert jobs.wait_for(done, timeout=0) is None
+
+
+# --------------------------------
+# /api/jobs/{job_id}
+# --------------------------------
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(backend, "DB_PATH", tmp_path / "hr_users.db")
+    backend.init_db()
+    return TestClient(backend.app)
+
+
+def _job(owner):
+    job = jobs.get_job(jobs.enqueue("generate_interview", {"vacancy": "x"}, owner=owner))
+    jobs.finish(job["id"], {"token": "secret", "reference_solution": "print(1)"})
+    return job["public_id"]
+
+
+def test_generation_job_is_visible_only_to_its_hr(client):
+    public_id = _job("hr:owner@example.com")
+    owner = {"Authorization": f"Bearer {backend.create_hr_session('owner@example.com')}"}
+    other = {"Authorization": f"Bearer {backend.create_hr_session('other@example.com')}"}
+
+    response = client.get(f"/api/jobs/{public_id}", headers=owner)
+    assert response.status_code == 200
+    assert response.json()["result"]["token"] == "secret"
+
+    assert client.get(f"/api/jobs/{public_id}", headers=other).status_code == 404
+    assert client.get(f"/api/jobs/{public_id}").status_code == 404
+    assert client.get("/api/jobs/1", headers=owner).status_code == 404
+
+
+def test_check_job_is_visible_only_with_interview_token(client):
+    public_id = _job("interview:tok-1")
+    assert client.get(
+        f"/api/jobs/{public_id}", headers={"X-Interview-Token": "tok-1"}
+    ).status_code == 200
+    assert client.get(
+        f"/api/jobs/{public_id}", headers={"X-Interview-Token": "tok-2"}
+    ).status_code == 404
+
+
+def test_generation_requires_hr_session(client):
+    response = client.post("/api/generate-tasks", json={"vacancy": "Python"})
+    assert response.status_code == 401
+
+
+def test_generation_company_comes_from_hr_session(client, monkeypatch):
+    for email, company in (("owner@example.com", "Acme"), ("other@example.com", "Rival")):
+        client.post("/api/hr/register", json={
+            "email": email, "password": "password123", "confirm_password": "password123",
+            "company": company,
+        })
+    session = client.post(
+        "/api/hr/login", json={"email": "owner@example.com", "password": "password123"}
+    ).json()["session_token"]
+
+    submitted = []
+    monkeypatch.setattr(
+        backend.drafts, "submit_draft",
+        lambda draft_id, params, owner: submitted.append(params) or {},
+    )
+    response = client.post(
+        "/api/generate-tasks/draft",
+        # hr_email в теле — от старых клиентов; компанию он больше не выбирает
+        json={"draft_id": "draft-12345", "vacancy": "Python backend " * 5,
+              "hr_email": "other@example.com"},
+        headers={"Authorization": f"Bearer {session}"},
+    )
+    assert response.status_code == 202
+    assert submitted[0]["company"] == "Acme"
+
+
+def test_draft_can_be_cancelled_only_by_its_hr(client, monkeypatch):
+    backend.drafts.init_drafts()
+    vacancy = "Python backend " * 5
+    owner = {"Authorization": f"Bearer {backend.create_hr_session('owner@example.com')}"}
+    other = {"Authorization": f"Bearer {backend.create_hr_session('other@example.com')}"}
+
+    response = client.post("/api/generate-tasks/draft", headers=owner,
+                           json={"draft_id": "draft-12345", "vacancy": vacancy})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    # чужой HR не может ни перехватить, ни отменить черновик
+    assert client.post("/api/generate-tasks/draft", headers=other, json={
+        "draft_id": "draft-12345", "vacancy": "Go backend " * 5,
+    }).json()["status"] == "skipped"
+    assert client.delete("/api/generate-tasks/draft/draft-12345").status_code == 401
+    assert client.delete("/api/generate-tasks/draft/draft-12345", headers=other).status_code == 204
+    assert jobs.get_status(job_id) == jobs.STATUS_QUEUED
+    assert backend.drafts.take_draft("draft-12345", {"vacancy": vacancy},
+                                     owner="hr:other@example.com") is None
+
+    assert client.delete("/api/generate-tasks/draft/draft-12345", headers=owner).status_code == 204
+    assert jobs.get_status(job_id) == jobs.STATUS_CANCELLED
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from llm_budget import CompanyBudgets, charged_to
+
+
+def _budgets(path):
+    budgets = CompanyBudgets(path)
+    # фоновый сброс в тестах не нужен — flush зовём сами
+    budgets._flusher_pid = os.getpid()
+    return budgets
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "llm_budget.db"
+    _budgets(path).set_limits("acme", 36_000, 600)
+    return path
+
+
+def _spend(budgets, company, prompt, completion):
+    with charged_to(company):
+        budgets.before_call()
+        budgets.charge(prompt, completion)
+
+
+def _stored_tokens(budgets, company):
+    row = budgets._conn().execute(
+        "SELECT tokens FROM company_buckets WHERE company = ?", (company,)
+    ).fetchone()
+    return row["tokens"]
+
+
+def test_flush_sums_spending_of_all_processes(db):
+    first, second = _budgets(db), _budgets(db)
+    _spend(first, "acme", 1000, 500)
+    _spend(second, "acme", 2000, 0)
+
+    first.flush()
+    second.flush()
+    # пополнение за время теста — 10 токенов в секунду
+    assert _stored_tokens(first, "acme") == pytest.approx(36_000 - 3500, abs=20)
+
+    # после следующего сброса первый процесс видит и чужой расход
+    first.flush()
+    assert first.tokens_wait("acme") == 0
+    assert first._buckets["acme"].tokens == pytest.approx(36_000 - 3500, abs=20)
+
+
+def test_flush_records_daily_usage_once(db):
+    budgets = _budgets(db)
+    _spend(budgets, "ACME", 100, 50)
+    budgets.flush()
+    budgets.flush()
+
+    (acme,) = [r for r in budgets.report() if r["company"] == "acme"]
+    assert acme["totals"]["requests"] == 1
+    assert acme["totals"]["tokens"] == 150
+
+
+def test_failed_flush_keeps_pending_usage(db, monkeypatch):
+    budgets = _budgets(db)
+    _spend(budgets, "acme", 100, 0)
+
+    def broken_refill(*args):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(budgets, "_refill", broken_refill)
+    with pytest.raises(RuntimeError):
+        budgets.flush()
+    monkeypatch.undo()
+
+    assert budgets._pending["acme"]["prompt_tokens"] == 100
+    budgets.flush()
+    assert budgets._pending == {}
+    assert _stored_tokens(budgets, "acme") == pytest.approx(36_000 - 100, abs=20)
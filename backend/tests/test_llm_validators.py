@@ -0,0 +1,78 @@
+import pytest
+
+from llm import InvalidOutput, JsonObjectValidator, PythonCodeValidator, StreamValidator
+
+
+def feed_by_chunks(validator, text, size=3):
+    """Кормим валидатор так же, как поток: накопленным текстом после каждого куска."""
+    for end in range(size, len(text) + size, size):
+        validator.feed(text[:end])
+        if validator.done:
+            break
+    return validator.result(text)
+
+
+def test_json_object_is_cut_out_of_stream():
+    text = '<think>\n\n</think>\n```json\n{"a": "}{\\"", "b": {"c": 1}}\n```\nпояснение'
+    validator = JsonObjectValidator(required_keys=("a", "b"))
+    assert feed_by_chunks(validator, text) == '{"a": "}{\\"", "b": {"c": 1}}'
+    assert validator.done
+
+
+def test_json_prose_instead_of_object_is_rejected():
+    with pytest.raises(InvalidOutput):
+        feed_by_chunks(JsonObjectValidator(), "Конечно! Вот JSON: {}")
+
+
+def test_json_split_think_tag_is_not_rejected():
+    validator = JsonObjectValidator()
+    validator.feed("<thi")
+    validator.feed("<think>")
+    validator.feed("<think>долго думаем</thi")
+    assert not validator.done
+    validator.feed('<think>долго думаем</think>{"x": 1}')
+    assert validator.done
+
+
+def test_json_missing_keys_and_int_keys():
+    with pytest.raises(InvalidOutput):
+        feed_by_chunks(JsonObjectValidator(required_keys=("score",)), '{"other": 1}')
+    with pytest.raises(InvalidOutput):
+        feed_by_chunks(JsonObjectValidator(int_keys=("score",)), '{"score": "много"}')
+
+
+def test_json_reset_forgets_previous_attempt():
+    validator = JsonObjectValidator()
+    validator.feed('{"a": ')
+    validator.reset()
+    validator.feed('{"b": 2}')
+    assert validator.done
+    assert validator.result('{"b": 2}') == '{"b": 2}'
+
+
+def test_json_feed_scans_only_new_suffix():
+    validator = JsonObjectValidator()
+    text = '{"items": [' + ", ".join(['"x"'] * 2000)
+    for end in range(1, len(text) + 1):
+        validator.feed(text[:end])
+        assert validator._pos == end or validator._start is None
+    validator.feed(text + "]}")
+    assert validator.done
+
+
+def test_python_code_passes_and_prose_is_rejected():
+    code = "```python\nimport sys\nprint(sys.stdin.read())\n```"
+    validator = PythonCodeValidator()
+    assert feed_by_chunks(validator, code) == code
+    with pytest.raises(InvalidOutput):
+        feed_by_chunks(PythonCodeValidator(), "<think></think>Вот решение:\nprint(1)\n")
+    # комментарий по-русски в первой строке — это ещё код
+    feed_by_chunks(PythonCodeValidator(), "# читаем вход\nprint(input())\n")
+
+
+def test_validator_must_implement_feed():
+    class Incomplete(StreamValidator):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
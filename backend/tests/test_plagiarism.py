@@ -0,0 +1,101 @@
+import pytest
+
+from plagiarism import PlagiarismIndex, fingerprints, interview_ref, normalize, task_key
+
+SOLUTION = """
+import sys
+
+def main():
+    data = sys.stdin.read().split()
+    n = int(data[0])
+    values = list(map(int, data[1:1 + n]))
+    best = values[0]
+    current = 0
+    for value in values:
+        current = max(value, current + value)
+        best = max(best, current)
+    print(best)
+
+main()
+"""
+
+RENAMED = """
+import sys
+
+def solve():
+    tokens = sys.stdin.read().split()
+    size = int(tokens[0])
+    arr = list(map(int, tokens[1:1 + size]))
+    answer = arr[0]
+    running = 0
+    for x in arr:
+        running = max(x, running + x)
+        answer = max(answer, running)
+    print(answer)
+
+solve()
+"""
+
+UNRELATED = """
+n = int(input())
+words = [input().strip() for _ in range(n)]
+counts = {}
+for word in words:
+    counts[word] = counts.get(word, 0) + 1
+for word, count in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])):
+    print(word, count)
+"""
+
+TASK = {"statement": "Найдите подмассив с максимальной суммой."}
+
+
+@pytest.fixture
+def index(tmp_path):
+    return PlagiarismIndex(tmp_path / "plagiarism.db")
+
+
+def test_renaming_does_not_change_fingerprints():
+    assert normalize(SOLUTION) == normalize(RENAMED)
+    assert fingerprints(SOLUTION) == fingerprints(RENAMED)
+    assert fingerprints(SOLUTION) != fingerprints(UNRELATED)
+
+
+def test_task_key_groups_template_variants():
+    assert task_key({"template_id": 7, "statement": "a"}) == task_key({"template_id": 7, "statement": "b"})
+    assert task_key({"statement": "a"}) != task_key({"statement": "b"})
+    assert task_key({"statement": " a\n"}) == task_key({"statement": "a"})
+
+
+def test_copy_of_same_task_is_matched_for_both_candidates(index):
+    key = task_key(TASK)
+    assert index.add("tok-a", "easy", key, SOLUTION) == []
+    matches = index.add("tok-b", "easy", key, RENAMED)
+    assert [m["token"] for m in matches] == ["tok-a"]
+    assert matches[0]["similarity"] == 1.0
+
+    report = index.matches_for("tok-a")
+    assert len(report) == 1
+    # токен чужого интервью в отчёт HR не попадает
+    assert report[0]["other_interview"] == interview_ref("tok-b")
+    assert "tok-b" not in str(report)
+
+
+def test_same_code_for_different_tasks_is_not_a_match(index):
+    index.add("tok-a", "easy", task_key({"statement": "задача 1"}), SOLUTION)
+    assert index.add("tok-b", "easy", task_key({"statement": "задача 2"}), RENAMED) == []
+    assert index.matches_for("tok-a") == []
+
+
+def test_resubmission_replaces_old_solution_and_its_matches(index):
+    key = task_key(TASK)
+    index.add("tok-a", "easy", key, SOLUTION)
+    index.add("tok-b", "easy", key, RENAMED)
+    index.add("tok-b", "easy", key, UNRELATED)
+    assert index.matches_for("tok-a") == []
+    assert index.matches_for("tok-b") == []
+
+
+def test_short_solutions_are_not_indexed(index):
+    key = task_key(TASK)
+    assert index.add("tok-a", "easy", key, "print(1)") == []
+    assert index.add("tok-b", "easy", key, "print(1)") == []
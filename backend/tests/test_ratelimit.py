@@ -0,0 +1,34 @@
+from ratelimit import LRUCache, TokenBucketLimiter
+
+
+def test_bucket_limits_and_refills(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("ratelimit.time.monotonic", lambda: now[0])
+    limiter = TokenBucketLimiter(rate=1, burst=2)
+
+    assert limiter.try_acquire("a") == 0.0
+    assert limiter.try_acquire("a") == 0.0
+    assert limiter.try_acquire("a") == 1.0
+    # у другого ключа своё ведро
+    assert limiter.try_acquire("b") == 0.0
+
+    now[0] += 1.0
+    assert limiter.try_acquire("a") == 0.0
+
+
+def test_buckets_are_bounded():
+    limiter = TokenBucketLimiter(rate=1, burst=5, max_keys=100)
+    for i in range(1000):
+        limiter.try_acquire(f"token-{i}")
+    assert len(limiter) == 100
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
@@ -0,0 +1,117 @@
+# test_sandbox.py
+import pytest
+from fastapi.testclient import TestClient
+
+import sandbox
+
+# печатает 10 // n; на входе "0" — падает, на "-1" — зависает
+SOLUTION = """
+n = int(input())
+if n == -1:
+    while True:
+        pass
+print(10 // n)
+"""
+
+
+def _test(inp, out):
+    return {"input": f"{inp}\n", "output": f"{out}\n"}
+
+
+def test_stop_on_failure_matches_candidate_scoring():
+    tests = [_test(1, 10), _test(2, 5), _test(5, 3), _test(10, 1)]
+    report = sandbox.run_code_report(SOLUTION, tests, timeout=2, stop_on_failure=True)
+
+    assert report["passed_count"] == 2
+    assert report["failed_test"] == 3
+    assert report["skipped_count"] == 1
+    assert [t["verdict"] for t in report["tests"]] == ["OK", "OK", "WA"]
+    assert sandbox.run_one_code_on_tests(SOLUTION, tests, timeout=2) == {
+        "solved": False,
+        "failed_test": 3,
+        "passed_count": 2,
+        "total_count": 4,
+    }
+
+
+def test_full_report_runs_past_failures():
+    tests = [_test(1, 10), _test(0, 0), _test(5, 3), _test(10, 1)]
+    report = sandbox.run_code_report(SOLUTION, tests, timeout=2)
+
+    assert [t["verdict"] for t in report["tests"]] == ["OK", "RE", "WA", "OK"]
+    assert report["passed_count"] == 2
+    assert report["failed_test"] == 2
+    assert report["skipped_count"] == 0
+
+
+def test_full_report_stops_on_first_timeout():
+    tests = [_test(1, 10), _test(-1, 0), _test(-1, 0), _test(2, 5)]
+    report = sandbox.run_code_report(SOLUTION, tests, timeout=0.5, stop_on_timeout=True)
+
+    assert [t["verdict"] for t in report["tests"]] == ["OK", "TLE"]
+    assert report["skipped_count"] == 2
+    assert not report["solved"]
+
+
+def test_solved():
+    tests = [_test(1, 10), _test(2, 5)]
+    report = sandbox.run_code_report(SOLUTION, tests, timeout=2, stop_on_failure=True)
+    assert report["solved"] and report["failed_test"] is None and report["skipped_count"] == 0
+
+
+# --------------------------------
+# /api/interview/{token}/run
+# --------------------------------
+
+@pytest.fixture
+def run_client(monkeypatch):
+    import backend
+    from ratelimit import LRUCache, TokenBucketLimiter
+
+    task = {
+        "level": "easy",
+        "time_limit": 1.5,
+        "samples": [{"input": "2\n", "output": "5\n"}, {"input": "5\n", "output": "2\n"}],
+    }
+    monkeypatch.setattr(backend, "INTERVIEWS", {"tok": {"coding_tasks": [task]}})
+    monkeypatch.setattr(backend, "RUN_CACHE", LRUCache(max_entries=16))
+    monkeypatch.setattr(backend, "RUN_LIMITER", TokenBucketLimiter(rate=0.001, burst=2))
+    monkeypatch.setattr(backend, "mark_in_progress", lambda token: None)
+
+    runs = []
+
+    def fake_run(code, samples, timeout):
+        runs.append(timeout)
+        return [{"output": s["output"], "passed": True} for s in samples]
+
+    monkeypatch.setattr(backend, "run_code_on_samples", fake_run)
+    return TestClient(backend.app), runs
+
+
+def test_run_repeats_are_served_from_cache(run_client):
+    client, runs = run_client
+    body = {"level": "easy", "code": "print(10 // int(input()))"}
+
+    first = client.post("/api/interview/tok/run", json=body).json()
+    second = client.post("/api/interview/tok/run", json=body).json()
+
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["passed_count"] == first["passed_count"] == 2
+    # в песочницу ушли один раз и с TL задачи
+    assert runs == [1.5]
+
+
+def test_run_is_rate_limited_per_interview(run_client):
+    client, runs = run_client
+    for i in range(2):
+        response = client.post("/api/interview/tok/run", json={"level": "easy", "code": f"print({i})"})
+        assert response.status_code == 200
+
+    response = client.post("/api/interview/tok/run", json={"level": "easy", "code": "print(2)"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert len(runs) == 2
+    # повтор уже прогнанного кода лимит не тратит
+    response = client.post("/api/interview/tok/run", json={"level": "easy", "code": "print(0)"})
+    assert response.status_code == 200
+    assert response.json()["cached"]
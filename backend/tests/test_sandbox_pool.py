@@ -0,0 +1,128 @@
+import io
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from contextlib import ExitStack
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import sandbox_pool
+from runner import RunnerHandler
+from sandbox_pool import RunnerPool, RunnersUnavailable
+from scheduler import INTERACTIVE, SANDBOX_GATE
+
+RUNS = {"runs": [{"stdout": "1\n", "timed_out": False}]}
+
+
+def _http_error(code):
+    return urllib.error.HTTPError("http://runner/run", code, "error", {}, io.BytesIO(b"{}"))
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = RunnerPool(["http://a", "http://b"])
+    monkeypatch.setattr(pool, "_ensure_checker", lambda: None)
+    return pool
+
+
+def _script(pool, monkeypatch, outcomes):
+    """Раннеры отвечают по очереди outcomes: исключение или ответ."""
+    calls = []
+
+    def request(runner, path, timeout, payload=None):
+        calls.append((runner.url, timeout, payload))
+        outcome = outcomes[len(calls) - 1]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(pool, "_request", request)
+    return calls
+
+
+def _healthy(pool):
+    return {r.url: r.healthy for r in pool.runners}
+
+
+def test_unreachable_runner_is_marked_down_and_run_retried(pool, monkeypatch):
+    calls = _script(pool, monkeypatch, [urllib.error.URLError("refused"), RUNS])
+    assert pool.run_batch("print(1)", [""], 1.0, 256) == RUNS["runs"]
+    assert len(calls) == 2
+    assert list(_healthy(pool).values()).count(False) == 1
+
+
+def test_busy_runner_stays_in_rotation(pool, monkeypatch):
+    calls = _script(pool, monkeypatch, [_http_error(503), RUNS])
+    assert pool.run_batch("print(1)", [""], 1.0, 256) == RUNS["runs"]
+    assert len(calls) == 2
+    assert all(_healthy(pool).values())
+
+
+def test_bad_request_is_not_retried_and_keeps_runner(pool, monkeypatch):
+    calls = _script(pool, monkeypatch, [_http_error(413), RUNS])
+    with pytest.raises(RunnersUnavailable):
+        pool.run_batch("print(1)", [""], 1.0, 256)
+    assert len(calls) == 1
+    assert all(_healthy(pool).values())
+
+
+def test_read_timeout_is_not_retried_and_keeps_runner(pool, monkeypatch):
+    calls = _script(pool, monkeypatch, [TimeoutError("timed out"), RUNS])
+    with pytest.raises(RunnersUnavailable):
+        pool.run_batch("print(1)", [""], 1.0, 256)
+    assert len(calls) == 1
+    assert all(_healthy(pool).values())
+
+
+def test_request_timeout_covers_runner_queue(pool, monkeypatch):
+    calls = _script(pool, monkeypatch, [RUNS])
+    pool.run_batch("print(1)", ["", ""], 2.0, 256)
+    (_, timeout, payload), = calls
+    assert payload["max_queue_seconds"] == sandbox_pool.RUNNER_QUEUE_SECONDS
+    assert timeout > 2 * (2.0 + 1) + sandbox_pool.RUNNER_QUEUE_SECONDS
+
+
+def test_retries_are_capped(monkeypatch):
+    pool = RunnerPool([f"http://r{i}" for i in range(10)])
+    monkeypatch.setattr(pool, "_ensure_checker", lambda: None)
+    calls = _script(pool, monkeypatch, [_http_error(503)] * 10)
+    with pytest.raises(RunnersUnavailable):
+        pool.run_batch("print(1)", [""], 1.0, 256)
+    assert len(calls) == sandbox_pool.MAX_ATTEMPTS
+
+
+@pytest.mark.skipif("SANDBOX_LOCAL_FALLBACK" in os.environ, reason="задано окружением")
+def test_local_fallback_is_off_by_default():
+    assert sandbox_pool.SANDBOX_LOCAL_FALLBACK is False
+
+
+def test_runner_answers_503_when_queue_wait_is_exceeded():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RunnerHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    body = {
+        "code": "print(1)",
+        "inputs": [""],
+        "timeout": 0.1,
+        "workload": INTERACTIVE,
+        "max_queue_seconds": 0,
+    }
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_port}/run",
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        # все слоты шлюза заняты — прогон так и не дождётся своей очереди
+        with ExitStack() as stack:
+            for _ in range(SANDBOX_GATE.capacity):
+                stack.enter_context(SANDBOX_GATE.slot(INTERACTIVE))
+            with pytest.raises(urllib.error.HTTPError) as e:
+                urllib.request.urlopen(request, timeout=10)
+        assert e.value.code == 503
+    finally:
+        server.shutdown()
+        server.server_close()
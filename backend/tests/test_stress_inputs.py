@@ -0,0 +1,55 @@
+# test_stress_inputs.py
+import pytest
+
+from stress_inputs import StressInputStore
+
+BIG = "100000\n" + " ".join(["7"] * 100_000) + "\n"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return StressInputStore(tmp_path / "stress_inputs.db")
+
+
+def test_externalize_keeps_only_refs(store):
+    tests = [
+        {"input": "2\n1 2\n", "output": "3\n"},
+        {"input": BIG, "output": "700000\n", "stress": True},
+    ]
+    stored = store.externalize(tests)
+
+    assert stored[0] == tests[0]
+    assert "input" not in stored[1] and stored[1]["output"] == "700000\n"
+    assert len(stored[1]["input_ref"]) == 64
+    # исходный список не трогаем
+    assert tests[1]["input"] == BIG
+
+    assert store.resolve(stored) == tests
+
+
+def test_same_input_stored_once(store):
+    a = store.externalize([{"input": BIG, "output": "1\n", "stress": True}])
+    b = store.externalize([{"input": BIG, "output": "2\n", "stress": True}])
+    assert a[0]["input_ref"] == b[0]["input_ref"]
+    assert store._conn().execute("SELECT COUNT(*) FROM stress_inputs").fetchone()[0] == 1
+
+
+def test_inline_tests_pass_through(store):
+    # задачи, сохранённые до выноса входов, остаются как есть
+    tests = [{"input": BIG, "output": "1\n", "stress": True}]
+    assert store.resolve(tests) == tests
+
+
+def test_purged_input_skips_test(store):
+    stored = store.externalize(
+        [{"input": "1\n5\n", "output": "5\n"}, {"input": BIG, "output": "1\n", "stress": True}]
+    )
+    assert store.purge(before=float("inf")) == 1
+    assert store.resolve(stored) == [{"input": "1\n5\n", "output": "5\n"}]
+
+
+def test_resolve_refreshes_usage(store):
+    stored = store.externalize([{"input": BIG, "output": "1\n", "stress": True}])
+    store._conn().execute("UPDATE stress_inputs SET used_at = 0")
+    store.resolve(stored)
+    assert store.purge(before=1.0) == 0
@@ -0,0 +1,80 @@
+from theory_prescore import DECISION_ESCALATE, DECISION_FAIL, prescore_answer
+
+QUESTION = "Зачем в базе данных нужен индекс и чем он платит за ускорение?"
+REFERENCE = (
+    "Индекс ускоряет поиск строк по значению столбца: вместо полного просмотра "
+    "таблицы база идёт по дереву и сразу находит нужные записи. "
+    "Цена — дополнительное место на диске и замедление вставки и обновления, "
+    "потому что индекс приходится перестраивать при каждом изменении."
+)
+
+
+def test_full_paraphrase_goes_to_llm():
+    answer = (
+        "Индекс ускоряет поиск по столбцу: база идёт по дереву и не делает полный "
+        "просмотр таблицы. Платим местом на диске и более медленной вставкой и "
+        "обновлением, ведь индекс перестраивается при изменении."
+    )
+    assert prescore_answer(QUESTION, REFERENCE, answer)["decision"] == DECISION_ESCALATE
+
+
+def test_keyword_list_is_not_passed_locally():
+    answer = "индекс поиск дерево диск вставка обновление перестраивать просмотр таблица"
+    assert prescore_answer(QUESTION, REFERENCE, answer)["decision"] == DECISION_ESCALATE
+
+
+def test_negated_answer_is_not_passed_locally():
+    answer = (
+        "Индекс не ускоряет поиск строк по значению столбца, база не идёт по дереву. "
+        "Места на диске он не занимает, вставку и обновление не замедляет, "
+        "перестраивать его при изменении не нужно."
+    )
+    assert prescore_answer(QUESTION, REFERENCE, answer)["decision"] == DECISION_ESCALATE
+
+
+def test_empty_answer_fails_locally():
+    for answer in ("", "  \n\t "):
+        result = prescore_answer(QUESTION, REFERENCE, answer)
+        assert result["decision"] == DECISION_FAIL
+        assert result["reasons"] == ["empty"]
+
+
+def test_garbage_fails_locally():
+    result = prescore_answer(QUESTION, REFERENCE, "}{ ;;; 0x00 ##### ---- !!! ...")
+    assert result["decision"] == DECISION_FAIL
+    assert "not_text" in result["reasons"]
+
+
+def test_copied_question_fails_locally():
+    result = prescore_answer(QUESTION, REFERENCE, QUESTION)
+    assert result["decision"] == DECISION_FAIL
+    assert "copied_question" in result["reasons"]
+
+
+def test_off_topic_answer_goes_to_llm():
+    # мало общих слов с эталоном — ещё не провал: решает LLM, в отчёте остаётся сигнал
+    answer = (
+        "Кошки любят спать на подоконнике, особенно солнечным утром, "
+        "а вечером охотятся за игрушечной мышкой по всей квартире."
+    )
+    result = prescore_answer(QUESTION, REFERENCE, answer)
+    assert result["decision"] == DECISION_ESCALATE
+    assert result["reasons"] == []
+    assert "off_topic" in result["signals"]
+
+
+def test_correct_english_answer_goes_to_llm():
+    answer = (
+        "An index lets the database find rows by a column value without a full table "
+        "scan, by walking a tree. The price is extra disk space and slower inserts and "
+        "updates, because the index has to be maintained on every write."
+    )
+    result = prescore_answer(QUESTION, REFERENCE, answer)
+    assert result["decision"] == DECISION_ESCALATE
+
+
+def test_short_correct_answers_go_to_llm():
+    for answer in ("Ускоряет поиск, замедляет запись.", "B-дерево, O(log n) вместо O(n)"):
+        result = prescore_answer(QUESTION, REFERENCE, answer)
+        assert result["decision"] == DECISION_ESCALATE, answer
+        assert "too_short" in result["signals"]
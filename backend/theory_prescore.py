@@ -0,0 +1,164 @@
+# theory_prescore.py
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+# -------------------------------
+# ЛОКАЛЬНАЯ ПРЕДОЦЕНКА ТЕОРЕТИЧЕСКИХ ОТВЕТОВ
+# -------------------------------
+#
+# Дешёвый фильтр перед LLM: без сети и GPU считаем похожесть ответа на эталон
+# (TF-IDF по предложениям эталона), покрытие ключевых слов, длину и "язык".
+# Локально решаем только явный провал: пустой ответ, не текст или переписанный
+# вопрос. Короткий ответ, ответ своими словами (мало общих слов с эталоном)
+# или на другом языке бывает верным — их оценивает LLM; для отчёта HR такие
+# приметы попадают в signals, но решения не меняют.
+#
+# Зачёт локально не ставим: мешок слов не отличает ответ от перечня ключевых
+# слов эталона и не видит отрицаний ("не" — стоп-слово), так что "PASS по
+# похожести" засчитывал бы и список терминов, и ответ "наоборот", а
+# правильный ответ своими словами уходил бы в LLM всё равно.
+
+DECISION_FAIL = "fail"
+DECISION_ESCALATE = "escalate"
+
+# пороги подобраны консервативно: локально решаем только очевидное
+MIN_ANSWER_TOKENS = 5
+# ниже обоих порогов — сигнал "off_topic" для отчёта, не провал
+OFF_TOPIC_SIMILARITY = 0.05
+OFF_TOPIC_COVERAGE = 0.1
+QUESTION_COPY_SIMILARITY = 0.8
+MIN_LETTER_SHARE = 0.5
+
+KEYWORDS_COUNT = 15
+
+_TOKEN_RE = re.compile(r"[a-zа-яё0-9]+", re.IGNORECASE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+_STOPWORDS = {
+    # ru
+    "и", "в", "во", "не", "что", "он", "на", "я", "с", "со", "как", "а", "то", "все",
+    "она", "так", "его", "но", "да", "ты", "к", "у", "же", "вы", "за", "бы", "по",
+    "только", "ее", "мне", "было", "вот", "от", "меня", "еще", "нет", "о", "из", "ему",
+    "теперь", "когда", "даже", "ну", "ли", "если", "уже", "или", "ни", "быть", "был",
+    "него", "до", "вас", "нибудь", "опять", "уж", "вам", "ведь", "там", "потом", "себя",
+    "ничего", "ей", "может", "они", "тут", "где", "есть", "надо", "ней", "для", "мы",
+    "тебя", "их", "чем", "была", "сам", "чтоб", "без", "будто", "чего", "раз", "тоже",
+    "себе", "под", "будет", "ж", "тогда", "кто", "этот", "того", "потому", "этого",
+    "какой", "совсем", "ним", "здесь", "этом", "один", "почти", "мой", "тем", "чтобы",
+    "нее", "были", "куда", "зачем", "всех", "никогда", "можно", "при", "наконец", "два",
+    "об", "другой", "хоть", "после", "над", "больше", "тот", "через", "эти", "нас", "про",
+    "всего", "них", "какая", "много", "разве", "три", "эту", "моя", "впрочем", "хорошо",
+    "свою", "этой", "перед", "иногда", "лучше", "чуть", "том", "нельзя", "такой", "им",
+    "более", "всегда", "конечно", "всю", "между", "это", "также", "который", "которые",
+    # en
+    "the", "a", "an", "and", "or", "of", "to", "in", "is", "it", "for", "on", "with",
+    "as", "by", "be", "are", "this", "that", "at", "from",
+}
+
+
+def _stem(token: str) -> str:
+    # грубый стемминг: у русских слов отрезаем окончания, оставляя основу до 6 букв
+    if len(token) > 6 and re.match(r"[а-яё]", token):
+        return token[:6]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        _stem(t)
+        for t in (m.group(0).lower() for m in _TOKEN_RE.finditer(text))
+        if t not in _STOPWORDS and len(t) > 1
+    ]
+
+
+def _idf(documents: List[List[str]]) -> Dict[str, float]:
+    df: Counter = Counter()
+    for doc in documents:
+        df.update(set(doc))
+    n = len(documents)
+    return {term: math.log(1 + (n + 1) / (cnt + 0.5)) for term, cnt in df.items()}
+
+
+def _tfidf_cosine(a: List[str], b: List[str], idf: Dict[str, float]) -> float:
+    if not a or not b:
+        return 0.0
+    default = max(idf.values(), default=1.0)
+    va = {t: c * idf.get(t, default) for t, c in Counter(a).items()}
+    vb = {t: c * idf.get(t, default) for t, c in Counter(b).items()}
+    dot = sum(w * vb.get(t, 0.0) for t, w in va.items())
+    norm = math.sqrt(sum(w * w for w in va.values())) * math.sqrt(sum(w * w for w in vb.values()))
+    return dot / norm if norm else 0.0
+
+
+def _letter_share(text: str) -> float:
+    """Доля букв среди непробельных символов — отсекаем мусор, код и наборы символов."""
+    chars = [ch for ch in text if not ch.isspace()]
+    if not chars:
+        return 0.0
+    return sum(1 for ch in chars if ch.isalpha()) / len(chars)
+
+
+def prescore_answer(question: str, reference_answer: str, candidate_answer: str) -> Dict:
+    """
+    Считаем локальные метрики ответа и решение:
+      decision: "fail" | "escalate" (отдать LLM).
+    """
+    answer_tokens = tokenize(candidate_answer)
+    ref_tokens = tokenize(reference_answer)
+    question_tokens = tokenize(question)
+
+    # IDF считаем по предложениям эталона и вопроса: частые во всём эталоне
+    # слова ("данные", "запрос") весят меньше, чем редкие термины
+    sentences = [tokenize(s) for s in _SENTENCE_RE.split(reference_answer)]
+    documents = [d for d in sentences if d] + [question_tokens]
+    idf = _idf(documents)
+
+    similarity = _tfidf_cosine(answer_tokens, ref_tokens, idf)
+    question_similarity = _tfidf_cosine(answer_tokens, question_tokens, idf)
+
+    # ключевые слова эталона: самые весомые по tf * idf, без слов из самого вопроса
+    ref_counts = Counter(ref_tokens)
+    question_terms = set(question_tokens)
+    keywords = sorted(
+        (t for t in ref_counts if t not in question_terms),
+        key=lambda t: ref_counts[t] * idf.get(t, 0.0),
+        reverse=True,
+    )[:KEYWORDS_COUNT]
+    answer_terms = set(answer_tokens)
+    coverage = (
+        sum(1 for t in keywords if t in answer_terms) / len(keywords) if keywords else 0.0
+    )
+
+    length_ratio = len(answer_tokens) / len(ref_tokens) if ref_tokens else 0.0
+    letter_share = _letter_share(candidate_answer)
+
+    # новые относительно вопроса слова — отсекаем "переписал вопрос"
+    novel_terms = answer_terms - question_terms
+
+    # reasons — причины локального провала, signals — только для отчёта
+    reasons: List[str] = []
+    if not candidate_answer.strip():
+        reasons.append("empty")
+    elif letter_share < MIN_LETTER_SHARE:
+        reasons.append("not_text")
+    if question_similarity >= QUESTION_COPY_SIMILARITY and len(novel_terms) < MIN_ANSWER_TOKENS:
+        reasons.append("copied_question")
+
+    signals: List[str] = []
+    if len(answer_tokens) < MIN_ANSWER_TOKENS:
+        signals.append("too_short")
+    if similarity < OFF_TOPIC_SIMILARITY and coverage < OFF_TOPIC_COVERAGE:
+        signals.append("off_topic")
+
+    return {
+        "decision": DECISION_FAIL if reasons else DECISION_ESCALATE,
+        "reasons": reasons,
+        "signals": signals,
+        "similarity": round(similarity, 3),
+        "keyword_coverage": round(coverage, 3),
+        "length_ratio": round(length_ratio, 3),
+        "question_similarity": round(question_similarity, 3),
+        "letter_share": round(letter_share, 3),
+    }
@@ -0,0 +1,303 @@
+# tracing.py
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+# --------------------------------
+# ТРАССИРОВКА
+# --------------------------------
+#
+# Спаны в духе OpenTelemetry без внешних зависимостей:
+#
+#     with span("task.solve_attempt", level=level, attempt=attempt) as s:
+#         ...
+#         s.set("outcome", "ok")
+#
+# Текущий спан живёт в contextvar, вложенные спаны становятся его детьми.
+# Готовые спаны уходят в экспортёр (TRACE_EXPORT):
+#   off        — никуда (по умолчанию);
+#   file       — JSON lines в TRACE_FILE (по умолчанию backend/traces.jsonl);
+#   collector  — пачками POST-ом на TRACE_COLLECTOR_URL (JSON, поля как в OTLP).
+#
+# Между процессами (API -> worker.py) контекст передаём строкой traceparent
+# в формате W3C: "00-<trace_id>-<span_id>-01".
+
+TRACE_EXPORT = os.environ.get("TRACE_EXPORT", "off")
+TRACE_FILE = Path(os.environ.get("TRACE_FILE", Path(__file__).with_name("traces.jsonl")))
+TRACE_COLLECTOR_URL = os.environ.get("TRACE_COLLECTOR_URL", "http://localhost:4318/v1/traces")
+SERVICE_NAME = os.environ.get("TRACE_SERVICE_NAME", "safe-interview")
+
+COLLECTOR_BATCH_SIZE = 64
+COLLECTOR_FLUSH_SECONDS = 2.0
+
+
+class Span:
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "attributes",
+        "start_ns", "end_ns", "status", "error",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None,
+                 attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.status = "ok"
+        self.error: str | None = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "service": SERVICE_NAME,
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "pid": os.getpid(),
+        }
+
+
+_current: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+# --------------------------------
+# ЭКСПОРТЁРЫ
+# --------------------------------
+
+class FileExporter:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+        # одна строка — один write в режиме append: строки разных процессов не перемешаются
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class CollectorExporter:
+    """Копит спаны и отправляет пачками из фонового потока; ошибки сети не мешают работе."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=10_000)
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    def export(self, span: Span) -> None:
+        if self._pid != os.getpid():
+            # после fork поток-отправитель надо запускать заново
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            pass  # коллектор не успевает — теряем спаны, а не память
+
+    def _run(self) -> None:
+        while True:
+            batch: List[Dict[str, Any]] = [self._queue.get()]
+            deadline = time.monotonic() + COLLECTOR_FLUSH_SECONDS
+            while len(batch) < COLLECTOR_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._send(batch)
+
+    def _send(self, batch: List[Dict[str, Any]]) -> None:
+        body = json.dumps({"spans": batch}, ensure_ascii=False, default=str).encode("utf-8")
+        request = urllib.request.Request(
+            self.url, data=body, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except Exception as e:
+            get_logger("tracing").warning(
+                "Не удалось отправить спаны в коллектор", spans=len(batch), error=str(e)
+            )
+
+
+def _make_exporter():
+    if TRACE_EXPORT == "file":
+        return FileExporter(TRACE_FILE)
+    if TRACE_EXPORT == "collector":
+        return CollectorExporter(TRACE_COLLECTOR_URL)
+    return None
+
+
+_exporter = _make_exporter()
+
+
+# --------------------------------
+# API
+# --------------------------------
+
+def _parse_traceparent(traceparent: str | None):
+    try:
+        _, trace_id, span_id, _ = traceparent.split("-")
+        return trace_id, span_id
+    except (AttributeError, ValueError):
+        return None
+
+
+@contextmanager
+def span(name: str, traceparent: str | None = None, **attributes: Any) -> Iterator[Span]:
+    """
+    Новый спан — ребёнок текущего. traceparent (из другого процесса)
+    задаёт родителя явно. Исключение внутри помечает спан ошибкой и летит дальше.
+    """
+    parent = _current.get()
+    remote = _parse_traceparent(traceparent)
+    if remote is not None:
+        trace_id, parent_id = remote
+    elif parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+
+    s = Span(name, trace_id, parent_id, attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.status = "error"
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        s.end_ns = time.time_ns()
+        if _exporter is not None:
+            _exporter.export(s)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Атрибут текущему спану (если он есть)."""
+    s = _current.get()
+    if s is not None:
+        s.set(key, value)
+
+
+def current_traceparent() -> str | None:
+    s = _current.get()
+    return s.traceparent if s is not None else None
+
+
+# --------------------------------
+# СТРУКТУРНЫЕ ЛОГИ
+# --------------------------------
+#
+# Вместо print: уровень, сообщение, поля и trace_id/span_id текущего спана.
+#     log = get_logger(__name__)
+#     log.info("Задача прошла все тесты", level=level, attempt=attempt)
+#
+# LOG_LEVEL — минимальный уровень (INFO); LOG_FORMAT=json — строки JSON,
+# иначе читаемый текст "время уровень логгер сообщение key=value ...".
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+
+
+class _Formatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = dict(getattr(record, "fields", {}))
+        s = _current.get()
+        if s is not None:
+            fields.setdefault("trace_id", s.trace_id)
+            fields.setdefault("span_id", s.span_id)
+        if record.exc_info:
+            fields["exception"] = self.formatException(record.exc_info)
+
+        if LOG_FORMAT == "json":
+            return json.dumps(
+                {
+                    "ts": round(record.created, 3),
+                    "level": record.levelname.lower(),
+                    "logger": record.name,
+                    "msg": record.getMessage(),
+                    **fields,
+                },
+                ensure_ascii=False,
+                default=str,
+            )
+
+        ts = time.strftime("%H:%M:%S", time.localtime(record.created))
+        extra = " ".join(f"{k}={v}" for k, v in fields.items() if k != "exception")
+        line = f"{ts} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        if extra:
+            line += f"  {extra}"
+        if "exception" in fields:
+            line += "\n" + fields["exception"]
+        return line
+
+
+_root = logging.getLogger("safe_interview")
+if not _root.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(_Formatter())
+    _root.addHandler(_handler)
+    _root.setLevel(LOG_LEVEL)
+    _root.propagate = False
+
+
+class StructLogger:
+    def __init__(self, name: str):
+        self._logger = _root.getChild(name)
+
+    def _log(self, level: int, msg: str, fields: Dict[str, Any], exc_info: bool = False) -> None:
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, msg, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, msg: str, **fields: Any) -> None:
+        self._log(logging.DEBUG, msg, fields)
+
+    def info(self, msg: str, **fields: Any) -> None:
+        self._log(logging.INFO, msg, fields)
+
+    def warning(self, msg: str, **fields: Any) -> None:
+        self._log(logging.WARNING, msg, fields)
+
+    def error(self, msg: str, **fields: Any) -> None:
+        self._log(logging.ERROR, msg, fields)
+
+    def exception(self, msg: str, **fields: Any) -> None:
+        """error + traceback текущего исключения."""
+        self._log(logging.ERROR, msg, fields, exc_info=True)
+
+
+def get_logger(name: str) -> StructLogger:
+    return StructLogger(name)
@@ -0,0 +1,179 @@
+# worker.py
+"""
+Пул процессов, которые разбирают очередь задач (jobs.py):
+генерацию интервью и проверку ответов кандидатов.
+
+Запуск (рядом с API в режиме SAFE_INTERVIEW_QUEUE=1):
+    python worker.py --processes 4 --reserved 1
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+import jobs
+from drafts import DRAFT_JOB_KIND
+from interview_pipeline import check_interview, create_interview, generate_interview_content
+from interview_store import INTERVIEWS
+from llm_budget import BudgetExceeded
+from scheduler import BULK, INTERACTIVE, PRIORITY, SPECULATIVE, Cancelled, cancellable, workload
+from tracing import get_logger, span
+
+log = get_logger("worker")
+
+IDLE_POLL_SECONDS = 0.5
+HEARTBEAT_SECONDS = 30
+# как часто работающая задача проверяет, не отменили ли её
+CANCEL_POLL_SECONDS = 2
+
+
+class JobRejected(Exception):
+    """Задачу выполнить нельзя по вине запроса (например, нет интервью) — не 500."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _handle_generate(payload):
+    return create_interview(payload)
+
+
+def _handle_draft(payload):
+    # токена и записи в хранилище нет: задачи заберёт /api/generate-tasks (см. drafts.py)
+    return generate_interview_content(payload)
+
+
+def _handle_check(payload):
+    if payload["token"] not in INTERVIEWS:
+        raise JobRejected(404, "Interview not found")
+    return check_interview(
+        payload["token"],
+        payload.get("coding_solutions") or {},
+        payload.get("theory_solutions") or {},
+    )
+
+
+HANDLERS = {
+    "generate_interview": _handle_generate,
+    "check_interview": _handle_check,
+    DRAFT_JOB_KIND: _handle_draft,
+}
+
+# класс нагрузки для шлюзов LLM и песочницы внутри процесса
+WORKLOADS = {
+    "generate_interview": BULK,
+    "check_interview": INTERACTIVE,
+    DRAFT_JOB_KIND: SPECULATIVE,
+}
+
+
+def _run_one(job, worker_name: str) -> None:
+    handler = HANDLERS.get(job["kind"])
+    if handler is None:
+        jobs.fail(job["id"], f"Неизвестный тип задачи: {job['kind']!r}")
+        return
+
+    # пока задача выполняется, продлеваем аренду — иначе её заберёт другой воркер —
+    # и следим за отменой: шлюзы LLM и песочницы бросят Cancelled на следующем запросе
+    stop = threading.Event()
+    cancelled = threading.Event()
+
+    def heartbeat():
+        last_lease = time.monotonic()
+        while not stop.wait(CANCEL_POLL_SECONDS):
+            if jobs.get_status(job["id"]) == jobs.STATUS_CANCELLED:
+                cancelled.set()
+                return
+            if time.monotonic() - last_lease >= HEARTBEAT_SECONDS:
+                jobs.extend_lease(job["id"], worker_name)
+                last_lease = time.monotonic()
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    started = time.perf_counter()
+    try:
+        with span(f"job.{job['kind']}", traceparent=job["traceparent"], job_id=job["id"],
+                  worker=worker_name, attempt=job["attempts"],
+                  queue_wait_ms=round((job["started_at"] - job["created_at"]) * 1000)) as s:
+            try:
+                with workload(WORKLOADS.get(job["kind"], BULK)), cancellable(cancelled):
+                    result = handler(job["payload"])
+            except Cancelled:
+                # статус уже cancelled — его поставил тот, кто отменял
+                s.set("outcome", "cancelled")
+                log.info("Задача отменена", job_id=job["id"], kind=job["kind"],
+                         seconds=round(time.perf_counter() - started, 1))
+            except JobRejected as e:
+                s.set("outcome", "rejected")
+                jobs.fail(job["id"], str(e), status_code=e.status_code)
+            except BudgetExceeded as e:
+                s.set("outcome", "over_budget")
+                jobs.fail(job["id"], str(e), status_code=429)
+            except Exception as e:
+                s.set("outcome", "error")
+                log.exception("Задача упала", job_id=job["id"], kind=job["kind"], error=str(e))
+                jobs.fail(job["id"], str(e))
+            else:
+                s.set("outcome", "ok")
+                jobs.finish(job["id"], result)
+                log.info(
+                    "Задача готова", job_id=job["id"], kind=job["kind"],
+                    seconds=round(time.perf_counter() - started, 1),
+                )
+    finally:
+        stop.set()
+
+
+def worker_loop(index: int | str, interactive_only: bool = False,
+                kinds: tuple[str, ...] | None = None) -> None:
+    """
+    interactive_only — резервный воркер: берёт только кандидатские задачи.
+    kinds — брать только задачи этих типов (поток черновиков внутри API).
+    """
+    worker_name = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    max_priority = PRIORITY[INTERACTIVE] if interactive_only else None
+    log.info("Воркер запущен", worker=worker_name, interactive_only=interactive_only,
+             kinds=kinds)
+    while True:
+        job = jobs.claim(worker_name, max_priority, kinds)
+        if job is None:
+            time.sleep(IDLE_POLL_SECONDS)
+            continue
+        _run_one(job, worker_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="сколько процессов-воркеров запустить (по умолчанию — по числу ядер)",
+    )
+    parser.add_argument(
+        "--reserved",
+        type=int,
+        default=None,
+        help="сколько из них берут только проверку ответов кандидатов "
+             "(по умолчанию 1, если процессов больше одного)",
+    )
+    args = parser.parse_args()
+    reserved = args.reserved if args.reserved is not None else int(args.processes > 1)
+
+    jobs.init_queue()
+
+    processes = [
+        multiprocessing.Process(target=worker_loop, args=(i, i < reserved), daemon=True)
+        for i in range(args.processes)
+    ]
+    for p in processes:
+        p.start()
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        log.info("Останавливаем воркеров")
+        for p in processes:
+            p.terminate()
@@ -1,3 +1,5 @@
+import { waitForJob } from "./jobsApi.js";
+
 export async function fetchInterviewByToken(token) {
   const res = await fetch(`/api/interview/${encodeURIComponent(token)}`, {
     method: "GET",
@@ -39,5 +41,79 @@ export async function submitInterview(token, payload) {
     throw error;
   }
 
+  // режим очереди: проверка ещё идёт — ждём её результат
+  if (res.status === 202 && data?.job_id) {
+    return waitForJob(data.job_id, { "X-Interview-Token": token });
+  }
+
   return data;
-}
\ No newline at end of file
+}
+
+// Последний автосохранённый снимок ответов
+export async function fetchAutosave(token) {
+  const res = await fetch(
+    `/api/interview/${encodeURIComponent(token)}/autosave`,
+    { method: "GET" }
+  );
+
+  const text = await res.text();
+  const data = text ? JSON.parse(text) : null;
+
+  if (!res.ok) {
+    const error = new Error(
+      data?.detail || data?.message || `Ошибка ${res.status}`
+    );
+    error.status = res.status;
+    throw error;
+  }
+
+  return data; // { version, coding_solutions, theory_solutions }
+}
+
+// Инкрементальное автосохранение: дельты относительно base_version
+export async function autosaveInterview(token, payload) {
+  const res = await fetch(
+    `/api/interview/${encodeURIComponent(token)}/autosave`,
+    {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(payload), // { base_version, deltas: [...] }
+    }
+  );
+
+  const text = await res.text();
+  const data = text ? JSON.parse(text) : null;
+
+  if (!res.ok) {
+    const error = new Error(
+      data?.detail?.message || data?.detail || `Ошибка ${res.status}`
+    );
+    error.status = res.status;
+    error.data = data;
+    throw error;
+  }
+
+  return data; // { version }
+}
+
+// Прогон одной задачи на видимых примерах (без отправки интервью)
+export async function runTask(token, payload) {
+  const res = await fetch(`/api/interview/${encodeURIComponent(token)}/run`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload), // { level, code, sample_indices? }
+  });
+
+  const text = await res.text();
+  const data = text ? JSON.parse(text) : null;
+
+  if (!res.ok) {
+    const error = new Error(
+      data?.detail || data?.message || `Ошибка ${res.status}`
+    );
+    error.status = res.status;
+    throw error;
+  }
+
+  return data; // { level, samples: [...], passed_count, total_count, cached }
+}
@@ -0,0 +1,38 @@
+// Фоновые задачи бэка (режим очереди): эндпоинт не дождался воркера
+// и ответил 202 { job_id, status } — опрашиваем задачу, пока она не завершится.
+
+const JOB_POLL_MS = 2000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// headers — чем подтверждаем, что задача наша: сессия HR или токен интервью
+export async function waitForJob(jobId, headers = {}) {
+  for (;;) {
+    await sleep(JOB_POLL_MS);
+
+    const res = await fetch(`/api/jobs/${encodeURIComponent(jobId)}`, {
+      method: "GET",
+      headers,
+    });
+
+    const text = await res.text();
+    const data = text ? JSON.parse(text) : null;
+
+    if (!res.ok) {
+      const error = new Error(
+        data?.detail || data?.message || `Ошибка ${res.status}`
+      );
+      error.status = res.status;
+      throw error;
+    }
+
+    if (data.status === "done") {
+      return data.result;
+    }
+    if (data.status === "failed" || data.status === "cancelled") {
+      const error = new Error(data.error || "Задача не выполнена");
+      error.status = 500;
+      throw error;
+    }
+  }
+}
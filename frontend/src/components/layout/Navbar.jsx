@@ -50,6 +50,8 @@ function Navbar() {
         email: data.email,
         name: data.name,
         company: data.company,
+        // сессия HR: без неё бэк не запустит генерацию (см. hrAuthHeaders)
+        sessionToken: data.session_token,
       };
 
       saveHrUser(user);
@@ -89,6 +91,8 @@ function Navbar() {
         email: data.email,
         name: data.name,
         company: data.company,
+        // сессия HR: без неё бэк не запустит генерацию (см. hrAuthHeaders)
+        sessionToken: data.session_token,
       };
 
       saveHrUser(user);
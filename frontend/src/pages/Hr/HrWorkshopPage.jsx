@@ -1,9 +1,16 @@
-import React, { useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import Container from "../../components/ui/Container.jsx";
 import Button from "../../components/ui/Button.jsx";
 import { generateInterviewToken } from "../../utils/token.js";
+import { hrAuthHeaders } from "../../utils/hrAuth.js";
+import { waitForJob } from "../../api/jobsApi.js";
 
 const COMPLEXITY_HINT = "Например: jun, jun+, mid, senior";
+// пауза в наборе, после которой отправляем черновик вакансии на предгенерацию
+const DRAFT_DEBOUNCE_MS = 1500;
+
+const buildVacancyText = (position, complexity) =>
+  `Должность: ${position.trim()}. Сложность: ${complexity.trim()}.`;
 
 function HrWorkshopPage() {
   const [position, setPosition] = useState("");
@@ -13,8 +20,44 @@ function HrWorkshopPage() {
   const [createdToken, setCreatedToken] = useState("");
   const [apiResponse, setApiResponse] = useState(null);
 
+  // один черновик на открытую форму: бэк начинает генерировать задачи,
+  // пока HR ещё печатает, и отдаёт их по этому id при отправке
+  const draftIdRef = useRef(`draft_${generateInterviewToken()}`);
+
   const isValid = position.trim() !== "" && complexity.trim() !== "";
 
+  useEffect(() => {
+    if (!isValid || isSubmitting || createdToken) return undefined;
+    const timer = setTimeout(() => {
+      fetch("/api/generate-tasks/draft", {
+        method: "POST",
+        headers: { "Content-Type": "application/json", ...hrAuthHeaders() },
+        body: JSON.stringify({
+          draft_id: draftIdRef.current,
+          vacancy: buildVacancyText(position, complexity),
+        }),
+      }).catch(() => {
+        // предгенерация — только ускорение, без неё форма работает как раньше
+      });
+    }, DRAFT_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [position, complexity, isValid, isSubmitting, createdToken]);
+
+  useEffect(
+    () => () => {
+      // ушли с формы — генерация по черновику больше не нужна
+      // (id берём на момент ухода: после отправки формы он уже новый)
+      // черновик отменяет только его владелец — нужна та же сессия HR
+      // eslint-disable-next-line react-hooks/exhaustive-deps
+      fetch(`/api/generate-tasks/draft/${draftIdRef.current}`, {
+        method: "DELETE",
+        headers: hrAuthHeaders(),
+        keepalive: true,
+      }).catch(() => {});
+    },
+    []
+  );
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     if (!isValid) return;
@@ -36,23 +79,36 @@ function HrWorkshopPage() {
       // мы используем его и передаём vacancy как комбинированный текст.
       // Когда добавишь отдельную ручку для interview, можно будет менять здесь только URL/тело.
 
-      const vacancyText = `Должность: ${payload.position}. Сложность: ${payload.complexity}.`;
+      const vacancyText = buildVacancyText(payload.position, payload.complexity);
       const res = await fetch("/api/generate-tasks", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          ...hrAuthHeaders(),
         },
-        body: JSON.stringify({ vacancy: vacancyText, token: payload.token }),
+        body: JSON.stringify({
+          vacancy: vacancyText,
+          token: payload.token,
+          draft_id: draftIdRef.current,
+        }),
       });
 
       if (!res.ok) {
         const errText = await res.text();
-        throw new Error(
+        const error = new Error(
           `Ошибка бэка (${res.status}): ${errText || "unknown"}`
         );
+        error.status = res.status;
+        throw error;
       }
 
-      const data = await res.json();
+      let data = await res.json();
+      // режим очереди: генерация ещё идёт — опрашиваем задачу до результата
+      if (res.status === 202 && data?.job_id) {
+        data = await waitForJob(data.job_id, hrAuthHeaders());
+      }
+      // черновик израсходован — следующая правка формы начнёт новый
+      draftIdRef.current = `draft_${generateInterviewToken()}`;
       setCreatedToken(token);
       setApiResponse(data);
       // здесь же можно будет дернуть отдельный endpoint "create_interview",
@@ -60,7 +116,9 @@ function HrWorkshopPage() {
     } catch (err) {
       console.error(err);
       setSubmitError(
-        "Не удалось сформировать интервью. Попробуйте ещё раз или свяжитесь с разработчиком."
+        err.status === 401
+          ? "Войдите как HR, чтобы сформировать интервью."
+          : "Не удалось сформировать интервью. Попробуйте ещё раз или свяжитесь с разработчиком."
       );
     } finally {
       setIsSubmitting(false);
@@ -1,11 +1,13 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useMemo, useState } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import Button from "../../components/ui/Button.jsx";
 import {
   fetchInterviewByToken,
+  runTask,
   submitInterview,
 } from "../../api/interviewApi.js";
 import { useAntiCheat } from "../../utils/useAntiCheat.js";
+import { useAutosave } from "../../utils/useAutosave.js";
 
 const INTERVIEW_DURATION_SECONDS = 45 * 60; // 45 минут
 
@@ -33,6 +35,10 @@ function SessionInterviewPage() {
 
   const [isSubmitting, setIsSubmitting] = useState(false);
 
+  // Результат последнего "Запустить" по задаче
+  const [runResult, setRunResult] = useState(null);
+  const [isRunning, setIsRunning] = useState(false);
+
   // --- Античит: включаем, когда интервью загружено и время ещё идёт ---
   useAntiCheat(interview !== null && remainingSeconds > 0, token, async () => {
     // callback, который вызывается хуком при серьёзном нарушении:
@@ -168,6 +174,56 @@ function SessionInterviewPage() {
     });
   };
 
+  // ---------- ОТВЕТЫ ПО УРОВНЯМ + АВТОСОХРАНЕНИЕ ----------
+
+  const { coding_solutions, theory_solutions } = useMemo(() => {
+    const coding = { easy: "", medium: "", hard: "" };
+    const theory = { easy: "", hard: "" };
+
+    codingTasks.forEach((task, idx) => {
+      const level = (task.level || "").toLowerCase();
+      if (["easy", "medium", "hard"].includes(level)) {
+        coding[level] = codeAnswers[idx] || "";
+      }
+    });
+
+    theoryTasks.forEach((task, offset) => {
+      const idx = codingCount + offset;
+      const level = (task.level || "").toLowerCase();
+      if (["easy", "hard"].includes(level)) {
+        theory[level] = textAnswers[idx] || "";
+      }
+    });
+
+    return { coding_solutions: coding, theory_solutions: theory };
+  }, [codingTasks, theoryTasks, codingCount, codeAnswers, textAnswers]);
+
+  // после перезагрузки страницы подставляем в редактор то, что успело
+  // автосохраниться, — по уровню задачи
+  const restoreAnswers = ({ coding, theory }) => {
+    const fill = (prev, taskList, offset, saved) => {
+      const next = [...prev];
+      taskList.forEach((task, idx) => {
+        const level = (task.level || "").toLowerCase();
+        if (saved[level]) {
+          next[offset + idx] = saved[level];
+        }
+      });
+      return next;
+    };
+
+    setCodeAnswers((prev) => fill(prev, codingTasks, 0, coding));
+    setTextAnswers((prev) => fill(prev, theoryTasks, codingCount, theory));
+  };
+
+  useAutosave(
+    interview !== null && remainingSeconds > 0,
+    token,
+    coding_solutions,
+    theory_solutions,
+    restoreAnswers
+  );
+
   // ---------- ТАЙМЕР ----------
 
   useEffect(() => {
@@ -241,6 +297,30 @@ function SessionInterviewPage() {
     }
   };
 
+  useEffect(() => {
+    setRunResult(null);
+  }, [currentTaskIndex]);
+
+  // ---------- ЗАПУСК НА ПРИМЕРАХ ----------
+
+  const handleRunSamples = async () => {
+    if (!currentTask || isTextTask) return;
+    setIsRunning(true);
+
+    try {
+      const result = await runTask(token, {
+        level: currentTask.level,
+        code: currentCode,
+      });
+      setRunResult({ ok: true, ...result });
+    } catch (e) {
+      console.error(e);
+      setRunResult({ ok: false, message: e.message });
+    } finally {
+      setIsRunning(false);
+    }
+  };
+
   // ---------- ОТПРАВКА ИНТЕРВЬЮ ----------
 
   const handleSubmitSolution = async () => {
@@ -254,24 +334,6 @@ function SessionInterviewPage() {
         return;
       }
 
-      const coding_solutions = { easy: "", medium: "", hard: "" };
-      const theory_solutions = { easy: "", hard: "" };
-
-      codingTasks.forEach((task, idx) => {
-        const level = (task.level || "").toLowerCase();
-        if (["easy", "medium", "hard"].includes(level)) {
-          coding_solutions[level] = codeAnswers[idx] || "";
-        }
-      });
-
-      theoryTasks.forEach((task, offset) => {
-        const idx = codingCount + offset;
-        const level = (task.level || "").toLowerCase();
-        if (["easy", "hard"].includes(level)) {
-          theory_solutions[level] = textAnswers[idx] || "";
-        }
-      });
-
       const payload = {
         coding_solutions,
         theory_solutions,
@@ -371,6 +433,9 @@ function SessionInterviewPage() {
               <CodeEditorPane
                 code={currentCode}
                 onChangeCode={handleCodeChange}
+                onRunSamples={handleRunSamples}
+                isRunning={isRunning}
+                runResult={runResult}
                 onSubmitSolution={handleSubmitSolution}
                 isSubmitting={isSubmitting}
                 isLastTask={isLastTask}
@@ -500,6 +565,9 @@ function TaskStatement({ task, onPrev, onNext, isFirst, isLast }) {
 function CodeEditorPane({
   code,
   onChangeCode,
+  onRunSamples,
+  isRunning,
+  runResult,
   onSubmitSolution,
   isSubmitting,
   isLastTask,
@@ -512,6 +580,13 @@ function CodeEditorPane({
           <span className="session-interview__language-badge">Python</span>
         </div>
         <div className="session-interview__editor-actions">
+          <Button
+            variant="secondary"
+            onClick={onRunSamples}
+            disabled={isRunning || isSubmitting}
+          >
+            {isRunning ? "Запуск..." : "Запустить на примерах"}
+          </Button>
           <Button
             variant="primary"
             onClick={onSubmitSolution}
@@ -534,6 +609,38 @@ function CodeEditorPane({
           spellCheck={false}
         />
       </div>
+
+      {runResult && <RunResultPanel result={runResult} />}
+    </div>
+  );
+}
+
+function RunResultPanel({ result }) {
+  if (!result.ok) {
+    return (
+      <div className="session-interview__run-result">
+        <p className="session-report__error">{result.message}</p>
+      </div>
+    );
+  }
+
+  return (
+    <div className="session-interview__run-result">
+      <p>
+        Пройдено примеров: {result.passed_count} из {result.total_count}
+      </p>
+      {result.samples
+        .filter((s) => !s.passed)
+        .map((s) => (
+          <div key={s.index} className="session-interview__example">
+            <span className="session-interview__example-label">
+              Пример {s.index + 1}
+            </span>
+            <code>Ожидали: {s.expected}</code>
+            <code>Получили: {s.output || "—"}</code>
+            {s.error && <code>{s.error}</code>}
+          </div>
+        ))}
     </div>
   );
 }
@@ -33,4 +33,12 @@ export function clearHrUser() {
   } catch {
     // ignore
   }
-}
\ No newline at end of file
+}
+
+/**
+ * Заголовки запросов от имени HR: сессия, выданная при входе
+ */
+export function hrAuthHeaders() {
+  const token = getHrUser()?.sessionToken;
+  return token ? { Authorization: `Bearer ${token}` } : {};
+}
@@ -1,6 +1,9 @@
 // src/utils/useAntiCheat.js
 import { useEffect, useRef } from "react";
 
+// как часто отправляем накопленные события одной пачкой
+const FLUSH_INTERVAL_MS = 2000;
+
 /**
  * enabled: boolean — включать/выключать хук
  * token: string | undefined — токен сессии (для логирования на бэк)
@@ -12,28 +15,34 @@ export function useAntiCheat(enabled, token, onCheat) {
   useEffect(() => {
     if (!enabled || !token) return;
 
-    const addEvent = async (type) => {
-      const time = new Date().toISOString();
+    let queue = [];
 
-      // уже среагировали на читерство — не дёргаем повторно
-      if (triggeredRef.current) return;
-      triggeredRef.current = true;
-
-      // 1. логируем событие на бэке
-      try {
-        await fetch(
-          `/api/interview/${encodeURIComponent(token)}/cheat-event`,
-          {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ type, time }),
-          }
-        );
-      } catch (e) {
+    // отправляем все накопленные события одним запросом;
+    // keepalive — чтобы пачка ушла, даже если страница уже закрывается
+    const flush = () => {
+      if (queue.length === 0) return;
+      const batch = queue;
+      queue = [];
+      fetch(`/api/interview/${encodeURIComponent(token)}/cheat-event`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(batch),
+        keepalive: true,
+      }).catch((e) => {
         console.error("Ошибка логирования cheat-event:", e);
-      }
+      });
+    };
+
+    const timer = setInterval(flush, FLUSH_INTERVAL_MS);
+
+    const addEvent = (type) => {
+      queue.push({ type, time: new Date().toISOString() });
 
-      // 2. вызываем callback (submit пустых решений + переход на отчёт)
+      // на первое нарушение реагируем один раз: сразу отправляем пачку
+      // и вызываем callback (submit пустых решений + переход на отчёт)
+      if (triggeredRef.current) return;
+      triggeredRef.current = true;
+      flush();
       if (typeof onCheat === "function") {
         onCheat();
       }
@@ -88,6 +97,8 @@ export function useAntiCheat(enabled, token, onCheat) {
     document.addEventListener("keydown", handleKeyDown);
 
     return () => {
+      clearInterval(timer);
+      flush();
       document.removeEventListener(
         "visibilitychange",
         handleVisibilityChange
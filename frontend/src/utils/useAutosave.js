@@ -0,0 +1,188 @@
+// src/utils/useAutosave.js
+import { useEffect, useRef, useState } from "react";
+import { autosaveInterview, fetchAutosave } from "../api/interviewApi.js";
+
+const AUTOSAVE_DELAY_MS = 2000;
+
+// Минимальная дельта между двумя строками: общий префикс и суффикс отбрасываем,
+// на бэк уходит только изменившийся кусок.
+// Позиции считаем в кодовых точках (Array.from), а не в UTF-16 единицах
+// строки JS — бэк режет строку Python по кодовым точкам, и эмодзи
+// (суррогатная пара) иначе сдвигал бы все позиции после себя.
+function diffText(oldText, newText) {
+  const oldChars = Array.from(oldText);
+  const newChars = Array.from(newText);
+
+  let start = 0;
+  const maxStart = Math.min(oldChars.length, newChars.length);
+  while (start < maxStart && oldChars[start] === newChars[start]) {
+    start += 1;
+  }
+
+  let oldEnd = oldChars.length;
+  let newEnd = newChars.length;
+  while (
+    oldEnd > start &&
+    newEnd > start &&
+    oldChars[oldEnd - 1] === newChars[newEnd - 1]
+  ) {
+    oldEnd -= 1;
+    newEnd -= 1;
+  }
+
+  return {
+    start,
+    end: oldEnd,
+    text: newChars.slice(start, newEnd).join(""),
+  };
+}
+
+function collectDeltas(saved, current) {
+  const deltas = [];
+  for (const kind of ["coding", "theory"]) {
+    const savedAnswers = saved[kind] || {};
+    const currentAnswers = current[kind] || {};
+    for (const [level, text] of Object.entries(currentAnswers)) {
+      const prev = savedAnswers[level] || "";
+      if (prev === text) continue;
+      deltas.push({ kind, level, ...diffText(prev, text) });
+    }
+  }
+  return deltas;
+}
+
+/**
+ * enabled: boolean — включать/выключать автосохранение
+ * token: string | undefined — токен сессии
+ * codingSolutions / theorySolutions: { [level]: string } — текущие ответы
+ * onRestore: ({ coding, theory }) => void — подставить в редактор ответы,
+ *   сохранённые до перезагрузки страницы
+ *
+ * Пока снимок с бэка не загружен и не подставлен через onRestore,
+ * ничего не отправляем: иначе пустой редактор после перезагрузки
+ * затёр бы сохранённые ответы.
+ */
+export function useAutosave(
+  enabled,
+  token,
+  codingSolutions,
+  theorySolutions,
+  onRestore
+) {
+  // то, что уже лежит на бэке, и его версия
+  const savedRef = useRef({ coding: {}, theory: {} });
+  const versionRef = useRef(null);
+  const inFlightRef = useRef(false);
+  // пока сохранение в полёте, ответы успели измениться — нужен ещё один проход
+  const pendingRef = useRef(false);
+  const timerRef = useRef(null);
+
+  // последние ответы и колбэк: сохранение, запланированное из finally,
+  // должно видеть свежие значения, а не те, что были при его создании
+  const currentRef = useRef({ coding: codingSolutions, theory: theorySolutions });
+  currentRef.current = { coding: codingSolutions, theory: theorySolutions };
+  const onRestoreRef = useRef(onRestore);
+  onRestoreRef.current = onRestore;
+
+  const [restoredToken, setRestoredToken] = useState(null);
+  const restored = Boolean(token) && restoredToken === token;
+
+  const applySnapshot = (snapshot) => {
+    savedRef.current = {
+      coding: snapshot.coding_solutions || {},
+      theory: snapshot.theory_solutions || {},
+    };
+    versionRef.current = snapshot.version;
+  };
+
+  // ---------- ВОССТАНОВЛЕНИЕ ПОСЛЕ ПЕРЕЗАГРУЗКИ ----------
+
+  useEffect(() => {
+    if (!enabled || !token || restoredToken === token) return;
+
+    let cancelled = false;
+
+    async function restore() {
+      try {
+        const snapshot = await fetchAutosave(token);
+        if (cancelled) return;
+        applySnapshot(snapshot);
+        onRestoreRef.current?.({
+          coding: savedRef.current.coding,
+          theory: savedRef.current.theory,
+        });
+        setRestoredToken(token);
+      } catch (e) {
+        // без снимка автосохранение не включаем: лучше не сохранить,
+        // чем затереть то, что уже на бэке
+        console.error("Не удалось загрузить автосохранение:", e);
+      }
+    }
+
+    restore();
+
+    return () => {
+      cancelled = true;
+    };
+  }, [enabled, token, restoredToken]);
+
+  // ---------- СОХРАНЕНИЕ ДЕЛЬТ ----------
+
+  const saveRef = useRef(null);
+  saveRef.current = async () => {
+    if (inFlightRef.current) {
+      pendingRef.current = true;
+      return;
+    }
+    inFlightRef.current = true;
+
+    const current = currentRef.current;
+
+    try {
+      const deltas = collectDeltas(savedRef.current, current);
+      if (deltas.length === 0) return;
+
+      try {
+        const { version } = await autosaveInterview(token, {
+          base_version: versionRef.current,
+          deltas,
+        });
+        versionRef.current = version;
+        savedRef.current = {
+          coding: { ...savedRef.current.coding, ...current.coding },
+          theory: { ...savedRef.current.theory, ...current.theory },
+        };
+      } catch (e) {
+        // версия разъехалась (другая вкладка) — перечитаем снимок
+        // и отправим дельты уже от него
+        if (e.status === 409) {
+          applySnapshot(await fetchAutosave(token));
+          pendingRef.current = true;
+        } else {
+          throw e;
+        }
+      }
+    } catch (e) {
+      console.error("Ошибка автосохранения:", e);
+    } finally {
+      inFlightRef.current = false;
+      // последние правки пришли, пока шло сохранение, — досохраняем их,
+      // не дожидаясь следующего нажатия клавиши
+      const latest = currentRef.current;
+      const changed =
+        latest.coding !== current.coding || latest.theory !== current.theory;
+      if (pendingRef.current || changed) {
+        pendingRef.current = false;
+        clearTimeout(timerRef.current);
+        timerRef.current = setTimeout(() => saveRef.current(), AUTOSAVE_DELAY_MS);
+      }
+    }
+  };
+
+  useEffect(() => {
+    if (!enabled || !restored) return;
+
+    timerRef.current = setTimeout(() => saveRef.current(), AUTOSAVE_DELAY_MS);
+    return () => clearTimeout(timerRef.current);
+  }, [enabled, restored, token, codingSolutions, theorySolutions]);
+}